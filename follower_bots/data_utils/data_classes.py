@@ -4,6 +4,7 @@
 
 from enum import Enum
 
+import numpy as np
 from server.assets import AssetId
 
 
@@ -270,26 +271,34 @@ class StaticMap:
     def __init__(self, recent_map):
         self.coord_to_props = {}
 
-        # Iterate over each tile
-        for tile in recent_map.tiles:
-            if tile is None:
-                continue
-
-            # Extract offset coordinates of tile
-            offset_coord = tile.cell.coord.to_offset_coordinates()[::-1]
-            properties = self.get_property_list(tile)
-            self.coord_to_props[offset_coord] = properties
-
-    def get_property_list(self, tile):
+        # Read the tiles from the map's arrays (see MapUpdate.arrays()) rather
+        # than from Tile objects
+        map_arrays = recent_map.arrays()
+        rows, cols = np.nonzero(map_arrays.present)
+        rotations = map_arrays.rotations[rows, cols] % 360
+        layers = map_arrays.layers[rows, cols]
+        asset_ids = map_arrays.asset_ids[rows, cols]
+        for row, col, rotation, layer, asset_id in zip(
+            rows.tolist(),
+            cols.tolist(),
+            rotations.tolist(),
+            layers.tolist(),
+            asset_ids.tolist(),
+        ):
+            # Keyed by the reversed offset coordinates of the tile
+            self.coord_to_props[(col, row)] = self.get_property_list(
+                rotation, layer, asset_id
+            )
+
+    def get_property_list(self, rotation_degrees, layer, asset_id):
         props = []
 
         # Basic properties
-        rot_prop = MapProperty[f"ROT_{int(tile.rotation_degrees % 360)}"]
-        layer_prop = MapProperty[f"LAYER{tile.cell.layer}"]
+        rot_prop = MapProperty[f"ROT_{int(rotation_degrees % 360)}"]
+        layer_prop = MapProperty[f"LAYER{layer}"]
         props.extend([rot_prop, layer_prop])
 
         # Asset id processing
-        asset_id = tile.asset_id
         asset_props = asset_to_properties[asset_id]
         props.extend(asset_props)
 
@@ -0,0 +1,272 @@
+# File: game_timeline.py
+# ----------------------
+# In-memory view over the events of a single game. The helpers in
+# preprocess_sql.py re-query the database for every instruction and every
+# move; GameTimeline loads a game's events once and answers the same
+# questions (leader position, cards on the map, action masks, ...) from
+# Python lists.
+
+import bisect
+import json
+from collections import defaultdict
+
+import server.messages.map_update as map_update_msg
+import torch
+from server.actor import Actor
+from server.card import Card
+from server.hex import HecsCoord
+from server.messages.action import Action
+from server.messages.prop import PropType, PropUpdate
+from server.schemas.event import Event, EventType
+from server.schemas.util import InitialState
+
+import follower_bots.data_utils.data_classes as data_cls
+from follower_bots.constants import ACT_DIM
+
+CARD_EVENT_TYPES = [
+    EventType.CARD_SPAWN,
+    EventType.CARD_SELECT,
+    EventType.CARD_SET,
+    EventType.PROP_UPDATE,
+]
+
+
+class GameTimeline:
+    """
+    All events of a game, sorted by server time and indexed by type, role
+    and parent event. Construct with GameTimeline.load(game_id) to fetch the
+    events with a single query.
+    """
+
+    def __init__(self, events):
+        # Stable sort, so events with identical timestamps keep DB order.
+        self.events = sorted(events, key=lambda event: event.server_time)
+
+        self.by_type = defaultdict(list)
+        self.children = defaultdict(list)
+        self.actions_by_role = defaultdict(list)
+        for event in self.events:
+            self.by_type[event.type].append(event)
+            if event.parent_event_id is not None:
+                self.children[event.parent_event_id].append(event)
+            if event.type == EventType.ACTION:
+                self.actions_by_role[event.role].append(event)
+
+        self.action_times = {
+            role: [event.server_time for event in events]
+            for role, events in self.actions_by_role.items()
+        }
+        self.card_events = [
+            event for event in self.events if event.type in CARD_EVENT_TYPES
+        ]
+        self.card_event_times = [event.server_time for event in self.card_events]
+
+        self._static_map = None
+        self._initial_state = None
+
+    @classmethod
+    def load(cls, game_id):
+        events = Event.select().where(Event.game_id == game_id)
+        return cls(list(events))
+
+    def first(self, event_type):
+        events = self.by_type[event_type]
+        return events[0] if len(events) > 0 else None
+
+    def instructions(self):
+        return self.by_type[EventType.INSTRUCTION_SENT]
+
+    def child_of_type(self, parent, event_type):
+        for child in self.children[parent.id]:
+            if child.type == event_type:
+                return child
+        return None
+
+    # Instruction state #
+
+    def instruction_activation(self, instruction):
+        return self.child_of_type(instruction, EventType.INSTRUCTION_ACTIVATED)
+
+    def instruction_is_completed(self, instruction):
+        return self.child_of_type(instruction, EventType.INSTRUCTION_DONE) is not None
+
+    def instruction_is_cancelled(self, instruction):
+        return (
+            self.child_of_type(instruction, EventType.INSTRUCTION_CANCELLED) is not None
+        )
+
+    def instruction_done(self, instruction):
+        for event in self.by_type[EventType.INSTRUCTION_DONE]:
+            if event.short_code == instruction.short_code:
+                return event
+        return None
+
+    def follower_moves(self, instruction):
+        return [
+            child
+            for child in self.children[instruction.id]
+            if child.type == EventType.ACTION and child.role == "Role.FOLLOWER"
+        ]
+
+    # Map state #
+
+    def static_map_info(self):
+        if self._static_map is None:
+            map_update = map_update_msg.MapUpdate.from_json(
+                self.first(EventType.MAP_UPDATE).data
+            )
+            self._static_map = (data_cls.StaticMap(map_update), map_update)
+        return self._static_map
+
+    def initial_state(self):
+        if self._initial_state is None:
+            self._initial_state = InitialState.from_json(
+                self.first(EventType.INITIAL_STATE).data
+            )
+        return self._initial_state
+
+    def last_action(self, role, server_time, inclusive=False):
+        """Returns the last action by `role` strictly before (or at, if
+        inclusive) the given server time."""
+        times = self.action_times.get(role, [])
+        if inclusive:
+            index = bisect.bisect_right(times, server_time)
+        else:
+            index = bisect.bisect_left(times, server_time)
+        if index == 0:
+            return None
+        return self.actions_by_role[role][index - 1]
+
+    def agent_coords(self, agent_type, server_time, inclusive=False):
+        move = self.last_action(f"Role.{agent_type}", server_time, inclusive)
+        if move is None:
+            # Agent did not take an action before, return spawn positions
+            initial_state = self.initial_state()
+            if agent_type == "FOLLOWER":
+                location = initial_state.follower_position
+                orientation = (initial_state.follower_rotation_degrees - 60) % 360
+            else:
+                location = initial_state.leader_position
+                orientation = (initial_state.leader_rotation_degrees - 60) % 360
+            return location, orientation
+
+        # Reconstruct position and rotation following last action
+        last_action = Action.from_json(move.data)
+        location = HecsCoord.add(move.location, last_action.displacement)
+        orientation = (move.orientation + last_action.rotation - 60) % 360
+        return location, orientation
+
+    def cards_before(self, server_time, inclusive=False):
+        if inclusive:
+            end = bisect.bisect_right(self.card_event_times, server_time)
+        else:
+            end = bisect.bisect_left(self.card_event_times, server_time)
+
+        props = []
+        for event in self.card_events[:end]:
+            if event.type == EventType.CARD_SET:
+                data = json.loads(event.data)
+                cards_ids = set([int(card_dict["id"]) for card_dict in data["cards"]])
+                props = [prop for prop in props if prop.id not in cards_ids]
+            elif event.type == EventType.CARD_SPAWN:
+                card = Card.from_json(event.data)
+                props.append(card.prop())
+            elif event.type == EventType.CARD_SELECT:
+                card = Card.from_json(event.data)
+                for prop in props:
+                    if prop.id == card.id:
+                        prop.card_init.selected = card.selected
+                        break
+            else:
+                prop_update = PropUpdate.from_json(event.data)
+                props = [
+                    prop
+                    for prop in prop_update.props
+                    if prop.prop_type == PropType.CARD
+                ]
+        return props
+
+    # Trajectory construction #
+
+    def actions(self, instruction):
+        moves = self.follower_moves(instruction)
+        actions = [data_cls.ActionEnums[move.short_code] for move in moves]
+        if self.instruction_is_completed(instruction):
+            actions.append(data_cls.ActionEnums["DONE"])
+        return actions, moves
+
+    def dynamic_maps(self, instruction, actions, moves):
+        dynamic_maps = []
+        instruction_done = None
+        for i, _ in enumerate(actions):
+            if i < len(moves):
+                move = moves[i]
+                follower_location = move.location
+                follower_orientation = (move.orientation - 60) % 360
+                leader_location, leader_orientation = self.agent_coords(
+                    "LEADER", move.server_time
+                )
+                cards = self.cards_before(move.server_time)
+            else:
+                if instruction_done is None:
+                    instruction_done = self.instruction_done(instruction)
+                done_time = instruction_done.server_time
+                follower_location, follower_orientation = self.agent_coords(
+                    "FOLLOWER", done_time, inclusive=True
+                )
+                leader_location, leader_orientation = self.agent_coords(
+                    "LEADER", done_time, inclusive=True
+                )
+                cards = self.cards_before(done_time, inclusive=True)
+
+            dynamic_maps.append(
+                data_cls.DynamicMap(
+                    cards,
+                    follower_location,
+                    follower_orientation,
+                    leader_location,
+                    leader_orientation,
+                )
+            )
+        return dynamic_maps
+
+    def action_masks(self, map_update, instruction, moves, actions):
+        all_masks = []
+        for i, _ in enumerate(actions):
+            mask = torch.BoolTensor([False] * (ACT_DIM - 1))
+
+            if i < len(moves):
+                follower_loc = moves[i].location
+                follower_rot = moves[i].orientation
+            else:
+                instruction_done = self.instruction_done(instruction)
+                follower_loc, follower_rot = self.agent_coords(
+                    "FOLLOWER", instruction_done.server_time, inclusive=True
+                )
+                follower_rot = (follower_rot + 60) % 360
+
+            follower = Actor(0, 0, 0, follower_loc)
+            follower._projected_heading = follower_rot
+
+            forward = follower.ForwardLocation()
+            if map_update.get_edge_between(follower_loc, forward):
+                mask[data_cls.ActionEnums["MF"].value] = True
+
+            backward = follower.BackwardLocation()
+            if map_update.get_edge_between(follower_loc, backward):
+                mask[data_cls.ActionEnums["MB"].value] = True
+
+            all_masks.append(mask)
+
+        all_masks = torch.stack(all_masks, dim=0)  # Tx5
+        T = all_masks.shape[0]
+        padding = torch.BoolTensor([True]).unsqueeze(1).repeat(T, 1)
+        return torch.cat([all_masks, padding], dim=1)  # Tx6
+
+    def skip_instruction(self, instruction, actions, split):
+        if len(actions) == 0:
+            return True
+        elif split == "val":
+            return not self.instruction_is_completed(instruction)
+        else:
+            return self.instruction_is_cancelled(instruction)
@@ -4,6 +4,7 @@
 # it in a symbolic format for future use.
 
 import argparse
+import multiprocessing
 import os
 import pickle
 import random
@@ -18,7 +19,8 @@ import server.messages.map_update as map_update_msg
 import server.schemas.defaults
 import server.schemas.game
 from follower_bots.constants import EDGE_WIDTH, ACT_DIM
-from follower_bots.utils import mkdir
+from follower_bots.data_utils.game_timeline import GameTimeline
+from follower_bots.utils import dump_pickle, mkdir, remove_pickle_shards
 
 from server.messages.prop import PropUpdate, PropType
 from server.messages.action import Action
@@ -40,6 +42,18 @@ def get_args():
     parser.add_argument(
         "--config_filepath", type=str, default="./follower_bots/data_configs/pretraining_examples.json"
     )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=0,
+        help="If positive, load each game's events once and process games in this many worker processes. Output is written as shards.",
+    )
+    parser.add_argument(
+        "--shard_size",
+        type=int,
+        default=2000,
+        help="Number of trajectories per output shard when --num_workers is positive.",
+    )
 
     args = parser.parse_args()
     return args
@@ -127,12 +141,108 @@ def preprocess_games(args, games, output_dir, split_name):
                 print(f"Instruction {num_instructions} in {split_name}")
 
     datapath = os.path.join(output_dir, f"pretrain_{split_name}.pkl")
+    remove_pickle_shards(datapath)
     with open(datapath, "wb") as f:
         pickle.dump(trajectories, f)
 
     print(f"Finished {split_name} processing!")
 
 
+def init_preprocess_worker(config_filepath):
+    # Each worker process gets its own database connection.
+    cfg = config.ReadConfigOrDie(config_filepath)
+    base.SetDatabase(cfg)
+    base.ConnectDatabase()
+
+
+def preprocess_game_timeline(game_id, split_name):
+    """
+    Computes the trajectories of a single game from its in-memory timeline.
+    Produces the same tuples as preprocess_games, in the same order.
+    """
+    timeline = GameTimeline.load(game_id)
+
+    trajectories = []
+    for instruction in timeline.instructions():
+        instruction_activation = timeline.instruction_activation(instruction)
+        if instruction_activation is None:
+            continue
+        text = ObjectiveMessage.from_json(instruction.data).text
+
+        actions, moves = timeline.actions(instruction)
+        if timeline.skip_instruction(instruction, actions, split_name):
+            continue
+
+        static_map, map = timeline.static_map_info()
+        dynamic_maps = timeline.dynamic_maps(instruction, actions, moves)
+        final_follower_pos = get_final_follower_pos(
+            dynamic_maps[-1], timeline.instruction_is_completed(instruction), moves
+        )
+        change_grid, special_cards = get_change_grid(dynamic_maps)
+        action_masks = timeline.action_masks(map, instruction, moves, actions)
+
+        trajectories.append(
+            (
+                text,
+                static_map,
+                dynamic_maps,
+                actions,
+                game_id,
+                instruction_activation.id,
+                final_follower_pos,
+                change_grid,
+                special_cards,
+                action_masks
+            )
+        )
+    return trajectories
+
+
+def _preprocess_game_worker(job):
+    game_id, split_name = job
+    return preprocess_game_timeline(game_id, split_name)
+
+
+def shard_path(output_dir, split_name, shard_index):
+    return os.path.join(output_dir, f"pretrain_{split_name}.shard{shard_index:05d}.pkl")
+
+
+def preprocess_games_parallel(args, games, output_dir, split_name):
+    """
+    Parallel version of preprocess_games. Games are fanned out over a process
+    pool and results are written, in game order, to shards of at most
+    args.shard_size trajectories as soon as they are available.
+    """
+    jobs = [(game.id, split_name) for game in games]
+    context = multiprocessing.get_context("spawn")
+    remove_pickle_shards(os.path.join(output_dir, f"pretrain_{split_name}.pkl"))
+
+    shard = []
+    shard_index = 0
+    num_instructions = 0
+    with context.Pool(
+        args.num_workers,
+        initializer=init_preprocess_worker,
+        initargs=(args.config_filepath,),
+    ) as pool:
+        for trajectories in pool.imap(_preprocess_game_worker, jobs, chunksize=4):
+            shard.extend(trajectories)
+            num_instructions += len(trajectories)
+            while len(shard) >= args.shard_size:
+                dump_pickle(
+                    shard_path(output_dir, split_name, shard_index),
+                    shard[: args.shard_size],
+                )
+                shard = shard[args.shard_size :]
+                shard_index += 1
+                print(f"Instruction {num_instructions} in {split_name}")
+
+    if len(shard) > 0 or shard_index == 0:
+        dump_pickle(shard_path(output_dir, split_name, shard_index), shard)
+
+    print(f"Finished {split_name} processing!")
+
+
 def get_instruction_activation(instruction):
     activation_query = instruction.children.where(
         Event.type == EventType.INSTRUCTION_ACTIVATED
@@ -532,8 +642,12 @@ def main():
 
     # Get train and val games
     train_games, val_games = get_tr_val_games(cfg)
-    preprocess_games(args, train_games, args.output_dir, "train")
-    preprocess_games(args, val_games, args.output_dir, "val")
+    if args.num_workers > 0:
+        preprocess_games_parallel(args, train_games, args.output_dir, "train")
+        preprocess_games_parallel(args, val_games, args.output_dir, "val")
+    else:
+        preprocess_games(args, train_games, args.output_dir, "train")
+        preprocess_games(args, val_games, args.output_dir, "val")
     save_leader_games(args, train_games + val_games, args.output_dir)
 
 
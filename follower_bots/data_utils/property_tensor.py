@@ -0,0 +1,189 @@
+# File: property_tensor.py
+# ------------------------
+# Vectorized construction of the Px25x25 property tensors fed to the follower
+# model. The static map contributes most of the properties and rarely changes
+# within a game, so it is packed into a tensor once and cached. On every step
+# only the handful of dynamic properties (cards, agents) are scattered into a
+# copy of it. Rollouts pack the static tensor straight from the map's arrays
+# (see MapUpdate.arrays()).
+
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from follower_bots.constants import EDGE_WIDTH, TORCH_DEVICE
+from follower_bots.data_utils.data_classes import (
+    DynamicMap,
+    MapProperty,
+    asset_to_properties,
+)
+
+NUM_CELLS = EDGE_WIDTH**2
+
+
+class StaticPropertyTensor:
+    """
+    The static properties of a map packed into a PAD-filled (P x 625) tensor,
+    along with the number of static properties held by each cell.
+    """
+
+    def __init__(self, static_map):
+        properties = [[] for _ in range(NUM_CELLS)]
+        for (x, y), props in static_map.coord_to_props.items():
+            properties[x * EDGE_WIDTH + y].extend([prop.value for prop in props])
+
+        self.lengths = [len(props) for props in properties]
+        self.size = max(self.lengths)
+        pad = [MapProperty["PAD"].value]
+        padded = [props + pad * (self.size - len(props)) for props in properties]
+        self.tensor = torch.Tensor(padded).T.contiguous()  # P x 625
+
+    @classmethod
+    def from_map_arrays(cls, map_arrays):
+        """
+        Packs the static properties of a MapArrays without building a StaticMap.
+        Equal to StaticPropertyTensor(StaticMap(map_update)).
+        """
+        rows, cols = np.nonzero(map_arrays.present)
+        cells = cols * EDGE_WIDTH + rows
+        rotations = map_arrays.rotations[rows, cols] % 360
+        layers = map_arrays.layers[rows, cols]
+
+        # Padded asset properties, one row per distinct asset id
+        asset_ids, asset_index = np.unique(
+            map_arrays.asset_ids[rows, cols], return_inverse=True
+        )
+        asset_props = [asset_to_properties[a] for a in asset_ids.tolist()]
+        num_asset_props = max([len(props) for props in asset_props], default=0)
+        asset_table = np.full(
+            (len(asset_props), num_asset_props), MapProperty["PAD"].value
+        )
+        for i, props in enumerate(asset_props):
+            asset_table[i, : len(props)] = [prop.value for prop in props]
+        asset_lengths = np.array([len(props) for props in asset_props], dtype=int)
+
+        padded = np.full((NUM_CELLS, 2 + num_asset_props), MapProperty["PAD"].value)
+        padded[cells, 0] = property_values(rotations, "ROT_{}")
+        padded[cells, 1] = property_values(layers, "LAYER{}")
+        padded[cells, 2:] = asset_table[asset_index]
+        lengths = np.zeros(NUM_CELLS, dtype=int)
+        lengths[cells] = 2 + asset_lengths[asset_index]
+
+        static_tensor = cls.__new__(cls)
+        static_tensor.lengths = lengths.tolist()
+        static_tensor.size = int(lengths.max())
+        static_tensor.tensor = torch.Tensor(
+            padded[:, : static_tensor.size].T.copy()
+        )  # P x 625
+        return static_tensor
+
+
+def property_values(values, name_format):
+    """
+    Maps an array of rotations or layers to MapProperty values, looking up each
+    distinct value once.
+    """
+    unique, index = np.unique(values, return_inverse=True)
+    lookup = [MapProperty[name_format.format(v)].value for v in unique.tolist()]
+    return np.array(lookup, dtype=int)[index]
+
+
+def dynamic_scatter_indices(static_tensor, dynamic_map):
+    """
+    Returns the (rows, cols, values) of the dynamic properties, placed after the
+    static properties of each cell, and the resulting property dimension.
+    """
+    rows, cols, values = [], [], []
+    size = static_tensor.size
+    for (x, y), props in dynamic_map.coord_to_props.items():
+        cell = x * EDGE_WIDTH + y
+        offset = static_tensor.lengths[cell]
+        for i, prop in enumerate(props):
+            rows.append(offset + i)
+            cols.append(cell)
+            values.append(prop.value)
+        size = max(size, offset + len(props))
+    return rows, cols, values, size
+
+
+def merge_properties(static_tensor, dynamic_maps, min_size=0):
+    """
+    Builds a T x P x 25 x 25 tensor for a list of T dynamic maps that share one
+    static map. P is the largest per-cell property count over all timesteps,
+    or min_size if that is larger.
+    """
+    scatters = [
+        dynamic_scatter_indices(static_tensor, dynamic_map)
+        for dynamic_map in dynamic_maps
+    ]
+    size = max([min_size, static_tensor.size] + [scatter[3] for scatter in scatters])
+
+    output = torch.full(
+        (len(dynamic_maps), size, NUM_CELLS), float(MapProperty["PAD"].value)
+    )
+    output[:, : static_tensor.size] = static_tensor.tensor
+    for t, (rows, cols, values, _) in enumerate(scatters):
+        if len(values) > 0:
+            output[t, rows, cols] = torch.Tensor(values)
+    return output.view(len(dynamic_maps), size, EDGE_WIDTH, EDGE_WIDTH)
+
+
+def map_fingerprint(map_arrays):
+    return (map_arrays.rows, map_arrays.cols) + tuple(
+        array.tobytes()
+        for array in (
+            map_arrays.present,
+            map_arrays.asset_ids,
+            map_arrays.rotations,
+            map_arrays.layers,
+        )
+    )
+
+
+class PropertyTensorBuilder:
+    """
+    Builds property tensors for rollouts, caching static map tensors across
+    steps. The cache is keyed by the MapUpdate object, falling back to its tile
+    contents, so a new map (or a censored follower view that changed) misses.
+    Holds up to max_entries maps so that batched rollouts over several games
+    don't evict each other.
+    """
+
+    def __init__(self, device=TORCH_DEVICE, max_entries=64):
+        self.device = device
+        self.max_entries = max_entries
+        self._by_identity = OrderedDict()
+        self._by_fingerprint = OrderedDict()
+
+    def static_tensor(self, map_update):
+        entry = self._by_identity.get(id(map_update))
+        if entry is not None and entry[0] is map_update:
+            return entry[1]
+
+        map_arrays = map_update.arrays()
+        fingerprint = map_fingerprint(map_arrays)
+        static_tensor = self._by_fingerprint.get(fingerprint)
+        if static_tensor is None:
+            static_tensor = StaticPropertyTensor.from_map_arrays(map_arrays)
+        self._by_fingerprint[fingerprint] = static_tensor
+        self._by_fingerprint.move_to_end(fingerprint)
+        self._by_identity[id(map_update)] = (map_update, static_tensor)
+        self._by_identity.move_to_end(id(map_update))
+
+        for cache in (self._by_fingerprint, self._by_identity):
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+        return static_tensor
+
+    def build(self, map_update, cards, agent_coords, min_size=0):
+        """
+        Returns the 1xPx25x25 property tensor for the current step. agent_coords
+        is the (f_loc, f_ang, l_loc, l_ang) tuple of pyclient_utils.get_agent_coords.
+        """
+        f_loc, f_ang, l_loc, l_ang = agent_coords
+        dynamic_map = DynamicMap(cards, f_loc, f_ang, l_loc, l_ang)
+        properties = merge_properties(
+            self.static_tensor(map_update), [dynamic_map], min_size
+        )
+        return properties.to(self.device)
@@ -18,12 +18,8 @@ from follower_bots.constants import (
     TORCH_DEVICE,
     VISIBLE_DISTANCE,
 )
-from follower_bots.data_utils.data_classes import (
-    ActionEnums,
-    DynamicMap,
-    MapProperty,
-    StaticMap,
-)
+from follower_bots.data_utils.data_classes import ActionEnums, MapProperty
+from follower_bots.data_utils.property_tensor import PropertyTensorBuilder
 from follower_bots.models.hex_conv import HexCrop
 from follower_bots.models.hex_util import AxialTranslatorRotator, OffsetToAxialConverter
 from follower_bots.models.pose import Pose
@@ -176,45 +172,17 @@ def get_processed_states_mp(
         return curr_state
 
 
+# Caches static map tensors across rollout steps.
+property_tensor_builder = PropertyTensorBuilder()
+
+
 def get_property_tensor(states, map, cards, actors):
-    properties = [[] for i in range(EDGE_WIDTH**2)]
-
-    # Process the properties: This is not the most efficient but reuses code
-    static_map = StaticMap(map)
-    f_loc, f_ang, l_loc, l_ang = get_agent_coords(actors)
-    dynamic_map = DynamicMap(cards, f_loc, f_ang, l_loc, l_ang)
-
-    # Add the properties from the processed data structures
-    for x in range(EDGE_WIDTH):
-        for y in range(EDGE_WIDTH):
-            # Add static props
-            if (x, y) in static_map.coord_to_props:
-                properties[x * EDGE_WIDTH + y].extend(
-                    [prop.value for prop in static_map.coord_to_props[(x, y)]]
-                )
-            if (x, y) in dynamic_map.coord_to_props:
-                properties[x * EDGE_WIDTH + y].extend(
-                    [prop.value for prop in dynamic_map.coord_to_props[(x, y)]]
-                )
-
-    # Pad it
-    properties = [torch.Tensor(prop) for prop in properties]
-    properties = (
-        pad_sequence(properties, padding_value=MapProperty["PAD"].value)
-        .view(-1, EDGE_WIDTH, EDGE_WIDTH)
-        .unsqueeze(0)
+    # Only the dynamic props are recomputed each step, see property_tensor.py
+    min_size = states.shape[2] if states != [] else 0
+    return property_tensor_builder.build(
+        map, cards, get_agent_coords(actors), min_size
     )  # 1xPx25x25
 
-    if states != []:
-        B, P, H, W = properties.shape
-        max_size = states.shape[2]
-        if max_size > P:
-            padding = torch.full((1, max_size - P, H, W), MapProperty["PAD"].value)
-            properties = torch.cat([properties, padding], dim=1)
-
-    # Push to device
-    return properties.to(TORCH_DEVICE)
-
 
 def get_agent_coords(actors):
     # Get follower coords
@@ -20,16 +20,17 @@ from follower_bots.constants import (
     TORCH_DEVICE,
     VISIBLE_DISTANCE,
 )
-from follower_bots.data_utils.data_classes import (
-    ActionEnums,
-    DynamicProperty,
-    MapProperty,
+from follower_bots.data_utils.data_classes import ActionEnums, DynamicProperty
+from follower_bots.data_utils.property_tensor import (
+    StaticPropertyTensor,
+    dynamic_scatter_indices,
+    merge_properties,
 )
 from follower_bots.data_utils.pyclient_utils import leader_idx_to_game_action
 from follower_bots.models.hex_conv import HexCrop
 from follower_bots.models.hex_util import AxialTranslatorRotator, OffsetToAxialConverter
 from follower_bots.models.pose import Pose
-from follower_bots.utils import load_pickle
+from follower_bots.utils import load_pickle, load_pickle_shards
 
 
 class SQLDataset(Dataset):
@@ -80,7 +81,7 @@ class SQLDataset(Dataset):
     def load_from_standard(
         self, dataset_path, preprocess_path, device=TORCH_DEVICE
     ):
-        trajectories = load_pickle(dataset_path)
+        trajectories = load_pickle_shards(dataset_path)
 
         self.instructions = []
         self.pos_indices = []
@@ -174,66 +175,19 @@ class SQLDataset(Dataset):
     def get_max_property_size(self, trajectories):
         max_size = 0
         for _, static_map, dynamic_map, _, _, _, _, _, _, _ in trajectories:
-            static_properties = self.extract_static_props(static_map)
-            all_dynamic_properties = self.extract_dynamic_props(dynamic_map)
-
-            for dynamic_props in all_dynamic_properties:
-                for i, dynamic_prop in enumerate(dynamic_props):
-                    static_prop = static_properties[i]
-                    curr_size = len(static_prop) + len(dynamic_prop)
-                    if curr_size > max_size:
-                        max_size = curr_size
+            static_tensor = StaticPropertyTensor(static_map)
+            for dynamic_props in dynamic_map:
+                size = dynamic_scatter_indices(static_tensor, dynamic_props)[3]
+                max_size = max(max_size, size)
         return max_size
 
     def get_property_tensor(self, static_map, dynamic_map, max_size):
-        # Get a list of lists of size 625 (25*25) where each list contains property indices
-        static_properties = self.extract_static_props(static_map)
-        all_dynamic_properties = self.extract_dynamic_props(dynamic_map)
-
-        # Get properties for each tile, repeated for each timestep
-        all_tiles_merged = []
-        for dynamic_props in all_dynamic_properties:
-            for i, dynamic_prop in enumerate(dynamic_props):
-                static_prop = static_properties[i]
-                all_tiles_merged.append(torch.Tensor(static_prop + dynamic_prop))
-
-        # Pad the property lists to be of the same size: Px(625xT)
-        padded_tiles = pad_sequence(
-            all_tiles_merged, padding_value=MapProperty["PAD"].value
-        )
-
-        # Extract property map for each individual timestep
-        return_tiles = []
-        for t in range(len(dynamic_map)):
-            curr_tiles = padded_tiles[
-                :, t * EDGE_WIDTH**2 : (t + 1) * EDGE_WIDTH**2
-            ].view(-1, EDGE_WIDTH, EDGE_WIDTH)
-            return_tiles.append(curr_tiles)
-
-        # Output: BxPx25x25 tensor
-        return_tiles = torch.stack(return_tiles, dim=0)
-        B, P, H, W = return_tiles.shape
-        if max_size > return_tiles.shape[1]:
-            padding = torch.full((B, max_size - P, H, W), MapProperty["PAD"].value)
-            return_tiles = torch.cat([return_tiles, padding], dim=1)
+        # Output: BxPx25x25 tensor. The static properties are packed once and the
+        # dynamic ones scattered on top for each timestep, see property_tensor.py
+        static_tensor = StaticPropertyTensor(static_map)
+        return_tiles = merge_properties(static_tensor, dynamic_map, max_size)
         return return_tiles.to(self.device)
 
-    def extract_static_props(self, static_map):
-        static_properties = [[] for i in range(EDGE_WIDTH**2)]
-        for (x, y), props in static_map.coord_to_props.items():
-            static_properties[x * EDGE_WIDTH + y].extend([prop.value for prop in props])
-        return static_properties
-
-    def extract_dynamic_props(self, dynamic_maps):
-        all_dynamic_properties = []
-        for i, dynamic_map in enumerate(dynamic_maps):
-            all_dynamic_properties.append([[] for j in range(EDGE_WIDTH**2)])
-            for (x, y), props in dynamic_map.coord_to_props.items():
-                all_dynamic_properties[i][x * EDGE_WIDTH + y].extend(
-                    [prop.value for prop in props]
-                )
-        return all_dynamic_properties
-
     def get_poses(self, dynamic_maps):
         positions = []
         rotations = []
@@ -0,0 +1,153 @@
+import argparse
+import logging
+import os
+import tempfile
+import unittest
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import torch
+
+# The game is recorded through the cb2game package, so that it shares the
+# database and config that follower_bots' server.* modules read from.
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.assets import AssetNamesFromTileClass, TileClass
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.config.map_config import MapConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.game import Game
+from follower_bots.data_utils.data_classes import AssetId, asset_to_properties
+from follower_bots.data_utils.preprocess_sql import (
+    preprocess_game_timeline,
+    preprocess_games,
+)
+from follower_bots.utils import dump_pickle, load_pickle, load_pickle_shards
+
+# Moves the follower makes for each instruction before marking it done. Turns
+# are always legal, whatever the map looks like around the follower.
+FOLLOWER_MOVES = [Action.Right(), Action.Right(), Action.Left()]
+NUM_INSTRUCTIONS = 3
+
+
+def play_game(coordinator, lobby):
+    """
+    Plays a game where the follower makes a few moves for each instruction,
+    leaving the last instruction unfinished.
+    """
+    game_name = coordinator.CreateGame(
+        log_to_db=True, realtime_actions=True, lobby=lobby
+    )
+    endpoint_pair = EndpointPair(coordinator, game_name)
+    endpoint_pair.initialize()
+    _, _, turn_state, instructions, _, _ = endpoint_pair.initial_state()
+    sent, moves = 0, 0
+    while not endpoint_pair.over():
+        active = [i for i in instructions if not (i.completed or i.cancelled)]
+        if turn_state.turn == Role.LEADER:
+            if sent == NUM_INSTRUCTIONS and not active:
+                break
+            if not active:
+                action = Action.SendInstruction(f"instruction {sent}")
+                sent += 1
+            else:
+                action = Action.EndTurn()
+        elif not active:
+            action = Action.EndTurn()
+        elif moves < len(FOLLOWER_MOVES):
+            action = FOLLOWER_MOVES[moves]
+            moves += 1
+        elif sent < NUM_INSTRUCTIONS:
+            action = Action.InstructionDone(active[0].uuid)
+            moves = 0
+        else:
+            break
+        _, _, turn_state, instructions, _, _ = endpoint_pair.step(action)
+    coordinator.Cleanup()
+
+
+class GameTimelineTest(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        # Newer streetlight assets have no follower properties, so keep them out
+        # of the generated map.
+        streetlight_tiles = [
+            name
+            for name in AssetNamesFromTileClass(TileClass.STREETLIGHT_TILES)
+            if AssetId[name].value in asset_to_properties
+        ]
+        self.config = Config(
+            comment="Game Timeline Unit Test Config",
+            map_config=MapConfig(streetlight_tiles=streetlight_tiles),
+        )
+        SetGlobalConfig(self.config)
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        play_game(LocalGameCoordinator(self.config), lobby)
+        self.games = list(Game.select())
+        self.output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+
+    def assert_trajectories_equal(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            (text, static_map, dynamic_maps, actions, game_id, activation_id) = a[:6]
+            self.assertEqual((text, actions, game_id, activation_id), (e[0],) + e[3:6])
+            self.assertEqual(static_map.coord_to_props, e[1].coord_to_props)
+            self.assertEqual(
+                [d.coord_to_props for d in dynamic_maps],
+                [d.coord_to_props for d in e[2]],
+            )
+            final_follower_pos, change_grid, special_cards, action_masks = a[6:]
+            self.assertEqual(final_follower_pos, e[6])
+            self.assertTrue(torch.equal(change_grid, e[7]))
+            self.assertEqual(special_cards, e[8])
+            self.assertTrue(torch.equal(action_masks, e[9]))
+
+    def test_matches_db_queries(self):
+        for split_name in ["train", "val"]:
+            preprocess_games(
+                argparse.Namespace(), self.games, self.output_dir.name, split_name
+            )
+            expected = load_pickle(
+                os.path.join(self.output_dir.name, f"pretrain_{split_name}.pkl")
+            )
+            actual = []
+            for game in self.games:
+                actual.extend(preprocess_game_timeline(game.id, split_name))
+            # Validation only keeps completed instructions, so it drops the
+            # unfinished last one.
+            num_completed = NUM_INSTRUCTIONS - (split_name == "val")
+            self.assertEqual(len(expected), num_completed)
+            self.assert_trajectories_equal(actual, expected)
+
+    def test_rerun_replaces_old_shards(self):
+        datapath = os.path.join(self.output_dir.name, "pretrain_train.pkl")
+        for shard_index in range(3):
+            dump_pickle(
+                datapath.replace(".pkl", f".shard{shard_index:05d}.pkl"), ["stale"]
+            )
+        preprocess_games(
+            argparse.Namespace(), self.games, self.output_dir.name, "train"
+        )
+        self.assertEqual(os.listdir(self.output_dir.name), ["pretrain_train.pkl"])
+        self.assertNotIn("stale", load_pickle_shards(datapath))
+
+
+if __name__ == "__main__":
+    unittest.main()
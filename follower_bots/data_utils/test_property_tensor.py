@@ -0,0 +1,153 @@
+import dataclasses
+import random
+import unittest
+
+import numpy as np
+import torch
+from server.map_provider import MapProvider, MapType
+from torch.nn.utils.rnn import pad_sequence
+
+from follower_bots.constants import EDGE_WIDTH
+from follower_bots.data_utils.data_classes import (
+    DynamicMap,
+    MapProperty,
+    StaticMap,
+    asset_to_properties,
+)
+from follower_bots.data_utils.property_tensor import (
+    PropertyTensorBuilder,
+    StaticPropertyTensor,
+    merge_properties,
+)
+
+
+def legacy_property_tensor(static_map, dynamic_maps, max_size=0):
+    """The per-cell loop previously used by pyclient_utils and SQLDataset."""
+    all_tiles_merged = []
+    for dynamic_map in dynamic_maps:
+        for x in range(EDGE_WIDTH):
+            for y in range(EDGE_WIDTH):
+                props = []
+                if (x, y) in static_map.coord_to_props:
+                    props.extend([p.value for p in static_map.coord_to_props[(x, y)]])
+                if (x, y) in dynamic_map.coord_to_props:
+                    props.extend([p.value for p in dynamic_map.coord_to_props[(x, y)]])
+                all_tiles_merged.append(torch.Tensor(props))
+
+    padded_tiles = pad_sequence(
+        all_tiles_merged, padding_value=MapProperty["PAD"].value
+    )
+    return_tiles = []
+    for t in range(len(dynamic_maps)):
+        curr_tiles = padded_tiles[
+            :, t * EDGE_WIDTH**2 : (t + 1) * EDGE_WIDTH**2
+        ].view(-1, EDGE_WIDTH, EDGE_WIDTH)
+        return_tiles.append(curr_tiles)
+
+    return_tiles = torch.stack(return_tiles, dim=0)
+    B, P, H, W = return_tiles.shape
+    if max_size > P:
+        padding = torch.full((B, max_size - P, H, W), MapProperty["PAD"].value)
+        return_tiles = torch.cat([return_tiles, padding], dim=1)
+    return return_tiles
+
+
+def legacy_static_props(map_update):
+    """StaticMap.coord_to_props as previously built from the Tile objects."""
+    coord_to_props = {}
+    for tile in map_update.tiles:
+        coord_to_props[tile.cell.coord.to_offset_coordinates()[::-1]] = [
+            MapProperty[f"ROT_{int(tile.rotation_degrees % 360)}"],
+            MapProperty[f"LAYER{tile.cell.layer}"],
+        ] + asset_to_properties[tile.asset_id]
+    return coord_to_props
+
+
+class PropertyTensorTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(17)
+        np.random.seed(17)
+        self.map_provider = MapProvider(MapType.RANDOM)
+        # Drop tiles with assets the follower model doesn't know about.
+        map_update = self.map_provider.map()
+        self.map_update = dataclasses.replace(
+            map_update,
+            tiles=[t for t in map_update.tiles if t.asset_id in asset_to_properties],
+        )
+        self.static_map = StaticMap(self.map_update)
+
+        # Select a few cards to exercise the shape/color/count properties.
+        self.cards = [card.prop() for card in self.map_provider.cards()]
+        for prop in self.cards[::2]:
+            prop.card_init.selected = True
+
+    def random_dynamic_map(self):
+        cards = random.sample(self.cards, k=len(self.cards) // 2)
+        follower = random.choice(self.map_provider.spawn_points())
+        leader = random.choice(self.map_provider.spawn_points())
+        return DynamicMap(
+            cards,
+            follower,
+            random.choice(range(0, 360, 60)),
+            leader,
+            random.choice(range(0, 360, 60)),
+        )
+
+    def test_single_step_matches_legacy(self):
+        builder = PropertyTensorBuilder(device=torch.device("cpu"))
+        for _ in range(10):
+            dynamic_map = self.random_dynamic_map()
+            expected = legacy_property_tensor(self.static_map, [dynamic_map])
+            actual = merge_properties(
+                builder.static_tensor(self.map_update), [dynamic_map]
+            )
+            self.assertEqual(actual.dtype, expected.dtype)
+            self.assertTrue(torch.equal(actual, expected))
+
+    def test_trajectory_matches_legacy(self):
+        dynamic_maps = [self.random_dynamic_map() for _ in range(8)]
+        for max_size in [0, 20]:
+            expected = legacy_property_tensor(self.static_map, dynamic_maps, max_size)
+            actual = merge_properties(
+                StaticPropertyTensor(self.static_map), dynamic_maps, max_size
+            )
+            self.assertTrue(torch.equal(actual, expected))
+
+    def test_static_map_matches_tiles(self):
+        self.assertEqual(
+            self.static_map.coord_to_props, legacy_static_props(self.map_update)
+        )
+
+    def test_static_map_skips_none_tiles(self):
+        tiles = list(self.map_update.tiles)
+        tiles[0] = None
+        map_update = dataclasses.replace(self.map_update, tiles=tiles)
+        expected = legacy_static_props(
+            dataclasses.replace(self.map_update, tiles=tiles[1:])
+        )
+        self.assertEqual(StaticMap(map_update).coord_to_props, expected)
+
+    def test_static_tensor_from_map_arrays(self):
+        # The full map, and a partial one like a censored follower view.
+        partial_map = dataclasses.replace(
+            self.map_update, tiles=self.map_update.tiles[::3]
+        )
+        for map_update in [self.map_update, partial_map]:
+            expected = StaticPropertyTensor(StaticMap(map_update))
+            actual = StaticPropertyTensor.from_map_arrays(map_update.arrays())
+            self.assertEqual(actual.size, expected.size)
+            self.assertEqual(actual.lengths, expected.lengths)
+            self.assertEqual(actual.tensor.dtype, expected.tensor.dtype)
+            self.assertTrue(torch.equal(actual.tensor, expected.tensor))
+
+    def test_static_tensor_is_cached(self):
+        builder = PropertyTensorBuilder(device=torch.device("cpu"))
+        first = builder.static_tensor(self.map_update)
+        self.assertIs(builder.static_tensor(self.map_update), first)
+        # An equal map in a different object reuses the tensor as well.
+        copy = type(self.map_update).from_json(self.map_update.to_json())
+        self.assertIs(builder.static_tensor(copy), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
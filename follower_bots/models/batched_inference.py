@@ -0,0 +1,343 @@
+# File: batched_inference
+# -----------------------
+# A local inference service for hosting many model-driven followers at once.
+# Pending follower decisions from different games are collected, padded into
+# one batch and run through a single forward pass on a worker thread, keeping
+# the asyncio event loop free. Each game keeps its own GPT-2 KV cache, so a
+# decision only embeds the newest state/action, exactly like
+# DecisionTransformer.compute_logits_with_past does for a single game.
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import torch
+import torch.nn.functional as F
+from torch.distributions.categorical import Categorical
+
+from follower_bots.constants import TEXT_PAD_IDX
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FollowerDecision:
+    """The inputs of one DecisionTransformer.sample_action call, for one game."""
+
+    game_id: int
+    states: torch.Tensor  # 1 x T x P x H x W
+    actions: torch.Tensor  # 1 x T
+    timesteps: torch.Tensor  # 1 x T
+    proc_instruction: torch.Tensor  # 1 x T'
+    pos_idx: torch.Tensor  # 1 x (T' + 2T)
+    attention_mask: torch.Tensor  # 1 x T
+    text_mask: torch.Tensor  # 1 x T'
+    action_mask: torch.Tensor  # 1 x (A - 1)
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+def legacy_past(past):
+    """Returns the KV cache as a tuple of (key, value) tuples per layer. Newer
+    transformers versions return Cache objects instead of tuples."""
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    if hasattr(past, "layers"):
+        return tuple((layer.keys, layer.values) for layer in past.layers)
+    return past
+
+
+def model_past(past):
+    """Inverse of legacy_past, for transformers versions that expect a Cache."""
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return past
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(past)
+    return DynamicCache(past)
+
+
+def _left_pad(tensor, length, value):
+    """Left-pads the last dimension of a 1 x N tensor to length."""
+    padding = length - tensor.shape[-1]
+    if padding <= 0:
+        return tensor
+    return F.pad(tensor, (padding, 0), value=value)
+
+
+def _past_row(past, row, start):
+    """Slices a single game's KV cache out of a batched one."""
+    return tuple(
+        tuple(tensor[row : row + 1, :, start:, :] for tensor in layer) for layer in past
+    )
+
+
+def _stack_pasts(pasts, length):
+    """Left-pads each game's KV cache to length and stacks them into a batch."""
+    stacked = []
+    for layer in range(len(pasts[0])):
+        tensors = []
+        for kv in range(len(pasts[0][layer])):
+            padded = [
+                F.pad(past[layer][kv], (0, 0, length - past[layer][kv].shape[2], 0))
+                for past in pasts
+            ]
+            tensors.append(torch.cat(padded, dim=0))
+        stacked.append(tuple(tensors))
+    return tuple(stacked)
+
+
+class BatchedFollowerService:
+    """
+    Batches follower decisions across games for a single DecisionTransformer.
+
+    Call sample_action() from any coroutine running on the service's event
+    loop; it resolves to the sampled action index once the batch containing
+    the decision has run. A batch is dispatched as soon as max_batch_size
+    decisions are pending, or max_latency_s after the first one arrived.
+    Call reset_game() when a game's instruction ends (where follower_demo
+    calls reset_past_output()), and end_game() when the game is over.
+    """
+
+    def __init__(self, follower, max_batch_size=16, max_latency_s=0.01):
+        self.follower = follower
+        self.follower.eval()
+        self.max_batch_size = max_batch_size
+        self.max_latency_s = max_latency_s
+
+        self._pending = None
+        self._task = None
+        # One thread: torch parallelizes internally and the KV caches below
+        # must not be touched concurrently.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._past_outputs = {}  # game_id -> KV cache of that game.
+
+        # Statistics for monitoring.
+        self.batches_run = 0
+        self.decisions_run = 0
+        self.total_inference_s = 0.0
+
+    def start(self):
+        self._pending = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=True)
+
+    def reset_game(self, game_id):
+        self._past_outputs.pop(game_id, None)
+
+    def end_game(self, game_id):
+        self.reset_game(game_id)
+
+    def has_past_output(self, game_id):
+        return game_id in self._past_outputs
+
+    def mean_batch_size(self):
+        if self.batches_run == 0:
+            return 0
+        return self.decisions_run / self.batches_run
+
+    async def sample_action(
+        self,
+        game_id,
+        states,
+        actions,
+        timesteps,
+        proc_instruction,
+        pos_idx,
+        attention_mask,
+        text_mask,
+        action_mask,
+    ):
+        decision = FollowerDecision(
+            game_id,
+            states,
+            actions,
+            timesteps,
+            proc_instruction,
+            pos_idx,
+            attention_mask,
+            text_mask,
+            action_mask,
+            asyncio.get_running_loop().create_future(),
+        )
+        await self._pending.put(decision)
+        return await decision.future
+
+    async def _next_batch(self):
+        batch = [await self._pending.get()]
+        deadline = time.monotonic() + self.max_latency_s
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # A game only ever has one decision in flight, but guard against
+            # misuse: a second decision for the same game waits for the next batch.
+            seen = set()
+            ready, deferred = [], []
+            for decision in batch:
+                (deferred if decision.game_id in seen else ready).append(decision)
+                seen.add(decision.game_id)
+            for decision in deferred:
+                self._pending.put_nowait(decision)
+
+            start_time = time.monotonic()
+            try:
+                actions = await loop.run_in_executor(
+                    self._executor, self._run_batch, ready
+                )
+            except Exception as e:
+                logger.exception("Batched follower inference failed.")
+                for decision in ready:
+                    if not decision.future.done():
+                        decision.future.set_exception(e)
+                continue
+            self.total_inference_s += time.monotonic() - start_time
+            self.batches_run += 1
+            self.decisions_run += len(ready)
+
+            for decision, action in zip(ready, actions):
+                if not decision.future.done():
+                    decision.future.set_result(action)
+
+    # Everything below runs on the worker thread.
+
+    def _run_batch(self, decisions):
+        # The state PAD embedding isn't zero, so padding the property dimension
+        # would change the outputs. Decisions are grouped by property count
+        # instead, and by whether the game already has a KV cache.
+        groups = {}
+        for d in decisions:
+            key = (d.game_id in self._past_outputs, d.states.shape[2])
+            groups.setdefault(key, []).append(d)
+
+        logits = {}
+        with torch.no_grad():
+            for (has_past, _), group in groups.items():
+                if has_past:
+                    logits.update(self._with_past_logits(group))
+                else:
+                    logits.update(self._first_sample_logits(group))
+
+        return [self._sample(logits[d.game_id]) for d in decisions]
+
+    def _sample(self, final_prob):
+        if self.follower.sampling_strat == "softmax":
+            return Categorical(F.softmax(final_prob, dim=0)).sample().item()
+        return torch.argmax(final_prob, dim=0).item()
+
+    def _final_probabilities(self, a_probs, decisions):
+        # Mirrors DecisionTransformer.compute_logits_with_past
+        final_prob = a_probs[:, -1, :-1] / self.follower.inference_temperature
+        action_mask = torch.cat([d.action_mask for d in decisions], dim=0)
+        final_prob.masked_fill_(action_mask.to(final_prob.device), -float("inf"))
+        return final_prob.cpu()
+
+    def _to_device(self, tensor):
+        return tensor.to(self.follower.device)
+
+    def _first_sample_logits(self, decisions):
+        text_length = max(d.proc_instruction.shape[1] for d in decisions)
+
+        # Text is left-padded so that every game's state lands on the last
+        # position. Position ids are explicit, so padding doesn't shift them.
+        states = torch.cat([d.states[:, -1:] for d in decisions])
+        text = torch.cat(
+            [
+                _left_pad(d.proc_instruction, text_length, TEXT_PAD_IDX)
+                for d in decisions
+            ]
+        )
+        text_mask = torch.cat(
+            [_left_pad(d.text_mask, text_length, 0) for d in decisions]
+        )
+        pos_idx = torch.cat(
+            [_left_pad(d.pos_idx, text_length + 2, 0) for d in decisions]
+        )
+        timesteps = torch.cat([d.timesteps[:, -1:] for d in decisions])
+        attention_mask = torch.cat([d.attention_mask[:, -1:] for d in decisions])
+        actions = torch.cat([d.actions[:, -1:] for d in decisions])
+
+        a_probs, past = self.follower.rollout_first_sample(
+            self._to_device(states),
+            self._to_device(actions),
+            self._to_device(timesteps),
+            self._to_device(text),
+            self._to_device(pos_idx),
+            self._to_device(attention_mask),
+            self._to_device(text_mask),
+        )
+        past = legacy_past(past)
+        for i, d in enumerate(decisions):
+            padding = text_length - d.proc_instruction.shape[1]
+            self._past_outputs[d.game_id] = _past_row(past, i, padding)
+
+        final_prob = self._final_probabilities(a_probs, decisions)
+        return {d.game_id: final_prob[i] for i, d in enumerate(decisions)}
+
+    def _with_past_logits(self, decisions):
+        pasts = [self._past_outputs[d.game_id] for d in decisions]
+        past_lengths = [past[0][0].shape[2] for past in pasts]
+        past_length = max(past_lengths)
+
+        # rollout_with_past only looks at the last two timesteps, from which it
+        # builds the mask of the last cached token and the two new ones. The
+        # mask over the rest of the cached history is passed in through
+        # text_attention_mask, left-padded with zeros to cover the padding of
+        # the KV caches.
+        history_masks = []
+        for d, length in zip(decisions, past_lengths):
+            mask = torch.cat(
+                [
+                    d.text_mask,
+                    torch.stack((d.attention_mask, d.attention_mask), dim=1)
+                    .permute(0, 2, 1)
+                    .reshape(1, -1)[:, :-4],
+                ],
+                dim=1,
+            )
+            assert mask.shape[1] == length - 1, "KV cache out of sync with inputs"
+            history_masks.append(_left_pad(mask, past_length - 1, 0))
+
+        states = torch.cat([d.states[:, -1:] for d in decisions])
+        actions = torch.cat([d.actions[:, -2:] for d in decisions])
+        timesteps = torch.cat([d.timesteps[:, -2:] for d in decisions])
+        pos_idx = torch.cat([d.pos_idx[:, -3:] for d in decisions])
+        attention_mask = torch.cat([d.attention_mask[:, -2:] for d in decisions])
+
+        a_probs, past = self.follower.rollout_with_past(
+            self._to_device(states),
+            self._to_device(actions),
+            self._to_device(timesteps),
+            None,
+            self._to_device(pos_idx),
+            self._to_device(attention_mask),
+            self._to_device(torch.cat(history_masks)),
+            past_output=model_past(_stack_pasts(pasts, past_length)),
+        )
+        past = legacy_past(past)
+        for i, (d, length) in enumerate(zip(decisions, past_lengths)):
+            self._past_outputs[d.game_id] = _past_row(past, i, past_length - length)
+
+        final_prob = self._final_probabilities(a_probs, decisions)
+        return {d.game_id: final_prob[i] for i, d in enumerate(decisions)}
@@ -2,17 +2,25 @@
 # ----------------------
 # Utilities for ensembling models with ray
 
+import copy
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import ray
 import torch
+import torch.nn as nn
 import torch.nn.functional as F
 from follower_bots.constants import TORCH_DEVICE
 from torch.distributions.categorical import Categorical
+from torch.func import functional_call, stack_module_state, vmap
 
+from follower_bots.models.batched_inference import legacy_past, model_past
+from follower_bots.models.exported_models import load_exported_follower
 from follower_bots.models.follower_transformers import DecisionTransformer
 from follower_bots.utils import load_arguments
 
+FUSED_EXECUTION_MODES = ["sequential", "threads", "stacked"]
+
 
 def load_follower_model(args, args_dir, model_dir, load_best=True):
     model_args = load_arguments(args_dir)
@@ -40,9 +48,12 @@ def load_follower_model(args, args_dir, model_dir, load_best=True):
 @ray.remote
 class FollowerModelWrapper:
     def __init__(self, args, args_dir, model_dir):
-        self.follower, _, _ = load_follower_model(
-            args, args_dir, model_dir, load_best=True
-        )
+        if getattr(args, "use_exported_model", False):
+            self.follower = load_exported_follower(args, model_dir)
+        else:
+            self.follower, _, _ = load_follower_model(
+                args, args_dir, model_dir, load_best=True
+            )
 
     def forward(
         self,
@@ -254,3 +265,245 @@ class FollowerEnsemble:
 
     def has_past_output(self):
         return ray.get([self.followers[-1].has_past_output.remote()])[-1]
+
+
+class _MemberRollout(nn.Module):
+    """
+    Exposes a member's KV-cached rollout as forward(), so that it can be run
+    through torch.func.functional_call. The cache goes in and out as tuples.
+    """
+
+    def __init__(self, follower):
+        super().__init__()
+        self.follower = follower
+
+    def forward(
+        self,
+        past_output,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+    ):
+        if past_output is None:
+            a_probs, past_output = self.follower.rollout_first_sample(
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+            )
+        else:
+            a_probs, past_output = self.follower.rollout_with_past(
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+                past_output=model_past(past_output),
+            )
+        return a_probs, legacy_past(past_output)
+
+
+class FusedFollowerEnsemble(FollowerEnsemble):
+    """
+    An in-process alternative to FollowerEnsemble for CPU serving. The inputs
+    are moved to the device once and shared by all members, and the members
+    are run in one of three ways:
+
+    * sequential: one after the other, like the ray actors but without the
+      serialization overhead.
+    * threads: concurrently on a thread pool. torch releases the GIL inside
+      its kernels, so members overlap.
+    * stacked: the member weights are stacked with stack_module_state and a
+      single vmap-ed forward pass runs all of them. Requires all members to
+      share an architecture.
+
+    Combination of the member logits is inherited from FollowerEnsemble.
+    """
+
+    def __init__(self, args, args_dirs=None, model_dirs=None, followers=None):
+        if followers is None:
+            followers = [
+                load_follower_model(args, args_dirs[i], model_dirs[i])[0]
+                for i in range(len(args_dirs))
+            ]
+        self.followers = followers
+        self.ensembling_strat = args.ensembling_strat
+        self.execution = getattr(args, "ensemble_execution", "stacked")
+        assert (
+            self.execution in FUSED_EXECUTION_MODES
+        ), f"Invalid ensemble execution mode {self.execution}"
+
+        self.device = followers[0].device
+        self.temperatures = torch.Tensor(
+            [follower.inference_temperature for follower in followers]
+        ).view(-1, 1, 1)
+
+        self._executor = None
+        if self.execution == "threads":
+            self._executor = ThreadPoolExecutor(max_workers=len(followers))
+
+        self._stacked_past = None
+        if self.execution == "stacked":
+            self._stack_members()
+
+    def _stack_members(self):
+        # The skeleton is a deep copy, which must not carry a KV cache along.
+        for follower in self.followers:
+            follower.reset_past_output()
+        # Stateless skeleton to run with the stacked weights. Made before the
+        # members are re-pointed below, so that it only copies one member.
+        self._forward_base = copy.deepcopy(self.followers[0]).to("meta")
+        self._rollout_base = _MemberRollout(self._forward_base)
+        params, buffers = stack_module_state(self.followers)
+        # stack_module_state copies the weights. Point each member at its slice
+        # of the stacked copy instead of keeping its own, so that the weights
+        # are only held once.
+        for i, follower in enumerate(self.followers):
+            for name, param in follower.named_parameters():
+                param.data = params[name].data[i]
+            for name, _ in follower.named_buffers():
+                module_name, _, buffer_name = name.rpartition(".")
+                follower.get_submodule(module_name)._buffers[buffer_name] = buffers[
+                    name
+                ][i]
+        self._forward_params, self._forward_buffers = params, buffers
+        # _MemberRollout nests the member under "follower", with the same tensors.
+        self._rollout_params = {f"follower.{k}": v for k, v in params.items()}
+        self._rollout_buffers = {f"follower.{k}": v for k, v in buffers.items()}
+
+    def _to_device(self, *tensors):
+        return [tensor.to(self.device) for tensor in tensors]
+
+    def _map_members(self, fn):
+        if self.execution == "threads":
+            return list(self._executor.map(fn, self.followers))
+        return [fn(follower) for follower in self.followers]
+
+    # Forward pass with ensembled models
+    def compute_probabilities(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+        action_mask,
+    ):
+        inputs = self._to_device(
+            states,
+            actions,
+            timesteps,
+            text_conditioning,
+            pos_idx,
+            attention_mask,
+            text_attention_mask,
+            action_mask,
+        )
+        with torch.no_grad():
+            if self.execution == "stacked":
+
+                def member_forward(params, buffers):
+                    return functional_call(
+                        self._forward_base, (params, buffers), tuple(inputs)
+                    )
+
+                all_action_logits = list(
+                    vmap(member_forward, randomness="different")(
+                        self._forward_params, self._forward_buffers
+                    )
+                )
+            else:
+                all_action_logits = self._map_members(
+                    lambda follower: follower(*inputs)
+                )  # BxTx6 each
+        return self.ensembled_probabilities(all_action_logits, inputs[-1])
+
+    def sample_action(
+        self,
+        states,
+        actions,
+        timesteps,
+        proc_instruction,
+        pos_idx,
+        attention_mask,
+        text_mask,
+        action_mask,
+    ):
+        inputs = self._to_device(
+            states,
+            actions,
+            timesteps,
+            proc_instruction,
+            pos_idx,
+            attention_mask,
+            text_mask,
+        )
+        (action_mask,) = self._to_device(action_mask)
+        with torch.no_grad():
+            if self.execution == "stacked":
+                all_action_logits = self._stacked_logits_with_past(
+                    inputs, action_mask
+                )
+            else:
+                all_action_logits = self._map_members(
+                    lambda follower: follower.compute_logits_with_past(
+                        *inputs, action_mask
+                    ).unsqueeze(1)
+                )  # Bx1x6 each
+
+        probs = self.ensembled_probabilities(all_action_logits, action_mask.cpu())
+        return Categorical(probs.squeeze(1)).sample()
+
+    def _stacked_logits_with_past(self, inputs, action_mask):
+        def member_rollout(params, buffers, past_output):
+            return functional_call(
+                self._rollout_base, (params, buffers), (past_output, *inputs)
+            )
+
+        if self._stacked_past is None:
+            a_probs, self._stacked_past = vmap(
+                lambda params, buffers: member_rollout(params, buffers, None),
+                randomness="different",
+            )(self._rollout_params, self._rollout_buffers)
+        else:
+            a_probs, self._stacked_past = vmap(member_rollout, randomness="different")(
+                self._rollout_params, self._rollout_buffers, self._stacked_past
+            )
+
+        # Same as DecisionTransformer.compute_logits_with_past, per member
+        final_prob = a_probs[:, :, -1, :-1] / self.temperatures.to(a_probs.device)
+        final_prob.masked_fill_(action_mask.unsqueeze(0), -float("inf"))
+        return list(final_prob.cpu().unsqueeze(2))  # Bx1x6 each
+
+    def eval(self):
+        for follower in self.followers:
+            follower.eval()
+        if self.execution == "stacked":
+            self._forward_base.eval()
+            self._rollout_base.eval()
+
+    def train(self):
+        assert self.execution != "stacked", "Stacked ensembles are inference-only"
+        for follower in self.followers:
+            follower.train()
+
+    def reset_past_output(self):
+        self._stacked_past = None
+        for follower in self.followers:
+            follower.reset_past_output()
+
+    def has_past_output(self):
+        if self.execution == "stacked":
+            return self._stacked_past is not None
+        return self.followers[-1].has_past_output()
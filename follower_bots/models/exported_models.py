@@ -0,0 +1,389 @@
+# File: exported_models
+# ---------------------
+# Export of DecisionTransformer to TorchScript for CPU-only serving. The full
+# forward pass and both rollout functions are traced separately. The GPT-2 KV
+# cache crosses the TorchScript boundary as a single tensor of shape
+# n_layer x 2 x B x heads x L x head_dim, so the traced graphs don't depend on
+# the transformers Cache classes. The GPT-2 blocks can optionally be
+# quantized to int8 with dynamic quantization before tracing.
+
+import json
+import os
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.ao.quantization import quantize_dynamic
+from torch.distributions.categorical import Categorical
+from transformers.pytorch_utils import Conv1D
+
+import follower_bots.constants as const
+from follower_bots.models.batched_inference import legacy_past, model_past
+
+EXPORT_DIRNAME = "exported"
+EXPORTED_GRAPHS = ["forward", "first_sample", "with_past"]
+
+
+def linearize_gpt2(module):
+    """
+    Replaces the transformers Conv1D layers of GPT-2 with equivalent nn.Linear
+    layers, in place. Dynamic quantization only knows about nn.Linear.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+        else:
+            linearize_gpt2(child)
+    return module
+
+
+def quantize_follower(follower):
+    """Quantizes the linear layers of the GPT-2 blocks of follower to int8."""
+    follower.transformer.h = quantize_dynamic(
+        linearize_gpt2(follower.transformer.h), {nn.Linear}, dtype=torch.qint8
+    )
+    return follower
+
+
+def stack_past(past):
+    """Packs a KV cache into one n_layer x 2 x B x heads x L x head_dim tensor."""
+    return torch.stack([torch.stack(layer) for layer in legacy_past(past)])
+
+
+def unstack_past(past):
+    """Inverse of stack_past. Returns the legacy tuple of (key, value) tuples."""
+    return tuple((past[i, 0], past[i, 1]) for i in range(past.shape[0]))
+
+
+class _FirstSample(nn.Module):
+    def __init__(self, follower):
+        super().__init__()
+        self.follower = follower
+
+    def forward(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+    ):
+        a_probs, past = self.follower.rollout_first_sample(
+            states,
+            actions,
+            timesteps,
+            text_conditioning,
+            pos_idx,
+            attention_mask,
+            text_attention_mask,
+        )
+        return a_probs, stack_past(past)
+
+
+class _WithPast(nn.Module):
+    def __init__(self, follower):
+        super().__init__()
+        self.follower = follower
+
+    def forward(
+        self,
+        states,
+        actions,
+        timesteps,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+        past,
+    ):
+        a_probs, past = self.follower.rollout_with_past(
+            states,
+            actions,
+            timesteps,
+            None,
+            pos_idx,
+            attention_mask,
+            text_attention_mask,
+            past_output=model_past(unstack_past(past)),
+        )
+        return a_probs, stack_past(past)
+
+
+def example_inputs(follower, seq_length, text_length=12, num_properties=8):
+    """
+    Synthetic inputs for tracing: the full forward pass, the first rollout step
+    and a rollout step at timestep seq_length with a matching KV cache.
+    """
+    side = 2 * const.VISIBLE_DISTANCE + 1
+    states = torch.randint(
+        1, const.NUM_PROPERTIES, (1, seq_length, num_properties, side, side)
+    )
+    actions = torch.randint(0, const.ACT_DIM - 1, (1, seq_length))
+    timesteps = torch.arange(seq_length).unsqueeze(0)
+    text = torch.randint(0, const.TEXT_SEP_IDX, (1, text_length))
+    text_mask = torch.ones(1, text_length, dtype=torch.long)
+    pos_idx = torch.arange(text_length + 2 * seq_length).unsqueeze(0)
+    attention_mask = torch.ones(1, seq_length, dtype=torch.long)
+    action_mask = torch.zeros(1, seq_length, const.ACT_DIM, dtype=torch.bool)
+
+    config = follower.transformer.config
+    past_length = text_length + 2 * seq_length - 3
+    past = torch.randn(
+        len(follower.transformer.h),
+        2,
+        1,
+        config.n_head,
+        past_length,
+        config.n_embd // config.n_head,
+    )
+    history_mask = torch.ones(1, past_length - 1, dtype=torch.long)
+
+    forward = (
+        states,
+        actions,
+        timesteps,
+        text,
+        pos_idx,
+        attention_mask,
+        text_mask,
+        action_mask,
+    )
+    first_sample = (
+        states[:, :1],
+        actions[:, :1],
+        timesteps[:, :1],
+        text,
+        pos_idx[:, : text_length + 2],
+        attention_mask[:, :1],
+        text_mask,
+    )
+    with_past = (
+        states[:, -1:],
+        actions[:, -2:],
+        timesteps[:, -2:],
+        pos_idx[:, -3:],
+        attention_mask[:, -2:],
+        history_mask,
+        past,
+    )
+    return {"forward": forward, "first_sample": first_sample, "with_past": with_past}
+
+
+def export_follower(follower, export_dir, quantize=True):
+    """
+    Traces follower (on CPU) and saves the TorchScript graphs and their
+    metadata to export_dir. The follower is quantized in place if requested.
+    """
+    follower = follower.cpu().eval()
+    follower.device = torch.device("cpu")
+    follower.reset_past_output()
+    if quantize:
+        quantize_follower(follower)
+
+    modules = {
+        "forward": follower,
+        "first_sample": _FirstSample(follower),
+        "with_past": _WithPast(follower),
+    }
+    # Trace at one length and check at another, so that shapes which leak into
+    # the graph as constants are caught here rather than when serving
+    inputs, check_inputs = example_inputs(follower, 4), example_inputs(follower, 7)
+
+    os.makedirs(export_dir, exist_ok=True)
+    with torch.no_grad():
+        for name in EXPORTED_GRAPHS:
+            traced = torch.jit.trace(
+                modules[name],
+                inputs[name],
+                check_inputs=[check_inputs[name]],
+                strict=False,
+            )
+            torch.jit.save(traced, os.path.join(export_dir, f"{name}.pt"))
+
+    metadata = {
+        "quantized": quantize,
+        "act_dim": follower.act_dim,
+        "inference_temperature": follower.inference_temperature,
+        "torch_version": torch.__version__,
+    }
+    with open(os.path.join(export_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+class ExportedFollower:
+    """
+    Serves an exported follower with the inference interface of
+    DecisionTransformer, so it can replace it in FollowerModelWrapper,
+    BatchedFollowerService and the demo scripts. KV caches are returned and
+    accepted in the same formats as by DecisionTransformer.
+    """
+
+    def __init__(self, export_dir, sampling_strat="argmax"):
+        with open(os.path.join(export_dir, "metadata.json"), "r") as f:
+            metadata = json.load(f)
+        self.quantized = metadata["quantized"]
+        self.act_dim = metadata["act_dim"]
+        self.inference_temperature = metadata["inference_temperature"]
+        self.sampling_strat = sampling_strat
+        self.device = torch.device("cpu")
+        self.past_output = None
+
+        self.graphs = {
+            name: torch.jit.load(
+                os.path.join(export_dir, f"{name}.pt"), map_location=self.device
+            ).eval()
+            for name in EXPORTED_GRAPHS
+        }
+
+    def __call__(self, *args):
+        return self.forward(*args)
+
+    def forward(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+        action_mask,
+    ):
+        with torch.no_grad():
+            return self.graphs["forward"](
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+                action_mask,
+            )
+
+    def compute_probabilities(self, *args):
+        return F.softmax(self.forward(*args), dim=2)
+
+    def sample_action(self, *args):
+        final_prob = self.compute_logits_with_past(*args)
+        if self.sampling_strat == "softmax":
+            return Categorical(F.softmax(final_prob, dim=1)).sample()
+        return torch.argmax(final_prob, dim=1)
+
+    def compute_logits_with_past(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+        action_mask,
+    ):
+        if self.past_output is None:
+            a_probs, self.past_output = self.rollout_first_sample(
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+            )
+        else:
+            a_probs, self.past_output = self.rollout_with_past(
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+            )
+
+        final_prob = a_probs[:, -1, :-1] / self.inference_temperature
+        final_prob.masked_fill_(action_mask, -float("inf"))
+        return final_prob
+
+    def rollout_first_sample(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+    ):
+        with torch.no_grad():
+            a_probs, past = self.graphs["first_sample"](
+                states,
+                actions,
+                timesteps,
+                text_conditioning,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+            )
+        return a_probs, unstack_past(past)
+
+    def rollout_with_past(
+        self,
+        states,
+        actions,
+        timesteps,
+        text_conditioning,
+        pos_idx,
+        attention_mask,
+        text_attention_mask,
+        past_output=None,
+    ):
+        if past_output is None:
+            past_output = self.past_output
+        with torch.no_grad():
+            a_probs, past = self.graphs["with_past"](
+                states,
+                actions,
+                timesteps,
+                pos_idx,
+                attention_mask,
+                text_attention_mask,
+                stack_past(past_output),
+            )
+        return a_probs, unstack_past(past)
+
+    def eval(self):
+        return self
+
+    def train(self, mode=True):
+        assert not mode, "Exported followers only support inference"
+        return self
+
+    def reset_past_output(self):
+        self.past_output = None
+
+    def has_past_output(self):
+        return self.past_output is not None
+
+
+def exported_model_dir(model_dir):
+    return os.path.join(model_dir, EXPORT_DIRNAME)
+
+
+def load_exported_follower(args, model_dir):
+    """
+    Loads the follower exported next to the checkpoints in model_dir, see
+    training/export_follower.py.
+    """
+    export_dir = exported_model_dir(model_dir)
+    assert os.path.exists(
+        os.path.join(export_dir, "metadata.json")
+    ), f"No exported follower in {export_dir}, run export_follower first"
+    return ExportedFollower(export_dir, sampling_strat=args.sampling_strat)
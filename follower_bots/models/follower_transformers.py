@@ -366,7 +366,12 @@ class DecisionTransformer(nn.Module):
         pos_idx,
         attention_mask,
         text_attention_mask,
+        past_output=None,
     ):
+        # An explicit past_output lets callers hold the KV cache themselves
+        # (e.g. one per game when batching across games)
+        if past_output is None:
+            past_output = self.past_output
         batch_size, seq_length = states.shape[0], states.shape[1]
 
         # Embed the state and the action
@@ -401,7 +406,7 @@ class DecisionTransformer(nn.Module):
             inputs_embeds=stacked_inputs,
             attention_mask=stacked_attention_mask,
             position_ids=pos_idx,
-            past_key_values=self.past_output,
+            past_key_values=past_output,
             use_cache=True,
         )
         x = transformer_outputs["last_hidden_state"]
@@ -7,7 +7,11 @@ import os
 import torch
 
 from follower_bots.constants import TORCH_DEVICE
-from follower_bots.models.ensembled_models import FollowerEnsemble
+from follower_bots.models.ensembled_models import (
+    FollowerEnsemble,
+    FusedFollowerEnsemble,
+)
+from follower_bots.models.exported_models import load_exported_follower
 from follower_bots.models.follower_transformers import DecisionTransformer
 from follower_bots.utils import load_arguments
 
@@ -126,7 +130,10 @@ def load_follower_model_for_corpora_eval_ensembled(args):
         model_dirs.append(model_dir)
 
     if len(args_dirs) > 1:
-        follower = FollowerEnsemble(args, args_dirs, model_dirs)
+        if getattr(args, "ensemble_execution", "ray") == "ray":
+            follower = FollowerEnsemble(args, args_dirs, model_dirs)
+        else:
+            follower = FusedFollowerEnsemble(args, args_dirs, model_dirs)
     else:
         follower, _, _ = load_follower_model(
             args, args_dirs[0], model_dirs[0], load_best=True
@@ -139,6 +146,8 @@ def load_follower_model_for_corpora_eval_standard(args):
     model_dir = os.path.join(
         args.experiments_folder, args.experiments_name, "checkpoints"
     )
+    if getattr(args, "use_exported_model", False):
+        return load_exported_follower(args, model_dir)
     follower, _, _ = load_follower_model(args, args_dir, model_dir, load_best=True)
     return follower
 
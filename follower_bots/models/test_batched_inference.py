@@ -0,0 +1,121 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import torch
+import transformers
+
+import follower_bots.constants as const
+from follower_bots.models.batched_inference import BatchedFollowerService
+from follower_bots.models.follower_transformers import DecisionTransformer
+
+NUM_GAMES = 3
+NUM_PROPERTIES = 4
+HORIZON = 4
+# Game 1 gets a new instruction after this many steps, so that later batches
+# mix games with and without a KV cache.
+RESET_GAME, RESET_STEP = 1, 2
+
+
+def small_follower():
+    """A DecisionTransformer on a small randomly initialized GPT-2, so that the
+    test doesn't download the pretrained weights."""
+    gpt2 = transformers.GPT2Model(
+        transformers.GPT2Config(n_embd=const.GPT_EMB_DIM, n_layer=2)
+    )
+    with mock.patch.object(
+        transformers.GPT2Model, "from_pretrained", return_value=gpt2
+    ), mock.patch.object(transformers.GPT2Tokenizer, "from_pretrained"):
+        follower = DecisionTransformer(const.ACT_DIM, const.CNN_EMB_DIM, 1)
+    return follower.eval()
+
+
+def synthetic_instruction(text_length, horizon):
+    """Yields sample_action inputs for one instruction, as in follower_demo."""
+    side = 2 * const.VISIBLE_DISTANCE + 1
+    states = torch.randint(
+        1, const.NUM_PROPERTIES, (1, horizon, NUM_PROPERTIES, side, side)
+    )
+    text = torch.randint(0, const.TEXT_SEP_IDX, (1, text_length))
+    text_mask = torch.ones(*text.shape, dtype=torch.long)
+    actions = torch.randint(0, const.ACT_DIM - 2, (1, horizon))
+    action_mask = torch.zeros(1, const.ACT_DIM - 1, dtype=torch.bool)
+    action_mask[0, -1] = True
+
+    for t in range(1, horizon + 1):
+        curr_actions = actions[:, :t].clone()
+        curr_actions[:, -1] = const.ACT_DIM - 1  # PAD, as get_processed_actions
+        yield (
+            states[:, :t],
+            curr_actions,
+            torch.arange(t).unsqueeze(0),
+            text,
+            torch.arange(0, text_length + 2 * t).unsqueeze(0),
+            torch.ones(1, t, dtype=torch.long),
+            text_mask,
+            action_mask,
+        )
+
+
+def game_instructions(game_id):
+    """The instructions a game sees. Text lengths differ across games so that
+    batches need padding."""
+    if game_id == RESET_GAME:
+        return [
+            list(synthetic_instruction(5 + game_id, RESET_STEP)),
+            list(synthetic_instruction(8, HORIZON - RESET_STEP)),
+        ]
+    return [list(synthetic_instruction(5 + game_id, HORIZON))]
+
+
+class BatchedFollowerServiceTest(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.follower = small_follower()
+        self.instructions = [game_instructions(i) for i in range(NUM_GAMES)]
+
+    def sequential_logits(self, game_id):
+        logits = []
+        with torch.no_grad():
+            for instruction in self.instructions[game_id]:
+                self.follower.reset_past_output()
+                for inputs in instruction:
+                    logits.append(self.follower.compute_logits_with_past(*inputs))
+        return logits
+
+    async def batched_logits(self):
+        service = BatchedFollowerService(
+            self.follower, max_batch_size=NUM_GAMES, max_latency_s=1.0
+        )
+        # Resolve decisions to their logits instead of a sampled action.
+        service._sample = lambda final_prob: final_prob
+        service.start()
+
+        async def play(game_id):
+            logits = []
+            for instruction in self.instructions[game_id]:
+                for inputs in instruction:
+                    logits.append(await service.sample_action(game_id, *inputs))
+                service.reset_game(game_id)
+            service.end_game(game_id)
+            return logits
+
+        try:
+            return await asyncio.gather(*[play(i) for i in range(NUM_GAMES)])
+        finally:
+            await service.stop()
+            self.batches_run = service.batches_run
+
+    def test_matches_sequential_inference(self):
+        batched = asyncio.run(self.batched_logits())
+        # Every step of every game ran in one batch.
+        self.assertEqual(self.batches_run, HORIZON)
+        for game_id in range(NUM_GAMES):
+            expected = self.sequential_logits(game_id)
+            self.assertEqual(len(batched[game_id]), len(expected))
+            for actual, e in zip(batched[game_id], expected):
+                self.assertTrue(torch.allclose(actual, e[0], atol=1e-5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+# File: benchmark_ensemble
+# ------------------------
+# Measures the per-decision latency of FusedFollowerEnsemble for ensemble
+# sizes 1-10 and each execution mode. Ensembles larger than the number of
+# trained models are filled with copies of them, which doesn't affect timing.
+
+import argparse
+import copy
+import os
+from time import perf_counter
+
+import torch
+
+import follower_bots.constants as const
+from follower_bots.models.ensembled_models import (
+    FUSED_EXECUTION_MODES,
+    FusedFollowerEnsemble,
+)
+from follower_bots.models.model_utils import load_follower_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Latency benchmark for fused follower ensembles"
+    )
+    parser.add_argument(
+        "--experiments_folder",
+        type=str,
+        help="The folder in which the experiments are held",
+    )
+    parser.add_argument(
+        "--ensemble_model_names",
+        type=str,
+        nargs="+",
+        help="The name of the experiments from which to load models",
+    )
+    parser.add_argument(
+        "--sampling_strat",
+        type=str,
+        default=const.SAMPLING_STRAT,
+        choices=const.SAMPLING_STRATS,
+    )
+    parser.add_argument(
+        "--ensembling_strat",
+        type=str,
+        choices=const.ENSEMBLING_STRATS,
+        default="boltzmann_multiplication",
+    )
+    parser.add_argument("--max_ensemble_size", type=int, default=10)
+    parser.add_argument("--modes", type=str, nargs="+", default=FUSED_EXECUTION_MODES)
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        default=const.INFERENCE_HORIZON,
+        help="Number of decisions per simulated instruction",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--text_length", type=int, default=16)
+    parser.add_argument("--num_properties", type=int, default=8)
+    parser.add_argument("--num_threads", type=int, default=torch.get_num_threads())
+
+    args = parser.parse_args()
+    return args
+
+
+def load_members(args):
+    followers = []
+    for exp_name in args.ensemble_model_names:
+        args_dir = os.path.join(args.experiments_folder, exp_name, "logging")
+        model_dir = os.path.join(args.experiments_folder, exp_name, "checkpoints")
+        follower, _, _ = load_follower_model(args, args_dir, model_dir)
+        followers.append(follower.eval())
+    return followers
+
+
+def synthetic_rollout(args):
+    """Yields sample_action inputs for one instruction, as in follower_demo."""
+    side = 2 * const.VISIBLE_DISTANCE + 1
+    states = torch.randint(
+        1, const.NUM_PROPERTIES, (1, args.horizon, args.num_properties, side, side)
+    )
+    text = torch.randint(0, const.TEXT_SEP_IDX, (1, args.text_length))
+    text_mask = torch.ones(*text.shape, dtype=torch.long)
+    actions = torch.randint(0, const.ACT_DIM - 2, (1, args.horizon))
+    action_mask = torch.zeros(1, const.ACT_DIM - 1, dtype=torch.bool)
+
+    for t in range(1, args.horizon + 1):
+        curr_actions = actions[:, :t].clone()
+        curr_actions[:, -1] = const.ACT_DIM - 1  # PAD, as get_processed_actions
+        timesteps = torch.arange(t).unsqueeze(0)
+        pos_idx = torch.arange(0, args.text_length + 2 * t).unsqueeze(0)
+        yield (
+            states[:, :t],
+            curr_actions,
+            timesteps,
+            text,
+            pos_idx,
+            torch.ones(1, t, dtype=torch.long),
+            text_mask,
+            action_mask,
+        )
+
+
+def time_ensemble(args, ensemble):
+    ensemble.eval()
+
+    # Warm up once, then time
+    latencies = []
+    for repeat in range(args.repeats + 1):
+        ensemble.reset_past_output()
+        for inputs in synthetic_rollout(args):
+            start = perf_counter()
+            ensemble.sample_action(*inputs)
+            if repeat > 0:
+                latencies.append(perf_counter() - start)
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p90 = latencies[int(0.9 * (len(latencies) - 1))]
+    return mean, p90
+
+
+def main():
+    args = get_args()
+    torch.set_num_threads(args.num_threads)
+    members = load_members(args)
+
+    print(f"{'size':>4} {'mode':>10} {'mean ms':>9} {'p90 ms':>9}")
+    for size in range(1, args.max_ensemble_size + 1):
+        followers = [copy.deepcopy(members[i % len(members)]) for i in range(size)]
+        for mode in args.modes:
+            args.ensemble_execution = mode
+            ensemble = FusedFollowerEnsemble(args, followers=followers)
+            mean, p90 = time_ensemble(args, ensemble)
+            print(f"{size:>4} {mode:>10} {1000 * mean:>9.2f} {1000 * p90:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# File: benchmark_exported
+# ------------------------
+# Measures the per-decision latency of a follower in eager PyTorch and
+# exported to TorchScript, with and without int8 quantization of the GPT-2
+# blocks. The exports are written to a temporary folder, so the checkpoint
+# folder isn't modified.
+
+import argparse
+import os
+import tempfile
+
+import torch
+
+import follower_bots.constants as const
+from follower_bots.models.exported_models import ExportedFollower, export_follower
+from follower_bots.training.benchmark_ensemble import time_ensemble
+from follower_bots.training.export_follower import load_eager_follower
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description="Latency benchmark for exported followers"
+    )
+    parser.add_argument(
+        "--experiments_folder",
+        type=str,
+        help="The folder in which the desired experiment is held",
+    )
+    parser.add_argument(
+        "--experiments_name",
+        type=str,
+        help="The name of the experiment from which to load a model",
+    )
+    parser.add_argument(
+        "--sampling_strat",
+        type=str,
+        default="argmax",
+        choices=const.SAMPLING_STRATS,
+    )
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        default=const.INFERENCE_HORIZON,
+        help="Number of decisions per simulated instruction",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--text_length", type=int, default=16)
+    parser.add_argument("--num_properties", type=int, default=8)
+    parser.add_argument("--num_threads", type=int, default=torch.get_num_threads())
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+    torch.set_num_threads(args.num_threads)
+    model_dir = os.path.join(
+        args.experiments_folder, args.experiments_name, "checkpoints"
+    )
+
+    followers = {"eager": load_eager_follower(args, model_dir)}
+    with tempfile.TemporaryDirectory() as export_root:
+        for name, quantize in [("traced", False), ("int8", True)]:
+            export_dir = os.path.join(export_root, name)
+            export_follower(
+                load_eager_follower(args, model_dir), export_dir, quantize=quantize
+            )
+            followers[name] = ExportedFollower(export_dir, args.sampling_strat)
+
+        print(f"{'model':>8} {'mean ms':>9} {'p90 ms':>9}")
+        for name, follower in followers.items():
+            mean, p90 = time_ensemble(args, follower)
+            print(f"{name:>8} {1000 * mean:>9.2f} {1000 * p90:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
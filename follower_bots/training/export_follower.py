@@ -0,0 +1,208 @@
+# File: export_follower
+# ---------------------
+# Exports a trained follower to TorchScript for CPU serving, optionally with
+# int8 dynamic quantization of the GPT-2 blocks, then checks that the exported
+# model agrees with the eager one on the validation set. The export is written
+# to <experiments_folder>/<experiments_name>/checkpoints/exported, where
+# --use_exported_model makes the loaders pick it up.
+
+import argparse
+import os
+
+import torch
+import torch.nn as nn
+
+import follower_bots.constants as const
+from follower_bots.data_utils.sql_dataset import get_sql_dataloader_for
+from follower_bots.models.exported_models import (
+    export_follower,
+    exported_model_dir,
+    load_exported_follower,
+)
+from follower_bots.models.model_utils import load_follower_model
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Export a follower for CPU serving")
+
+    # Model loading arguments
+    parser.add_argument(
+        "--experiments_folder",
+        type=str,
+        help="The folder in which the desired experiment is held",
+    )
+    parser.add_argument(
+        "--experiments_name",
+        type=str,
+        help="The name of the experiment from which to load a model",
+    )
+    parser.add_argument(
+        "--sampling_strat",
+        type=str,
+        default="argmax",
+        choices=const.SAMPLING_STRATS,
+    )
+
+    # Export arguments
+    parser.add_argument(
+        "--no_quantize",
+        action="store_true",
+        help="If set, the exported model keeps float32 GPT-2 blocks",
+    )
+    parser.add_argument(
+        "--skip_parity_check",
+        action="store_true",
+        help="If set, will not compare the exported model to the eager one",
+    )
+    parser.add_argument(
+        "--max_parity_batches",
+        type=int,
+        default=-1,
+        help="Number of validation batches to check, -1 for all of them",
+    )
+
+    # Dataset arguments
+    parser.add_argument("--batch_size", type=int, default=const.BATCH_SIZE)
+    parser.add_argument("--num_workers", type=int, default=const.NUM_WORKERS)
+    parser.add_argument(
+        "--pretrain_dset_path", default="./follower_bots/pretraining_data"
+    )
+
+    args = parser.parse_args()
+    return args
+
+
+def load_eager_follower(args, model_dir):
+    args_dir = os.path.join(args.experiments_folder, args.experiments_name, "logging")
+    follower, _, _ = load_follower_model(args, args_dir, model_dir, load_best=True)
+    follower = follower.cpu().eval()
+    follower.device = torch.device("cpu")
+    return follower
+
+
+def rollout_actions(
+    follower, s, a, t, text, pos_idx, attn_mask, text_mask, action_mask
+):
+    """
+    Replays one unpadded trajectory step by step through sample_action, with
+    the KV cache, and returns the action chosen at each step.
+    """
+    follower.reset_past_output()
+    text_length = text.shape[1]
+    chosen = []
+    for step in range(1, s.shape[1] + 1):
+        actions = a[:, :step].clone()
+        actions[:, -1] = const.ACT_DIM - 1  # PAD, as get_processed_actions
+        with torch.no_grad():
+            action = follower.sample_action(
+                s[:, :step],
+                actions,
+                t[:, :step],
+                text,
+                pos_idx[:, : text_length + 2 * step],
+                attn_mask[:, :step],
+                text_mask,
+                action_mask[:, step - 1, :-1],
+            )
+        chosen.append(action.item())
+    follower.reset_past_output()
+    return chosen
+
+
+def parity_check(args, eager, exported):
+    """
+    Compares the exported follower to the eager one on the validation set, with
+    teacher forcing through the full forward pass and with step-by-step
+    rollouts of the first trajectory of every batch.
+    """
+    val_loader = get_sql_dataloader_for(args, "val", use_ce=True)
+    criterion = nn.CrossEntropyLoss()
+
+    num_actions, forward_agreement, max_prob_diff = 0, 0, 0.0
+    eager_loss, exported_loss, num_batches = 0.0, 0.0, 0
+    num_steps, rollout_agreement = 0, 0
+    for i, (
+        s,
+        a,
+        t,
+        text,
+        pos_idx,
+        attn_mask,
+        text_mask,
+        action_mask,
+        _,
+        _,
+    ) in enumerate(val_loader):
+        if i == args.max_parity_batches:
+            break
+        inputs = (s, a, t, text, pos_idx, attn_mask, text_mask, action_mask)
+        with torch.no_grad():
+            eager_logits = eager(*inputs)
+            exported_logits = exported(*inputs)
+
+        valid = attn_mask.bool()
+        forward_agreement += (
+            (eager_logits.argmax(dim=2) == exported_logits.argmax(dim=2))[valid]
+            .sum()
+            .item()
+        )
+        num_actions += valid.sum().item()
+        prob_diff = (eager_logits.softmax(dim=2) - exported_logits.softmax(dim=2)).abs()
+        max_prob_diff = max(max_prob_diff, prob_diff[valid].max().item())
+
+        eager_loss += criterion(eager_logits.view(-1, const.ACT_DIM), a.view(-1)).item()
+        exported_loss += criterion(
+            exported_logits.view(-1, const.ACT_DIM), a.view(-1)
+        ).item()
+        num_batches += 1
+
+        length = attn_mask[0].sum().item()
+        trajectory = (
+            s[:1, :length],
+            a[:1, :length],
+            t[:1, :length],
+            text[:1],
+            pos_idx[:1],
+            attn_mask[:1, :length],
+            text_mask[:1],
+            action_mask[:1, :length],
+        )
+        eager_actions = rollout_actions(eager, *trajectory)
+        exported_actions = rollout_actions(exported, *trajectory)
+        rollout_agreement += sum(
+            x == y for x, y in zip(eager_actions, exported_actions)
+        )
+        num_steps += length
+
+    print(f"Teacher-forced action agreement: {forward_agreement / num_actions:.4f}")
+    print(f"Maximum action probability difference: {max_prob_diff:.4f}")
+    print(
+        f"Validation cross entropy, eager: {eager_loss / num_batches:.4f},"
+        + f" exported: {exported_loss / num_batches:.4f}"
+    )
+    print(f"Rollout action agreement: {rollout_agreement / num_steps:.4f}")
+
+
+def main():
+    args = get_args()
+    model_dir = os.path.join(
+        args.experiments_folder, args.experiments_name, "checkpoints"
+    )
+
+    export_follower(
+        load_eager_follower(args, model_dir),
+        exported_model_dir(model_dir),
+        quantize=not args.no_quantize,
+    )
+    print(f"Exported follower to {exported_model_dir(model_dir)}")
+
+    if not args.skip_parity_check:
+        parity_check(
+            args,
+            load_eager_follower(args, model_dir),
+            load_exported_follower(args, model_dir),
+        )
+
+
+if __name__ == "__main__":
+    main()
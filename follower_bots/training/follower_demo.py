@@ -5,6 +5,7 @@
 # have a data collection or training goal.
 
 import argparse
+import asyncio
 from datetime import timedelta
 from random import gauss
 from time import sleep, time
@@ -20,10 +21,16 @@ from follower_bots.data_utils.pyclient_utils import (
     get_processed_instructions,
     get_processed_states,
 )
+from follower_bots.models.batched_inference import BatchedFollowerService
+from follower_bots.models.ensembled_models import FUSED_EXECUTION_MODES
 from follower_bots.models.model_utils import load_follower_model_for_corpora_eval
 
 from py_client.game_endpoint import Action, Role
-from py_client.remote_client import RemoteClient
+from py_client.remote_client import (
+    AsyncRemoteClient,
+    RemoteClient,
+    SharedClientSession,
+)
 
 
 def get_args():
@@ -51,6 +58,11 @@ def get_args():
         choices=const.SAMPLING_STRATS,
         help="The strategy to follow for sampling follower actions",
     )
+    parser.add_argument(
+        "--use_exported_model",
+        action="store_true",
+        help="If set, will load the TorchScript model written by export_follower instead of the checkpoint",
+    )
 
     # Ensembling arguments: Will override some of past arguments
     parser.add_argument(
@@ -71,6 +83,13 @@ def get_args():
         default="boltzmann_multiplication",
         help="What ensembling strategy to use for ensembling",
     )
+    parser.add_argument(
+        "--ensemble_execution",
+        type=str,
+        choices=["ray"] + FUSED_EXECUTION_MODES,
+        default="ray",
+        help="How to run the ensemble members. Modes other than ray run them in-process, see FusedFollowerEnsemble",
+    )
 
     # Demo arguments
     parser.add_argument(
@@ -80,12 +99,150 @@ def get_args():
         help="If specified, will load the euid associated with the specified instruction",
     )
 
+    # Hosting arguments
+    parser.add_argument(
+        "--num_games",
+        type=int,
+        default=1,
+        help="If larger than 1, play this many games concurrently and batch model inference across them",
+    )
+    parser.add_argument("--max_batch_size", type=int, default=16)
+    parser.add_argument(
+        "--max_batch_latency",
+        type=float,
+        default=0.01,
+        help="Maximum time in seconds to wait for a batch of decisions to fill up",
+    )
+
     args = parser.parse_args()
     return args
 
 
+async def connect_and_join(args, session):
+    client = AsyncRemoteClient(
+        args.host, args.render, lobby_name="bot-sandbox", session=session
+    )
+    connected, reason = await client.connect()
+    assert connected, f"Unable to connect: {reason}"
+    game, reason = await client.join_game(
+        timeout=timedelta(minutes=5),
+        queue_type=AsyncRemoteClient.QueueType.FOLLOWER_ONLY,
+        e_uuid=args.e_uuid,
+    )
+    assert game is not None, f"Unable to join game: {reason}"
+    return client, game
+
+
+async def play_batched_game(args, service, game_id, session):
+    """
+    The loop of main(), for one of several concurrent games. All games share
+    the service's event loop; model inference goes through the shared service.
+    """
+    client, game = await connect_and_join(args, session)
+    try:
+        await play_game_with_service(service, game_id, game)
+    finally:
+        await game.close()
+        await client.reset()
+
+
+async def play_game_with_service(service, game_id, game):
+    raw_instruction, proc_instruction, text_mask = None, None, None
+    states, actions, timesteps = [], [], []
+    map, cards, turn_state, instructions, actors, feedback = game.initial_state()
+
+    if turn_state.turn != Role.FOLLOWER:
+        game_action = Action.NoopAction()
+        map, cards, turn_state, instructions, actors, feedback = await game.step(
+            game_action
+        )
+
+    total_timesteps = 0
+    while not game.over():
+        start_time = time()
+
+        raw_instruction, proc_instruction, text_mask = get_processed_instructions(
+            instructions, raw_instruction, proc_instruction, text_mask
+        )
+        actions = get_processed_actions(actions)
+        states = get_processed_states(states, map, cards, actors)
+        timesteps = torch.LongTensor([[i for i in range(states.shape[1])]])
+        attention_mask = torch.ones(*states.shape[:2], dtype=torch.long)
+        pos_idx = torch.arange(
+            0, proc_instruction.shape[1] + 2 * timesteps.shape[1], dtype=torch.long
+        ).unsqueeze(0)
+
+        if total_timesteps < const.INFERENCE_HORIZON:
+            action_mask = generate_action_mask(game.action_mask())
+            action = await service.sample_action(
+                game_id,
+                states,
+                actions,
+                timesteps,
+                proc_instruction,
+                pos_idx,
+                attention_mask,
+                text_mask,
+                action_mask,
+            )
+        else:
+            action = ActionEnums["DONE"].value
+        actions[:, -1] = action
+        game_action = follower_idx_to_game_action(action, raw_instruction.uuid)
+
+        inference_time = time() - start_time
+        map, cards, turn_state, instructions, actors, feedback = await game.step(
+            game_action
+        )
+        total_timesteps += 1
+
+        if not game.over():
+            done_instruction = (
+                game_action.action_code() == Action.ActionCode.INSTRUCTION_DONE
+            )
+            terminated_instruction = raw_instruction.uuid != get_active_uuid(
+                instructions
+            )
+            if done_instruction or terminated_instruction:
+                states, actions, timesteps = [], [], []
+                service.reset_game(game_id)
+                total_timesteps = 0
+
+        time_beyond_standard = max(0, inference_time - 0.15)
+        sleep_time = max(0.1, gauss(0.7 - time_beyond_standard, 0.08))
+        await asyncio.sleep(sleep_time)
+
+    service.end_game(game_id)
+    print(f"Game {game_id} over. Score: {turn_state.score}")
+
+
+async def main_batched(args):
+    assert (
+        not args.use_ensembling
+    ), "Batched inference supports a single model, not ensembles"
+    follower = load_follower_model_for_corpora_eval(args)
+    service = BatchedFollowerService(
+        follower, args.max_batch_size, args.max_batch_latency
+    )
+    service.start()
+    try:
+        async with SharedClientSession() as session:
+            await asyncio.gather(
+                *[
+                    play_batched_game(args, service, i, session)
+                    for i in range(args.num_games)
+                ]
+            )
+    finally:
+        await service.stop()
+    print(f"Mean inference batch size: {service.mean_batch_size():.2f}")
+
+
 def main():
     args = get_args()
+    if args.num_games > 1:
+        asyncio.run(main_batched(args))
+        return
 
     # Load the model
     follower = load_follower_model_for_corpora_eval(args)
@@ -2,6 +2,7 @@
 # --------------
 # Script containing various utility functions
 
+import glob
 import json
 import os
 import pickle
@@ -51,6 +52,35 @@ def dump_pickle(filename, data):
         raise (e)
 
 
+def pickle_shard_paths(filename):
+    root, ext = os.path.splitext(filename)
+    return sorted(glob.glob(f"{root}.shard*{ext}"))
+
+
+def remove_pickle_shards(filename):
+    # Removes a pickled list and its shards, so that re-runs which write fewer
+    # shards (or a single file instead) don't leave stale data behind.
+    for path in [filename] + pickle_shard_paths(filename):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_pickle_shards(filename):
+    # Loads either a single pickled list or, if it does not exist, the
+    # concatenation of its "<name>.shardNNNNN.pkl" shards in order.
+    if os.path.exists(filename):
+        return load_pickle(filename)
+
+    shard_paths = pickle_shard_paths(filename)
+    if len(shard_paths) == 0:
+        raise FileNotFoundError(filename)
+
+    data = []
+    for shard_path in shard_paths:
+        data.extend(load_pickle(shard_path))
+    return data
+
+
 def load_json(filename):
     try:
         with open(filename) as f:
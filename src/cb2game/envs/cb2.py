@@ -384,31 +384,15 @@ class CerealBar2Env(gym.Env):
                 "rotation": follower.heading_degrees(),
             },
         }
-        asset_ids = [
-            [assets.AssetId.NONE for _ in range(map_update.cols)]
-            for _ in range(map_update.rows)
-        ]
-        boundaries = [
-            [-1 for _ in range(map_update.cols)] for _ in range(map_update.rows)
-        ]
-        orientations = [
-            [0 for _ in range(map_update.cols)] for _ in range(map_update.rows)
-        ]
-        heights = [[0 for _ in range(map_update.cols)] for _ in range(map_update.rows)]
-        layers = [[0 for _ in range(map_update.cols)] for _ in range(map_update.rows)]
-        for tile in map_update.tiles:
-            row, col = tile.cell.coord.to_offset_coordinates()
-            asset_ids[row][col] = tile.asset_id
-            boundaries[row][col] = tile.cell.boundary.edges
-            orientations[row][col] = tile.rotation_degrees
-            heights[row][col] = tile.cell.height
-            layers[row][col] = tile.cell.layer
+        # Cells without a tile (outside of the follower's view) are filled with
+        # AssetId.NONE and boundary -1.
+        map_arrays = map_update.arrays()
         map = {
-            "asset_ids": asset_ids,
-            "boundaries": boundaries,
-            "orientations": orientations,
-            "heights": heights,
-            "layers": layers,
+            "asset_ids": map_arrays.asset_ids.astype(np.int16),
+            "boundaries": map_arrays.edges.astype(np.int8),
+            "orientations": map_arrays.rotations.astype(np.int16),
+            "heights": map_arrays.heights.astype(np.float32),
+            "layers": map_arrays.layers.astype(np.int8),
         }
         card_counts = [
             [0 for _ in range(map_update.cols)] for _ in range(map_update.rows)
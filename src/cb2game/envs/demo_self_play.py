@@ -16,7 +16,7 @@ from cb2game.pyclient.game_endpoint import Action, Role
 from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
 from cb2game.server.config.config import ReadConfigOrDie
 from cb2game.server.hex import HecsCoord
-from cb2game.server.messages.map_update import MapUpdate
+from cb2game.server.map_arrays import MapArrays
 from cb2game.server.messages.prop import PropUpdate
 from cb2game.server.util import PackageRoot
 
@@ -133,8 +133,9 @@ def get_instruction_for_card(card, observation, game_endpoint=None):
     distance_to_follower = lambda c: c.prop_info.location.distance_to(
         follower.location()
     )
-    map_update = MapUpdate.from_gym_state(observation)
-    path = find_path_to_card(card, follower, map_update, cards)
+    # Only the tiles visited by the search are materialized.
+    map_arrays = MapArrays.from_gym_map(observation["map"])
+    path = find_path_to_card(card, follower, map_arrays, cards)
     if not path:
         return "random, random, random, random, random"
     game_vis = game_endpoint.visualization() if game_endpoint else None
@@ -0,0 +1,13 @@
+"""Local load test for the CB2 server.
+
+Launches a headless server with a temporary database, then plays games
+against it with bot leader/follower pairs (agents/simple_leader.py and
+agents/simple_follower.py). Pairs are added in steps, and each step reports
+server tick latency, action round-trip time, messages/sec, database write
+latency and server CPU/RSS. Run with:
+
+    python3 -m cb2game.loadtest --pairs=32 --ramp_steps=4 --step_s=60
+
+See run_loadtest.py for all options, and impairment.py for network impairment
+profiles.
+"""
@@ -0,0 +1,6 @@
+import fire
+
+from cb2game.loadtest.run_loadtest import main
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,105 @@
+"""Bot leader/follower pairs for the load test.
+
+Each bot process plays its share of the pairs in one asyncio event loop, with
+one shared HTTP session. Pairs start on a ramp schedule and keep joining new
+games until the load test ends.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+
+from cb2game.agents.simple_follower import SimpleFollower, SimpleFollowerConfig
+from cb2game.agents.simple_leader import SimpleLeader
+from cb2game.loadtest.metrics import ClientMetrics, MeasuredSocket
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.remote_client import (
+    AsyncRemoteClient,
+    QueueType,
+    SharedClientSession,
+)
+from cb2game.server.messages.rooms import Role
+
+logger = logging.getLogger(__name__)
+
+JOIN_TIMEOUT = timedelta(minutes=1)
+
+
+async def PlayGames(url, lobby, role, metrics, end_time, action_period_s, session):
+    """Plays games as one role until end_time."""
+    client = AsyncRemoteClient(url, lobby_name=lobby, session=session)
+    queue_type = (
+        QueueType.LEADER_ONLY if role == Role.LEADER else QueueType.FOLLOWER_ONLY
+    )
+    while time.time() < end_time:
+        try:
+            connected, reason = await client.connect()
+            if not connected:
+                raise ConnectionError(reason)
+            timeout = min(JOIN_TIMEOUT, timedelta(seconds=end_time - time.time()))
+            game, reason = await client.join_game(
+                timeout=timeout, queue_type=queue_type
+            )
+            if game is None:
+                raise ConnectionError(reason)
+            if role == Role.LEADER:
+                metrics.current().games_started += 1
+            game.socket = MeasuredSocket(game.socket, metrics)
+            if role == Role.LEADER:
+                agent = SimpleLeader()
+            else:
+                agent = SimpleFollower(SimpleFollowerConfig())
+            game_state = game.initial_state()
+            if role == Role.FOLLOWER:
+                game_state = await game.step(Action.NoopAction())
+            while not game.over() and time.time() < end_time:
+                # Think for a bit, like a person would.
+                await asyncio.sleep(action_period_s * random.uniform(0.5, 1.5))
+                game_state = await game.step(agent.choose_action(game_state))
+            if game.over() and role == Role.LEADER:
+                metrics.current().games_finished += 1
+            await game.close()
+        except Exception as e:
+            logger.warning(f"{role} bot error: {e}")
+            metrics.current().errors += 1
+            await asyncio.sleep(1)
+        finally:
+            await client.reset()
+
+
+async def PlayPairs(url, lobby, pair_start_times, end_time, action_period_s, metrics):
+    async def PlayPair(start_time, session):
+        await asyncio.sleep(max(start_time - time.time(), 0))
+        await asyncio.gather(
+            *[
+                PlayGames(url, lobby, role, metrics, end_time, action_period_s, session)
+                for role in [Role.LEADER, Role.FOLLOWER]
+            ]
+        )
+
+    async with SharedClientSession() as session:
+        await asyncio.gather(
+            *[PlayPair(start_time, session) for start_time in pair_start_times]
+        )
+
+
+def RunBots(
+    url,
+    lobby,
+    pair_start_times,
+    start_time,
+    step_s,
+    steps,
+    action_period_s,
+    results,
+):
+    """Bot process entry point. Puts a list of StepMetrics in results."""
+    # Games ending mid-step make the pyclient log warnings. Errors are counted.
+    logging.basicConfig(level=logging.ERROR)
+    metrics = ClientMetrics(start_time, step_s, steps)
+    end_time = start_time + step_s * steps
+    asyncio.run(
+        PlayPairs(url, lobby, pair_start_times, end_time, action_period_s, metrics)
+    )
+    results.put(metrics.steps())
@@ -0,0 +1,135 @@
+"""Network impairment for the load test.
+
+bad_link_simulation/ impairs the whole machine's network with pf and dnctl,
+which needs root and only works on OSX/BSD. Instead, the load test can put an
+ImpairedLink in front of the server. It's a TCP proxy which delays data in each
+direction according to an ImpairmentProfile.
+
+Packets can't be dropped inside a TCP stream. A lost packet is modeled as the
+retransmission delay the sender would see instead.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ImpairmentProfile:
+    delay_ms: float = 0  # One-way delay.
+    jitter_ms: float = 0  # Delay varies uniformly by up to this much.
+    loss: float = 0  # Chance that data is lost and must be retransmitted.
+    retransmit_ms: float = 200  # Extra delay for lost data (TCP min RTO).
+    bandwidth_bytes_s: float = 0  # 0 for unlimited.
+
+
+PROFILES = {
+    "none": ImpairmentProfile(),
+    # Same as bad_link_simulation/start_slow_internet.sh.
+    "slow": ImpairmentProfile(delay_ms=100, loss=0.05, bandwidth_bytes_s=10e6),
+    "mobile": ImpairmentProfile(
+        delay_ms=50, jitter_ms=30, loss=0.01, bandwidth_bytes_s=1e6
+    ),
+    "transatlantic": ImpairmentProfile(delay_ms=45, jitter_ms=5),
+}
+
+
+def ImpairmentProfileFromName(name):
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown impairment profile {name}. Options: {list(PROFILES.keys())}"
+        )
+    return PROFILES[name]
+
+
+class ImpairedLink(object):
+    """Proxies TCP connections from a local port to the server, impaired."""
+
+    def __init__(self, profile: ImpairmentProfile, server_host, server_port):
+        self._profile = profile
+        self._server_host = server_host
+        self._server_port = server_port
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Starts listening. Returns the port clients should connect to."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(
+                self._server_host, self._server_port
+            )
+        except OSError as e:
+            logger.warning(f"Impaired link couldn't connect to server: {e}")
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self._forward(client_reader, server_writer),
+            self._forward(server_reader, client_writer),
+        )
+
+    def _delay_s(self):
+        profile = self._profile
+        delay_ms = profile.delay_ms + random.uniform(
+            -profile.jitter_ms, profile.jitter_ms
+        )
+        if random.random() < profile.loss:
+            delay_ms += profile.retransmit_ms
+        return max(delay_ms, 0) / 1000
+
+    async def _forward(self, reader, writer):
+        """Reads data and delivers it in order, each chunk after its delay."""
+        deliveries = asyncio.Queue()
+        sender = asyncio.ensure_future(self._deliver(deliveries, writer))
+        link_free_time = 0  # When the link is done sending earlier data.
+        last_delivery_time = 0
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                now = time.monotonic()
+                send_time = now
+                if self._profile.bandwidth_bytes_s > 0:
+                    link_free_time = max(link_free_time, now) + (
+                        len(data) / self._profile.bandwidth_bytes_s
+                    )
+                    send_time = link_free_time
+                # TCP delivers in order, so data waits for earlier data.
+                last_delivery_time = max(
+                    send_time + self._delay_s(), last_delivery_time
+                )
+                deliveries.put_nowait((last_delivery_time, data))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            deliveries.put_nowait((last_delivery_time, None))
+            await sender
+
+    async def _deliver(self, deliveries, writer):
+        try:
+            while True:
+                delivery_time, data = await deliveries.get()
+                wait_s = delivery_time - time.monotonic()
+                if wait_s > 0:
+                    await asyncio.sleep(wait_s)
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
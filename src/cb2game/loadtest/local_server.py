@@ -0,0 +1,154 @@
+"""Runs a headless CB2 server in a subprocess, and samples its resource usage."""
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+import aiohttp
+import yaml
+
+from cb2game.server.config.config import Config
+from cb2game.server.lobby_consts import LobbyInfo, LobbyType
+
+# psutil is optional. Without it, server CPU and RSS are read from /proc, which
+# only works on Linux.
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+LOBBY_NAME = "loadtest"
+STARTUP_TIMEOUT_S = 60
+
+
+def FreePort():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@dataclass
+class ProcessUsage:
+    cpu_s: float = 0  # User + system CPU time.
+    rss_bytes: int = 0
+
+
+def ProcessUsageFromPid(pid):
+    """Returns the pid's ProcessUsage, or None if it can't be read."""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            cpu = process.cpu_times()
+            return ProcessUsage(cpu.user + cpu.system, process.memory_info().rss)
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            # The command name (field 2) may contain spaces. Skip past it.
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    # utime and stime are fields 14 and 15. fields starts at field 3.
+    cpu_s = (int(fields[11]) + int(fields[12])) / clock_ticks
+    return ProcessUsage(cpu_s, resident_pages * os.sysconf("SC_PAGE_SIZE"))
+
+
+class LocalServer(object):
+    """A server with a temporary database and a single bot lobby."""
+
+    def __init__(self, game_capacity, room_shards=0):
+        self._directory = tempfile.TemporaryDirectory(prefix="cb2-loadtest-")
+        self.port = FreePort()
+        self.config = Config(
+            name="loadtest",
+            data_prefix=self._directory.name,
+            http_port=self.port,
+            room_shards=room_shards,
+            comment="Load test config. Created by cb2game.loadtest.",
+            lobbies=[
+                LobbyInfo(
+                    LOBBY_NAME,
+                    LobbyType.OPEN,
+                    "Load test bots.",
+                    game_capacity,
+                    sound_clip_volume=0,
+                )
+            ],
+        )
+        self.log_path = os.path.join(self._directory.name, "server.log")
+        self._process = None
+
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def pid(self):
+        return self._process.pid
+
+    async def start(self):
+        config_path = os.path.join(self._directory.name, "config.yaml")
+        with open(config_path, "w") as config_file:
+            yaml.dump(self.config, config_file, sort_keys=False)
+        self._log_file = open(self.log_path, "w")
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "cb2game.server.main",
+                f"--config_filepath={config_path}",
+                "--headless=True",
+            ],
+            stdout=self._log_file,
+            stderr=subprocess.STDOUT,
+        )
+        end_time = time.time() + STARTUP_TIMEOUT_S
+        while time.time() < end_time:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Server exited. See {self.log_path}")
+            try:
+                await self.status()
+                return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.5)
+        raise TimeoutError(f"Server didn't start. See {self.log_path}")
+
+    async def status(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{self.url()}/status") as response:
+                response.raise_for_status()
+                return await response.json()
+
+    def usage(self, status=None):
+        """Total ProcessUsage of the server and its room shards."""
+        pids = [self._process.pid]
+        if status is not None:
+            pids += [s["pid"] for s in status.get("room_shards", []) if "pid" in s]
+        total = ProcessUsage()
+        for pid in pids:
+            usage = ProcessUsageFromPid(pid)
+            if usage is None:
+                continue
+            total.cpu_s += usage.cpu_s
+            total.rss_bytes += usage.rss_bytes
+        return total
+
+    def stop(self, keep_files=False):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._process is not None:
+            self._log_file.close()
+        if not keep_files:
+            self._directory.cleanup()
@@ -0,0 +1,105 @@
+"""Client-side load test measurements, bucketed by ramp step."""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List, Tuple
+
+from cb2game.pyclient.game_socket import AsyncGameSocket
+from cb2game.server.messages import message_from_server, message_to_server
+from cb2game.server.util import LatencyHistogram
+
+# Messages that the server answers with a StateMachineTick once processed.
+TIMED_MESSAGE_TYPES = [
+    message_to_server.MessageType.ACTIONS,
+    message_to_server.MessageType.OBJECTIVE,
+    message_to_server.MessageType.OBJECTIVE_COMPLETED,
+    message_to_server.MessageType.TURN_COMPLETE,
+]
+
+
+@dataclass
+class StepMetrics:
+    # LatencyHistogram counts of action round-trip times.
+    rtt_counts: List[int] = field(
+        default_factory=lambda: [0] * len(LatencyHistogram.bounds())
+    )
+    messages_sent: int = 0
+    messages_received: int = 0
+    games_started: int = 0
+    games_finished: int = 0
+    errors: int = 0
+
+    def merge(self, other):
+        self.rtt_counts = [a + b for a, b in zip(self.rtt_counts, other.rtt_counts)]
+        self.messages_sent += other.messages_sent
+        self.messages_received += other.messages_received
+        self.games_started += other.games_started
+        self.games_finished += other.games_finished
+        self.errors += other.errors
+
+
+class ClientMetrics(object):
+    """Measurements from all bots in a process, one StepMetrics per ramp step.
+
+    Measurements are added to the step that's running at the time. Bot
+    processes return steps() to the load test, which merges them.
+    """
+
+    def __init__(self, start_time: float, step_s: float, steps: int):
+        self._start_time = start_time
+        self._step_s = step_s
+        self._steps = [StepMetrics() for _ in range(steps)]
+        self._rtt = [LatencyHistogram() for _ in range(steps)]
+
+    def _index(self):
+        index = int((time.time() - self._start_time) // self._step_s)
+        return min(max(index, 0), len(self._steps) - 1)
+
+    def current(self) -> StepMetrics:
+        return self._steps[self._index()]
+
+    def record_rtt(self, rtt_s):
+        self._rtt[self._index()].record(rtt_s)
+
+    def steps(self) -> List[StepMetrics]:
+        for step, rtt in zip(self._steps, self._rtt):
+            step.rtt_counts = rtt.counts()
+        return self._steps
+
+
+class MeasuredSocket(AsyncGameSocket):
+    """Wraps a game's socket. Counts messages and times action round trips.
+
+    The round trip of an action is the time from sending it to receiving the
+    next StateMachineTick, which the server sends once it's processed the
+    action. If several actions are sent before the tick, the first is timed.
+    """
+
+    def __init__(self, socket: AsyncGameSocket, metrics: ClientMetrics):
+        self._socket = socket
+        self._metrics = metrics
+        self._sent_time = None
+
+    async def send_message(self, message: message_to_server.MessageToServer):
+        if message.type in TIMED_MESSAGE_TYPES and self._sent_time is None:
+            self._sent_time = time.perf_counter()
+        self._metrics.current().messages_sent += 1
+        await self._socket.send_message(message)
+
+    def connected(self) -> bool:
+        return self._socket.connected()
+
+    async def receive_message(
+        self, timeout: timedelta
+    ) -> Tuple[message_from_server.MessageFromServer, str]:
+        message, reason = await self._socket.receive_message(timeout)
+        if message is None:
+            return message, reason
+        self._metrics.current().messages_received += 1
+        if (
+            message.type == message_from_server.MessageType.STATE_MACHINE_TICK
+            and self._sent_time is not None
+        ):
+            self._metrics.record_rtt(time.perf_counter() - self._sent_time)
+            self._sent_time = None
+        return message, reason
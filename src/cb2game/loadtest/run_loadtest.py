@@ -0,0 +1,317 @@
+"""Measures how many concurrent games a machine sustains. See __init__.py."""
+import asyncio
+import logging
+import math
+import multiprocessing
+import queue
+import time
+from dataclasses import asdict, dataclass
+
+import orjson
+
+from cb2game.loadtest.bots import RunBots
+from cb2game.loadtest.impairment import ImpairedLink, ImpairmentProfileFromName
+from cb2game.loadtest.local_server import LOBBY_NAME, LocalServer
+from cb2game.loadtest.metrics import StepMetrics
+from cb2game.server.util import HistogramPercentile
+
+logger = logging.getLogger(__name__)
+
+# Time for bot processes to start before the first step.
+STARTUP_S = 5
+USAGE_SAMPLE_PERIOD_S = 1
+MS = 1000
+
+
+@dataclass
+class ServerSnapshot:
+    time: float
+    tick_counts: list
+    db_write_counts: list
+    cpu_s: float
+    rss_bytes: int
+
+
+@dataclass
+class StepReport:
+    step: int
+    pairs: int
+    games_started: int
+    games_finished: int
+    bot_errors: int
+    tick_p50_ms: float
+    tick_p99_ms: float
+    tick_max_ms: float
+    rtt_p50_ms: float
+    rtt_p95_ms: float
+    rtt_p99_ms: float
+    messages_per_s: float
+    db_writes_per_s: float
+    db_write_p50_ms: float
+    db_write_p99_ms: float
+    server_cpu_percent: float
+    server_rss_mb: float
+
+
+def ActivePairs(pairs, ramp_steps, step):
+    """Number of pairs playing during a ramp step. All pairs by the last step."""
+    return math.ceil(pairs * (step + 1) / ramp_steps)
+
+
+def PairStartSteps(pairs, ramp_steps):
+    start_steps = []
+    for step in range(ramp_steps):
+        start_steps += [step] * (
+            ActivePairs(pairs, ramp_steps, step) - len(start_steps)
+        )
+    return start_steps
+
+
+def SumCounts(count_lists):
+    return [sum(counts) for counts in zip(*count_lists)]
+
+
+def Subtract(a, b):
+    return [x - y for x, y in zip(a, b)]
+
+
+async def TakeSnapshot(server):
+    status = await server.status()
+    tick_counts = [
+        lobby_status["tick_latency"]["counts"]
+        for lobby_status in status["lobbies"].values()
+    ]
+    for shard in status.get("room_shards", []):
+        tick_counts += [t["counts"] for t in shard.get("tick_latency", {}).values()]
+    usage = server.usage(status)
+    return ServerSnapshot(
+        time.time(),
+        SumCounts(tick_counts),
+        status["db_write_latency"]["counts"],
+        usage.cpu_s,
+        usage.rss_bytes,
+    )
+
+
+async def SampleServer(server, start_time, step_s, steps):
+    """Returns a ServerSnapshot at the start and end of every step, and the
+    peak RSS during each step."""
+    snapshots = []
+    peak_rss = [0] * steps
+    for step in range(steps + 1):
+        await asyncio.sleep(max(start_time + step * step_s - time.time(), 0))
+        snapshots.append(await TakeSnapshot(server))
+        if step == steps:
+            break
+        while time.time() < start_time + (step + 1) * step_s - USAGE_SAMPLE_PERIOD_S:
+            await asyncio.sleep(USAGE_SAMPLE_PERIOD_S)
+            peak_rss[step] = max(peak_rss[step], server.usage().rss_bytes)
+    return snapshots, peak_rss
+
+
+async def CollectBotResults(processes, results, steps):
+    merged = [StepMetrics() for _ in range(steps)]
+    remaining = len(processes)
+    loop = asyncio.get_event_loop()
+    while remaining > 0:
+        try:
+            process_steps = await loop.run_in_executor(None, results.get, True, 1)
+        except queue.Empty:
+            if not any(p.is_alive() for p in processes):
+                logger.error("A bot process exited without results.")
+                break
+            continue
+        for total, step in zip(merged, process_steps):
+            total.merge(step)
+        remaining -= 1
+    return merged
+
+
+def StepReports(pairs, ramp_steps, step_s, snapshots, peak_rss, bot_steps):
+    reports = []
+    for step in range(ramp_steps):
+        before, after = snapshots[step], snapshots[step + 1]
+        window_s = after.time - before.time
+        ticks = Subtract(after.tick_counts, before.tick_counts)
+        db_writes = Subtract(after.db_write_counts, before.db_write_counts)
+        bots = bot_steps[step]
+        messages = bots.messages_sent + bots.messages_received
+        reports.append(
+            StepReport(
+                step=step,
+                pairs=ActivePairs(pairs, ramp_steps, step),
+                games_started=bots.games_started,
+                games_finished=bots.games_finished,
+                bot_errors=bots.errors,
+                tick_p50_ms=HistogramPercentile(ticks, 50) * MS,
+                tick_p99_ms=HistogramPercentile(ticks, 99) * MS,
+                tick_max_ms=HistogramPercentile(ticks, 100) * MS,
+                rtt_p50_ms=HistogramPercentile(bots.rtt_counts, 50) * MS,
+                rtt_p95_ms=HistogramPercentile(bots.rtt_counts, 95) * MS,
+                rtt_p99_ms=HistogramPercentile(bots.rtt_counts, 99) * MS,
+                messages_per_s=messages / step_s,
+                db_writes_per_s=sum(db_writes) / window_s,
+                db_write_p50_ms=HistogramPercentile(db_writes, 50) * MS,
+                db_write_p99_ms=HistogramPercentile(db_writes, 99) * MS,
+                server_cpu_percent=100 * (after.cpu_s - before.cpu_s) / window_s,
+                server_rss_mb=max(peak_rss[step], after.rss_bytes) / 2**20,
+            )
+        )
+    return reports
+
+
+def PrintReports(reports):
+    columns = [
+        ("step", "step", "{}"),
+        ("pairs", "pairs", "{}"),
+        ("games", "games_started", "{}"),
+        ("errors", "bot_errors", "{}"),
+        ("tick p50/p99/max ms", None, None),
+        ("rtt p50/p95/p99 ms", None, None),
+        ("msg/s", "messages_per_s", "{:.0f}"),
+        ("db w/s", "db_writes_per_s", "{:.0f}"),
+        ("db p50/p99 ms", None, None),
+        ("cpu %", "server_cpu_percent", "{:.0f}"),
+        ("rss MB", "server_rss_mb", "{:.0f}"),
+    ]
+    rows = [[name for name, _, _ in columns]]
+    for report in reports:
+        row = []
+        for name, key, fmt in columns:
+            if name.startswith("tick"):
+                row.append(
+                    f"{report.tick_p50_ms:.1f}/{report.tick_p99_ms:.1f}/"
+                    f"{report.tick_max_ms:.0f}"
+                )
+            elif name.startswith("rtt"):
+                row.append(
+                    f"{report.rtt_p50_ms:.0f}/{report.rtt_p95_ms:.0f}/"
+                    f"{report.rtt_p99_ms:.0f}"
+                )
+            elif name.startswith("db p"):
+                row.append(f"{report.db_write_p50_ms:.2f}/{report.db_write_p99_ms:.2f}")
+            else:
+                row.append(fmt.format(getattr(report, key)))
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+    print(
+        "Percentiles are bucket upper bounds (10 buckets per decade). Tick latency is "
+        "the time between game loop iterations."
+    )
+
+
+async def RunLoadTest(
+    pairs,
+    ramp_steps,
+    step_s,
+    processes,
+    action_period_s,
+    impairment,
+    room_shards,
+    keep_files,
+):
+    profile = ImpairmentProfileFromName(impairment)
+    server = LocalServer(game_capacity=pairs * 2, room_shards=room_shards)
+    link = None
+    bot_processes = []
+    try:
+        await server.start()
+        url = server.url()
+        if impairment != "none":
+            link = ImpairedLink(profile, "127.0.0.1", server.port)
+            url = f"http://127.0.0.1:{await link.start()}"
+        logger.info(f"Server at {server.url()}. Bots connect to {url}.")
+
+        start_time = time.time() + STARTUP_S
+        start_steps = PairStartSteps(pairs, ramp_steps)
+        # Stagger joins over the start of each step.
+        stagger_s = min(5, step_s / 4)
+        pair_start_times = [
+            start_time + step * step_s + stagger_s * i / pairs
+            for i, step in enumerate(start_steps)
+        ]
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        for index in range(processes):
+            process = context.Process(
+                target=RunBots,
+                args=(
+                    url,
+                    LOBBY_NAME,
+                    pair_start_times[index::processes],
+                    start_time,
+                    step_s,
+                    ramp_steps,
+                    action_period_s,
+                    results,
+                ),
+                daemon=True,
+            )
+            process.start()
+            bot_processes.append(process)
+
+        (snapshots, peak_rss), bot_steps = await asyncio.gather(
+            SampleServer(server, start_time, step_s, ramp_steps),
+            CollectBotResults(bot_processes, results, ramp_steps),
+        )
+        return StepReports(pairs, ramp_steps, step_s, snapshots, peak_rss, bot_steps)
+    finally:
+        for process in bot_processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        if link is not None:
+            await link.stop()
+        server.stop(keep_files)
+        if keep_files:
+            print(f"Server log: {server.log_path}")
+
+
+def main(
+    pairs=8,
+    ramp_steps=4,
+    step_s=30,
+    processes=1,
+    action_period_s=0.5,
+    impairment="none",
+    room_shards=0,
+    report_path="",
+    keep_files=False,
+):
+    """Runs a local server and ramps up bot games against it.
+
+    Args:
+        pairs: Number of leader/follower bot pairs at full load.
+        ramp_steps: Pairs are added in this many equal steps.
+        step_s: Duration of each step. Each step is one row in the report.
+        processes: Number of bot processes. Pairs are split between them.
+        action_period_s: Mean time a bot waits before each action.
+        impairment: Network impairment profile. See loadtest/impairment.py.
+        room_shards: Server room shards. See server/room_shards.py.
+        report_path: If set, also writes the report to this path as JSON.
+        keep_files: Keep the server's temporary database and log.
+    """
+    logging.basicConfig(level=logging.INFO)
+    reports = asyncio.run(
+        RunLoadTest(
+            pairs,
+            ramp_steps,
+            step_s,
+            processes,
+            action_period_s,
+            impairment,
+            room_shards,
+            keep_files,
+        )
+    )
+    PrintReports(reports)
+    if report_path:
+        with open(report_path, "wb") as report_file:
+            report_file.write(
+                orjson.dumps(
+                    [asdict(report) for report in reports],
+                    option=orjson.OPT_INDENT_2,
+                )
+            )
@@ -56,6 +56,14 @@ def PongMessage():
     return message
 
 
+def ObjectiveSyncRequestMessage():
+    message = message_to_server.MessageToServer(
+        transmit_time=datetime.utcnow(),
+        type=message_to_server.MessageType.OBJECTIVE_SYNC_REQUEST,
+    )
+    return message
+
+
 def NegativeFeedbackMessage():
     message = message_to_server.MessageToServer(
         transmit_time=datetime.utcnow(),
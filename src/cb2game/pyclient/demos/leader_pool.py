@@ -1,9 +1,7 @@
 import asyncio
 import logging
-import time
 
 import fire
-import nest_asyncio
 
 from cb2game.pyclient.demos.routing_leader_client import *
 from cb2game.pyclient.remote_client import *
@@ -11,12 +9,11 @@ from cb2game.pyclient.remote_client import *
 logger = logging.getLogger(__name__)
 
 
-class PathfindingLeader(threading.Thread):
-    def __init__(self, url, index):
-        super().__init__()
+class PathfindingLeader(object):
+    def __init__(self, url, index, session):
         self.url = url
-        self.exc = None
         self.index = index
+        self.session = session
 
     def get_action(self, game, map, cards, turn_state, instructions, actors, feedback):
         if turn_state.turn != Role.LEADER:
@@ -34,19 +31,31 @@ class PathfindingLeader(threading.Thread):
         instruction = get_instruction_for_card(closest_card, follower, map, game, cards)
         return Action.SendInstruction(instruction=instruction)
 
-    def run(self):
-        try:
-            pass
-
-            event_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(event_loop)
-            client = RemoteClient(self.url, render=False)
-            joined, reason = client.Connect()
-            assert joined, f"Unable to join: {reason}"
-            self.game, reason = client.JoinGame(
-                queue_type=RemoteClient.QueueType.LEADER_ONLY
+    async def run(self):
+        client = AsyncRemoteClient(self.url, render=False, session=self.session)
+        joined, reason = await client.connect()
+        assert joined, f"Unable to join: {reason}"
+        game, reason = await client.join_game(queue_type=QueueType.LEADER_ONLY)
+        assert game is not None, f"Unable to join game: {reason}"
+        (
+            map,
+            cards,
+            turn_state,
+            instructions,
+            (leader, follower),
+            live_feedback,
+        ) = game.initial_state()
+        while not game.over():
+            leader_action = self.get_action(
+                game,
+                map,
+                cards,
+                turn_state,
+                instructions,
+                (leader, follower),
+                live_feedback,
             )
-            assert self.game is not None, f"Unable to join game: {reason}"
+            logger.info(f"Leader {self.index} step({str(leader_action)})")
             (
                 map,
                 cards,
@@ -54,62 +63,34 @@ class PathfindingLeader(threading.Thread):
                 instructions,
                 (leader, follower),
                 live_feedback,
-            ) = self.game.initial_state()
-            while not self.game.over():
-                leader_action = self.get_action(
-                    self.game,
-                    map,
-                    cards,
-                    turn_state,
-                    instructions,
-                    (leader, follower),
-                    live_feedback,
-                )
-                logger.info(f"Leader {self.index} step({str(leader_action)})")
-                (
-                    map,
-                    cards,
-                    turn_state,
-                    instructions,
-                    (leader, follower),
-                    live_feedback,
-                ) = self.game.step(leader_action)
-            self.game.close()
+            ) = await game.step(leader_action)
+        await game.close()
+        await client.reset()
+
+
+async def play_forever(url, index, session):
+    """Plays games as leader. Restarts the leader when a game ends or fails."""
+    while True:
+        try:
+            await PathfindingLeader(url, index, session).run()
         except Exception as e:
-            self.exc = e
+            logger.info(f"Leader {index} died. Restarting. Reason: {e}")
+            await asyncio.sleep(1)
 
-    def join(self):
-        super().join()
-        if self.exc:
-            raise self.exc
 
-    def assert_ok(self):
-        if self.exc:
-            raise self.exc
+async def run_pool(url, number_of_leaders):
+    # All leaders share one event loop and one connection pool.
+    async with SharedClientSession() as session:
+        await asyncio.gather(
+            *[play_forever(url, i, session) for i in range(number_of_leaders)]
+        )
 
 
 def main(url="http://localhost:8080", number_of_leaders=32):
     """This utility maintains a pool of leaders who play games. It is intended to be used for evaluation of games."""
-    nest_asyncio.apply()
     logging.basicConfig(level=logging.INFO)
     logger.info(f"number_of_leaders: {number_of_leaders}")
-    leaders = []
-    for i in range(number_of_leaders):
-        leader_agent = PathfindingLeader(url, i)
-        leader_agent.daemon = True
-        leader_agent.start()
-        leaders.append(leader_agent)
-
-    while True:
-        for i in range(number_of_leaders):
-            if not leaders[i].is_alive():
-                logger.info(f"Leader {i} died. Restarting.")
-                leaders[i].assert_ok()
-                leader_agent = PathfindingLeader(url, i)
-                leader_agent.daemon = True
-                leader_agent.start()
-                leaders[i] = leader_agent
-        time.sleep(1)
+    asyncio.run(run_pool(url, number_of_leaders))
 
 
 if __name__ == "__main__":
@@ -26,6 +26,7 @@ from cb2game.pyclient.client_messages import (
     LeaveMessage,
     LoadScenarioMessage,
     NegativeFeedbackMessage,
+    ObjectiveSyncRequestMessage,
     PongMessage,
     PositiveFeedbackMessage,
     TutorialNextStepMessage,
@@ -49,6 +50,7 @@ from cb2game.server.messages.objective import ObjectiveMessage
 from cb2game.server.messages.prop import Prop, PropType
 from cb2game.server.messages.rooms import Role
 from cb2game.server.messages.turn_state import TurnState
+from cb2game.server.objective_updates import ApplyObjectiveUpdate
 from cb2game.server.util import HEARTBEAT_TIMEOUT_S
 
 logger = logging.getLogger(__name__)
@@ -454,7 +456,13 @@ class GameEndpoint(object):
         self.cards = {}
         self.turn_state = None
         self.instructions = []
+        # Version of self.instructions, for incremental objective updates. None
+        # until the full list has been received.
+        self._objective_version = None
         self.queued_messages = []
+        if self._objective_updates_enabled():
+            # Ask for incremental objective updates instead of full lists.
+            self.queued_messages.append(ObjectiveSyncRequestMessage())
         self.message_number = 0
         self.player_id = -1
         self._player_role = Role.NONE
@@ -522,13 +530,7 @@ class GameEndpoint(object):
         if either role can act, and then rely on the user to call step()
         with an action from the correct agent (this will be verified).
         """
-        # If too much time passes between calls to step(), log an error.
-        if datetime.now() - self.last_step_call > timedelta(
-            seconds=HEARTBEAT_TIMEOUT_S
-        ):
-            logger.warning(
-                f"NOTE: Over {HEARTBEAT_TIMEOUT_S} seconds between calls to step(). Must call step more frequently than this, or the server will disconnect."
-            )
+        self._check_step_period()
 
         # Step() pseudocode:
         # Consume any pending actions. If the game state changes during any of these, return False rejecting the action.
@@ -544,6 +546,40 @@ class GameEndpoint(object):
         if (not action.is_noop()) and not self._process_pending_messages():
             self._timeout_observed = True
             return self._state()
+        for message in self._step_messages(action):
+            logger.debug(f"Sending action: {message.type}")
+            self.socket.send_message(message)
+        # Reset this variable. We want to see if while waiting for ticks, the
+        # follower has moved. This allows self._can_act() to return True if
+        # playing as the leader, to give live feedback on a follower move.
+        self._follower_moved = False
+        # Call _wait_for_tick before checking _can_act(), to make sure we don't
+        # miss any state transitions that took place on the server.
+        waited, reason = self._wait_for_tick()
+        if not waited:
+            logger.warning(f"Issue waiting for tick: {reason}")
+        if wait_for_turn:
+            while not self._can_act() and not self.over() and self.socket.connected():
+                waited, reason = self._wait_for_tick()
+                if not waited:
+                    logger.warning(f"Issue waiting for tick: {reason}")
+                if self.render:
+                    # Handle pygame events while waiting in between turns.
+                    pygame_handle_events()
+        return self._finish_step()
+
+    def _check_step_period(self):
+        # If too much time passes between calls to step(), log an error.
+        if datetime.now() - self.last_step_call > timedelta(
+            seconds=HEARTBEAT_TIMEOUT_S
+        ):
+            logger.warning(
+                f"NOTE: Over {HEARTBEAT_TIMEOUT_S} seconds between calls to step(). Must call step more frequently than this, or the server will disconnect."
+            )
+
+    def _step_messages(self, action):
+        """Validates action. Returns the messages to send for it, followed by
+        any queued messages (like automated ping responses)."""
         valid_actions = set([])
         if self._player_role == Role.FOLLOWER:
             valid_actions = Action.FollowerActions()
@@ -567,31 +603,15 @@ class GameEndpoint(object):
             raise ValueError(
                 f"Player is role {self._player_role} and turn {self.turn_state.turn} but sent inappropriate action: {action}"
             )
+        messages = []
         message, reason = action.message_to_server(self.player_actor)
         if message != None:
-            logger.debug(f"Sending action: {message.type}")
-            self.socket.send_message(message)
-        for message in self.queued_messages:
-            logger.debug(f"Sending action: {message.type}")
-            self.socket.send_message(message)
+            messages.append(message)
+        messages.extend(self.queued_messages)
         self.queued_messages = []
-        # Reset this variable. We want to see if while waiting for ticks, the
-        # follower has moved. This allows self._can_act() to return True if
-        # playing as the leader, to give live feedback on a follower move.
-        self._follower_moved = False
-        # Call _wait_for_tick before checking _can_act(), to make sure we don't
-        # miss any state transitions that took place on the server.
-        waited, reason = self._wait_for_tick()
-        if not waited:
-            logger.warning(f"Issue waiting for tick: {reason}")
-        if wait_for_turn:
-            while not self._can_act() and not self.over() and self.socket.connected():
-                waited, reason = self._wait_for_tick()
-                if not waited:
-                    logger.warning(f"Issue waiting for tick: {reason}")
-                if self.render:
-                    # Handle pygame events while waiting in between turns.
-                    pygame_handle_events()
+        return messages
+
+    def _finish_step(self) -> GameState:
         state = self._state()
         # Clear internal live feedback before returning. This is to make sure that the
         # live feedback only occurs for 1 step per feedback message.
@@ -610,6 +630,10 @@ class GameEndpoint(object):
             self.config.live_feedback_enabled and self.lobby_info.live_feedback_enabled
         )
 
+    def _objective_updates_enabled(self):
+        # Servers which don't advertise this can't parse OBJECTIVE_SYNC_REQUEST.
+        return self.config is not None and self.config.objective_updates
+
     def _can_act(self):
         if self.player_role() == self.turn_state.turn:
             if self.player_role() == Role.FOLLOWER:
@@ -753,69 +777,99 @@ class GameEndpoint(object):
                     f"No message received from _receive_message(). Reason: {reason}"
                 )
                 continue
-            if response.type == message_from_server.MessageType.STATE_SYNC:
-                logger.debug(f"INIT received state sync.")
-                state_sync = response.state
-                self.player_id = state_sync.player_id
-                self._player_role = state_sync.player_role
-                for net_actor in state_sync.actors:
-                    added_actor = actor.Actor(
+            result = self._handle_init_message(response)
+            if result is not None:
+                return result
+        return False, "Game initialization timed out."
+
+    def _handle_init_message(self, response):
+        """Handles a message received during initialization.
+
+        Returns the result of _initialize() once it's done, or None to keep
+        waiting.
+        """
+        if response.type == message_from_server.MessageType.STATE_SYNC:
+            logger.debug(f"INIT received state sync.")
+            state_sync = response.state
+            self.player_id = state_sync.player_id
+            self._player_role = state_sync.player_role
+            for net_actor in state_sync.actors:
+                added_actor = actor.Actor(
+                    net_actor.actor_id,
+                    0,
+                    net_actor.actor_role,
+                    net_actor.location,
+                    False,
+                    net_actor.rotation_degrees,
+                )
+                self.actors[net_actor.actor_id] = added_actor
+                added_actor.add_action(
+                    action_module.Init(
                         net_actor.actor_id,
-                        0,
-                        net_actor.actor_role,
                         net_actor.location,
-                        False,
                         net_actor.rotation_degrees,
                     )
-                    self.actors[net_actor.actor_id] = added_actor
-                    added_actor.add_action(
-                        action_module.Init(
-                            net_actor.actor_id,
-                            net_actor.location,
-                            net_actor.rotation_degrees,
-                        )
-                    )
-                    while added_actor.has_actions():
-                        added_actor.step()
-                self.player_actor = self.actors[self.player_id]
-                logger.debug(
-                    f"Player start pos: {self.player_actor.location().to_offset_coordinates()}"
                 )
-                logger.debug(
-                    f"Player start orientation: {self.player_actor.heading_degrees()}"
+                while added_actor.has_actions():
+                    added_actor.step()
+            self.player_actor = self.actors[self.player_id]
+            logger.debug(
+                f"Player start pos: {self.player_actor.location().to_offset_coordinates()}"
+            )
+            logger.debug(
+                f"Player start orientation: {self.player_actor.heading_degrees()}"
+            )
+        if response.type == message_from_server.MessageType.MAP_UPDATE:
+            logger.debug(f"INIT received map")
+            self.map_update = response.map_update
+        if response.type == message_from_server.MessageType.PROP_UPDATE:
+            logger.debug(f"INIT received prop")
+            self._handle_prop_update(response.prop_update)
+        if response.type == message_from_server.MessageType.GAME_STATE:
+            logger.debug(f"INIT received turn state")
+            self.turn_state = response.turn_state
+            if self.over():
+                return False, "Game over"
+        if response.type == message_from_server.MessageType.OBJECTIVE:
+            logger.debug(f"INIT received objective")
+            self.instructions = response.objectives
+        if response.type == message_from_server.MessageType.OBJECTIVE_UPDATE:
+            logger.debug(f"INIT received objective update")
+            self._handle_objective_update(response.objective_update)
+        if response.type == message_from_server.MessageType.STATE_MACHINE_TICK:
+            logger.debug(f"Init TICK received")
+            if None not in [
+                self.player_actor,
+                self.map_update,
+                self.prop_update,
+                self.turn_state,
+            ]:
+                logger.debug(f"Init DONE for {self._player_role}")
+                self._initial_state_ready = True
+                if self.render:
+                    self._render()
+                return True, ""
+            else:
+                logger.warning(
+                    f"Init not ready. Player role: {self._player_role}, map update: {self.map_update is not None}, prop update: {self.prop_update is not None}, turn state: {self.turn_state is not None}"
                 )
-            if response.type == message_from_server.MessageType.MAP_UPDATE:
-                logger.debug(f"INIT received map")
-                self.map_update = response.map_update
-            if response.type == message_from_server.MessageType.PROP_UPDATE:
-                logger.debug(f"INIT received prop")
-                self._handle_prop_update(response.prop_update)
-            if response.type == message_from_server.MessageType.GAME_STATE:
-                logger.debug(f"INIT received turn state")
-                self.turn_state = response.turn_state
-                if self.over():
-                    return False, "Game over"
-            if response.type == message_from_server.MessageType.OBJECTIVE:
-                logger.debug(f"INIT received objective")
-                self.instructions = response.objectives
-            if response.type == message_from_server.MessageType.STATE_MACHINE_TICK:
-                logger.debug(f"Init TICK received")
-                if None not in [
-                    self.player_actor,
-                    self.map_update,
-                    self.prop_update,
-                    self.turn_state,
-                ]:
-                    logger.debug(f"Init DONE for {self._player_role}")
-                    self._initial_state_ready = True
-                    if self.render:
-                        self._render()
-                    return True, ""
-                else:
-                    logger.warning(
-                        f"Init not ready. Player role: {self._player_role}, map update: {self.map_update is not None}, prop update: {self.prop_update is not None}, turn state: {self.turn_state is not None}"
-                    )
-        return False, "Game initialization timed out."
+        return None
+
+    def _handle_objective_update(self, objective_update):
+        if self._objective_version is None and not objective_update.full:
+            # Waiting for the full list.
+            return
+        result = ApplyObjectiveUpdate(
+            self.instructions, self._objective_version, objective_update
+        )
+        if result is None:
+            logger.warning(
+                f"Objective update for version {objective_update.base_version}, but at version {self._objective_version}. Requesting full objective list."
+            )
+            self._objective_version = None
+            self.queued_messages.append(ObjectiveSyncRequestMessage())
+            return
+        self.instructions, self._objective_version = result
 
     def _handle_prop_update(self, prop_update):
         self.prop_update = prop_update
@@ -910,6 +964,8 @@ class GameEndpoint(object):
             self.map_update = message.map_update
         elif message.type == message_from_server.MessageType.OBJECTIVE:
             self.instructions = message.objectives
+        elif message.type == message_from_server.MessageType.OBJECTIVE_UPDATE:
+            self._handle_objective_update(message.objective_update)
         elif message.type == message_from_server.MessageType.PING:
             self.queued_messages.append(PongMessage())
         elif message.type == message_from_server.MessageType.LIVE_FEEDBACK:
@@ -938,7 +994,9 @@ class GameEndpoint(object):
             )
         )
         self.display.set_props(props)
-        self.display.set_map(map_update)
+        # The map is only re-rendered on set_map(), and it rarely changes.
+        if map_update is not self.display.map():
+            self.display.set_map(map_update)
         self.display.set_instructions(instructions)
         self.display.draw()
         pygame.display.flip()
@@ -951,3 +1009,120 @@ class GameEndpoint(object):
         return state_sync.StateSync(
             len(self.actors), actor_states, self.player_id, role
         )
+
+
+class AsyncGameEndpoint(GameEndpoint):
+    """GameEndpoint for asyncio. step() and friends are coroutines.
+
+    Takes an AsyncGameSocket. Waiting for the server doesn't block the event
+    loop, so one process can play many games at once. Do not initialize
+    yourself. Use AsyncRemoteClient.join_game() instead. See remote_client.py.
+
+    """
+
+    async def step(self, action, wait_for_turn=True) -> GameState:
+        """Executes one action and waits until the environment is ready for another action.
+
+        If wait_for_turn is False, returns after the next tick instead of
+        waiting for this player's turn. See GameEndpoint.step().
+        """
+        self._check_step_period()
+        self._timeout_observed = False
+        if (not action.is_noop()) and not await self._process_pending_messages():
+            self._timeout_observed = True
+            return self._state()
+        for message in self._step_messages(action):
+            logger.debug(f"Sending action: {message.type}")
+            await self.socket.send_message(message)
+        # See GameEndpoint.step().
+        self._follower_moved = False
+        waited, reason = await self._wait_for_tick()
+        if not waited:
+            logger.warning(f"Issue waiting for tick: {reason}")
+        if wait_for_turn:
+            while not self._can_act() and not self.over() and self.socket.connected():
+                waited, reason = await self._wait_for_tick()
+                if not waited:
+                    logger.warning(f"Issue waiting for tick: {reason}")
+                if self.render:
+                    pygame_handle_events()
+        return self._finish_step()
+
+    async def _process_pending_messages(self) -> bool:
+        """Process any pending messages from the server. Returns false if a turn change occurred. True if our turn never ended."""
+        turn_change = False
+        current_turn = self.turn_state.turn
+        message, reason = await self.socket.receive_message(
+            timedelta(seconds=BLOCKING_ZERO_TIME)
+        )
+        while message:
+            self._handle_message(message)
+            if self.turn_state.turn != current_turn:
+                turn_change = True
+            message, reason = await self.socket.receive_message(
+                timedelta(seconds=BLOCKING_ZERO_TIME)
+            )
+        return not turn_change
+
+    async def _wait_for_tick(self, timeout=timedelta(seconds=60)):
+        """Waits for a tick"""
+        end_time = datetime.utcnow() + timeout
+        while not self.over() and self.socket.connected():
+            if datetime.utcnow() > end_time:
+                return False, "Timed out waiting for tick"
+            message, reason = await self.socket.receive_message(
+                end_time - datetime.utcnow()
+            )
+            if message is None:
+                logger.warning(f"Received None from _receive_message. Reason: {reason}")
+                continue
+            self._handle_message(message)
+            if message.type == message_from_server.MessageType.STATE_MACHINE_TICK:
+                return True, ""
+        # Game over, return True to exit without triggering any errors.
+        return True, ""
+
+    async def receive(self, timeout=timedelta(seconds=60)) -> GameState:
+        """Waits for the next tick from the server without acting. Returns the state."""
+        waited, reason = await self._wait_for_tick(timeout)
+        if not waited:
+            logger.warning(f"Issue waiting for tick: {reason}")
+        return self._finish_step()
+
+    async def _initialize(self, timeout=timedelta(seconds=60)):
+        """Initializes the game state. See GameEndpoint._initialize()."""
+        if self._initial_state_ready:
+            logger.warning("Initial state already ready")
+            return
+
+        end_time = datetime.utcnow() + timeout
+        while self.socket.connected():
+            if datetime.utcnow() > end_time:
+                raise Exception("Timed out waiting for game")
+            response, reason = await self.socket.receive_message(
+                timeout=end_time - datetime.utcnow()
+            )
+            if response is None:
+                logger.warning(
+                    f"No message received from _receive_message(). Reason: {reason}"
+                )
+                continue
+            result = self._handle_init_message(response)
+            if result is not None:
+                return result
+        return False, "Game initialization timed out."
+
+    async def close(self):
+        if not self.over() and self.socket.connected():
+            await self.socket.send_message(LeaveMessage())
+        if self.render:
+            self.pygame_task.cancel()
+
+    def __enter__(self):
+        raise TypeError("Use `async with` for AsyncGameEndpoint.")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
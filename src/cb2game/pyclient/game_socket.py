@@ -32,3 +32,24 @@ class GameSocket(ABC):
     ) -> Tuple[message_from_server.MessageFromServer, str]:
         """Blocks until a message is received or the timeout is reached."""
         ...
+
+
+class AsyncGameSocket(ABC):
+    """GameSocket for asyncio. Used by AsyncGameEndpoint."""
+
+    @abstractmethod
+    async def send_message(self, message: message_to_server.MessageToServer):
+        """Send a message to the server."""
+        ...
+
+    @abstractmethod
+    def connected(self) -> bool:
+        """Is the socket connected to a server or state machine?"""
+        ...
+
+    @abstractmethod
+    async def receive_message(
+        self, timeout: timedelta
+    ) -> Tuple[message_from_server.MessageFromServer, str]:
+        """Waits until a message is received or the timeout is reached."""
+        ...
@@ -110,9 +110,14 @@ class LocalGameCoordinator:
         log_to_db: bool = True,
         realtime_actions: bool = False,
         lobby: Lobby = DEFAULT_LOBBY,
+        seed: int = None,
     ):
         """Creates a new game. Exactly two agents can join this game with JoinGame().
 
+        If seed is provided, the map, cards and spawn points are generated from
+        it, so two games with the same seed and the same agent actions play out
+        identically.
+
         Returns the game name.
         """
         if realtime_actions and "unittest" not in sys.modules:
@@ -149,6 +154,7 @@ class LocalGameCoordinator:
             log_to_db=log_to_db,
             realtime_actions=False,
             lobby=lobby,
+            seed=seed,
         )
         self._game_drivers[game_name] = StateMachineDriver(state_machine, room_id)
         return game_name
@@ -6,8 +6,6 @@ from enum import Enum
 
 import aiohttp
 import nest_asyncio
-import orjson
-import requests
 
 import cb2game.server.messages as messages
 from cb2game.pyclient.client_messages import (
@@ -16,11 +14,19 @@ from cb2game.pyclient.client_messages import (
     JoinLeaderQueueMessage,
     JoinQueueMessage,
 )
-from cb2game.pyclient.game_endpoint import GameEndpoint
-from cb2game.pyclient.game_socket import GameSocket
+from cb2game.pyclient.game_endpoint import AsyncGameEndpoint, GameEndpoint
+from cb2game.pyclient.game_socket import AsyncGameSocket, GameSocket
 from cb2game.server.config.config import Config
-from cb2game.server.main import HEARTBEAT_TIMEOUT_S
 from cb2game.server.messages import message_from_server, message_to_server
+from cb2game.server.util import HEARTBEAT_TIMEOUT_S
+from cb2game.server.wire_format import (
+    AvailableWireFormats,
+    DecodeMessage,
+    EncodeMessage,
+    NegotiatedWireFormat,
+    Subprotocols,
+    WireFormat,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +44,17 @@ logger = logging.getLogger(__name__)
 #        leader.SendLeadAction(Player.LeadActions.END_TURN)
 #        game.follower().WaitForTurn()
 #        leader.SendLeadAction(Player.LeadActions.POSITIVE_FEEDBACK)
+#
+# RemoteClient blocks on every call. To run many bots in one process, use
+# AsyncRemoteClient, which RemoteClient is built on:
+#
+# async with SharedClientSession() as session:
+#     client = AsyncRemoteClient(url, session=session)
+#     joined, reason = await client.connect()
+#     game, reason = await client.join_game(queue_type=QueueType.LEADER_ONLY)
+#     map, cards, turn_state, instructions, actors, feedback = game.initial_state()
+#     while not game.over():
+#         ... = await game.step(action)
 
 # TODO(sharf): client.Connect() should have its own context manager, or at least
 # make it so that __aexit__ for JoinGame() doesn't disconnect the client's
@@ -63,9 +80,50 @@ class RemoteSocket(GameSocket):
         return self.client._receive_message(timeout)  # pylint: disable=protected-access
 
 
+class AsyncRemoteSocket(AsyncGameSocket):
+    def __init__(self, client):
+        self.client = client
+
+    async def send_message(self, message: message_to_server.MessageToServer):
+        """Send a message to the server."""
+        await self.client._send_message(message)  # pylint: disable=protected-access
+
+    def connected(self) -> bool:
+        """Is the socket connected to a server or state machine?"""
+        return self.client.connected()
+
+    async def receive_message(
+        self, timeout: timedelta
+    ) -> message_from_server.MessageFromServer:
+        """Waits until a message is received or the timeout is reached."""
+        return await self.client._receive_message(  # pylint: disable=protected-access
+            timeout
+        )
+
+
+class QueueType(Enum):
+    NONE = 0
+    LEADER_ONLY = 1
+    FOLLOWER_ONLY = 2
+    DEFAULT = 3  # Could be assigned either leader or follower.asyncio.
+    MAX = 4
+
+
+def SharedClientSession(max_connections=0):
+    """Creates a ClientSession to share between AsyncRemoteClients.
+
+    Each client's websocket holds one of the session's connections for the
+    whole game, so the default of 0 doesn't limit the number of connections.
+    Must be called from a coroutine.
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_connections))
+
+
 # Client which manages connection state and shuffling of messages to Game
 # object. See the comment at the top of this file for an example usage.
-class RemoteClient(object):
+class AsyncRemoteClient(object):
+    """Asyncio client for a CB2 server. Methods which talk to the server are coroutines."""
+
     class State(Enum):
         NONE = 0
         BEGIN = 1
@@ -77,82 +135,92 @@ class RemoteClient(object):
         ERROR = 8
         MAX = 9
 
-    def __init__(self, url, render=False, lobby_name="bot-sandbox"):
+    QueueType = QueueType
+
+    def __init__(
+        self,
+        url,
+        render=False,
+        lobby_name="bot-sandbox",
+        wire_formats=None,
+        session: aiohttp.ClientSession = None,
+    ):
         """Constructor.
 
         Args:
             url: (str) The URL of the server to connect to. Include http:// or https://!
             render: (bool) Whether to render the game using pygame, for the user to see.
             lobby_name: (str) The name of the lobby to join. Default is bot-sandbox. Please don't join other lobbies unless you have contacted the owners of the server.
+            wire_formats: (List[WireFormat]) Message encodings to offer the server, most preferred first. Defaults to all available. Pass [] to use JSON text frames.
+            session: (aiohttp.ClientSession) Session to connect with. Share one between clients (see SharedClientSession()) to pool connections. If None, the client creates and closes its own.
         """
-        self.session = None
-        self.ws = None
-        self.render = render  # Whether to render the game with pygame.
-        self.Reset()
         self.url = url
+        self.render = render  # Whether to render the game with pygame.
         self.lobby_name = lobby_name
-        self.event_loop = asyncio.get_event_loop()
-        logging.basicConfig(level=logging.INFO)
-        # Lets us synchronously block on an event loop that's already running.
-        # This means we can encapsulate asyncio without making our users learn
-        # how to use await/async. This isn't technically needed, unless you want
-        # to be compatible with something like jupyter or anything else which
-        # requires an always-running event loop.
-        nest_asyncio.apply()
-
-        # Detect if we're running in an interactive shell and warn the user about the server heartbeat timeout.
-        if hasattr(sys, "ps1"):
-            logger.warning(
-                f"NOTE: You're running in an interactive shell. The server will disconnect you after {HEARTBEAT_TIMEOUT_S} seconds (by default) of inactivity. Remain active by calling Game.step(). For this reason, it's recommended not to use this library manually from a REPL loop."
-            )
+        if wire_formats is None:
+            wire_formats = AvailableWireFormats()
+        self.wire_formats = wire_formats
+        self.wire_format = WireFormat.JSON_TEXT
+        self._shared_session = session
+        self.session = None
+        self.ws = None
+        self._reset_state()
 
-    def Connect(self):
+    async def connect(self):
         """Connect to the server.
 
         Returns:
             (bool, str): True if connected. If not, the second element is an error message.
         """
-        if self.init_state != RemoteClient.State.BEGIN:
-            return False, "Server is not in the BEGIN state. Call Reset() first?"
+        if self.init_state != AsyncRemoteClient.State.BEGIN:
+            return False, "Server is not in the BEGIN state. Call reset() first?"
+        session = self._shared_session
+        if session is None:
+            session = aiohttp.ClientSession()
+        self.session = session
         config_url = f"{self.url}/data/config"
-        config_response = requests.get(config_url)
-        if config_response.status_code != 200:
-            return (
-                False,
-                f"Could not get config from {config_url}: {config_response.status_code}",
-            )
-        self.config = Config.from_json(config_response.text)
+        async with session.get(config_url) as config_response:
+            if config_response.status != 200:
+                return (
+                    False,
+                    f"Could not get config from {config_url}: {config_response.status}",
+                )
+            self.config = Config.from_json(await config_response.text())
         url = f"{self.url}/player_endpoint?is_bot=true"
         if self.lobby_name != "":
             url += f"&lobby_name={self.lobby_name}"
         logger.info(f"Connecting to {url}...")
-        session = aiohttp.ClientSession()
-        ws = self.event_loop.run_until_complete(session.ws_connect(url))
-        logger.info(f"Connected!")
-        self.session = session
+        ws = await session.ws_connect(url, protocols=Subprotocols(self.wire_formats))
+        # Servers which don't support a subprotocol use JSON text frames.
+        self.wire_format = NegotiatedWireFormat(ws.protocol)
+        logger.info(f"Connected! Wire format: {self.wire_format}")
         self.ws = ws
-        self.init_state = RemoteClient.State.CONNECTED
+        self.init_state = AsyncRemoteClient.State.CONNECTED
         return True, ""
 
     def connected(self):
         return self.init_state in [
-            RemoteClient.State.CONNECTED,
-            RemoteClient.State.IN_QUEUE,
-            RemoteClient.State.IN_GAME_INIT,
-            RemoteClient.State.GAME_STARTED,
-            RemoteClient.State.GAME_OVER,
+            AsyncRemoteClient.State.CONNECTED,
+            AsyncRemoteClient.State.IN_QUEUE,
+            AsyncRemoteClient.State.IN_GAME_INIT,
+            AsyncRemoteClient.State.GAME_STARTED,
+            AsyncRemoteClient.State.GAME_OVER,
         ]
 
-    def Reset(self):
-        if self.session is not None:
-            self.event_loop.run_until_complete(self.session.close())
+    async def reset(self):
+        """Disconnects from the server. Closes the session unless it's shared."""
         if self.ws is not None:
-            self.event_loop.run_until_complete(self.ws.close())
+            await self.ws.close()
+        if self.session is not None and self.session is not self._shared_session:
+            await self.session.close()
         self.session = None
         self.ws = None
+        self._reset_state()
+
+    def _reset_state(self):
         self.player_role = None
         self.player_id = -1
-        self.init_state = RemoteClient.State.BEGIN
+        self.init_state = AsyncRemoteClient.State.BEGIN
         self.map_update = None
         self.state_sync = None
         self.prop_update = None
@@ -164,14 +232,7 @@ class RemoteClient(object):
     def state(self):
         return self.init_state
 
-    class QueueType(Enum):
-        NONE = 0
-        LEADER_ONLY = 1
-        FOLLOWER_ONLY = 2
-        DEFAULT = 3  # Could be assigned either leader or follower.asyncio.
-        MAX = 4
-
-    def JoinGame(
+    async def join_game(
         self,
         timeout=timedelta(minutes=6),
         queue_type=QueueType.DEFAULT,
@@ -179,32 +240,22 @@ class RemoteClient(object):
     ):
         """Enters the game queue and waits for a game.
 
-        Waits for all of the following:
-            - Server says the game has started
-            - Server has sent a map update.
-            - Server has sent a state sync.
-            - Server has sent a prop update.
+        See RemoteClient.JoinGame().
 
-        Args:
-            timeout: The maximum amount of time to wait for the game to start.
-            queue_type: Which queue to join (DEFAULT, LEADER_ONLY, FOLLOWER_ONLY).
-            e_uuid: Event UUID to resume from. Empty implies new game.
         Returns:
-            (Game, str): The game that was started. If the game didn't start, the second element is an error message.
-        Raises:
-            TimeoutError: If the game did not start within the timeout.
+            (AsyncGameEndpoint, str): The game that was started. If the game didn't start, the second element is an error message.
         """
-        in_queue, reason = self._join_queue(queue_type, e_uuid)
+        in_queue, reason = await self._join_queue(queue_type, e_uuid)
         if not in_queue:
             return None, f"Failed to join queue: {reason}"
 
-        game_joined, reason = self._wait_for_game(timeout)
+        game_joined, reason = await self._wait_for_game(timeout)
         if not game_joined:
             return None, f"Failed to join game: {reason}"
 
         return self.game, ""
 
-    def AttachToScenario(self, scenario_id, timeout=timedelta(minutes=6)):
+    async def attach_to_scenario(self, scenario_id, timeout=timedelta(minutes=6)):
         """Attaches to an already-existing scenario of the provided ID.
 
             If none exists, returns failure.
@@ -212,20 +263,16 @@ class RemoteClient(object):
         Args:
             scenario_id: The ID of the scenario to attach to.
         """
-        if self.init_state not in [
-            RemoteClient.State.CONNECTED,
-            RemoteClient.State.GAME_OVER,
-        ]:
-            return False, f"Not ready to join game. State: {str(self.init_state)}"
-        self._send_message(AttachToScenarioMessage(scenario_id))
-        self.init_state = RemoteClient.State.IN_QUEUE
-        game_joined, reason = self._wait_for_game(timeout)
+        attached, reason = await self._attach_to_scenario(scenario_id)
+        if not attached:
+            return False, reason
+        game_joined, reason = await self._wait_for_game(timeout)
         if not game_joined:
             return None, f"Failed to join game: {reason}"
 
         return self.game, ""
 
-    def _send_message(self, message):
+    async def _send_message(self, message):
         """Sends a message to the server.
 
         Args:
@@ -236,41 +283,49 @@ class RemoteClient(object):
         if not self.connected():
             return
         try:
-            binary_message = orjson.dumps(
-                message,
-                option=orjson.OPT_NAIVE_UTC | orjson.OPT_PASSTHROUGH_DATETIME,
-                default=datetime.isoformat,
-            )
-            self.event_loop.run_until_complete(
-                self.ws.send_str(binary_message.decode("utf-8"))
-            )
+            binary_message = EncodeMessage(message, self.wire_format)
+            if self.wire_format.binary():
+                await self.ws.send_bytes(binary_message)
+            else:
+                await self.ws.send_str(binary_message.decode("utf-8"))
         except RuntimeError as e:
             logger.error(f"Failed to send message: {e}")
-            self.init_state = RemoteClient.State.ERROR
+            self.init_state = AsyncRemoteClient.State.ERROR
         except ConnectionResetError as e:
             logger.error(f"Connection reset: {e}")
-            self.init_state = RemoteClient.State.CONNECTED
+            self.init_state = AsyncRemoteClient.State.CONNECTED
 
-    def _join_queue(self, queue_type=QueueType.DEFAULT, e_uuid: str = ""):
+    async def _join_queue(self, queue_type=QueueType.DEFAULT, e_uuid: str = ""):
         """Sends a join queue message to the server."""
         if self.init_state not in [
-            RemoteClient.State.CONNECTED,
-            RemoteClient.State.GAME_OVER,
+            AsyncRemoteClient.State.CONNECTED,
+            AsyncRemoteClient.State.GAME_OVER,
         ]:
             return False, f"Not ready to join game. State: {str(self.init_state)}"
-        if queue_type == RemoteClient.QueueType.DEFAULT:
-            self._send_message(JoinQueueMessage(e_uuid))
-        elif queue_type == RemoteClient.QueueType.LEADER_ONLY:
-            self._send_message(JoinLeaderQueueMessage(e_uuid))
-        elif queue_type == RemoteClient.QueueType.FOLLOWER_ONLY:
-            self._send_message(JoinFollowerQueueMessage(e_uuid))
+        if queue_type == QueueType.DEFAULT:
+            await self._send_message(JoinQueueMessage(e_uuid))
+        elif queue_type == QueueType.LEADER_ONLY:
+            await self._send_message(JoinLeaderQueueMessage(e_uuid))
+        elif queue_type == QueueType.FOLLOWER_ONLY:
+            await self._send_message(JoinFollowerQueueMessage(e_uuid))
         else:
             return False, f"Invalid queue type {queue_type}"
-        self.init_state = RemoteClient.State.IN_QUEUE
+        self.init_state = AsyncRemoteClient.State.IN_QUEUE
         return True, ""
 
-    def _wait_for_game(self, timeout=timedelta(minutes=6)):
-        """Blocks until the game is started or a timeout is reached.
+    async def _attach_to_scenario(self, scenario_id):
+        """Sends a message to attach to a scenario."""
+        if self.init_state not in [
+            AsyncRemoteClient.State.CONNECTED,
+            AsyncRemoteClient.State.GAME_OVER,
+        ]:
+            return False, f"Not ready to join game. State: {str(self.init_state)}"
+        await self._send_message(AttachToScenarioMessage(scenario_id))
+        self.init_state = AsyncRemoteClient.State.IN_QUEUE
+        return True, ""
+
+    async def _wait_for_game(self, timeout=timedelta(minutes=6)):
+        """Waits until the game is started or a timeout is reached.
 
         Waits for all of the following:
             - Server says the game has started
@@ -284,14 +339,28 @@ class RemoteClient(object):
         Returns:
             (bool, str): A tuple containing if a game was joined, and if not, the reason why.
         """
-        if self.init_state != RemoteClient.State.IN_QUEUE:
+        end_time = datetime.utcnow() + timeout
+        joined, reason = await self._wait_for_join(end_time)
+        if not joined:
+            return False, reason
+        self.game = AsyncGameEndpoint(AsyncRemoteSocket(self), self.config, self.render)
+        result, reason = await self.game._initialize(end_time - datetime.utcnow())
+        assert result, f"Failed to initialize game: {reason}"
+        self.init_state = AsyncRemoteClient.State.GAME_STARTED
+        return True, ""
+
+    async def _wait_for_join(self, end_time):
+        """Waits until the server puts us in a room, or end_time passes.
+
+        Returns:
+            (bool, str): A tuple containing if a room was joined, and if not, the reason why.
+        """
+        if self.init_state != AsyncRemoteClient.State.IN_QUEUE:
             return False, "Not in queue, yet waiting for game."
-        start_time = datetime.utcnow()
-        end_time = start_time + timeout
         while self.connected():
             if datetime.utcnow() > end_time:
                 return False, "Timed out waiting for game"
-            response, reason = self._receive_message(
+            response, reason = await self._receive_message(
                 timeout=end_time - datetime.utcnow()
             )
             if response is None:
@@ -300,7 +369,7 @@ class RemoteClient(object):
                 )
                 continue
             if (
-                self.init_state == RemoteClient.State.IN_QUEUE
+                self.init_state == AsyncRemoteClient.State.IN_QUEUE
                 and response.type == message_from_server.MessageType.ROOM_MANAGEMENT
             ):
                 if (
@@ -310,15 +379,7 @@ class RemoteClient(object):
                     join_message = response.room_management_response.join_response
                     if join_message.joined == True:
                         logger.info(f"Joined room. Role: {join_message.role}")
-                        self.init_state = RemoteClient.State.IN_GAME_INIT
-                        self.game = GameEndpoint(
-                            RemoteSocket(self), self.config, self.render
-                        )
-                        result, reason = self.game._initialize(
-                            end_time - datetime.utcnow()
-                        )
-                        assert result, f"Failed to initialize game: {reason}"
-                        self.init_state = RemoteClient.State.GAME_STARTED
+                        self.init_state = AsyncRemoteClient.State.IN_GAME_INIT
                         return True, ""
                     else:
                         logger.info(f"Place in queue: {join_message.place_in_queue}")
@@ -326,18 +387,16 @@ class RemoteClient(object):
                         logger.info(
                             f"Booted from queue! Reason: {join_message.boot_reason}"
                         )
-                        self.init_state = RemoteClient.State.CONNECTED
+                        self.init_state = AsyncRemoteClient.State.CONNECTED
                         return (
                             False,
                             f"Booted from queue! Reason: {join_message.boot_reason}",
                         )
         return False, "Disconnected"
 
-    def _receive_message(self, timeout=timedelta(minutes=1)):
+    async def _receive_message(self, timeout=timedelta(minutes=1)):
         try:
-            message = self.event_loop.run_until_complete(
-                self.ws.receive(timeout=timeout.total_seconds())
-            )
+            message = await self.ws.receive(timeout=timeout.total_seconds())
         except asyncio.TimeoutError:
             return None, "Timeout waiting for message."
         if message is None:
@@ -345,15 +404,161 @@ class RemoteClient(object):
         if message.type == aiohttp.WSMsgType.ERROR:
             return None, f"Received websocket error: {message.data}"
         if message.type == aiohttp.WSMsgType.CLOSED:
-            self.init_state = RemoteClient.State.BEGIN
+            self.init_state = AsyncRemoteClient.State.BEGIN
             return None, "Socket closed."
         if message.type == aiohttp.WSMsgType.CLOSE:
-            self.init_state = RemoteClient.State.BEGIN
+            self.init_state = AsyncRemoteClient.State.BEGIN
             return None, "Socket closing."
-        if message.type != aiohttp.WSMsgType.TEXT:
+        if message.type not in [aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY]:
             return (
                 None,
                 f"Unexpected message type: {message.type}. data: {message.data}",
             )
-        response = message_from_server.MessageFromServer.from_json(message.data)
+        response = DecodeMessage(
+            message_from_server.MessageFromServer, message.data, self.wire_format
+        )
         return response, ""
+
+
+class RemoteClient(object):
+    """Blocking client for a CB2 server. Runs an AsyncRemoteClient on this
+    thread's event loop."""
+
+    State = AsyncRemoteClient.State
+    QueueType = QueueType
+
+    def __init__(self, url, render=False, lobby_name="bot-sandbox", wire_formats=None):
+        """Constructor.
+
+        Args:
+            url: (str) The URL of the server to connect to. Include http:// or https://!
+            render: (bool) Whether to render the game using pygame, for the user to see.
+            lobby_name: (str) The name of the lobby to join. Default is bot-sandbox. Please don't join other lobbies unless you have contacted the owners of the server.
+            wire_formats: (List[WireFormat]) Message encodings to offer the server, most preferred first. Defaults to all available. Pass [] to use JSON text frames.
+        """
+        self.client = AsyncRemoteClient(url, render, lobby_name, wire_formats)
+        self.game = None
+        self.event_loop = asyncio.get_event_loop()
+        logging.basicConfig(level=logging.INFO)
+        # Lets us synchronously block on an event loop that's already running.
+        # This means we can encapsulate asyncio without making our users learn
+        # how to use await/async. This isn't technically needed, unless you want
+        # to be compatible with something like jupyter or anything else which
+        # requires an always-running event loop.
+        nest_asyncio.apply()
+
+        # Detect if we're running in an interactive shell and warn the user about the server heartbeat timeout.
+        if hasattr(sys, "ps1"):
+            logger.warning(
+                f"NOTE: You're running in an interactive shell. The server will disconnect you after {HEARTBEAT_TIMEOUT_S} seconds (by default) of inactivity. Remain active by calling Game.step(). For this reason, it's recommended not to use this library manually from a REPL loop."
+            )
+
+    @property
+    def url(self):
+        return self.client.url
+
+    @property
+    def config(self):
+        return self.client.config
+
+    @property
+    def init_state(self):
+        return self.client.init_state
+
+    def _run(self, coroutine):
+        return self.event_loop.run_until_complete(coroutine)
+
+    def Connect(self):
+        """Connect to the server.
+
+        Returns:
+            (bool, str): True if connected. If not, the second element is an error message.
+        """
+        return self._run(self.client.connect())
+
+    def connected(self):
+        return self.client.connected()
+
+    def Reset(self):
+        self._run(self.client.reset())
+        self.game = None
+
+    def state(self):
+        return self.client.state()
+
+    def JoinGame(
+        self,
+        timeout=timedelta(minutes=6),
+        queue_type=QueueType.DEFAULT,
+        e_uuid: str = "",
+    ):
+        """Enters the game queue and waits for a game.
+
+        Waits for all of the following:
+            - Server says the game has started
+            - Server has sent a map update.
+            - Server has sent a state sync.
+            - Server has sent a prop update.
+
+        Args:
+            timeout: The maximum amount of time to wait for the game to start.
+            queue_type: Which queue to join (DEFAULT, LEADER_ONLY, FOLLOWER_ONLY).
+            e_uuid: Event UUID to resume from. Empty implies new game.
+        Returns:
+            (Game, str): The game that was started. If the game didn't start, the second element is an error message.
+        Raises:
+            TimeoutError: If the game did not start within the timeout.
+        """
+        in_queue, reason = self._run(self.client._join_queue(queue_type, e_uuid))
+        if not in_queue:
+            return None, f"Failed to join queue: {reason}"
+
+        game_joined, reason = self._wait_for_game(timeout)
+        if not game_joined:
+            return None, f"Failed to join game: {reason}"
+
+        return self.game, ""
+
+    def AttachToScenario(self, scenario_id, timeout=timedelta(minutes=6)):
+        """Attaches to an already-existing scenario of the provided ID.
+
+            If none exists, returns failure.
+
+        Args:
+            scenario_id: The ID of the scenario to attach to.
+        """
+        attached, reason = self._run(self.client._attach_to_scenario(scenario_id))
+        if not attached:
+            return False, reason
+        game_joined, reason = self._wait_for_game(timeout)
+        if not game_joined:
+            return None, f"Failed to join game: {reason}"
+
+        return self.game, ""
+
+    def _send_message(self, message):
+        """Sends a message to the server.
+
+        Args:
+            message: The message to send.
+        """
+        self._run(self.client._send_message(message))
+
+    def _wait_for_game(self, timeout=timedelta(minutes=6)):
+        """Blocks until the game is started or a timeout is reached.
+
+        See AsyncRemoteClient._wait_for_game(). The game is a blocking
+        GameEndpoint instead of an AsyncGameEndpoint.
+        """
+        end_time = datetime.utcnow() + timeout
+        joined, reason = self._run(self.client._wait_for_join(end_time))
+        if not joined:
+            return False, reason
+        self.game = GameEndpoint(RemoteSocket(self), self.config, self.client.render)
+        result, reason = self.game._initialize(end_time - datetime.utcnow())
+        assert result, f"Failed to initialize game: {reason}"
+        self.client.init_state = RemoteClient.State.GAME_STARTED
+        return True, ""
+
+    def _receive_message(self, timeout=timedelta(minutes=1)):
+        return self._run(self.client._receive_message(timeout))
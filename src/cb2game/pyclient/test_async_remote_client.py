@@ -0,0 +1,174 @@
+"""Plays concurrent games with AsyncRemoteClient against an in-process server."""
+import asyncio
+import logging
+import os
+import tempfile
+import unittest
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import cb2game.server.main as server_main
+from cb2game.pyclient.game_endpoint import Action, AsyncGameEndpoint
+from cb2game.pyclient.remote_client import (
+    AsyncRemoteClient,
+    QueueType,
+    SharedClientSession,
+)
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobby_utils import GetLobby, InitializeLobbies
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas import base
+
+logger = logging.getLogger(__name__)
+
+LOBBY = "bot-sandbox"
+NUMBER_OF_GAMES = 4
+INSTRUCTIONS_PER_GAME = 2
+TIMEOUT_S = 120
+
+
+def ActiveInstruction(instructions):
+    for instruction in instructions:
+        if not instruction.completed and not instruction.cancelled:
+            return instruction
+    return None
+
+
+async def PlayLeader(game):
+    """Sends instructions until INSTRUCTIONS_PER_GAME are completed.
+
+    Steps without waiting for its turn, like a leader watching the follower
+    to give live feedback. Returns the number of completed instructions and of
+    steps which returned during the follower's turn.
+    """
+    _, _, turn_state, instructions, _, _ = game.initial_state()
+    follower_turn_steps = 0
+    while not game.over():
+        completed = sum(1 for i in instructions if i.completed)
+        if completed >= INSTRUCTIONS_PER_GAME:
+            break
+        if turn_state.turn != Role.LEADER:
+            action = Action.NoopAction()
+        elif ActiveInstruction(instructions) is None:
+            action = Action.SendInstruction(f"instruction {len(instructions)}")
+        else:
+            action = Action.EndTurn()
+        _, _, turn_state, instructions, _, _ = await game.step(
+            action, wait_for_turn=False
+        )
+        if turn_state.turn == Role.FOLLOWER:
+            follower_turn_steps += 1
+    await game.close()
+    return sum(1 for i in instructions if i.completed), follower_turn_steps
+
+
+async def PlayFollower(game):
+    """Turns once for each instruction, then marks it done."""
+    _, _, turn_state, instructions, _, _ = game.initial_state()
+    moved = False
+    while not game.over():
+        instruction = ActiveInstruction(instructions)
+        if turn_state.turn != Role.FOLLOWER or instruction is None:
+            action = Action.NoopAction()
+        elif not moved:
+            action = Action.Right()
+        else:
+            action = Action.InstructionDone(instruction.uuid)
+        moved = action.action_code() == Action.ActionCode.TURN_RIGHT
+        _, _, turn_state, instructions, _, _ = await game.step(action)
+
+
+class AsyncRemoteClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.data_directory = tempfile.TemporaryDirectory()
+        self.config = Config(
+            data_prefix=self.data_directory.name,
+            comment="Async Remote Client Unit Test Config",
+            objective_updates=True,
+        )
+        SetGlobalConfig(self.config)
+        InitializeLobbies(self.config.lobbies)
+        server_main.InitGameRecording(self.config)
+        lobby = GetLobby(LOBBY)
+        self.lobby_tasks = [
+            asyncio.ensure_future(lobby.matchmake()),
+            asyncio.ensure_future(lobby.cleanup_rooms()),
+        ]
+        app = web.Application()
+        app.add_routes(server_main.routes)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.url = str(self.server.make_url("")).rstrip("/")
+
+    async def asyncTearDown(self):
+        for task in self.lobby_tasks:
+            task.cancel()
+        await self.server.close()
+        base.GetDatabase().close()
+        self.data_directory.cleanup()
+
+    async def play_game(self, session, index):
+        leader = AsyncRemoteClient(self.url, lobby_name=LOBBY, session=session)
+        follower = AsyncRemoteClient(self.url, lobby_name=LOBBY, session=session)
+        for client in [leader, follower]:
+            connected, reason = await client.connect()
+            self.assertTrue(connected, reason)
+        (leader_game, reason), (follower_game, _) = await asyncio.gather(
+            leader.join_game(queue_type=QueueType.LEADER_ONLY),
+            follower.join_game(queue_type=QueueType.FOLLOWER_ONLY),
+        )
+        self.assertIsInstance(leader_game, AsyncGameEndpoint, reason)
+        self.assertEqual(leader_game.player_role(), Role.LEADER)
+        self.assertEqual(follower_game.player_role(), Role.FOLLOWER)
+        (completed, follower_turn_steps), _ = await asyncio.gather(
+            PlayLeader(leader_game), PlayFollower(follower_game)
+        )
+        # With wait_for_turn=False, step() returns during the follower's turn.
+        self.assertGreater(follower_turn_steps, 0)
+        logger.info(f"Game {index} done. Instructions completed: {completed}")
+        for client in [leader, follower]:
+            await client.reset()
+        # The shared session stays open for other games.
+        self.assertFalse(session.closed)
+        return completed
+
+    async def test_concurrent_games(self):
+        async with SharedClientSession() as session:
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    *[self.play_game(session, i) for i in range(NUMBER_OF_GAMES)]
+                ),
+                TIMEOUT_S,
+            )
+        self.assertEqual(results, [INSTRUCTIONS_PER_GAME] * NUMBER_OF_GAMES)
+
+    async def test_unknown_message_type_ignored(self):
+        async with SharedClientSession() as session:
+            leader = AsyncRemoteClient(self.url, lobby_name=LOBBY, session=session)
+            follower = AsyncRemoteClient(self.url, lobby_name=LOBBY, session=session)
+            for client in [leader, follower]:
+                connected, reason = await client.connect()
+                self.assertTrue(connected, reason)
+            # E.g. a message type from a newer client.
+            await leader.ws.send_str(
+                '{"transmit_time": "2023-01-01T00:00:00", "type": 1000}'
+            )
+            (leader_game, reason), (follower_game, _) = await asyncio.wait_for(
+                asyncio.gather(
+                    leader.join_game(queue_type=QueueType.LEADER_ONLY),
+                    follower.join_game(queue_type=QueueType.FOLLOWER_ONLY),
+                ),
+                TIMEOUT_S,
+            )
+            self.assertIsInstance(leader_game, AsyncGameEndpoint, reason)
+            self.assertIsInstance(follower_game, AsyncGameEndpoint)
+            for client in [leader, follower]:
+                await client.reset()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,7 +13,8 @@ from cb2game.server.messages.action import Action, ActionType, AnimationType
 OUTLINE_RADIUS = 30
 
 # Returns a list of 3 tuples of (shape, color, count) that make up a unique sert of cards.
-def RandomUniqueSet():
+# Randomness comes from rng (the random module, or a random.Random instance).
+def RandomUniqueSet(rng=random):
     shapes = [
         Shape.PLUS,
         Shape.TORUS,
@@ -33,9 +34,9 @@ def RandomUniqueSet():
         Color.YELLOW,
     ]
     counts = [1, 2, 3]
-    selected_shapes = random.sample(shapes, 3)
-    selected_colors = random.sample(colors, 3)
-    selected_counts = random.sample(counts, 3)
+    selected_shapes = rng.sample(shapes, 3)
+    selected_colors = rng.sample(colors, 3)
+    selected_counts = rng.sample(counts, 3)
     return list(zip(selected_shapes, selected_colors, selected_counts))
 
 
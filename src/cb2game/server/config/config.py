@@ -127,6 +127,10 @@ class Config(DataClassJSONMixin):
 
     http_port: int = 8080
 
+    # Number of worker processes hosting game rooms. 0 runs rooms in the main
+    # server process. See server/room_shards.py.
+    room_shards: int = 0
+
     map_cache_size: int = 500
 
     comment: str = ""
@@ -396,6 +400,12 @@ class Config(DataClassJSONMixin):
     # should not be public should require this password.
     server_password_sha512: str = ""
 
+    # If true, pyclients ask this server for incremental objective updates
+    # instead of full objective lists. See server/objective_updates.py. Off by
+    # default, as clients can't tell a server with this unset from an older
+    # server which doesn't understand the request.
+    objective_updates: bool = False
+
     # Data path accessors that add the requisite data_prefix.
     def data_directory(self):
         # If data_prefix is None or empty string, use appdirs. Else use the prefix.
@@ -0,0 +1,50 @@
+""" Fills the GameSummary table for games that ended before it existed.
+
+New games are summarized by the server when they end. Games which are still
+running (or were abandoned without an end time) are skipped.
+
+Example usage:
+python3 -m cb2game.server.db_tools.backfill_game_summaries --config_filepath=<config>
+
+# Recompute all summaries, e.g. after changing how they're computed.
+python3 -m cb2game.server.db_tools.backfill_game_summaries --config_filepath=<config> --overwrite
+"""
+import logging
+from datetime import datetime
+
+import fire
+
+import cb2game.server.config.config as config
+from cb2game.server.db_tools import db_utils
+from cb2game.server.schemas import base
+from cb2game.server.schemas.game import Game
+from cb2game.server.schemas.game_summary import GameSummary
+
+logger = logging.getLogger(__name__)
+
+
+def main(config_filepath="server/config/server-config.yaml", overwrite=False):
+    logging.basicConfig(level=logging.INFO)
+    cfg = config.ReadConfigOrDie(config_filepath)
+    db_utils.ConnectToDatabase(cfg)
+
+    games = Game.select().where(
+        (Game.completed == True) | (Game.end_time != datetime.max)
+    )
+    if not overwrite:
+        games = games.where(Game.id.not_in(GameSummary.select(GameSummary.game)))
+    games = games.order_by(Game.id)
+
+    count = 0
+    for game in games.iterator():
+        # One transaction per game, so an interrupted backfill keeps its work.
+        with base.GetDatabase().atomic():
+            db_utils.SaveGameSummary(game)
+        count += 1
+        if count % 100 == 0:
+            logger.info(f"Summarized {count} games (last: {game.id}).")
+    logger.info(f"Summarized {count} games.")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -4,16 +4,26 @@ from playhouse.sqlite_ext import CSqliteExtDatabase
 import cb2game.server.config.config as config
 
 
-def BackupDb(config):
+def BackupDatabase(database_path, backup_path):
+    """Copies the database with SQLite's online backup API.
+
+    The copy is a consistent snapshot that includes the contents of the WAL,
+    and taking it doesn't block the server from writing to the database.
+    """
     database = CSqliteExtDatabase(
-        config.database_path(),
+        database_path,
         pragmas=[
             ("cache_size", -1024 * 64),  # 64MB page-cache.
             ("journal_mode", "wal"),  # Use WAL-mode (you should always use this!).
             ("foreign_keys", 1),
         ],
     )
-    database.backup_to_file(config.backup_database_path())
+    database.backup_to_file(backup_path)
+    database.close()
+
+
+def BackupDb(config):
+    BackupDatabase(config.database_path(), config.backup_database_path())
 
 
 def main(config_path="config/server-config.json"):
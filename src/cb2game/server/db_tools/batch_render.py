@@ -0,0 +1,398 @@
+""" Renders instructions or whole games from the database, in parallel.
+
+instruction_vis.py draws each instruction in a single process. This tool
+renders selected games across a pool of headless worker processes:
+
+    python -m cb2game.server.db_tools.batch_render game_data.db output \\
+        --games=1-500,612 --workers=8
+
+In "instructions" mode (the default), each activated instruction is drawn like
+instruction_vis.py does, to <output_dir>/<game id>/instruction_<uuid>.png. In
+"animations" mode, each game is replayed from its event stream into
+<output_dir>/<game id>/game.gif, one frame per tick in which a player moved.
+Animations need the Pillow package.
+
+Outputs which already exist are skipped, so an interrupted run can be resumed.
+Each run writes index.json and index.html to output_dir, listing every output
+of the selected games, skipped or not.
+"""
+import html
+import json
+import logging
+import multiprocessing
+import pathlib
+from dataclasses import dataclass
+from typing import List
+
+import fire
+import pygame
+
+from cb2game.server.card import Card
+from cb2game.server.db_tools.instruction_vis import (
+    SCREEN_SIZE,
+    LoadGameScene,
+    LoadInstructionScene,
+    draw_instruction,
+)
+from cb2game.server.hex import HecsCoord
+from cb2game.server.map_tools import visualize
+from cb2game.server.messages.action import Action, ActionType
+from cb2game.server.messages.objective import ObjectiveMessage
+from cb2game.server.messages.rooms import Role
+from cb2game.server.messages.state_sync import Actor, StateSync
+from cb2game.server.schemas import base
+from cb2game.server.schemas.event import Event, EventType
+from cb2game.server.schemas.game import Game
+from cb2game.server.schemas.util import InitialState
+
+logger = logging.getLogger(__name__)
+
+ANIMATION_SIZE = 400  # Frames are kept in memory, so they're smaller.
+
+
+@dataclass
+class RenderTask:
+    game_id: int
+    output_dir: str
+    mode: str  # "instructions" or "animations".
+    # Only render these instructions (INSTRUCTION_SENT short codes). All if None.
+    instruction_ids: List[str] = None
+    overwrite: bool = False
+    frame_duration_ms: int = 200
+
+
+def InitWorker(db_path):
+    base.SetDatabaseByPath(db_path)
+    base.ConnectDatabase()
+    visualize.make_pygame_headless()
+
+
+def ParseIdRanges(spec):
+    """Parses "1-100,205" into [(1, 100), (205, 205)].
+
+    Fire passes 205 as an int and 1,205 as a tuple, so those are accepted too.
+    """
+    if isinstance(spec, (list, tuple)):
+        parts = [str(part) for part in spec]
+    else:
+        parts = str(spec).split(",")
+    ranges = []
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        ranges.append((int(start), int(end or start)))
+    return ranges
+
+
+def ReadInstructionIds(spec):
+    """Reads instruction IDs from a comma-separated list, or @file (one per line)."""
+    if isinstance(spec, (list, tuple)):
+        return [str(instruction_id) for instruction_id in spec]
+    if spec.startswith("@"):
+        with open(spec[1:], "r") as f:
+            return [line.strip() for line in f if line.strip()]
+    return [part.strip() for part in spec.split(",") if part.strip()]
+
+
+def SelectGameIds(game_ranges, instruction_ids):
+    query = Game.select(Game.id).order_by(Game.id)
+    if game_ranges:
+        condition = None
+        for start, end in game_ranges:
+            in_range = Game.id.between(start, end)
+            condition = in_range if condition is None else (condition | in_range)
+        query = query.where(condition)
+    if instruction_ids is not None:
+        instruction_games = Event.select(Event.game_id).where(
+            Event.type == EventType.INSTRUCTION_SENT,
+            Event.short_code << instruction_ids,
+        )
+        query = query.where(Game.id << instruction_games)
+    return [game_id for (game_id,) in query.tuples()]
+
+
+def RenderInstructions(task: RenderTask, game_dir: pathlib.Path):
+    game = Game.get_by_id(task.game_id)
+    instructions = (
+        Event.select()
+        .where(Event.game_id == game.id, Event.type == EventType.INSTRUCTION_SENT)
+        .order_by(Event.server_time)
+    )
+    if task.instruction_ids is not None:
+        instructions = instructions.where(Event.short_code << task.instruction_ids)
+    entries = []
+    to_draw = []
+    for instruction in instructions:
+        path = game_dir / f"instruction_{instruction.short_code}.png"
+        entry = {
+            "game_id": game.id,
+            "instruction_id": instruction.short_code,
+            "text": ObjectiveMessage.from_json(instruction.data).text,
+            "path": str(path.relative_to(task.output_dir)),
+            "status": "skipped",
+        }
+        entries.append(entry)
+        if task.overwrite or not path.exists():
+            to_draw.append((instruction, path, entry))
+    if not to_draw:
+        return entries
+
+    game_scene = LoadGameScene(game)
+    if game_scene is None:
+        for (_, _, entry) in to_draw:
+            entry["status"] = "no map"
+        return entries
+    game_events, map_update, initial_cards = game_scene
+    display = visualize.GameDisplay(SCREEN_SIZE)
+    for (instruction, path, entry) in to_draw:
+        instruction_scene = LoadInstructionScene(
+            game_events, initial_cards, instruction
+        )
+        if instruction_scene is None:
+            entry["status"] = "not activated"
+            continue
+        moves, feedbacks, props = instruction_scene
+        draw_instruction(
+            ObjectiveMessage.from_json(instruction.data),
+            moves,
+            feedbacks,
+            map_update,
+            path,
+            game.id,
+            props,
+            display,
+        )
+        entry["status"] = "rendered"
+    return entries
+
+
+def GameFrames(game_events, map_update, initial_cards, screen_size):
+    """Replays a game's events, yielding the screen after each tick with a move."""
+    display = visualize.GameDisplay(screen_size)
+    display.set_map(map_update)
+    actors = {}
+    cards = {card.id: card for card in initial_cards}
+    instructions = {}
+    last_tick = None
+    moved = False
+
+    def DrawFrame():
+        display.set_state_sync(StateSync(len(actors), list(actors.values())))
+        display.set_props([card.prop() for card in cards.values()])
+        display.set_instructions(list(instructions.values()))
+        display.draw()
+        return display.screen()
+
+    for event in game_events:
+        if moved and event.tick != last_tick:
+            yield DrawFrame()
+            moved = False
+        last_tick = event.tick
+        if event.type == EventType.INITIAL_STATE:
+            initial_state = InitialState.from_json(event.data)
+            actors[initial_state.leader_id] = Actor(
+                initial_state.leader_id,
+                0,
+                initial_state.leader_position,
+                initial_state.leader_rotation_degrees,
+                Role.LEADER,
+            )
+            actors[initial_state.follower_id] = Actor(
+                initial_state.follower_id,
+                0,
+                initial_state.follower_position,
+                initial_state.follower_rotation_degrees,
+                Role.FOLLOWER,
+            )
+        elif event.type == EventType.ACTION:
+            action = Action.from_json(event.data)
+            if action.id not in actors:
+                # Card animations.
+                continue
+            actor = actors[action.id]
+            if action.action_type == ActionType.INIT:
+                location, rotation = action.displacement, action.rotation
+            else:
+                location = HecsCoord.add(event.location, action.displacement)
+                rotation = event.orientation + action.rotation
+            actors[action.id] = Actor(
+                actor.actor_id, actor.asset_id, location, rotation, actor.actor_role
+            )
+            moved = True
+        elif event.type in [EventType.CARD_SPAWN, EventType.CARD_SELECT]:
+            card = Card.from_json(event.data)
+            cards[card.id] = card
+        elif event.type == EventType.CARD_SET:
+            for card in json.loads(event.data)["cards"]:
+                cards.pop(card["id"], None)
+        elif event.type == EventType.INSTRUCTION_SENT:
+            instructions[event.short_code] = ObjectiveMessage.from_json(event.data)
+        elif event.type in [
+            EventType.INSTRUCTION_DONE,
+            EventType.INSTRUCTION_CANCELLED,
+        ]:
+            instructions.pop(event.short_code, None)
+    if moved:
+        yield DrawFrame()
+
+
+def RenderAnimation(task: RenderTask, game_dir: pathlib.Path):
+    # Optional dependency, only needed for animations.
+    from PIL import Image
+
+    path = game_dir / "game.gif"
+    entry = {
+        "game_id": task.game_id,
+        "path": str(path.relative_to(task.output_dir)),
+        "status": "skipped",
+    }
+    if path.exists() and not task.overwrite:
+        return [entry]
+    game_scene = LoadGameScene(Game.get_by_id(task.game_id))
+    if game_scene is None:
+        entry["status"] = "no map"
+        return [entry]
+    frames = []
+    for screen in GameFrames(*game_scene, ANIMATION_SIZE):
+        frame = Image.frombytes(
+            "RGB", screen.get_size(), pygame.image.tostring(screen, "RGB")
+        )
+        # Palette images are a third of the size.
+        frames.append(frame.quantize())
+    if not frames:
+        entry["status"] = "no moves"
+        return [entry]
+    frames[0].save(
+        path,
+        save_all=True,
+        append_images=frames[1:],
+        duration=task.frame_duration_ms,
+        loop=0,
+    )
+    entry["status"] = "rendered"
+    entry["frames"] = len(frames)
+    return [entry]
+
+
+def RenderGame(task: RenderTask):
+    """Renders one game's outputs. Runs in worker processes."""
+    game_dir = pathlib.Path(task.output_dir) / str(task.game_id)
+    game_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        if task.mode == "animations":
+            return RenderAnimation(task, game_dir)
+        return RenderInstructions(task, game_dir)
+    except Exception as e:
+        logger.exception(f"Failed to render game {task.game_id}: {e}")
+        return [{"game_id": task.game_id, "status": "error", "error": repr(e)}]
+
+
+def WriteIndex(output_dir: pathlib.Path, entries):
+    entries = sorted(
+        entries, key=lambda entry: (entry["game_id"], entry.get("path", ""))
+    )
+    with open(output_dir / "index.json", "w") as f:
+        json.dump(entries, f, indent=2)
+    rows = []
+    for entry in entries:
+        image = ""
+        if "path" in entry and entry["status"] in ["rendered", "skipped"]:
+            src = html.escape(entry["path"])
+            image = f'<a href="{src}"><img src="{src}" width="300"></a>'
+        rows.append(
+            "<tr>"
+            f"<td>{entry['game_id']}</td>"
+            f"<td>{html.escape(entry.get('text', ''))}</td>"
+            f"<td>{html.escape(entry['status'])}</td>"
+            f"<td>{image}</td>"
+            "</tr>"
+        )
+    with open(output_dir / "index.html", "w") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+            "<title>CB2 renders</title></head><body>\n"
+            "<table border='1'>\n"
+            "<tr><th>Game</th><th>Instruction</th><th>Status</th><th>Image</th></tr>\n"
+            + "\n".join(rows)
+            + "\n</table></body></html>\n"
+        )
+
+
+def main(
+    db_path,
+    output_dir,
+    games="",
+    instructions="",
+    mode="instructions",
+    workers: int = multiprocessing.cpu_count(),
+    overwrite: bool = False,
+    frame_duration_ms: int = 200,
+):
+    """Renders games in db_path to PNGs (or GIFs) in output_dir.
+
+    Args:
+        games: Game ID ranges to render, like "1-100,205". All games if empty.
+        instructions: Comma-separated instruction IDs (short codes), or
+            @file with one per line. Only these instructions are rendered.
+        mode: "instructions" or "animations".
+        workers: Number of rendering processes. 0 renders in-process.
+        overwrite: Render outputs again even if they exist.
+        frame_duration_ms: Time each animation frame is shown.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if mode not in ["instructions", "animations"]:
+        raise ValueError(f"Unknown mode: {mode}")
+    if mode == "animations":
+        # Fail before starting workers if Pillow is missing.
+        import PIL  # noqa: F401
+
+    instruction_ids = ReadInstructionIds(instructions) if instructions else None
+    InitWorker(db_path)
+    game_ids = SelectGameIds(ParseIdRanges(games), instruction_ids)
+    base.CloseDatabase()
+    logger.info(f"Rendering {len(game_ids)} games.")
+
+    output_dir = pathlib.Path(output_dir).expanduser()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [
+        RenderTask(
+            game_id,
+            str(output_dir),
+            mode,
+            instruction_ids,
+            overwrite,
+            frame_duration_ms,
+        )
+        for game_id in game_ids
+    ]
+
+    entries = []
+    if workers <= 0:
+        InitWorker(db_path)
+        rendered_games = map(RenderGame, tasks)
+    else:
+        # Spawn instead of fork, so workers don't inherit our sqlite connection.
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(workers, initializer=InitWorker, initargs=(db_path,))
+        rendered_games = pool.imap_unordered(RenderGame, tasks)
+    for count, game_entries in enumerate(rendered_games, 1):
+        entries.extend(game_entries)
+        if count % 100 == 0:
+            logger.info(f"Rendered {count}/{len(tasks)} games...")
+    if workers <= 0:
+        base.CloseDatabase()
+    else:
+        pool.close()
+        pool.join()
+
+    WriteIndex(output_dir, entries)
+    counts = {}
+    for entry in entries:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    print(f"Wrote {output_dir / 'index.html'}. Outputs by status: {counts}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
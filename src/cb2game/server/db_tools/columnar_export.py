@@ -0,0 +1,230 @@
+""" Exports the Game, Instruction, Move and Event tables to Parquet for analytics.
+
+Walking the ORM row by row is slow for reports over the whole database. This
+tool materializes the tables as Parquet files which pandas can scan in a few
+seconds. See the --columnar_dir flag of game_statistics_tool.py.
+
+The export is incremental. Each run only appends the games that ended since the
+last run. The output directory is laid out as:
+
+    <output_dir>/export_state.json
+    <output_dir>/<table>/bucket=<game_id // 1000>/part-<first_id>-<last_id>-<n>.parquet
+
+Columns are the raw database columns (foreign keys end in _id). Datetimes are
+parsed, and datetime.max (the end_time of unfinished games) becomes NaT. JSON
+and coordinate columns are kept as text.
+
+Requires pyarrow, which is an optional dependency. Install it with
+`pip install cb2game[analytics]`.
+
+Example usage:
+python3 -m cb2game.server.db_tools.columnar_export --output_dir=analytics/ --config_filepath=<config>
+"""
+import glob
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import fire
+import pandas as pd
+import peewee
+
+import cb2game.server.config.config as config
+from cb2game.server.db_tools import db_utils
+from cb2game.server.schemas import base
+from cb2game.server.schemas.event import Event
+from cb2game.server.schemas.game import Game, Instruction, Move
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORTED_TABLES = [Game, Instruction, Move, Event]
+
+# Number of game IDs per partition.
+PARTITION_SIZE = 1000
+
+# Number of rows converted and written at a time.
+CHUNK_SIZE = 200000
+
+# Games that haven't ended are exported once they're this old. This keeps
+# games abandoned by a server crash from blocking the export forever.
+UNFINISHED_GAME_TIMEOUT = timedelta(days=1)
+
+STATE_FILE = "export_state.json"
+
+
+def RequirePyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "The columnar export needs pyarrow. Install it with `pip install cb2game[analytics]`."
+        )
+
+
+def GameIdColumn(model):
+    return "id" if model is Game else "game_id"
+
+
+def ColumnTypes(model):
+    """Maps each column of model to the pandas dtype it's exported with."""
+    types = {}
+    for field in model._meta.sorted_fields:
+        # Foreign keys hold values of the field they refer to.
+        value_field = field
+        if isinstance(field, peewee.ForeignKeyField):
+            value_field = field.rel_field
+        if isinstance(value_field, peewee.BooleanField):
+            dtype = "boolean"
+        elif isinstance(value_field, peewee.IntegerField):
+            dtype = "Int64"
+        elif isinstance(value_field, peewee.FloatField):
+            dtype = "float64"
+        elif isinstance(value_field, peewee.DateTimeField):
+            dtype = "datetime64[ns]"
+        else:
+            dtype = "string"
+        types[field.column_name] = dtype
+    return types
+
+
+def ConvertColumns(frame, column_types):
+    """Converts raw sqlite values to consistent dtypes, so that every Parquet
+    file of a table has the same schema."""
+    for column, dtype in column_types.items():
+        if dtype == "datetime64[ns]":
+            frame[column] = pd.to_datetime(
+                frame[column], errors="coerce", format="ISO8601"
+            )
+        else:
+            frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+def ReadState(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {"last_game_id": 0}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def WriteState(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def LastExportableGameId():
+    """Returns the highest game ID such that this game and all games before it
+    are over. Only these are exported, so that exported games never change."""
+    cutoff = datetime.utcnow() - UNFINISHED_GAME_TIMEOUT
+    first_running = (
+        Game.select(peewee.fn.MIN(Game.id))
+        .where(Game.end_time == datetime.max, Game.start_time > cutoff)
+        .scalar()
+    )
+    if first_running is not None:
+        return first_running - 1
+    last_game = Game.select(peewee.fn.MAX(Game.id)).scalar()
+    return last_game if last_game is not None else 0
+
+
+def ExportTableRange(output_dir, model, first_id, last_id):
+    """Exports the rows of model belonging to games first_id to last_id
+    (inclusive) to one partition. The range must lie within a partition."""
+    table = model._meta.table_name
+    column = GameIdColumn(model)
+    bucket = first_id // PARTITION_SIZE
+    partition = os.path.join(output_dir, table, f"bucket={bucket}")
+    os.makedirs(partition, exist_ok=True)
+    # Remove files left behind by an interrupted export of the same games.
+    for stale_file in glob.glob(os.path.join(partition, f"part-{first_id}-*.parquet")):
+        os.remove(stale_file)
+
+    column_types = ColumnTypes(model)
+    columns = ", ".join(f'"{name}"' for name in column_types)
+    query = (
+        f'SELECT {columns} FROM "{table}" WHERE "{column}" >= ? AND "{column}" <= ?'
+        f' ORDER BY "{column}"'
+    )
+    rows = 0
+    chunks = pd.read_sql_query(
+        query,
+        base.GetDatabase().connection(),
+        params=(first_id, last_id),
+        chunksize=CHUNK_SIZE,
+    )
+    for n, chunk in enumerate(chunks):
+        ConvertColumns(chunk, column_types).to_parquet(
+            os.path.join(partition, f"part-{first_id}-{last_id}-{n}.parquet"),
+            index=False,
+        )
+        rows += len(chunk)
+    return rows
+
+
+def Export(output_dir):
+    """Appends all games that ended since the last export to output_dir."""
+    RequirePyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    state = ReadState(output_dir)
+    first_id = state["last_game_id"] + 1
+    last_id = LastExportableGameId()
+    if last_id < first_id:
+        logger.info(f"No new games to export after game {first_id - 1}.")
+        return
+
+    logger.info(f"Exporting games {first_id} to {last_id}...")
+    # Each partition is committed to the state file once all tables are
+    # written, so an interrupted export resumes from the last full partition.
+    start = first_id
+    while start <= last_id:
+        end = min(last_id, (start // PARTITION_SIZE + 1) * PARTITION_SIZE - 1)
+        for model in EXPORTED_TABLES:
+            rows = ExportTableRange(output_dir, model, start, end)
+            logger.info(
+                f"Exported {rows} rows of {model._meta.table_name} for games {start}-{end}."
+            )
+        state["last_game_id"] = end
+        WriteState(output_dir, state)
+        start = end + 1
+
+
+def LoadTable(columnar_dir, model, columns=None, game_ids=None):
+    """Reads an exported table into a DataFrame.
+
+    Args:
+        columns: Columns to read. Reading fewer columns is much faster.
+        game_ids: If set, only rows of these games are read.
+    """
+    RequirePyarrow()
+    path = os.path.join(columnar_dir, model._meta.table_name)
+    column_types = ColumnTypes(model)
+    if columns is None:
+        columns = list(column_types)
+    if not os.path.exists(path):
+        return pd.DataFrame({c: pd.Series(dtype=column_types[c]) for c in columns})
+
+    filters = None
+    if game_ids is not None:
+        game_ids = sorted(set(game_ids))
+        buckets = sorted(set(i // PARTITION_SIZE for i in game_ids))
+        filters = [("bucket", "in", buckets), (GameIdColumn(model), "in", game_ids)]
+    frame = pd.read_parquet(path, columns=columns, filters=filters)
+    return frame.reset_index(drop=True)
+
+
+def main(output_dir, config_filepath="server/config/server-config.yaml"):
+    logging.basicConfig(level=logging.INFO)
+    cfg = config.ReadConfigOrDie(config_filepath)
+    db_utils.ConnectToDatabase(cfg)
+    Export(output_dir)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -3,9 +3,19 @@
     We release our data in both sqlite and json formats. The sqlite format is
     easier to work with for our internal tools, but the json format is easier
     for external users to work with.
+
+    Games are streamed out one at a time, so memory use doesn't grow with the
+    size of the database. If json_path ends in .jsonl (optionally followed by
+    .gz or .zst), one game is written per line instead of a single json list.
+    .gz and .zst outputs are compressed with gzip and zstd respectively (zstd
+    requires the zstandard package).
 """
 
+import collections
+import gzip
+import io
 import logging
+import multiprocessing
 from dataclasses import dataclass
 from typing import Dict, List
 
@@ -103,7 +113,7 @@ def ConvertGameToDataclass(game: Game):
     completed
     events: List[Event]
     """
-    game_events = list(Event.select().where(Event.game == game.id))
+    game_events = Event.select().where(Event.game == game.id).iterator()
     return JsonGameSchema(
         id=game.id,
         type=game.type,
@@ -115,30 +125,114 @@ def ConvertGameToDataclass(game: Game):
     )
 
 
-def main(db_path, json_path, pretty: bool = True):
+def SerializeGame(game_id, pretty: bool = False):
+    """Converts a game to json. Runs in worker processes when exporting in parallel."""
+    game = Game.get_by_id(game_id)
+    return JsonSerialize(ConvertGameToDataclass(game), pretty=pretty)
+
+
+def SerializedGames(game_ids, db_path, pretty: bool, workers: int):
+    """Yields the json of each game, in the order of game_ids.
+
+    With workers > 0, games are converted in that many processes, each with its
+    own DB connection. At most 4 games per worker are in flight at a time, so
+    memory use stays bounded even if writing the output is the bottleneck.
+    """
+    if workers <= 0:
+        for game_id in game_ids:
+            yield SerializeGame(game_id, pretty)
+        return
+
+    # Spawn instead of fork, so workers don't inherit our sqlite connection.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        workers, initializer=SwitchToDatabase, initargs=(db_path,)
+    ) as pool:
+        pending = collections.deque()
+        for game_id in game_ids:
+            pending.append(pool.apply_async(SerializeGame, (game_id, pretty)))
+            if len(pending) >= 4 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def OpenOutput(path, compression: str = None):
+    """Opens path for writing text, compressed with gzip or zstd.
+
+    If compression is None, it's inferred from the file extension.
+    """
+    if compression is None:
+        if path.endswith(".gz"):
+            compression = "gzip"
+        elif path.endswith(".zst"):
+            compression = "zstd"
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if compression == "zstd":
+        # Optional dependency, only needed for zstd exports.
+        import zstandard
+
+        writer = zstandard.ZstdCompressor().stream_writer(
+            open(path, "wb"), closefd=True
+        )
+        return io.TextIOWrapper(writer, encoding="utf-8")
+    if compression not in (None, "none"):
+        raise ValueError(f"Unknown compression: {compression}")
+    return open(path, "w")
+
+
+def main(
+    db_path,
+    json_path,
+    pretty: bool = True,
+    jsonl: bool = None,
+    compression: str = None,
+    workers: int = 0,
+):
+    """Exports the games in db_path to json_path.
+
+    Args:
+        pretty: Indent the json. Ignored for jsonl output.
+        jsonl: Write one game per line. Inferred from json_path if not set.
+        compression: gzip, zstd or none. Inferred from json_path if not set.
+        workers: Number of processes converting games. 0 converts in-process.
+    """
     logging.basicConfig(level=logging.INFO)
     logger.info(f"DB to JSON")
 
+    if jsonl is None:
+        jsonl = ".jsonl" in json_path
+    if jsonl:
+        pretty = False
+
     logger.info(f"Opening DB...")
     SwitchToDatabase(db_path)
     database = base.GetDatabase()
 
-    print(f"Loading data from {db_path}...")
-    with database.connection_context():
-        # Query all games.
-        print(f"Querying all games...")
-        games = list(Game.select().where(Game.id).order_by(Game.id))
-
-    print(f"Converting {len(games)} games to json...")
-
-    # Convert each game to a dictionary.
-    games = [ConvertGameToDataclass(game) for game in games]
-
-    # Write the json file.
-    print(f"Writing {len(games)} games to {json_path}...")
-    with open(json_path, "w") as f:
-        output_string = JsonSerialize(games, pretty=pretty)
-        f.write(output_string)
+    print(f"Exporting games from {db_path} to {json_path}...")
+    with database.connection_context(), OpenOutput(json_path, compression) as f:
+        # Iterate over game IDs with a cursor instead of loading all games.
+        game_ids = (
+            Game.select(Game.id).where(Game.id).order_by(Game.id).tuples().iterator()
+        )
+        game_ids = (game_id for (game_id,) in game_ids)
+
+        if not jsonl:
+            f.write("[\n")
+        count = 0
+        for game_json in SerializedGames(game_ids, db_path, pretty, workers):
+            if jsonl:
+                f.write(game_json + "\n")
+            else:
+                f.write((",\n" if count > 0 else "") + game_json)
+            count += 1
+            if count % 1000 == 0:
+                logger.info(f"Wrote {count} games...")
+        if not jsonl:
+            f.write("\n]\n")
+
+    print(f"Wrote {count} games to {json_path}.")
 
 
 if __name__ == "__main__":
@@ -2,14 +2,18 @@
 
 import itertools
 import logging
+from collections import Counter
+from datetime import datetime
 from enum import Enum
 
+import orjson
 import peewee
 
 import cb2game.server.schemas.base as base
 import cb2game.server.schemas.defaults as defaults_db
 from cb2game.server.schemas.event import Event, EventType
 from cb2game.server.schemas.game import Game
+from cb2game.server.schemas.game_summary import GameSummary
 from cb2game.server.schemas.mturk import Assignment
 
 # This document makes reference to the following game classifications:
@@ -89,7 +93,8 @@ def ListResearchGames():
     if len(ids) == 0:
         return []
     logger.info(f"Max game ID before research filtering: {max(ids)}")
-    return [game for game in games if IsGameResearchData(game)]
+    summaries = GetGameSummaries(games)
+    return [game for game in games if IsGameResearchData(game, summaries[game.id])]
 
 
 def ListMturkGames():
@@ -240,7 +245,20 @@ class GameDiagnosis(Enum):
     GOOD = 9
 
 
-def DiagnoseGame(game):
+def _DiagnoseGameStatic(game):
+    """The checks of DiagnoseGame which don't depend on the game's events."""
+    if not game.valid:  # Bool field in the db to manually filter out bad games.
+        return GameDiagnosis.DB_INVALID
+    if not is_mturk(game):  # Only mturk games are considered research data.
+        return GameDiagnosis.NOT_MTURK
+    if is_mturk_sandbox(
+        game
+    ):  # Only non-sandbox mturk games are considered research data.
+        return GameDiagnosis.MTURK_SANDBOX
+    return None
+
+
+def DiagnoseGame(game, summary=None):
     """Returns a string explaining why the game is invalid for research.
 
     Provided object must be joined with the Assignment table on both the lead_assignment and follow_assignment fields.
@@ -252,33 +270,25 @@ def DiagnoseGame(game):
     - Either the game's "leader_assignment" or "follower_assignment" column is not null and has a submit URL of "https://www.mturk.com".
     - Low percentage of incomplete instructions (something like < 20%).
     - Any instruction with more than 25 moves invalidates the game (the follower clearly just got lost and never recovered).
-    """
-    # Join the game
-    if not game.valid:  # Bool field in the db to manually filter out bad games.
-        return GameDiagnosis.DB_INVALID
-    if not is_mturk(game):  # Only mturk games are considered research data.
-        return GameDiagnosis.NOT_MTURK
-    if is_mturk_sandbox(
-        game
-    ):  # Only non-sandbox mturk games are considered research data.
-        return GameDiagnosis.MTURK_SANDBOX
 
-    game_events = (
-        Event.select()
-        .join(Game)
-        .where(Event.game == game.id)
-        .order_by(Event.server_time)
-    )
+    The event-based checks are read from the game's GameSummary. Pass summary
+    if it's already loaded (see GetGameSummaries).
+    """
+    diagnosis = _DiagnoseGameStatic(game)
+    if diagnosis is not None:
+        return diagnosis
     if short_game(game):  # Filter games that were just given up on.
         return GameDiagnosis.SHORT_GAME
-    if follower_got_lost(game_events):
+    if summary is None:
+        summary = GetGameSummary(game)
+    if summary.follower_got_lost:
         return GameDiagnosis.FOLLOWER_GOT_LOST
-    if high_percent_cancelled_instructions(game_events):
+    if summary.high_percent_cancelled:
         return GameDiagnosis.HIGH_PERCENT_INSTRUCTIONS_CANCELLED
     return GameDiagnosis.GOOD
 
 
-def IsGameResearchData(game):
+def IsGameResearchData(game, summary=None):
     """Returns True if the game is usable as research data.
 
     Provided object must be joined with the Assignment table on both the lead_assignment and follow_assignment fields.
@@ -291,4 +301,134 @@ def IsGameResearchData(game):
     - Low percentage of incomplete instructions (something like < 20%).
     - Any instruction with more than 25 moves invalidates the game (the follower clearly just got lost and never recovered).
     """
-    return DiagnoseGame(game) == GameDiagnosis.GOOD
+    return DiagnoseGame(game, summary) == GameDiagnosis.GOOD
+
+
+def SummarizeGame(game):
+    """Computes the GameSummary of a game from its events. Doesn't save it.
+
+    Reads the game's events in two queries (one for instruction texts), instead
+    of the per-instruction queries of follower_got_lost and
+    high_percent_cancelled_instructions, which it agrees with.
+    """
+    events = list(
+        Event.select(Event.id, Event.type, Event.role, Event.parent_event)
+        .where(Event.game == game.id)
+        .order_by(Event.server_time)
+        .tuples()
+    )
+    instruction_texts = {
+        event_id: orjson.loads(data)["text"]
+        for event_id, data in Event.select(Event.id, Event.data)
+        .where(Event.game == game.id, Event.type == EventType.INSTRUCTION_SENT)
+        .tuples()
+    }
+
+    instructions = [e[0] for e in events if e[1] == EventType.INSTRUCTION_SENT]
+    children = {}  # Event type -> set of parent event IDs.
+    actions_per_instruction = Counter()
+    follower_acted_on = set()
+    leader_moves, follower_moves = 0, 0
+    for event_id, event_type, role, parent in events:
+        if parent is not None:
+            children.setdefault(event_type, set()).add(parent)
+        if event_type != EventType.ACTION:
+            continue
+        if role == "Role.LEADER":
+            leader_moves += 1
+        elif role == "Role.FOLLOWER":
+            follower_moves += 1
+        if parent is not None:
+            actions_per_instruction[parent] += 1
+            if role == "Role.FOLLOWER":
+                follower_acted_on.add(parent)
+
+    activated = children.get(EventType.INSTRUCTION_ACTIVATED, set())
+    completed = children.get(EventType.INSTRUCTION_DONE, set())
+    cancelled = children.get(EventType.INSTRUCTION_CANCELLED, set())
+    acted_on = [i for i in instructions if i in activated and i in follower_acted_on]
+    acted_on_cancelled = [i for i in acted_on if i in cancelled]
+    cancel_rate = len(acted_on_cancelled) / len(acted_on) if acted_on else 0
+
+    move_counts = [actions_per_instruction[i] for i in instructions]
+    texts = [instruction_texts.get(i, "") for i in instructions]
+    vocabulary = set(word for text in texts for word in text.split(" "))
+
+    summary = GameSummary(
+        game=game.id,
+        duration_s=(game.end_time - game.start_time).total_seconds()
+        if game.end_time != datetime.max
+        else 0,
+        instructions_sent=len(instructions),
+        instructions_activated=len([i for i in instructions if i in activated]),
+        instructions_completed=len([i for i in instructions if i in completed]),
+        instructions_cancelled=len([i for i in instructions if i in cancelled]),
+        instructions_acted_on=len(acted_on),
+        instructions_acted_on_cancelled=len(acted_on_cancelled),
+        cancel_rate=cancel_rate,
+        leader_moves=leader_moves,
+        follower_moves=follower_moves,
+        instruction_move_counts=orjson.dumps(move_counts).decode("utf-8"),
+        instruction_word_counts=orjson.dumps(
+            [len(text.split(" ")) for text in texts]
+        ).decode("utf-8"),
+        vocabulary=orjson.dumps(sorted(vocabulary)).decode("utf-8"),
+        follower_got_lost=any(count >= 25 for count in move_counts),
+        high_percent_cancelled=cancel_rate >= 0.2 if acted_on else True,
+    )
+    diagnosis = _DiagnoseGameStatic(game)
+    if diagnosis is None:
+        if short_game(game):
+            diagnosis = GameDiagnosis.SHORT_GAME
+        elif summary.follower_got_lost:
+            diagnosis = GameDiagnosis.FOLLOWER_GOT_LOST
+        elif summary.high_percent_cancelled:
+            diagnosis = GameDiagnosis.HIGH_PERCENT_INSTRUCTIONS_CANCELLED
+        else:
+            diagnosis = GameDiagnosis.GOOD
+    summary.diagnosis = diagnosis.name
+    summary.research_valid = diagnosis == GameDiagnosis.GOOD
+    return summary
+
+
+def SaveGameSummary(game):
+    """Computes and stores the summary of a game, replacing any previous one."""
+    summary = SummarizeGame(game)
+    GameSummary.delete().where(GameSummary.game == game.id).execute()
+    summary.save(force_insert=True)
+    return summary
+
+
+def GetGameSummary(game):
+    """Returns the stored summary of a game, computing it if it's missing.
+
+    Summaries computed here are only stored for games that are over.
+    """
+    summary = GameSummary.get_or_none(GameSummary.game == game.id)
+    if summary is not None:
+        return summary
+    if game.completed or game.end_time != datetime.max:
+        return SaveGameSummary(game)
+    return SummarizeGame(game)
+
+
+def GetStoredGameSummaries(game_ids):
+    """Returns {game_id: GameSummary} for the games which have a stored summary."""
+    game_ids = list(game_ids)
+    summaries = {}
+    # Stay under SQLite's limit on the number of query parameters.
+    for chunk in range(0, len(game_ids), 500):
+        query = GameSummary.select().where(
+            GameSummary.game.in_(game_ids[chunk : chunk + 500])
+        )
+        summaries.update({summary.game_id: summary for summary in query})
+    return summaries
+
+
+def GetGameSummaries(games):
+    """Returns {game_id: GameSummary} for games. Missing ones are computed."""
+    summaries = GetStoredGameSummaries(game.id for game in games)
+    for game in games:
+        if game.id not in summaries:
+            summaries[game.id] = GetGameSummary(game)
+    return summaries
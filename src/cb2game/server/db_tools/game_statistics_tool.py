@@ -2,18 +2,17 @@ import pickle
 
 import fire
 import numpy as np
+import pandas as pd
 from autocorrect import Speller
 from nltk.tokenize import word_tokenize
 
 import cb2game.server.config.config as config
 import cb2game.server.schemas.defaults as defaults_db
-from cb2game.server.db_tools.db_utils import (
-    follower_got_lost,
-    high_percent_cancelled_instructions,
-    short_game,
-)
+from cb2game.server.db_tools.columnar_export import LoadTable
+from cb2game.server.db_tools.db_utils import GetGameSummary, short_game
 from cb2game.server.schemas import base
 from cb2game.server.schemas.cards import CardSelections, CardSets
+from cb2game.server.schemas.event import Event, EventType
 from cb2game.server.schemas.game import Game, Instruction, LiveFeedback, Move
 from cb2game.server.schemas.mturk import Worker
 
@@ -48,6 +47,10 @@ COMMANDS = [
 def PrintUsage():
     print("Usage:")
     print("  game_counts --from_id=[0-9]+ --to_id=[0-9]+ --id_file=<str>")
+    print(
+        "  Pass --columnar_dir=<dir> to read a columnar_export.py export instead of the DB. Supported by:"
+    )
+    print(f"  {', '.join(COLUMNAR_COMMANDS)}")
     print("  help")
     print("Check the script for more. I need to write all of this.")
 
@@ -129,6 +132,10 @@ def ReportGameTypes(ids):
         else:
             num_human_human += 1
 
+    report_game_types(num_human_human, num_human_AI)
+
+
+def report_game_types(num_human_human, num_human_AI):
     print(
         f"There are a total of {num_human_human} human-human games and {num_human_AI} human-AI games"
     )
@@ -196,6 +203,10 @@ def ReportBasicStats(ids, game_type):
         all_stats["durations"].append(get_duration(game.start_time, game.end_time))
         all_stats["turns"].append(game.number_turns)
 
+    report_basic_stats(all_stats, game_type)
+
+
+def report_basic_stats(all_stats, game_type):
     print(
         f"Human-{game_type} average score: {np.mean(all_stats['scores'])} pm {np.std(all_stats['scores'])}"
     )
@@ -335,6 +346,14 @@ def ReportTerminationStats(ids, game_type):
 
         termination_percentages.append(num_cancelled / num_inst)
 
+    report_termination_stats(
+        termination_percentages, total_instructions, total_cancelled, game_type
+    )
+
+
+def report_termination_stats(
+    termination_percentages, total_instructions, total_cancelled, game_type
+):
     print(
         f"Human-{game_type}, average percentage of instructions cancelled per game is: {np.mean(termination_percentages)}"
     )
@@ -882,7 +901,10 @@ def ReportInstructionChaining(ids, game_type):
         if len(curr_game_chaining) != 0:
             avg_chaining_per_game.append(np.mean(curr_game_chaining))
 
-    # Report results
+    report_instruction_chaining(num_chaining_overall, avg_chaining_per_game, game_type)
+
+
+def report_instruction_chaining(num_chaining_overall, avg_chaining_per_game, game_type):
     print(
         f"Human-{game_type}, within a game a leader issues chains of {np.mean(avg_chaining_per_game)} instructions"
         + "when they issue instructions"
@@ -912,17 +934,12 @@ def ReportInvalidGames(ids, game_type):
             continue
         if game_type == "ai" and game.follower_id is not None:
             continue
-        instructions = (
-            Instruction.select()
-            .join(Game)
-            .where(Instruction.game == game)
-            .order_by(Instruction.id)
-        )
         num_games += 1
 
+        summary = GetGameSummary(game)
         is_short = short_game(game)
-        is_lost = follower_got_lost(instructions)
-        is_cancelled = high_percent_cancelled_instructions(instructions)
+        is_lost = summary.follower_got_lost
+        is_cancelled = summary.high_percent_cancelled
 
         if is_short:
             num_short += 1
@@ -933,7 +950,14 @@ def ReportInvalidGames(ids, game_type):
         if is_short or is_lost or is_cancelled:
             num_invalid += 1
 
-    # Report results
+    report_invalid_games(
+        num_games, num_short, num_too_many_term, num_lost, num_invalid, game_type
+    )
+
+
+def report_invalid_games(
+    num_games, num_short, num_too_many_term, num_lost, num_invalid, game_type
+):
     print(
         f"There are {num_games} human-{game_type} games. {num_invalid / num_games * 100}% of these are invalid"
     )
@@ -1387,6 +1411,10 @@ def ReportZeroScoringGames(ids, game_type):
         num_games += 1
         num_zero += 1 if game.score == 0 else 0
 
+    report_zero_scoring_games(num_games, num_zero, game_type)
+
+
+def report_zero_scoring_games(num_games, num_zero, game_type):
     print(
         f"Human-{game_type}, {num_zero}/{num_games} games score 0, forming {num_zero/num_games*100}%"
     )
@@ -1437,6 +1465,173 @@ def SavePlayerBonuses(ids, discounted_game_filepath, bonus_record_filepath):
         pickle.dump(player_to_earnings, f)
 
 
+### Columnar backend. These functions answer the same reports from the Parquet
+### export of columnar_export.py (see the columnar_dir flag), using pandas
+### scans instead of per-game queries.
+COLUMNAR_COMMANDS = [
+    "game_counts",
+    "basic_stats",
+    "termination_stats",
+    "instruction_chaining_amount",
+    "num_invalid_games",
+    "zero_score_games",
+]
+
+
+def filter_games_columnar(games):
+    """Vectorized filter_game. Returns a mask of the games to skip."""
+    leader, follower = games["leader_id"], games["follower_id"]
+    same_players = (leader == follower).fillna(leader.isna() & follower.isna())
+    secret_players = (
+        (leader == SECRET_LEADER_ID) & (follower == SECRET_FOLLOWER_ID)
+    ).fillna(False)
+    not_mturk = (games["type"] != "follower-pilot-lobby|4|game-mturk").fillna(True)
+    return (not_mturk | same_players | secret_players).astype(bool)
+
+
+def select_games_columnar(games, game_type):
+    games = games[~filter_games_columnar(games)]
+    if game_type == "human":
+        games = games[games["follower_id"].notna()]
+    if game_type == "ai":
+        games = games[games["follower_id"].isna()]
+    return games
+
+
+def ReportGameTypesColumnar(games):
+    games = select_games_columnar(games, "overall")
+    num_human_AI = int(games["follower_id"].isna().sum())
+    report_game_types(len(games) - num_human_AI, num_human_AI)
+
+
+def ReportBasicStatsColumnar(games, game_type):
+    games = select_games_columnar(games, game_type)
+    # Matches get_duration, which only counts the seconds part of the timedelta.
+    durations = (games["end_time"] - games["start_time"]).dt.seconds / 60
+    all_stats = {
+        "scores": games["score"].tolist(),
+        "durations": durations.dropna().tolist(),
+        "turns": games["number_turns"].tolist(),
+    }
+    report_basic_stats(all_stats, game_type)
+
+
+def ReportTerminationStatsColumnar(games, instructions, game_type):
+    games = select_games_columnar(games, game_type)
+    active = instructions[
+        instructions["game_id"].isin(games["id"])
+        & (instructions["turn_activated"] != -1)
+    ]
+    cancelled = (active["turn_cancelled"] != -1).astype(int)
+    per_game = cancelled.groupby(active["game_id"]).agg(["sum", "size"])
+    termination_percentages = (per_game["sum"] / per_game["size"]).tolist()
+    report_termination_stats(
+        termination_percentages, len(active), int(cancelled.sum()), game_type
+    )
+
+
+def ReportInstructionChainingColumnar(games, instructions, game_type):
+    games = select_games_columnar(games, game_type)
+    instructions = instructions[instructions["game_id"].isin(games["id"])]
+    instructions = instructions.sort_values(["game_id", "id"])
+
+    # A chain is a run of consecutive instructions issued in the same turn.
+    previous_turn = instructions.groupby("game_id")["turn_issued"].shift()
+    new_chain = (instructions["turn_issued"] != previous_turn).fillna(True)
+    chain_id = new_chain.astype(int).cumsum()
+    chains = instructions.groupby(chain_id)["game_id"].agg(["first", "size"])
+
+    num_chaining_overall = chains["size"].tolist()
+    avg_chaining_per_game = chains.groupby("first")["size"].mean().tolist()
+    report_instruction_chaining(num_chaining_overall, avg_chaining_per_game, game_type)
+
+
+def ReportInvalidGamesColumnar(games, events, game_type):
+    games = select_games_columnar(games, game_type)
+    events = events[events["game_id"].isin(games["id"])]
+    sent = events[events["type"] == EventType.INSTRUCTION_SENT]
+    children = events[events["parent_event_id"].notna()]
+
+    def has_child(condition):
+        return sent["id"].isin(children[condition]["parent_event_id"])
+
+    # follower_got_lost: an instruction with 25 or more actions.
+    actions = children[children["type"] == EventType.ACTION]
+    action_counts = actions.groupby("parent_event_id").size()
+    lost_instructions = action_counts[action_counts >= 25].index
+    lost_games = sent[sent["id"].isin(lost_instructions)]["game_id"]
+
+    # high_percent_cancelled_instructions: of the activated instructions the
+    # follower acted on, at least 20% were cancelled (or there were none).
+    acted_on = has_child(
+        children["type"] == EventType.INSTRUCTION_ACTIVATED
+    ) & has_child(
+        (children["type"] == EventType.ACTION) & (children["role"] == "Role.FOLLOWER")
+    )
+    cancelled = acted_on & has_child(
+        children["type"] == EventType.INSTRUCTION_CANCELLED
+    )
+    per_game = (
+        pd.DataFrame(
+            {"active": acted_on.astype(int), "cancelled": cancelled.astype(int)}
+        )
+        .groupby(sent["game_id"])
+        .sum()
+    )
+    low_cancel_games = per_game[
+        (per_game["active"] > 0) & (per_game["cancelled"] / per_game["active"] < 0.2)
+    ].index
+
+    is_short = games["number_turns"] <= 2
+    is_lost = games["id"].isin(lost_games)
+    is_cancelled = ~games["id"].isin(low_cancel_games)
+    report_invalid_games(
+        len(games),
+        int(is_short.sum()),
+        int(is_cancelled.sum()),
+        int(is_lost.sum()),
+        int((is_short | is_lost | is_cancelled).sum()),
+        game_type,
+    )
+
+
+def ReportZeroScoringGamesColumnar(games, game_type):
+    games = select_games_columnar(games, game_type)
+    report_zero_scoring_games(len(games), int((games["score"] == 0).sum()), game_type)
+
+
+def RunColumnarCommand(command, ids, columnar_dir):
+    game_columns = ["id", "type", "leader_id", "follower_id", "score"]
+    game_columns += ["start_time", "end_time", "number_turns"]
+    games = LoadTable(columnar_dir, Game, game_columns, ids)
+    game_types = ["ai", "human", "overall"]
+
+    if command == "game_counts":
+        ReportGameTypesColumnar(games)
+    elif command == "basic_stats":
+        for game_type in game_types:
+            ReportBasicStatsColumnar(games, game_type)
+    elif command in ["termination_stats", "instruction_chaining_amount"]:
+        instruction_columns = ["id", "game_id", "turn_issued"]
+        instruction_columns += ["turn_activated", "turn_cancelled"]
+        instructions = LoadTable(columnar_dir, Instruction, instruction_columns, ids)
+        report = (
+            ReportTerminationStatsColumnar
+            if command == "termination_stats"
+            else ReportInstructionChainingColumnar
+        )
+        for game_type in game_types:
+            report(games, instructions, game_type)
+    elif command == "num_invalid_games":
+        event_columns = ["id", "game_id", "type", "role", "parent_event_id"]
+        events = LoadTable(columnar_dir, Event, event_columns, ids)
+        for game_type in game_types:
+            ReportInvalidGamesColumnar(games, events, game_type)
+    elif command == "zero_score_games":
+        for game_type in game_types:
+            ReportZeroScoringGamesColumnar(games, game_type)
+
+
 def main(
     command,
     to_id="",
@@ -1446,11 +1641,20 @@ def main(
     discounted_game_filepath="",
     bonus_record_filepath="",
     config_filepath="server/config/server-config.yaml",
+    columnar_dir="",
 ):
     if command == "help":
         PrintUsage()
         return
 
+    # Reports supported by the columnar backend don't need the database.
+    if columnar_dir != "" and command in COLUMNAR_COMMANDS:
+        ids = get_list_of_ids(to_id, from_id, id_file)
+        RunColumnarCommand(command, ids, columnar_dir)
+        return
+    if columnar_dir != "":
+        print(f"{command} has no columnar backend. Reading the database instead.")
+
     # Setup the sqlite database used to record game actions.
     cfg = config.ReadConfigOrDie(config_filepath)
     print(f"Reading database from {cfg.database_path()}")
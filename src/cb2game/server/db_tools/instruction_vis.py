@@ -29,22 +29,6 @@ logger = logging.getLogger(__name__)
 pygame.freetype.init()
 INSTRUCTION_FONT = pygame.freetype.SysFont("Times New Roman", 30)
 
-# The below imports are used to import pygame in a headless setup, to render map
-# updates as images for game recordings.
-import os
-
-# set SDL to use the dummy NULL video driver,
-#   so it doesn't need a windowing system.
-os.environ["SDL_VIDEODRIVER"] = "dummy"
-import pygame.transform
-
-if 1:
-    # some platforms might need to init the display for some parts of pygame.
-    import pygame.display
-
-    pygame.display.init()
-    screen = pygame.display.set_mode((1, 1))
-
 SCREEN_SIZE = 800
 
 
@@ -78,9 +62,17 @@ def draw_instruction(
     filename: str,
     game_id: int,
     props: List[prop_msg.Prop],
+    display: visualize.GameDisplay = None,
 ):
-    display = visualize.GameDisplay(SCREEN_SIZE)
-    display.set_map(map_update)
+    """Draws an instruction and the follower's path to filename.
+
+    Pass the same display to draw several instructions on one map. The map is
+    then only rendered once.
+    """
+    if display is None:
+        display = visualize.GameDisplay(SCREEN_SIZE)
+    if display.map() is not map_update:
+        display.set_map(map_update)
     display.set_props(props)
     trajectory = [(move.location, move.orientation) for move in moves]
     if len(moves) > 0:
@@ -115,6 +107,83 @@ def draw_instruction(
     pygame.image.save(display.screen(), filename)
 
 
+def LoadGameScene(game):
+    """Returns (game_events, first_map_update, initial_cards) for a game.
+
+    game_events is a query over the game's events, ordered by server time.
+    Returns None if the game has no map or prop updates.
+    """
+    ParentEvent = Event.alias()
+    # Do a self-join to link parent events. ParentEvent is an alias of Event.
+    game_events = (
+        Event.select()
+        .join(
+            ParentEvent,
+            peewee.JOIN.LEFT_OUTER,
+            on=(Event.parent_event == ParentEvent.id),
+        )
+        .where(Event.game_id == game.id)
+        .order_by(Event.server_time)
+    )
+    map_events = (
+        game_events.select()
+        .where(Event.type == EventType.MAP_UPDATE)
+        .order_by(Event.server_time)
+    )
+    if map_events.count() == 0:
+        print(f"Skipping game {game.id} because it has no map update events.")
+        return None
+    prop_updates = game_events.where(Event.type == EventType.PROP_UPDATE).order_by(
+        Event.server_time
+    )
+    if not prop_updates.exists():
+        print(f"Skipping game {game.id} because it has no prop update events.")
+        return None
+    first_map_update = map_update_msg.MapUpdate.from_json(map_events.get().data)
+    first_prop_update = prop_msg.PropUpdate.from_json(prop_updates.get().data)
+    initial_cards = [Card.FromProp(prop) for prop in first_prop_update.props]
+    return game_events, first_map_update, initial_cards
+
+
+def LoadInstructionScene(game_events, initial_cards, instruction):
+    """Returns (moves, feedbacks, props) to draw an instruction with.
+
+    props are the cards on the board when the instruction was activated.
+    Returns None if the instruction was never activated.
+    """
+    activation_query = instruction.children.where(
+        Event.type == EventType.INSTRUCTION_ACTIVATED
+    )
+    if not activation_query.exists():
+        print(f"Skipping instruction {instruction.id} because it was never activated.")
+        return None
+    activation = activation_query.get()
+
+    cards_by_location = {card.location: card for card in initial_cards}
+    card_events = game_events.where(
+        Event.type << [EventType.CARD_SPAWN, EventType.CARD_SET],
+        Event.server_time <= activation.server_time,
+    ).order_by(Event.server_time)
+    for event in card_events:
+        if event.type == EventType.CARD_SPAWN:
+            card = Card.from_json(event.data)
+            cards_by_location[card.location] = card
+        elif event.type == EventType.CARD_SET:
+            data_obj = json.loads(event.data)
+            cards = [Card.from_dict(card) for card in data_obj["cards"]]
+            for card in cards:
+                cards_by_location[card.location] = None
+    props = [card.prop() for card in cards_by_location.values() if card is not None]
+
+    moves = instruction.children.where(Event.type == EventType.ACTION)
+    feedbacks = (
+        game_events.select()
+        .where(Event.parent_event << moves, Event.type == EventType.LIVE_FEEDBACK)
+        .order_by(Event.server_time)
+    )
+    return moves, feedbacks, props
+
+
 def main(
     max_instructions=-1,
     config_filepath="config/server-config.json",
@@ -122,6 +191,7 @@ def main(
     research_only=True,
 ):
     logging.basicConfig(level=logging.INFO)
+    visualize.make_pygame_headless()
     if config_filepath == "":
         cfg = config.Config()
         logger.warning(
@@ -150,78 +220,23 @@ def main(
             game for game in db_utils.ListGames() if db_utils.IsConfigGame(cfg, game)
         ]
     print(f"Found {len(games)} games.")
-    ParentEvent = Event.alias()
     # For each game.
     for game in games:
+        game_scene = LoadGameScene(game)
+        if game_scene is None:
+            continue
+        game_events, first_map_update, initial_cards = game_scene
         # Create a directory for the game.
         game_dir = output_dir / str(game.id)
         game_dir.mkdir(parents=False, exist_ok=True)
-        # Do a self-join to link parent events. ParentEvent is an alias of Event defined above.
-        game_events = (
-            Event.select()
-            .join(
-                ParentEvent,
-                peewee.JOIN.LEFT_OUTER,
-                on=(Event.parent_event == ParentEvent.id),
-            )
-            .where(Event.game_id == game.id)
-            .order_by(Event.server_time)
-        )
-        map_events = (
-            game_events.select()
-            .where(Event.type == EventType.MAP_UPDATE)
-            .order_by(Event.server_time)
-        )
-        if map_events.count() == 0:
-            print(f"Skipping game {game.id} because it has no map update events.")
-            continue
-        prop_updates = game_events.where(Event.type == EventType.PROP_UPDATE).order_by(
-            Event.server_time
-        )
-        if not prop_updates.exists():
-            print(f"Skipping game {game.id} because it has no prop update events.")
-            continue
-        first_map_update = map_update_msg.MapUpdate.from_json(map_events.get().data)
-        first_prop_update = prop_msg.PropUpdate.from_json(prop_updates.get().data)
-        initial_cards = [Card.FromProp(prop) for prop in first_prop_update.props]
         instructions = game_events.where(Event.type == EventType.INSTRUCTION_SENT)
         for instruction in instructions:
-            activation_query = instruction.children.where(
-                Event.type == EventType.INSTRUCTION_ACTIVATED
+            instruction_scene = LoadInstructionScene(
+                game_events, initial_cards, instruction
             )
-            if not activation_query.exists():
-                print(
-                    f"Skipping instruction {instruction.id} because it was never activated."
-                )
+            if instruction_scene is None:
                 continue
-            activation = activation_query.get()
-
-            cards_by_location = {card.location: card for card in initial_cards}
-            card_events = game_events.where(
-                Event.type << [EventType.CARD_SPAWN, EventType.CARD_SET],
-                Event.server_time <= activation.server_time,
-            ).order_by(Event.server_time)
-            for event in card_events:
-                if event.type == EventType.CARD_SPAWN:
-                    card = Card.from_json(event.data)
-                    cards_by_location[card.location] = card
-                elif event.type == EventType.CARD_SET:
-                    data_obj = json.loads(event.data)
-                    cards = [Card.from_dict(card) for card in data_obj["cards"]]
-                    for card in cards:
-                        cards_by_location[card.location] = None
-            props = [
-                card.prop() for card in cards_by_location.values() if card is not None
-            ]
-
-            moves = instruction.children.where(Event.type == EventType.ACTION)
-            feedbacks = (
-                game_events.select()
-                .where(
-                    Event.parent_event << moves, Event.type == EventType.LIVE_FEEDBACK
-                )
-                .order_by(Event.server_time)
-            )
+            moves, feedbacks, props = instruction_scene
 
             dt_string = instruction.server_time.strftime("%Y-%m-%d_%H-%M-%S")
             filepath = game_dir / f"instruction_vis_{dt_string}.png"
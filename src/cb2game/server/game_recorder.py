@@ -328,6 +328,10 @@ class GameRecorder(object):
         self._instruction_queue = Queue()
         self._tick = 0
         self._turn_number = 0
+        # Events created by this recorder, keyed by short_code (the
+        # instruction or question UUID). Saves a DB query on every move.
+        self._instruction_events = {}
+        self._question_events = {}
 
         # Create an entry in the Game database table.
         self._game_record = game_record
@@ -435,6 +439,7 @@ class GameRecorder(object):
             self._game_record, self._turn_number, self._tick, objective
         )
         event.save(force_insert=True)
+        self._instruction_events[objective.uuid] = event
 
     def record_instruction_activated(self, objective):
         if self._disabled:
@@ -600,6 +605,7 @@ class GameRecorder(object):
             feedback_question,
         )
         event.save(force_insert=True)
+        self._question_events[feedback_question.uuid] = event
 
     def record_feedback_response(self, feedback_response: FeedbackResponse):
         if self._disabled:
@@ -674,19 +680,26 @@ class GameRecorder(object):
         return move_code
 
     def _get_event_from_instruction_uuid(self, instruction_uuid):
-        instruction_sent_event_query = Event.select().where(
-            Event.type == EventType.INSTRUCTION_SENT,
-            Event.short_code == instruction_uuid,
+        return self._get_event(
+            self._instruction_events, EventType.INSTRUCTION_SENT, instruction_uuid
         )
-        if not instruction_sent_event_query.exists():
-            return None
-        return instruction_sent_event_query.get()
 
     def _get_event_from_question_uuid(self, question_uuid):
-        question_event_query = Event.select().where(
-            Event.type == EventType.FEEDBACK_QUESTION,
-            Event.short_code == question_uuid,
+        return self._get_event(
+            self._question_events, EventType.FEEDBACK_QUESTION, question_uuid
         )
-        if not question_event_query.exists():
-            return None
-        return question_event_query.get()
+
+    def _get_event(self, events, event_type, short_code):
+        """Looks up an event by short code. Events this recorder created are
+        in memory. The DB is only queried for other events, E.g. instructions
+        in a game restored from a scenario or a previous game's event."""
+        if short_code in events:
+            return events[short_code]
+        event = (
+            Event.select()
+            .where(Event.type == event_type, Event.short_code == short_code)
+            .first()
+        )
+        if event is not None:
+            events[short_code] = event
+        return event
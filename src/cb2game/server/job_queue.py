@@ -0,0 +1,177 @@
+""" A durable queue for work that shouldn't block the game loop.
+
+Jobs are rows in the Job table (schemas/job.py), so they survive restarts. A
+worker thread in the server process runs them in order, and deletes each job's
+row in the same transaction as the job's own database writes. A job which
+raises is retried after a backoff, up to MAX_ATTEMPTS times, and then kept
+with status FAILED. Queue depth is shown in /status.
+
+Handlers are registered by kind with @JobHandler(kind) and take the job's
+payload as keyword arguments. See post_game_jobs.py.
+
+If InitJobQueue() hasn't been called (unit tests, local games and db tools),
+EnqueueJob() runs the job immediately instead. Room shards call
+InitJobQueue(start_worker=False), which only enqueues jobs. The main server
+process then runs them.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import orjson
+
+from cb2game.server.schemas import base
+from cb2game.server.schemas.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY_S = 10  # Doubles after each failed attempt.
+# The worker also checks the table this often, for jobs from room shards.
+POLL_PERIOD_S = 1
+BATCH_SIZE = 100
+
+_job_handlers = {}
+
+
+def JobHandler(kind):
+    """Decorator which registers a function as the handler of a job kind."""
+
+    def register(function):
+        _job_handlers[kind] = function
+        return function
+
+    return register
+
+
+# Callbacks to run once the current thread's job commits. None outside of jobs.
+_on_commit = threading.local()
+
+
+def OnCommit(callback):
+    """Runs callback once the running job's transaction commits.
+
+    Use this for in-memory state which mirrors the database, so that it's left
+    alone if the job rolls back. Outside of a job queue transaction (e.g. when
+    EnqueueJob() runs a job immediately), callback runs now.
+    """
+    callbacks = getattr(_on_commit, "callbacks", None)
+    if callbacks is None:
+        callback()
+        return
+    callbacks.append(callback)
+
+
+def RunJob(kind, payload):
+    if kind not in _job_handlers:
+        raise ValueError(f"No handler for job kind {kind}")
+    _job_handlers[kind](**payload)
+
+
+class JobQueue(object):
+    def __init__(self, retry_delay_s=RETRY_DELAY_S, max_attempts=MAX_ATTEMPTS):
+        self._retry_delay_s = retry_delay_s
+        self._max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def enqueue(self, kind, payload):
+        job = Job.create(kind=kind, payload=orjson.dumps(payload).decode("utf-8"))
+        self._wakeup.set()
+        return job
+
+    def run_pending(self):
+        """Runs jobs which are due. Returns the number of jobs run."""
+        jobs = list(
+            Job.select()
+            .where(Job.status == JobStatus.PENDING, Job.run_after <= datetime.utcnow())
+            .order_by(Job.id)
+            .limit(BATCH_SIZE)
+        )
+        for job in jobs:
+            self._run(job)
+        return len(jobs)
+
+    def _run(self, job):
+        start_time = time.time()
+        callbacks = []
+        _on_commit.callbacks = callbacks
+        try:
+            with base.GetDatabase().atomic():
+                RunJob(job.kind, orjson.loads(job.payload))
+                job.delete_instance()
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.attempts += 1
+            job.last_error = repr(e)
+            if job.attempts >= self._max_attempts:
+                job.status = JobStatus.FAILED
+            delay_s = self._retry_delay_s * 2 ** (job.attempts - 1)
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay_s)
+            job.save()
+            return
+        finally:
+            _on_commit.callbacks = None
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({job.kind}) on-commit error: {e}")
+        logger.info(f"Job {job.id} ({job.kind}) took {time.time() - start_time}s")
+
+    def depth(self):
+        """Number of jobs by status, for /status."""
+        return {
+            status.name.lower(): Job.select().where(Job.status == status).count()
+            for status in JobStatus
+        }
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._work, name="job-queue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _work(self):
+        # Peewee opens a connection for each thread.
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.exception(f"Job queue error: {e}")
+            self._wakeup.wait(POLL_PERIOD_S)
+        base.GetDatabase().close()
+
+
+_job_queue = None
+
+
+def InitJobQueue(start_worker=True):
+    global _job_queue
+    _job_queue = JobQueue()
+    if start_worker:
+        _job_queue.start()
+    return _job_queue
+
+
+def GetJobQueue():
+    """Returns the job queue, or None if InitJobQueue() hasn't been called."""
+    return _job_queue
+
+
+def EnqueueJob(kind, **payload):
+    """Queues a job, or runs it now if there's no job queue. See above."""
+    if _job_queue is None:
+        RunJob(kind, payload)
+        return
+    _job_queue.enqueue(kind, payload)
@@ -1,17 +1,171 @@
-""" Code for updating the leaderboard table. """
+""" Code for updating the leaderboard table.
+
+The leaderboard is read on every visit to the homepage, and updated at the end
+of every game. To keep both cheap, the table is mirrored in memory by
+LeaderboardCache, which is loaded from the database on first use and then kept
+in sync by UpdateLeaderboard once its writes commit. Usernames are cached too.
+"""
+import bisect
 import hashlib
+import heapq
 import logging
+import threading
 
 import humanhash
+import orjson
 
 import cb2game.server.schemas.leaderboard as leaderboard_db
 import cb2game.server.schemas.mturk as mturk_db
+from cb2game.server.job_queue import OnCommit
 from cb2game.server.lobby_consts import LobbyType
 from cb2game.server.schemas.google_user import GoogleUser
 from cb2game.server.username_word_list import USERNAME_WORDLIST
 
 logger = logging.getLogger(__name__)
 
+# Number of entries kept per lobby (and per lobby for bot follower games).
+LEADERBOARD_SIZE = 10
+
+
+def IsBotFollowerEntry(entry):
+    return entry.follower_name == "<Bot>" and entry.leader_name != "<Bot>"
+
+
+class LeaderboardCache(object):
+    """In-memory copy of the leaderboard table.
+
+    Entries are grouped by (lobby_name, lobby_type). Each group holds two lists
+    sorted from highest to lowest score: all entries, and the entries of bot
+    follower games. Ties are ranked by age, oldest first. Adding an entry is a
+    binary search, and evicting the lowest entry of a list is a pop.
+
+    Serialized JSON responses are cached until the next update.
+    """
+
+    def __init__(self):
+        # The job queue's worker thread updates the cache.
+        self._lock = threading.RLock()
+        self._boards = {}  # (lobby_name, lobby_type) -> (entries, bot_entries)
+        self._json = {}  # (lobby_name, lobby_type, only_bot) -> (body, etag)
+
+    def load(self):
+        with self._lock:
+            self._boards = {}
+            self._json = {}
+            for entry in leaderboard_db.Leaderboard.select():
+                entries, bot_entries = self._board(entry.lobby_name, entry.lobby_type)
+                bisect.insort(entries, self._key(entry))
+                if IsBotFollowerEntry(entry):
+                    bisect.insort(bot_entries, self._key(entry))
+
+    def add(self, entry):
+        """Adds an entry. Returns the entry it evicts, if any.
+
+        Like the leaderboard has always been pruned, bot follower game entries
+        only evict other bot follower game entries, and other entries evict
+        the lowest entry of the lobby.
+        """
+        with self._lock:
+            self._json = {}
+            entries, bot_entries = self._board(entry.lobby_name, entry.lobby_type)
+            bisect.insort(entries, self._key(entry))
+            if not IsBotFollowerEntry(entry):
+                if len(entries) <= LEADERBOARD_SIZE:
+                    return None
+                evicted = entries.pop()
+                self._remove(bot_entries, evicted)
+                return evicted[-1]
+            bisect.insort(bot_entries, self._key(entry))
+            if len(bot_entries) <= LEADERBOARD_SIZE:
+                return None
+            evicted = bot_entries.pop()
+            self._remove(entries, evicted)
+            return evicted[-1]
+
+    def evicted_by(self, entry):
+        """Returns the entry that add(entry) would evict, without adding it."""
+        with self._lock:
+            entries, bot_entries = self._boards.get(
+                (entry.lobby_name, LobbyType(entry.lobby_type)), ([], [])
+            )
+            board = bot_entries if IsBotFollowerEntry(entry) else entries
+            if len(board) < LEADERBOARD_SIZE:
+                return None
+            return max(board[-1], self._key(entry))[-1]
+
+    def remove(self, entry):
+        with self._lock:
+            self._json = {}
+            entries, bot_entries = self._board(entry.lobby_name, entry.lobby_type)
+            self._remove(entries, self._key(entry))
+            self._remove(bot_entries, self._key(entry))
+
+    def top(self, lobby_name="", lobby_type=LobbyType.NONE, only_bot_follower=False):
+        """Returns the top entries. Empty filters match all lobbies."""
+        with self._lock:
+            lists = [
+                bot_entries if only_bot_follower else entries
+                for (name, board_type), (entries, bot_entries) in self._boards.items()
+                if (lobby_name == "" or lobby_name == name)
+                and (lobby_type == LobbyType.NONE or lobby_type == board_type)
+            ]
+            return [key[-1] for key in heapq.merge(*lists)][:LEADERBOARD_SIZE]
+
+    def json(self, lobby_name="", lobby_type=LobbyType.NONE, only_bot_follower=False):
+        """Returns the top entries as serialized JSON, and an ETag for it."""
+        with self._lock:
+            cache_key = (lobby_name, lobby_type, only_bot_follower)
+            if cache_key not in self._json:
+                body = orjson.dumps(
+                    [
+                        {
+                            "time": str(entry.time.date()),
+                            "score": entry.score,
+                            "leader": entry.leader_name or "",
+                            "follower": entry.follower_name or "",
+                            "lobby_name": entry.lobby_name,
+                            "lobby_type": entry.lobby_type,
+                        }
+                        for entry in self.top(lobby_name, lobby_type, only_bot_follower)
+                    ]
+                )
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                self._json[cache_key] = (body, etag)
+            return self._json[cache_key]
+
+    def _board(self, lobby_name, lobby_type):
+        return self._boards.setdefault((lobby_name, LobbyType(lobby_type)), ([], []))
+
+    @staticmethod
+    def _key(entry):
+        # Entry IDs are unique, so entries themselves are never compared.
+        return (-entry.score, entry.id, entry)
+
+    @staticmethod
+    def _remove(entries, key):
+        i = bisect.bisect_left(entries, key[:2])
+        if i < len(entries) and entries[i][:2] == key[:2]:
+            del entries[i]
+
+
+_leaderboard_cache = None
+
+
+def Leaderboards():
+    """Returns the leaderboard cache, loading it from the database if needed."""
+    global _leaderboard_cache
+    if _leaderboard_cache is None:
+        _leaderboard_cache = LeaderboardCache()
+        _leaderboard_cache.load()
+    return _leaderboard_cache
+
+
+def ReloadLeaderboards():
+    """Reloads the leaderboard cache, e.g. after the database changed."""
+    global _leaderboard_cache
+    _leaderboard_cache = None
+    return Leaderboards()
+
 
 def GetLeaderboard(
     lobby_name: str = "",
@@ -19,24 +173,23 @@ def GetLeaderboard(
     only_bot_follower_games: bool = False,
 ):
     """Returns a list of the top 10 leaderboard entries."""
-    query = leaderboard_db.Leaderboard.select()
-    if len(lobby_name) > 0:
-        query = query.where(leaderboard_db.Leaderboard.lobby_name == lobby_name)
-    if lobby_type != LobbyType.NONE:
-        query = query.where(leaderboard_db.Leaderboard.lobby_type == lobby_type)
-    if only_bot_follower_games:
-        query = query.where(
-            (leaderboard_db.Leaderboard.follower_name == "<Bot>")
-            & (leaderboard_db.Leaderboard.leader_name != "<Bot>")
-        )
-    return query.order_by(leaderboard_db.Leaderboard.score.desc()).limit(10)
+    return Leaderboards().top(lobby_name, lobby_type, only_bot_follower_games)
+
+
+def GetLeaderboardJson(
+    lobby_name: str = "",
+    lobby_type: LobbyType = LobbyType.NONE,
+    only_bot_follower_games: bool = False,
+):
+    """Returns (json bytes, etag) for the top 10 leaderboard entries."""
+    return Leaderboards().json(lobby_name, lobby_type, only_bot_follower_games)
 
 
 def UpdateLeaderboard(game_record):
     """Updates the leaderboard table with the latest score."""
-    logger.info(f"Updating leaderboard for game {game_record.id}")
     if game_record == None:
         return
+    logger.info(f"Updating leaderboard for game {game_record.id}")
     if game_record.type == None:
         return
     components = game_record.type.split("|")
@@ -102,20 +255,20 @@ def UpdateLeaderboard(game_record):
             leaderboard_entry.mturk_leader = game_record.leader
             leaderboard_entry.mturk_follower = game_record.follower
         leaderboard_entry.save()
-    # If there are now more than 10 entries, delete the one with the lowest score.
-    query = leaderboard_db.Leaderboard.select()
-    if len(lobby_name) > 0:
-        query = query.where(leaderboard_db.Leaderboard.lobby_name == lobby_name)
-    if lobby_type != LobbyType.NONE:
-        query = query.where(leaderboard_db.Leaderboard.lobby_type == lobby_type)
-    if (leader_name == "<Bot>") or (follower_name == "<Bot>"):
-        query = query.where(
-            (leaderboard_db.Leaderboard.follower_name == "<Bot>")
-            & (leaderboard_db.Leaderboard.leader_name != "<Bot>")
-        )
-    if query.count() > 10:
-        lowest_entry = query.order_by(leaderboard_db.Leaderboard.score.asc()).get()
-        lowest_entry.delete_instance()
+        # If there are now more than 10 entries, delete the one with the lowest score.
+        cache = Leaderboards()
+        lowest_entry = cache.evicted_by(leaderboard_entry)
+        if lowest_entry is not None:
+            lowest_entry.delete_instance()
+        # The job's transaction may still roll back, so the cache is only
+        # updated once the new entry (and the eviction) are committed.
+        OnCommit(lambda: cache.add(leaderboard_entry))
+
+
+# Username caches, keyed by hashed mturk worker ID and hashed google ID. Only
+# found usernames are cached. The Set*Username functions keep them up to date.
+_mturk_usernames = {}
+_google_usernames = {}
 
 
 def LookupUsername(worker):
@@ -130,6 +283,15 @@ def LookupUsername(worker):
 
 def UsernameFromHashedGoogleUserId(user_id_shasum):
     """Returns a user's username from their hashed google account ID."""
+    if user_id_shasum not in _google_usernames:
+        username = _UsernameFromHashedGoogleUserId(user_id_shasum)
+        if username is None:
+            return None
+        _google_usernames[user_id_shasum] = username
+    return _google_usernames[user_id_shasum]
+
+
+def _UsernameFromHashedGoogleUserId(user_id_shasum):
     google_user = (
         GoogleUser.select().where(GoogleUser.hashed_google_id == user_id_shasum).get()
     )
@@ -157,6 +319,15 @@ def LookupUsernameFromId(worker_id):
 
 
 def LookupUsernameFromMd5sum(worker_id_md5sum):
+    if worker_id_md5sum not in _mturk_usernames:
+        username = _LookupUsernameFromMd5sum(worker_id_md5sum)
+        if username is None:
+            return None
+        _mturk_usernames[worker_id_md5sum] = username
+    return _mturk_usernames[worker_id_md5sum]
+
+
+def _LookupUsernameFromMd5sum(worker_id_md5sum):
     worker_select = mturk_db.Worker.select().where(
         mturk_db.Worker.hashed_id == worker_id_md5sum
     )
@@ -167,6 +338,7 @@ def LookupUsernameFromMd5sum(worker_id_md5sum):
 
 def SetUsername(worker, username):
     """Sets the username for a given worker."""
+    _mturk_usernames.pop(worker.hashed_id, None)
     username_select = leaderboard_db.Username.select().where(
         leaderboard_db.Username.worker == worker
     )
@@ -182,6 +354,8 @@ def SetUsername(worker, username):
 
 def SetGoogleUsername(user_id_shasum, username):
     """Sets the username for a given google user."""
+    # The username may move from another account, so drop all of them.
+    _google_usernames.clear()
     google_user = (
         GoogleUser.select().where(GoogleUser.hashed_google_id == user_id_shasum).get()
     )
@@ -49,9 +49,11 @@ from cb2game.server.messages.tutorials import (
     TutorialResponseType,
 )
 from cb2game.server.room import Room, RoomType
+from cb2game.server.room_shards import GetRoomShards
 from cb2game.server.util import (
     GetCommitHash,
     IdAssigner,
+    LatencyHistogram,
     LatencyMonitor,
     PackageVersion,
 )
@@ -128,6 +130,8 @@ class Lobby(ABC):
         self._pending_scenario_messages = {}  # {ws: scenario_response}
         self._matchmaking_exc = None
         self._latency_monitor = LatencyMonitor()
+        # Time between game loop iterations, over all rooms in the lobby.
+        self._tick_latency = LatencyHistogram()
 
     @abstractmethod
     def get_leader_follower_match(
@@ -194,6 +198,9 @@ class Lobby(ABC):
     def latency_monitor(self):
         return self._latency_monitor
 
+    def tick_latency(self):
+        return self._tick_latency
+
     def register_game_logging_directory(self, dir) -> None:
         """Each lobby has its own log directory. Game logs are written to this directory."""
         self._base_log_directory = dir
@@ -509,6 +516,15 @@ class Lobby(ABC):
 
         Returns the room, or None if startup failed.
         """
+        shards = GetRoomShards()
+        if shards is not None:
+            room = shards.create_room(
+                self, id, game_record, type, tutorial_name, from_event
+            )
+            if room is None or not room.initialized():
+                return None
+            self._rooms[id] = room
+            return room
         room = Room(
             # Room name.
             "Room #" + str(id) + ("(TUTORIAL)" if type == RoomType.TUTORIAL else ""),
@@ -69,3 +69,7 @@ class LobbyInfo(DataClassJSONMixin):
     # over them.
     select_requires_button_press: bool = False
     card_covers: bool = False
+    # Compress websocket messages of at least this many bytes with
+    # permessage-deflate, for clients which support it. 0 disables compression.
+    # See websocket_compression.py.
+    compression_threshold_bytes: int = 0
@@ -30,8 +30,9 @@ from aiohttp import web
 from aiohttp_session import get_session, new_session, setup
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
 from dateutil import parser, tz
-from playhouse.sqlite_ext import SqliteExtDatabase
+from mashumaro.exceptions import InvalidFieldValue
 
+import cb2game.server.db_tools.backup as backup
 import cb2game.server.db_tools.db_utils as db_utils
 import cb2game.server.leaderboard as leaderboard
 import cb2game.server.schemas as schemas
@@ -40,9 +41,12 @@ import cb2game.server.schemas.defaults as defaults
 import cb2game.server.schemas.event as event_db
 import cb2game.server.schemas.game as game_db
 import cb2game.server.schemas.mturk as mturk
+import cb2game.server.websocket_compression as websocket_compression
+import cb2game.server.wire_format as wire_format
 from cb2game.server.client_exception_logger import ClientExceptionLogger
 from cb2game.server.config.config import GlobalConfig, InitGlobalConfig
 from cb2game.server.google_authenticator import GoogleAuthenticator
+from cb2game.server.job_queue import GetJobQueue, InitJobQueue
 from cb2game.server.lobby_consts import IsMturkLobby, LobbyType
 from cb2game.server.lobby_utils import GetLobbies, GetLobby, InitializeLobbies
 from cb2game.server.map_provider import MapGenerationTask, MapPoolSize
@@ -56,6 +60,7 @@ from cb2game.server.remote_table import (
     LogConnectionEvent,
     Remote,
 )
+from cb2game.server.room_shards import GetRoomShards, InitRoomShards
 from cb2game.server.schemas import base
 from cb2game.server.user_info_fetcher import UserInfoFetcher
 from cb2game.server.util import HEARTBEAT_TIMEOUT_S, password_protected
@@ -97,12 +102,26 @@ async def transmit_bytes(ws, message):
     remote.bytes_down += len(message)
     remote.last_message_down = time.time()
 
+    compress = websocket_compression.FrameCompression(remote.compression, message)
     try:
-        await ws.send_str(message.decode("utf-8"))
+        if remote.wire_format.binary():
+            await ws.send_bytes(message, compress=compress)
+        else:
+            await ws.send_str(message.decode("utf-8"), compress=compress)
     except ConnectionResetError:
         pass
 
 
+async def transmit_message(ws, message, json_option=wire_format.JSON_OPTION):
+    """Encodes message in the socket's wire format and transmits it."""
+    remote = GetRemote(ws)
+    if remote is None:
+        return ValueError("Agent ID not found in remote table")
+    await transmit_bytes(
+        ws, wire_format.EncodeMessage(message, remote.wire_format, json_option)
+    )
+
+
 @routes.get("/")
 async def Index(request):
     return web.FileResponse(PackageRoot() / "server/www/index.html")
@@ -304,6 +323,9 @@ def LobbyStatus(player_lobby):
             else None,
             "user_type": ws.user_type,
             "uuid": ws.uuid,
+            "compression": dataclasses.asdict(ws.compression),
+            "compression_bytes_saved": ws.compression.estimated_bytes_saved(),
+            "compression_cpu_s": ws.compression.estimated_cpu_s(),
         }
         for ws in remotes
     ]
@@ -328,6 +350,7 @@ def LobbyStatus(player_lobby):
         ],
         "bucket_latencies": latency_monitor.bucket_latencies(),
         "bucket_timestamps": latency_monitor.bucket_timestamps(),
+        "tick_latency": player_lobby.tick_latency().summary(),
     }
 
 
@@ -357,9 +380,16 @@ async def Status(request):
     status = {
         "assets": assets_map,
         "map_cache_size": MapPoolSize(),
+        "db_write_latency": base.DatabaseWriteLatency().summary(),
         "remotes": remote_infos,
         "lobbies": {},
     }
+    room_shards = GetRoomShards()
+    if room_shards is not None:
+        status["room_shards"] = await room_shards.status()
+    job_queue = GetJobQueue()
+    if job_queue is not None:
+        status["job_queue"] = job_queue.depth()
     for lobby in lobbies:
         logger.info(
             f"Getting status for lobby {lobby.lobby_name()}. hash: {hash(lobby)}"
@@ -416,29 +446,14 @@ async def MessagesFromServer(request):
         only_follower_bot_games = (
             request.query["only_follower_bot_games"].lower() == "true"
         )
-    board = leaderboard.GetLeaderboard(lobby_name, lobby_type, only_follower_bot_games)
-    leaderboard_entries = []
-    logger.info(f"Leaderboard for {lobby_name} {lobby_type} has {len(board)} entries")
-    for i, entry in enumerate(board):
-        leader_name = entry.leader_name
-        follower_name = entry.follower_name
-        if leader_name == None:
-            leader_name = ""
-        if follower_name == None:
-            follower_name = ""
-        logger.info(
-            f"{i:3}: scr: {entry.score} ldr: {leader_name} flwr: {follower_name} time: {entry.time}"
-        )
-        entry = {
-            "time": str(entry.time.date()),
-            "score": entry.score,
-            "leader": leader_name,
-            "follower": follower_name,
-            "lobby_name": entry.lobby_name,
-            "lobby_type": entry.lobby_type,
-        }
-        leaderboard_entries.append(entry)
-    return web.json_response(leaderboard_entries)
+    body, etag = leaderboard.GetLeaderboardJson(
+        lobby_name, lobby_type, only_follower_bot_games
+    )
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(
+        body=body, content_type="application/json", headers={"ETag": etag}
+    )
 
 
 download_requested = False
@@ -467,6 +482,15 @@ async def ExceptionSaver(lobbies, config):
             logger.exception(e)
 
 
+# Preparing a download can take a while on large databases, since the whole DB
+# is compressed at low priority.
+DOWNLOAD_TIMEOUT = timedelta(hours=2)
+# The DB snapshot is compressed this many bytes at a time.
+DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+# While MTurk games are active, compression pauses this long after each chunk.
+DOWNLOAD_THROTTLE_SLEEP_S = 1
+
+
 async def DataDownloader(lobbies):
     global download_requested
     global download_status
@@ -475,6 +499,7 @@ async def DataDownloader(lobbies):
     download_time_started = None
     download_path = mp.Queue()
     logs = mp.Queue()
+    throttle = mp.Event()
     NYC = tz.gettz("America/New_York")
     timestamp = lambda: datetime.now(NYC).strftime("%Y-%m-%d %H:%M:%S")
     log_entry = lambda x: download_status["log"].append(f"{timestamp()}: {x}")
@@ -486,8 +511,8 @@ async def DataDownloader(lobbies):
 
         if download_process is not None:
             try:
-                log = logs.get(False)
-                download_status["log"].append(log)
+                while True:
+                    download_status["log"].append(logs.get(False))
             except queue.Empty:
                 pass
 
@@ -495,6 +520,9 @@ async def DataDownloader(lobbies):
             try:
                 download_file_path = download_path.get(True, 15)
                 log_entry(f"Download ready in temp file at {download_file_path}.")
+                # Only the latest download is kept around for retrieval.
+                CleanupDownloadFiles()
+                files_to_clean.append(download_file_path)
                 download_status["status"] = "ready"
                 download_requested = False
                 download_process.terminate()
@@ -511,10 +539,12 @@ async def DataDownloader(lobbies):
                 download_path = mp.Queue()
                 logs = mp.Queue()
                 download_status["log"] = []
+            # Wait for a new request before preparing another download.
+            continue
 
         if download_process is not None and download_process.is_alive():
-            # If the process is still running, but we've waited 5 minutes, kill it.
-            if (datetime.now() - download_time_started).total_seconds() > 300:
+            # If the process is still running, but has taken too long, kill it.
+            if datetime.now() - download_time_started > DOWNLOAD_TIMEOUT:
                 log_entry("Download process timed out.")
                 download_process.terminate()
                 download_process = None
@@ -527,24 +557,31 @@ async def DataDownloader(lobbies):
                 download_status["log"] = []
                 continue
 
-        # Check mturk lobbies to see if there are any active games.
-        for lobby in lobbies:
-            if not IsMturkLobby(lobby.lobby_type()):
-                continue
-            if len(lobby.room_ids()) > 0:
-                download_status["status"] = "busy"
-                break
-        # Don't start downloads if someone is actively playing a game.
-        if download_status["status"] == "busy":
-            log_entry(
-                f"Waiting on {len(lobby.room_ids())} active games to finish before downloading."
-            )
-            await asyncio.sleep(10)
-            continue
-
-        if download_process is None and download_status["status"] in ["done", "idle"]:
+        # Check mturk lobbies to see if there are any active games. If there
+        # are, the download is prepared slowly to leave the CPU to the games.
+        active_games = sum(
+            len(lobby.room_ids())
+            for lobby in lobbies
+            if IsMturkLobby(lobby.lobby_type())
+        )
+        if active_games > 0 and not throttle.is_set():
+            throttle.set()
+            log_entry(f"{active_games} active games. Slowing down download.")
+        elif active_games == 0 and throttle.is_set():
+            throttle.clear()
+            log_entry("No active games. Download at full speed.")
+
+        # download_requested is only set again by a new request, so a finished
+        # or failed download is never restarted on its own.
+        if download_process is None and download_status["status"] in [
+            "done",
+            "idle",
+            "ready",
+            "error",
+        ]:
             download_process = mp.Process(
-                target=GatherDataForDownload, args=(GlobalConfig(), download_path, logs)
+                target=GatherDataForDownload,
+                args=(GlobalConfig(), download_path, logs, throttle),
             )
             download_process.start()
             download_status["status"] = "preparing"
@@ -552,30 +589,58 @@ async def DataDownloader(lobbies):
             download_time_started = datetime.now()
 
 
-def GatherDataForDownload(config, response, logs):
-    """Zips up player data for download in a separate thread. Param response is a queue to put the zip file path into."""
+def GatherDataForDownload(config, response, logs, throttle):
+    """Zips up player data for download in a separate process. Param response is a queue to put the zip file path into.
+
+    The zip is built from an online backup of the database, so it includes
+    recent writes still in the WAL, and is compressed in chunks at low priority.
+    Compression slows down further while param throttle is set.
+    """
     NYC = tz.gettz("America/New_York")
     timestamp = lambda: datetime.now(NYC).strftime("%Y-%m-%d %H:%M:%S")
     log_entry = lambda x: logs.put(f"{timestamp()}: {x}")
-    database = SqliteExtDatabase(
-        config.database_path(),
-        pragmas=[
-            ("cache_size", -1024 * 64),  # 64MB page-cache.
-            ("journal_mode", "wal"),  # Use WAL-mode (you should always use this!).
-            ("foreign_keys", 1),
-        ],
-    )
+    if hasattr(os, "nice"):
+        os.nice(10)
     log_entry(f"Starting...")
-    log_entry("Compressing to zip...")
+
+    # With WAL-mode, readers don't block writers, so the snapshot is taken in a
+    # single step. Stepping it in smaller increments would make SQLite restart
+    # the backup every time a game writes to the DB.
+    log_entry("Taking DB snapshot...")
+    snapshot_file = tempfile.NamedTemporaryFile(
+        delete=False, prefix="game_data_", suffix=".db"
+    )
+    snapshot_file.close()
     download_file = tempfile.NamedTemporaryFile(
         delete=False, prefix="game_data_", suffix=".zip"
     )
     download_file_path = download_file.name
-    with zipfile.ZipFile(download_file, "a", False) as zip_file:
-        with open(config.database_path(), "rb") as db_file:
-            zip_file.writestr("game_data.db", db_file.read())
-            log_entry(f"DB file added to download ZIP.")
-    download_file.close()
+    # Both files are as large as the DB, so don't leave them behind on failure.
+    succeeded = False
+    try:
+        backup.BackupDatabase(config.database_path(), snapshot_file.name)
+        log_entry(
+            f"DB snapshot taken ({os.path.getsize(snapshot_file.name) / 2**20:.1f} MiB)."
+        )
+
+        log_entry("Compressing to zip...")
+        with zipfile.ZipFile(
+            download_file, "w", zipfile.ZIP_DEFLATED, allowZip64=True
+        ) as zip_file:
+            with open(snapshot_file.name, "rb") as db_file, zip_file.open(
+                "game_data.db", "w", force_zip64=True
+            ) as zip_entry:
+                while chunk := db_file.read(DOWNLOAD_CHUNK_SIZE):
+                    zip_entry.write(chunk)
+                    if throttle.is_set():
+                        time.sleep(DOWNLOAD_THROTTLE_SLEEP_S)
+                log_entry(f"DB file added to download ZIP.")
+        succeeded = True
+    finally:
+        download_file.close()
+        os.remove(snapshot_file.name)
+        if not succeeded:
+            os.remove(download_file_path)
     log_entry("Zip file written to disk.")
     log_entry(f"Download ready in temp file at {download_file_path}.")
     response.put(download_file_path)
@@ -597,7 +662,9 @@ def CleanupDownloadFiles():
     logger.info("Deleting temporary files...")
     for file in files_to_clean:
         logger.info(f"Deleting: {file}")
-        os.remove(file)
+        if os.path.exists(file):
+            os.remove(file)
+    files_to_clean = []
 
 
 def SaveClientExceptionsToDB():
@@ -612,7 +679,6 @@ def SaveClientExceptionsToDB():
 async def RetrieveData(request):
     global download_status
     global download_file_path
-    global files_to_clean
     NYC = tz.gettz("America/New_York")
     timestamp = lambda: datetime.now(NYC).strftime("%Y-%m-%d %H:%M:%S")
     log_entry = lambda x: download_status["log"].append(f"{timestamp()}: {x}")
@@ -622,11 +688,11 @@ async def RetrieveData(request):
         return web.HTTPNotFound()
     log_entry("Retrieved download.")
     download_status["status"] = "done"
-    local_download_file_path = download_file_path
-    download_file_path = ""
-    files_to_clean.append(local_download_file_path)
+    # The file stays available until the next download is prepared, so that
+    # interrupted downloads can be resumed. FileResponse handles HTTP range
+    # requests.
     return web.FileResponse(
-        local_download_file_path,
+        download_file_path,
         headers={
             "Content-Disposition": f"attachment;filename={os.path.basename(download_file_path)}"
         },
@@ -663,6 +729,9 @@ async def GameList(request):
     if limit_to_100:
         games = games.limit(100)
     games = games.order_by(game_db.Game.id.desc())
+    # Only stored summaries are used. Computing missing ones here would stall
+    # running games (this handler runs on the game loop).
+    summaries = db_utils.GetStoredGameSummaries(game.id for game in games)
     response = []
     # For convenience, convert timestamps to US eastern time.
     NYC = tz.gettz("America/New_York")
@@ -702,6 +771,7 @@ async def GameList(request):
                         search_found = True
         if not search_found and len(searches) > 0:
             continue
+        summary = summaries.get(game.id, None)
         response.append(
             {
                 "id": game.id,
@@ -715,11 +785,10 @@ async def GameList(request):
                 ),
                 "duration": str(game.end_time - game.start_time),
                 "completed": game.completed,
-                # Calculating this is too expensive per-game. Running it on
-                # every game entry (done here) actually pauses running games
-                # for 2 seconds.
-                #
-                # "research_valid": db_utils.IsGameResearchData(game),
+                # None until the game is over and summarized.
+                "research_valid": (summary.research_valid and game.valid)
+                if summary
+                else None,
                 "kvals": game.kvals,
             }
         )
@@ -960,33 +1029,18 @@ async def stats(request):
     durations = []
     scores = []
     instruction_counts = []
-    instructions = []
+    instruction_word_count = []
     instruction_move_counts = []
     vocab = set()
+    summaries = db_utils.GetGameSummaries(games)
     for game in games:
-        game_events = event_db.Event.select().where(event_db.Event.game == game.id)
-        instructions = game_events.where(
-            event_db.Event.type == event_db.EventType.INSTRUCTION_SENT
-        )
-        for event in instructions:
-            moves = game_events.where(
-                event_db.Event.type == event_db.EventType.ACTION,
-                event_db.Event.parent_event == event.id,
-            )
-            instruction_move_counts.append(moves.count())
-            instruction_text = orjson.loads(event.data)["text"]
-            instructions.append(instruction_text)
-            words = instruction_text.split(" ")
-            vocab.extend(words)
-        duration = (game.end_time - game.start_time).total_seconds()
-        score = game.score
-        durations.append(duration)
-        scores.append(score)
-        instruction_counts.append(instructions.count())
-
-    instruction_word_count = [
-        len(instruction.split(" ")) for instruction in instructions
-    ]
+        summary = summaries[game.id]
+        instruction_move_counts.extend(summary.move_counts())
+        instruction_word_count.extend(summary.word_counts())
+        vocab.update(summary.words())
+        durations.append(summary.duration_s)
+        scores.append(game.score)
+        instruction_counts.append(summary.instructions_sent)
 
     json_stats = []
 
@@ -1051,12 +1105,16 @@ async def stats(request):
     game_outcomes = {}
     mturk_games = db_utils.ListMturkGames()
     logger.info(f"Number of games total: {len(mturk_games)}")
+    config_games = [
+        game for game in mturk_games if db_utils.IsConfigGame(GlobalConfig(), game)
+    ]
+    config_summaries = db_utils.GetGameSummaries(config_games)
     total_config_games = 0
     for game in mturk_games:
         if db_utils.IsConfigGame(GlobalConfig(), game):
             logger.info(f"Game {game.id} is a config game")
             total_config_games += 1
-            game_diagnosis = db_utils.DiagnoseGame(game)
+            game_diagnosis = db_utils.DiagnoseGame(game, config_summaries[game.id])
             if (
                 game_diagnosis
                 == db_utils.GameDiagnosis.HIGH_PERCENT_INSTRUCTIONS_INCOMPLETE
@@ -1095,14 +1153,14 @@ async def stream_game_state(request, ws, lobby):
         # If not in a room, drain messages from the room manager.
         message = lobby.drain_message(ws)
         if message is not None:
-            await transmit_bytes(ws, orjson.dumps(message, option=orjson.OPT_NAIVE_UTC))
+            await transmit_message(ws, message, orjson.OPT_NAIVE_UTC)
 
         # If the menu options have been updated, send them to the client.
         if not menu_options_updated:
             menu_options_updated = True
             message = message_from_server.MenuOptionsFromServer(lobby.menu_options(ws))
             # Wait 10ms first,
-            await transmit_bytes(ws, orjson.dumps(message, option=orjson.OPT_NAIVE_UTC))
+            await transmit_message(ws, message, orjson.OPT_NAIVE_UTC)
 
         # Handle any authentication confirmations.
         confirmations = google_authenticator.fill_auth_confirmations(ws)
@@ -1113,9 +1171,7 @@ async def stream_game_state(request, ws, lobby):
                 message = message_from_server.GoogleAuthConfirmationFromServer(
                     confirmation
                 )
-                await transmit_bytes(
-                    ws, orjson.dumps(message, option=orjson.OPT_NAIVE_UTC)
-                )
+                await transmit_message(ws, message, orjson.OPT_NAIVE_UTC)
 
         # Fill userinfo responses.
         userinfo_responses = user_info_fetcher.fill_user_infos(ws)
@@ -1123,9 +1179,7 @@ async def stream_game_state(request, ws, lobby):
             for userinfo_response in userinfo_responses:
                 message = message_from_server.UserInfoFromServer(userinfo_response)
                 logger.info(f"message: {message}")
-                await transmit_bytes(
-                    ws, orjson.dumps(message, option=orjson.OPT_NAIVE_UTC)
-                )
+                await transmit_message(ws, message, orjson.OPT_NAIVE_UTC)
 
         if not lobby.socket_in_room(ws):
             if was_in_room:
@@ -1151,40 +1205,23 @@ async def stream_game_state(request, ws, lobby):
             # await asyncio.sleep(1.0)
             message = lobby.drain_message(ws)
             if message is not None:
-                await transmit_bytes(
-                    ws,
-                    orjson.dumps(
-                        message,
-                        option=orjson.OPT_NAIVE_UTC | orjson.OPT_PASSTHROUGH_DATETIME,
-                        default=datetime.isoformat,
-                    ),
-                )
+                await transmit_message(ws, message)
             # await asyncio.sleep(1.0)
             continue
 
         # Send a ping every 10 seconds.
         if (datetime.now(timezone.utc) - remote.last_ping).total_seconds() > 10.0:
             remote.last_ping = datetime.now(timezone.utc)
-            await transmit_bytes(
-                ws,
-                orjson.dumps(
-                    message_from_server.PingMessageFromServer(),
-                    option=orjson.OPT_NAIVE_UTC | orjson.OPT_PASSTHROUGH_DATETIME,
-                    default=datetime.isoformat,
-                ),
-            )
+            await transmit_message(ws, message_from_server.PingMessageFromServer())
 
         out_messages = []
         if room.fill_messages(player_id, out_messages):
             for message in out_messages:
-                await transmit_bytes(
-                    ws,
-                    orjson.dumps(
-                        message,
-                        option=orjson.OPT_NAIVE_UTC | orjson.OPT_PASSTHROUGH_DATETIME,
-                        default=datetime.isoformat,
-                    ),
-                )
+                # Rooms hosted by room shards send pre-serialized messages.
+                if isinstance(message, bytes):
+                    await transmit_bytes(ws, message)
+                    continue
+                await transmit_message(ws, message)
 
 
 async def receive_agent_updates(request, ws, lobby):
@@ -1199,7 +1236,7 @@ async def receive_agent_updates(request, ws, lobby):
             logger.error("ws connection closed with exception %s" % ws.exception())
             continue
 
-        if msg.type != aiohttp.WSMsgType.TEXT:
+        if msg.type not in [aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY]:
             continue
 
         remote.last_message_up = time.time()
@@ -1209,8 +1246,16 @@ async def receive_agent_updates(request, ws, lobby):
             await ws.close()
             continue
 
-        logger.debug("Raw message: " + msg.data)
-        message = message_to_server.MessageToServer.from_json(msg.data)
+        logger.debug(f"Raw message: {msg.data}")
+        try:
+            message = wire_format.DecodeMessage(
+                message_to_server.MessageToServer, msg.data, remote.wire_format
+            )
+        except InvalidFieldValue as e:
+            # E.g. a message type added in a newer client. Skip the message
+            # rather than dropping the connection.
+            logger.warning(f"Ignoring message which couldn't be decoded: {e}")
+            continue
 
         if message.type == message_to_server.MessageType.GOOGLE_AUTH:
             await google_authenticator.handle_auth(ws, message.google_auth)
@@ -1291,10 +1336,16 @@ async def PlayerEndpoint(request):
             submit_to_url=submit_to_url,
         )
 
+    compression_threshold = lobby.lobby_info().compression_threshold_bytes
     ws = web.WebSocketResponse(
-        autoclose=True, heartbeat=HEARTBEAT_TIMEOUT_S, autoping=True
+        autoclose=True,
+        heartbeat=HEARTBEAT_TIMEOUT_S,
+        autoping=True,
+        protocols=wire_format.Subprotocols(),
+        compress=compression_threshold > 0,
     )
     await ws.prepare(request)
+    compression = websocket_compression.NegotiatedCompression(ws, compression_threshold)
     logger.info("player connected from : " + request.remote)
     hashed_ip = "UNKNOWN"
     peername = request.transport.get_extra_info("peername")
@@ -1304,7 +1355,12 @@ async def PlayerEndpoint(request):
         port = peername[1]
         hashed_ip = hashlib.md5(ip.encode("utf-8")).hexdigest()
     remote = Remote(hashed_ip, port, 0, 0, time.time(), time.time(), request, ws)
-    remote = dataclasses.replace(remote, user_type=UserType.OPEN)
+    remote = dataclasses.replace(
+        remote,
+        user_type=UserType.OPEN,
+        wire_format=wire_format.NegotiatedWireFormat(ws.ws_protocol),
+        compression=compression,
+    )
 
     if is_bot:
         remote = dataclasses.replace(remote, user_type=UserType.BOT)
@@ -1356,16 +1412,19 @@ async def asset(request):
     return web.FileResponse(assets_map[asset_id])
 
 
-async def serve(config):
+async def serve(config, headless=False):
     # Check if the server/www/WebGL directory exists.
-    if not os.path.isdir(os.path.join(PackageRoot() / "server/www/WebGL")):
+    if headless:
+        # Only the API and websocket endpoints. Used by cb2game.loadtest.
+        logger.info("Headless mode. Not serving the Unity front-end.")
+    elif not os.path.isdir(os.path.join(PackageRoot() / "server/www/WebGL")):
         logger.warning(
             "WebGL directory not found. This directory contains the compiled Unity front-end. You can download it by running `python3 -m cb2game.server.fetch_client` or manually here https://github.com/lil-lab/cb2/releases. You can also compile from source, but this requires installing Unity and getting a license. See game/ for client code and build_client.sh for instructions building the client from headless mode in Unity."
         )
         return
-
-    # Add a route for serving web frontend files on /.
-    routes.static("/", os.path.join(PackageRoot() / "server/www/WebGL"))
+    else:
+        # Add a route for serving web frontend files on /.
+        routes.static("/", os.path.join(PackageRoot() / "server/www/WebGL"))
 
     app = web.Application()
     fernet_key = cryptography.fernet.Fernet.generate_key()
@@ -1435,6 +1494,7 @@ def InitGameRecording(config):
     base.SetDatabase(config)
     base.ConnectDatabase()
     base.CreateTablesIfNotExists(defaults.ListDefaultTables())
+    leaderboard.Leaderboards()  # Load the leaderboard cache before serving.
 
 
 def CreateDataDirectory(config):
@@ -1449,7 +1509,13 @@ def CreateExceptionDirectory(config):
     exception_dir.mkdir(parents=False, exist_ok=True)
 
 
-def main(config_filepath=""):
+def main(config_filepath="", headless=False):
+    """Runs the server.
+
+    Args:
+        config_filepath: Path to the server config (see generate_config.py).
+        headless: Serve without the Unity WebGL front-end. For bots only.
+    """
     global assets_map
     global lobby
 
@@ -1479,6 +1545,7 @@ def main(config_filepath=""):
     CreateExceptionDirectory(GlobalConfig())
     InitGameRecording(GlobalConfig())
     client_exception_logger.set_config(GlobalConfig())
+    atexit.register(InitJobQueue().stop)
 
     lobbies = GetLobbies()
     lobby_coroutines = []
@@ -1486,10 +1553,15 @@ def main(config_filepath=""):
         lobby_coroutines.append(lobby.matchmake())
         lobby_coroutines.append(lobby.cleanup_rooms())
 
+    room_shards = InitRoomShards(GlobalConfig())
+    if room_shards is not None:
+        atexit.register(room_shards.stop)
+        lobby_coroutines.append(room_shards.run())
+
     assets_map = HashCollectAssets(GlobalConfig().assets_directory())
     tasks = asyncio.gather(
         *lobby_coroutines,
-        serve(GlobalConfig()),
+        serve(GlobalConfig(), headless),
         MapGenerationTask(lobbies, GlobalConfig()),
         DataDownloader(lobbies),
         ExceptionSaver(lobbies, GlobalConfig()),
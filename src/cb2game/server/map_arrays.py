@@ -0,0 +1,178 @@
+""" Array-backed map representation.
+
+A MapUpdate is a list of Tile dataclasses, each with a HexCell, HecsCoord and
+HexBoundary. That's convenient, but consumers which want a grid (gym
+observations, pathfinding, rendering) end up rebuilding one from the tile list.
+MapArrays stores the same map as one NumPy array per tile field, indexed by
+offset coordinates [row, col]. Tile objects are only built when asked for.
+
+Convert with MapArrays.from_map_update() and to_map_update(), or use
+MapUpdate.arrays(), which caches the conversion.
+"""
+import logging
+
+import numpy as np
+
+from cb2game.server.assets import AssetId
+from cb2game.server.hex import HecsCoord, HexBoundary, HexCell
+from cb2game.server.messages.action import Color
+from cb2game.server.messages.map_update import MapUpdate, Tile
+
+logger = logging.getLogger(__name__)
+
+
+class MapArrays(object):
+    """A map as a struct of arrays, indexed [row, col].
+
+    Cells without a tile (E.g. outside of the follower's view) have present
+    set to False, asset_id AssetId.NONE, edges -1 and zero for everything else.
+
+    Supports the read-only parts of the MapUpdate interface (rows, cols, tiles,
+    tile_at(), get_edge_between()...), so it can be passed to code written for
+    MapUpdate. The arrays must not be modified after tiles have been read.
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        cols: int,
+        metadata=None,
+        fog_start=None,
+        fog_end=None,
+        color_tint: Color = Color(0, 0, 0, 0),
+    ):
+        self.rows = rows
+        self.cols = cols
+        self.metadata = metadata
+        self.fog_start = fog_start
+        self.fog_end = fog_end
+        self.color_tint = color_tint
+        self.asset_ids = np.full((rows, cols), AssetId.NONE, dtype=np.int16)
+        self.edges = np.full((rows, cols), -1, dtype=np.int8)
+        self.heights = np.zeros((rows, cols), dtype=np.float64)
+        self.layers = np.zeros((rows, cols), dtype=np.int8)
+        self.rotations = np.zeros((rows, cols), dtype=np.int16)
+        self.present = np.zeros((rows, cols), dtype=bool)
+        # Flat (row * cols + col) index of each tile, in MapUpdate order.
+        self.order = np.zeros(0, dtype=np.int32)
+        # Maps from (row, col) -> Tile. Filled in by tile_at_offset().
+        self._tile_cache = {}
+
+    @staticmethod
+    def from_map_update(map_update: MapUpdate):
+        arrays = MapArrays(
+            map_update.rows,
+            map_update.cols,
+            map_update.metadata,
+            map_update.fog_start,
+            map_update.fog_end,
+            map_update.color_tint,
+        )
+        # Recorded map updates may hold None for cells without a tile.
+        tiles = [tile for tile in map_update.tiles if tile is not None]
+
+        def Column(values, dtype):
+            # Much faster than np.array() on a list of tuples.
+            return np.fromiter(values, dtype=dtype, count=len(tiles))
+
+        coords = [tile.cell.coord for tile in tiles]
+        cells = [tile.cell for tile in tiles]
+        rows = Column([coord.r * 2 + coord.a for coord in coords], np.intp)
+        cols = Column([coord.c for coord in coords], np.intp)
+        arrays.asset_ids[rows, cols] = Column(
+            [tile.asset_id for tile in tiles], np.int16
+        )
+        arrays.edges[rows, cols] = Column(
+            [cell.boundary.edges for cell in cells], np.int8
+        )
+        arrays.heights[rows, cols] = Column([cell.height for cell in cells], np.float64)
+        arrays.layers[rows, cols] = Column([cell.layer for cell in cells], np.int8)
+        arrays.rotations[rows, cols] = Column(
+            [tile.rotation_degrees for tile in tiles], np.int16
+        )
+        arrays.present[rows, cols] = True
+        arrays.order = rows * arrays.cols + cols
+        return arrays
+
+    @staticmethod
+    def from_gym_map(map_space):
+        """Converts the "map" part of a gym observation (see envs/cb2.py).
+
+        Like MapUpdate.from_gym_state(), every cell gets a tile, including
+        cells which were outside of the follower's view.
+        """
+        asset_ids = np.asarray(map_space["asset_ids"])
+        rows, cols = asset_ids.shape
+        arrays = MapArrays(rows, cols)
+        arrays.asset_ids[:] = asset_ids
+        arrays.edges[:] = map_space["boundaries"]
+        arrays.heights[:] = map_space["heights"]
+        arrays.layers[:] = map_space["layers"]
+        arrays.rotations[:] = map_space["orientations"]
+        arrays.present[:] = True
+        arrays.order = np.arange(rows * cols, dtype=np.int32)
+        return arrays
+
+    def to_map_update(self) -> MapUpdate:
+        return MapUpdate(
+            self.rows,
+            self.cols,
+            self.tiles,
+            self.metadata,
+            [],
+            self.fog_start,
+            self.fog_end,
+            self.color_tint,
+        )
+
+    @staticmethod
+    def from_json(json_str: str):
+        return MapArrays.from_map_update(MapUpdate.from_json(json_str))
+
+    def to_json(self) -> str:
+        return self.to_map_update().to_json()
+
+    @property
+    def tiles(self):
+        """All tiles, in the order of the MapUpdate this was made from."""
+        return [
+            self.tile_at_offset(*divmod(index, self.cols))
+            for index in self.order.tolist()
+        ]
+
+    def tile_at_offset(self, row: int, col: int):
+        """Returns the tile at the given offset coordinates, or None."""
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        if not self.present[row, col]:
+            return None
+        tile = self._tile_cache.get((row, col))
+        if tile is None:
+            tile = Tile(
+                int(self.asset_ids[row, col]),
+                HexCell(
+                    HecsCoord.from_offset(row, col),
+                    HexBoundary(int(self.edges[row, col])),
+                    float(self.heights[row, col]),
+                    int(self.layers[row, col]),
+                ),
+                int(self.rotations[row, col]),
+            )
+            self._tile_cache[(row, col)] = tile
+        return tile
+
+    def tile_at(self, hecs: HecsCoord):
+        return self.tile_at_offset(*hecs.to_offset_coordinates())
+
+    def get_edge_between(self, hecs_a: HecsCoord, hecs_b: HecsCoord):
+        """Returns true if there is an edge (obstacle) between the two adjacent
+        HECS coordinates. See MapUpdate.get_edge_between()."""
+        tile_a = self.tile_at(hecs_a)
+        tile_b = self.tile_at(hecs_b)
+        if tile_a is None or tile_b is None:
+            return True
+        bound_a = tile_a.cell.boundary
+        bound_b = tile_b.cell.boundary
+        return bound_a.get_edge_between(hecs_a, hecs_b) or bound_b.get_edge_between(
+            hecs_b, hecs_a
+        )
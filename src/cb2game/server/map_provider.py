@@ -1,17 +1,19 @@
 """ This utility streams a hardcoded map to clients. """
 import asyncio
 import dataclasses
+import functools
+import heapq
 import itertools
 import logging
 import math
 import random
 import sys
+from array import array
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
-from queue import Queue
 from typing import List
 
-import numpy as np
 from dataclasses_json import dataclass_json
 
 import cb2game.server.card as card
@@ -46,23 +48,22 @@ class SearchPoint:
     radius: int
 
 
-def place_city(map, city, map_config):
+def place_city(map, city, map_config, rng):
     """Places a city on the map."""
     # Place the center path tile.
-    map[city.r][city.c] = PathTile(map_config=map_config)
+    map[city.r][city.c] = PathTile(map_config=map_config, rng=rng)
     map_height, map_width = map_config.map_height, map_config.map_width
 
     # Make openings to enter and exit the city.
     connection_points = city_connection_points(city, map_config)
     for point in connection_points:
         r, c = point.to_offset_coordinates()
-        map[r][c] = PathTile(0, map_config)
+        map[r][c] = PathTile(0, map_config, rng=rng)
 
-    point_queue = Queue()
-    point_queue.put(SearchPoint(city.r, city.c, 0))
+    point_queue = deque([SearchPoint(city.r, city.c, 0)])
     covered_points = set()
-    while not point_queue.empty():
-        point = point_queue.get()
+    while point_queue:
+        point = point_queue.popleft()
         if (point.r, point.c) in covered_points:
             continue
         covered_points.add((point.r, point.c))
@@ -71,17 +72,17 @@ def place_city(map, city, map_config):
             AssetId.GROUND_TILE,
         ] + NatureAssetIds(map_config=map_config):
             if point.radius % 3 == 0:
-                tile_generator = np.random.choice(
+                tile_generator = rng.choices(
                     [PathTile, GroundTileTree, GroundTileStreetLight],
-                    size=1,
-                    p=[0.3, 0.3, 0.4],
+                    weights=[0.3, 0.3, 0.4],
                 )[0]
                 map[point.r][point.c] = tile_generator(
-                    rotation_degrees=random.choice([0, 60, 120, 180, 240, 300]),
+                    rotation_degrees=rng.choice([0, 60, 120, 180, 240, 300]),
                     map_config=map_config,
+                    rng=rng,
                 )
             elif point.radius % 3 == 1:
-                map[point.r][point.c] = PathTile(0, map_config)
+                map[point.r][point.c] = PathTile(0, map_config, rng=rng)
             elif point.radius % 3 == 2:
                 coord = HecsCoord.from_offset(point.r, point.c)
                 center = HecsCoord.from_offset(city.r, city.c)
@@ -89,6 +90,7 @@ def place_city(map, city, map_config):
                 map[point.r][point.c] = UrbanHouseTile(
                     rotation_degrees=degrees_to_center,
                     map_config=map_config,
+                    rng=rng,
                 )
         hc = HecsCoord.from_offset(point.r, point.c)
         for neighbor in hc.neighbors():
@@ -98,7 +100,7 @@ def place_city(map, city, map_config):
             if nr < 0 or nr >= map_height or nc < 0 or nc >= map_width:
                 continue
             if point.radius < city.size:
-                point_queue.put(SearchPoint(nr, nc, point.radius + 1))
+                point_queue.append(SearchPoint(nr, nc, point.radius + 1))
 
 
 def city_connection_points(city, map_config):
@@ -119,17 +121,16 @@ def city_connection_points(city, map_config):
     return connections
 
 
-def place_circular_lake(map, lake, map_config):
+def place_circular_lake(map, lake, map_config, rng):
     """Places a lake on the map."""
     # Place the center tile.
-    map[lake.r][lake.c] = WaterTile(map_config=map_config)
+    map[lake.r][lake.c] = WaterTile(map_config=map_config, rng=rng)
 
     map_height, map_width = map_config.map_height, map_config.map_width
-    point_queue = Queue()
-    point_queue.put(SearchPoint(lake.r, lake.c, 0))
+    point_queue = deque([SearchPoint(lake.r, lake.c, 0)])
     covered_points = set()
-    while not point_queue.empty():
-        point = point_queue.get()
+    while point_queue:
+        point = point_queue.popleft()
         if (point.r, point.c) in covered_points:
             continue
         covered_points.add((point.r, point.c))
@@ -144,14 +145,14 @@ def place_circular_lake(map, lake, map_config):
             edge_of_map = r == 0 or c == 0 or r == map_height - 1 or c == map_width - 1
             if map[r][c].asset_id in [AssetId.EMPTY_TILE, AssetId.GROUND_TILE]:
                 if (point.radius == lake.size) or edge_of_map:
-                    map[r][c] = PathTile(map_config=map_config)
+                    map[r][c] = PathTile(map_config=map_config, rng=rng)
                 elif map[r][c].asset_id == AssetId.EMPTY_TILE:
-                    map[r][c] = WaterTile(map_config=map_config)
+                    map[r][c] = WaterTile(map_config=map_config, rng=rng)
             if point.radius < lake.size:
-                point_queue.put(SearchPoint(r, c, point.radius + 1))
+                point_queue.append(SearchPoint(r, c, point.radius + 1))
 
 
-def place_l_shaped_lake(map, lake, map_config):
+def place_l_shaped_lake(map, lake, map_config, rng):
     r, c = lake.r, lake.c
     # Each lake configuration is a list of smaller lake epicenters. They are combined to make the larger lake.
     lake_configurations = [
@@ -160,37 +161,32 @@ def place_l_shaped_lake(map, lake, map_config):
         [Lake(r, c, 1), Lake(r, c + 2, 1), Lake(r - 2, c, 1)],
         [Lake(r, c, 1), Lake(r, c - 2, 1), Lake(r + 2, c, 1)],
     ]
-    lake_positions = random.choice(lake_configurations)
+    lake_positions = rng.choice(lake_configurations)
     for lake in lake_positions:
         if not offset_coord_in_map(map, (lake.r, lake.c)):
             continue
-        place_circular_lake(map, lake, map_config)
+        place_circular_lake(map, lake, map_config, rng)
 
 
-def place_island_lake(map, lake, map_config):
+def place_island_lake(map, lake, map_config, rng):
     r, c = lake.r, lake.c
     lake.size = 2
-    place_circular_lake(map, lake, map_config)
-    point_queue = Queue()
-    point_queue.put(SearchPoint(r, c, 0))
+    place_circular_lake(map, lake, map_config, rng)
     center = HecsCoord.from_offset(r, c)
-    map[r][c] = np.random.choice(
+    map[r][c] = rng.choices(
         [GroundTile, RandomNatureTile, GroundTileStreetLight],
-        size=1,
-        p=[0.05, 0.45, 0.5],
-    )[0](map_config=map_config)
+        weights=[0.05, 0.45, 0.5],
+    )[0](map_config=map_config, rng=rng)
     lr, lc = center.left().to_offset_coordinates()
-    map[lr][lc] = np.random.choice(
+    map[lr][lc] = rng.choices(
         [GroundTile, RandomNatureTile, GroundTileStreetLight],
-        size=1,
-        p=[0.9, 0.05, 0.05],
-    )[0](map_config=map_config)
+        weights=[0.9, 0.05, 0.05],
+    )[0](map_config=map_config, rng=rng)
     rr, rc = center.right().to_offset_coordinates()
-    map[rr][rc] = np.random.choice(
+    map[rr][rc] = rng.choices(
         [GroundTile, RandomNatureTile, GroundTileStreetLight],
-        size=1,
-        p=[0.9, 0.05, 0.05],
-    )[0](map_config=map_config)
+        weights=[0.9, 0.05, 0.05],
+    )[0](map_config=map_config, rng=rng)
 
     # Each "bridge" consists of two tiles (tile_inner, tile_outer)
     bridge_points = [
@@ -199,53 +195,52 @@ def place_island_lake(map, lake, map_config):
         (center.down_left(), center.down_left().down_left()),
         (center.down_right(), center.down_right().down_right()),
     ]
-    random.shuffle(bridge_points)
-    number_of_bridges = random.randint(0, 4)
+    rng.shuffle(bridge_points)
+    number_of_bridges = rng.randint(0, 4)
     for i in range(number_of_bridges):
         if len(bridge_points) == 0:
             continue
         inner, outer = bridge_points.pop()
         in_r, in_c = inner.to_offset_coordinates()
         out_r, out_c = outer.to_offset_coordinates()
-        map[in_r][in_c] = GroundTile()
-        map[out_r][out_c] = GroundTile()
+        map[in_r][in_c] = GroundTile(rng=rng)
+        map[out_r][out_c] = GroundTile(rng=rng)
 
     for inner, outer in bridge_points:
         in_r, in_c = inner.to_offset_coordinates()
-        map[in_r][in_c] = np.random.choice(
+        map[in_r][in_c] = rng.choices(
             [GroundTile, RandomNatureTile, GroundTileStreetLight],
-            size=1,
-            p=[0.9, 0.05, 0.05],
-        )[0](map_config=map_config)
+            weights=[0.9, 0.05, 0.05],
+        )[0](map_config=map_config, rng=rng)
 
 
-def random_lake_type():
+def random_lake_type(rng):
     # Do NOT put RANDOM as a return option in this function, or it causes an infinite recursive loop in place_lake below.
     # Just in case you were inattentive and didn't read this, I placed a guard if-statement below it.
-    lake_type = random.choice([LakeType.REGULAR, LakeType.L_SHAPED, LakeType.ISLAND])
+    lake_type = rng.choice([LakeType.REGULAR, LakeType.L_SHAPED, LakeType.ISLAND])
     if lake_type == LakeType.RANDOM:
         logger.warning("RANDOM lake type cannot be returned from random_lake_type().")
         return LakeType.REGULAR
     return lake_type
 
 
-def place_lake(map, lake, map_config):
+def place_lake(map, lake, map_config, rng):
     type = lake.type
     if type == LakeType.RANDOM:
         # Recursive, but guaranteed to terminate.
-        lake.type = random_lake_type()
+        lake.type = random_lake_type(rng)
         if lake.type == LakeType.RANDOM:
             logger.warning(
                 "RANDOM lake type cannot be returned from random_lake_type()."
             )
             lake.type = LakeType.REGULAR
-        place_lake(map, lake, map_config, map_config)
+        place_lake(map, lake, map_config, rng)
     elif type == LakeType.L_SHAPED:
-        place_l_shaped_lake(map, lake, map_config)
+        place_l_shaped_lake(map, lake, map_config, rng)
     elif type == LakeType.ISLAND:
-        place_island_lake(map, lake, map_config)
+        place_island_lake(map, lake, map_config, rng)
     elif type == LakeType.REGULAR:
-        place_circular_lake(map, lake, map_config)
+        place_circular_lake(map, lake, map_config, rng)
 
 
 def lake_connection_points(lake, map_config):
@@ -281,7 +276,7 @@ def offset_coord_in_map(map, offset):
     )
 
 
-def place_small_mountain(map, mountain, map_config: MapConfig):
+def place_small_mountain(map, mountain, map_config: MapConfig, rng):
     mountain_coords = []
     # MountainTile(rotation_degrees=0)
     # RampToMountain(rotation_degrees=0)
@@ -293,7 +288,7 @@ def place_small_mountain(map, mountain, map_config: MapConfig):
     mountain_coords.append(start.down_right())
 
     potential_trees = [start.right(), start.down_left()]
-    trees = random.sample(potential_trees, random.randint(0, len(potential_trees) - 1))
+    trees = rng.sample(potential_trees, rng.randint(0, len(potential_trees) - 1))
 
     for coord in mountain_coords:
         offset = coord.to_offset_coordinates()
@@ -334,10 +329,12 @@ def place_small_mountain(map, mountain, map_config: MapConfig):
             offset = neighbor.to_offset_coordinates()
             if offset_coord_in_map(map, offset):
                 if map[offset[0]][offset[1]].asset_id == AssetId.EMPTY_TILE:
-                    map[offset[0]][offset[1]] = GroundTile(map_config=map_config)
+                    map[offset[0]][offset[1]] = GroundTile(
+                        map_config=map_config, rng=rng
+                    )
 
 
-def place_medium_mountain(map, mountain, map_config: MapConfig):
+def place_medium_mountain(map, mountain, map_config: MapConfig, rng):
     mountain_coords = []
     # MountainTile(rotation_degrees=0)
     # RampToMountain(rotation_degrees=0)
@@ -350,7 +347,7 @@ def place_medium_mountain(map, mountain, map_config: MapConfig):
     mountain_coords.append(start.down_right().down_left())
 
     potential_trees = [start, start.down_right(), start.down_right().down_right()]
-    trees = random.sample(potential_trees, random.randint(0, len(potential_trees) - 1))
+    trees = rng.sample(potential_trees, rng.randint(0, len(potential_trees) - 1))
 
     for coord in mountain_coords:
         offset = coord.to_offset_coordinates()
@@ -393,10 +390,12 @@ def place_medium_mountain(map, mountain, map_config: MapConfig):
             offset = neighbor.to_offset_coordinates()
             if offset_coord_in_map(map, offset):
                 if map[offset[0]][offset[1]].asset_id == AssetId.EMPTY_TILE:
-                    map[offset[0]][offset[1]] = GroundTile(map_config=map_config)
+                    map[offset[0]][offset[1]] = GroundTile(
+                        map_config=map_config, rng=rng
+                    )
 
 
-def place_large_mountain(map, mountain, map_config: MapConfig):
+def place_large_mountain(map, mountain, map_config: MapConfig, rng):
     mountain_coords = []
     # MountainTile(rotation_degrees=0)
     # RampToMountain(rotation_degrees=0)
@@ -412,7 +411,7 @@ def place_large_mountain(map, mountain, map_config: MapConfig):
         start.up_left(),
         start.up_right(),
     ]
-    trees = random.sample(potential_trees, random.randint(0, len(potential_trees) - 1))
+    trees = rng.sample(potential_trees, rng.randint(0, len(potential_trees) - 1))
 
     for coord in mountain_coords:
         offset = coord.to_offset_coordinates()
@@ -453,16 +452,18 @@ def place_large_mountain(map, mountain, map_config: MapConfig):
             offset = neighbor.to_offset_coordinates()
             if offset_coord_in_map(map, offset):
                 if map[offset[0]][offset[1]].asset_id == AssetId.EMPTY_TILE:
-                    map[offset[0]][offset[1]] = GroundTile(map_config=map_config)
+                    map[offset[0]][offset[1]] = GroundTile(
+                        map_config=map_config, rng=rng
+                    )
 
 
-def place_mountain(map, mountain, map_config: MapConfig):
+def place_mountain(map, mountain, map_config: MapConfig, rng):
     if mountain.type == MountainType.SMALL:
-        place_small_mountain(map, mountain, map_config)
+        place_small_mountain(map, mountain, map_config, rng)
     elif mountain.type == MountainType.MEDIUM:
-        place_medium_mountain(map, mountain, map_config)
+        place_medium_mountain(map, mountain, map_config, rng)
     elif mountain.type == MountainType.LARGE:
-        place_large_mountain(map, mountain, map_config)
+        place_large_mountain(map, mountain, map_config, rng)
     else:
         logger.error(f"Unknown mountain type: {mountain.type}")
 
@@ -498,6 +499,28 @@ def mountain_connection_points(map, mountain):
     return connection_points
 
 
+@functools.lru_cache(maxsize=8)
+def neighbor_table(rows, cols):
+    """In-map neighbors of each offset coordinate, as neighbor_table[r][c].
+
+    Neighbors are (r, c) tuples, in the order of HecsCoord.neighbors().
+    """
+    return [
+        [
+            tuple(
+                (nr, nc)
+                for (nr, nc) in (
+                    n.to_offset_coordinates()
+                    for n in HecsCoord.from_offset(r, c).neighbors()
+                )
+                if 0 <= nr < rows and 0 <= nc < cols
+            )
+            for c in range(cols)
+        ]
+        for r in range(rows)
+    ]
+
+
 def path_find(map, start, end, map_config: MapConfig = MapConfig()):
     """Finds a path of empty or ground tiles from start to end on the map.
 
@@ -505,34 +528,64 @@ def path_find(map, start, end, map_config: MapConfig = MapConfig()):
 
     Used for outpost routing.
     """
-    children = Queue()
-    children.put((start, [start]))
-    visited = set()
-    visited.add(start)
-    while not children.empty():
-        (current, path_to_current) = children.get()
+    if end is None:
+        return None
+    passable = set(
+        [AssetId.EMPTY_TILE, AssetId.GROUND_TILE, AssetId.GROUND_TILE_PATH]
+        + NatureAssetIds(map_config=map_config)
+    )
+    neighbors = neighbor_table(len(map), len(map[0]))
+    end = end.to_offset_coordinates()
+    # Breadth-first search. Each visited point links to the point it was
+    # reached from, and the path is read back from end once it's found.
+    parents = {start.to_offset_coordinates(): None}
+    frontier = deque(parents)
+    while frontier:
+        current = frontier.popleft()
         if current == end:
-            return path_to_current
-        (r, c) = current.to_offset_coordinates()
-        for neighbor in current.neighbors():
-            nr, nc = neighbor.to_offset_coordinates()
-            if nr < 0 or nr >= len(map) or nc < 0 or nc >= len(map[0]):
+            path = []
+            while current is not None:
+                path.append(HecsCoord.from_offset(*current))
+                current = parents[current]
+            return path[::-1]
+        for neighbor in neighbors[current[0]][current[1]]:
+            if neighbor in parents:
                 continue
-            neighbor_tile = map[nr][nc]
-            if neighbor_tile.asset_id in [
-                AssetId.EMPTY_TILE,
-                AssetId.GROUND_TILE,
-                AssetId.GROUND_TILE_PATH,
-            ] + NatureAssetIds(map_config=map_config):
-                if neighbor not in visited:
-                    path_to_neighbor = path_to_current + [neighbor]
-                    child_node = (neighbor, path_to_neighbor)
-                    children.put(child_node)
-                    visited.add(neighbor)
+            if map[neighbor[0]][neighbor[1]].asset_id in passable:
+                parents[neighbor] = current
+                frontier.append(neighbor)
     return None
 
 
-def place_outpost(map, outpost, map_config: MapConfig):
+class ConnectionPointIndex(object):
+    """Finds connection points near a point, by bucketing them on a grid.
+
+    Buckets are max_distance wide (in cartesian coordinates), so every point
+    within max_distance of a point is in its bucket or one of the 8 around it.
+    """
+
+    def __init__(self, points, max_distance):
+        self._points = points
+        self._bucket_size = max(max_distance, 1)
+        self._buckets = {}
+        for i, point in enumerate(points):
+            self._buckets.setdefault(self._bucket(point), []).append(i)
+
+    def _bucket(self, point):
+        x, y = point.cartesian()
+        return (math.floor(x / self._bucket_size), math.floor(y / self._bucket_size))
+
+    def nearby(self, point):
+        """Indices of points which might be within max_distance, ascending."""
+        bx, by = self._bucket(point)
+        indices = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                indices.extend(self._buckets.get((bx + dx, by + dy), []))
+        return sorted(indices)
+
+
+def place_outpost(map, outpost, map_config: MapConfig, rng):
     """Place tiles at (r, c), (r + 1, c), (r, c + 2), (r + 1, c + 2)"""
     coords = [
         (outpost.r, outpost.c),
@@ -553,7 +606,7 @@ def place_outpost(map, outpost, map_config: MapConfig):
         map[row][col] = tile
 
     # The outpost positioning purposefully leaves out (r, c+1). This is the center. Mark it as PathTile and then path-connect it to nearest features.
-    map[outpost.r + 2][outpost.c] = PathTile(map_config=map_config)
+    map[outpost.r + 2][outpost.c] = PathTile(map_config=map_config, rng=rng)
 
     # Connect the outpost to the nearest features.
     path_to_a = path_find(
@@ -576,19 +629,23 @@ def place_outpost(map, outpost, map_config: MapConfig):
         for coord in path_to_x:
             offset = coord.to_offset_coordinates()
             if offset_coord_in_map(map, offset):
-                map[offset[0]][offset[1]] = PathTile(map_config=map_config)
+                map[offset[0]][offset[1]] = PathTile(map_config=map_config, rng=rng)
 
 
 def RandomMap(map_config: MapConfig):
-    """Random map of Tile objects, each with HECS coordinates and locations."""
+    """Random map of Tile objects, each with HECS coordinates and locations.
+
+    All randomness comes from a random.Random seeded with map_config.rng_seed
+    (or a random seed, which is saved in the map metadata), so the same seed
+    always generates the same map. The global RNGs aren't used or reseeded.
+    """
     # First, set the RNG seed if specified.
     if map_config.rng_seed is not None:
         start_seed = map_config.rng_seed
     else:
         start_seed = random.randint(0, sys.maxsize)
 
-    # Set the RNG seed.
-    random.seed(start_seed)
+    rng = random.Random(start_seed)
 
     map = []
     for r in range(0, map_config.map_height):
@@ -598,13 +655,13 @@ def RandomMap(map_config: MapConfig):
             row.append(tile)
         map.append(row)
 
-    map_metadata = MapMetadata([], [], [], [], 0, start_seed)
+    map_metadata = MapMetadata(start_seed=start_seed)
 
     # Generate candidates for feature centers.
     rows = list(range(1, map_config.map_height - 2, 6))
     cols = list(range(1, map_config.map_width - 2, 6))
     feature_center_candidates = list(itertools.product(rows, cols))
-    random.shuffle(feature_center_candidates)
+    rng.shuffle(feature_center_candidates)
 
     # Points where an outpost can be connected to.
     connection_points = []
@@ -614,7 +671,7 @@ def RandomMap(map_config: MapConfig):
     ids = IdAssigner()
 
     min_cities, max_cities = map_config.number_of_cities_range
-    number_of_cities = random.randint(min_cities, max_cities)
+    number_of_cities = rng.randint(min_cities, max_cities)
     cities = []
     for i in range(number_of_cities):
         if len(feature_center_candidates) == 0:
@@ -622,7 +679,7 @@ def RandomMap(map_config: MapConfig):
         city_center = feature_center_candidates.pop()
         city = City(city_center[0], city_center[1], 2)
         cities.append(city)
-        place_city(map, city, map_config)
+        place_city(map, city, map_config, rng)
         map_metadata.cities.append(city)
         new_connection_points = city_connection_points(city, map_config)
         connection_points.extend(new_connection_points)
@@ -631,19 +688,17 @@ def RandomMap(map_config: MapConfig):
             connection_point_entity[point] = feature_id
 
     min_lakes, max_lakes = map_config.number_of_lakes_range
-    number_of_lakes = random.randint(min_lakes, max_lakes)
+    number_of_lakes = rng.randint(min_lakes, max_lakes)
     lake_types = [LakeType.ISLAND, LakeType.L_SHAPED, LakeType.REGULAR] * (
         (number_of_lakes // 3) + 1
     )
-    random.shuffle(lake_types)
+    rng.shuffle(lake_types)
     for i in range(number_of_lakes):
         if len(feature_center_candidates) == 0:
             break
         lake_center = feature_center_candidates.pop()
-        lake = Lake(
-            lake_center[0], lake_center[1], random.randint(1, 2), lake_types.pop()
-        )
-        place_lake(map, lake, map_config)
+        lake = Lake(lake_center[0], lake_center[1], rng.randint(1, 2), lake_types.pop())
+        place_lake(map, lake, map_config, rng)
         map_metadata.lakes.append(lake)
         new_connection_points = lake_connection_points(lake, map_config)
         connection_points.extend(new_connection_points)
@@ -652,13 +707,13 @@ def RandomMap(map_config: MapConfig):
             connection_point_entity[point] = feature_id
 
     min_mountains, max_mountains = map_config.number_of_mountains_range
-    number_of_mountains = random.randint(min_mountains, max_mountains)
+    number_of_mountains = rng.randint(min_mountains, max_mountains)
     mountain_types = [MountainType.SMALL, MountainType.MEDIUM, MountainType.LARGE] * (
         number_of_mountains // 3 + 1
     )
     mountain_types = mountain_types[:number_of_mountains]
 
-    random.shuffle(mountain_types)
+    rng.shuffle(mountain_types)
 
     for i in range(number_of_mountains):
         if len(feature_center_candidates) == 0:
@@ -668,9 +723,9 @@ def RandomMap(map_config: MapConfig):
             mountain_center[0],
             mountain_center[1],
             mountain_types.pop(),
-            bool(np.random.choice([True, False], p=[0.3, 0.7])),
+            rng.random() < 0.3,
         )
-        place_mountain(map, mountain, map_config)
+        place_mountain(map, mountain, map_config, rng)
         map_metadata.mountains.append(mountain)
         new_connection_points = mountain_connection_points(map, mountain)
         connection_points.extend(new_connection_points)
@@ -680,14 +735,15 @@ def RandomMap(map_config: MapConfig):
 
     # Add a random number of outposts.
     min_outposts, max_outposts = map_config.number_of_outposts_range
-    number_of_outposts = random.randint(min_outposts, max_outposts)
+    number_of_outposts = rng.randint(min_outposts, max_outposts)
     for i in range(number_of_outposts):
         if len(feature_center_candidates) == 0:
             break
         outpost_center = feature_center_candidates.pop()
         outpost_center_hex = HecsCoord.from_offset(outpost_center[0], outpost_center[1])
-        nearest_connection_points = sorted(
-            connection_points, key=lambda x: x.distance_to(outpost_center_hex)
+        # Same as sorting by distance and taking the first two, ties included.
+        nearest_connection_points = heapq.nsmallest(
+            2, connection_points, key=lambda x: x.distance_to(outpost_center_hex)
         )
         first_connection_point = (
             nearest_connection_points.pop(0)
@@ -705,25 +761,32 @@ def RandomMap(map_config: MapConfig):
             first_connection_point,
             second_connection_point,
             [
-                RandomNatureTile(map_config=map_config),
-                UrbanHouseTile(map_config=map_config),
-                RandomNatureTile(map_config=map_config),
+                RandomNatureTile(map_config=map_config, rng=rng),
+                UrbanHouseTile(map_config=map_config, rng=rng),
+                RandomNatureTile(map_config=map_config, rng=rng),
             ],
         )
         map_metadata.outposts.append(outpost)
-        if random.randint(0, 1) == 0:
+        if rng.randint(0, 1) == 0:
             outpost.tiles.append(
-                UrbanHouseTile(rotation_degrees=180, map_config=map_config)
+                UrbanHouseTile(rotation_degrees=180, map_config=map_config, rng=rng)
             )
-        place_outpost(map, outpost, map_config)
+        place_outpost(map, outpost, map_config, rng)
 
     # For each connection point, see if another connection point is nearby. If so, path connect them.
     number_of_entities = ids.num_allocated()
     connected = [
         [0 for _ in range(number_of_entities)] for _ in range(number_of_entities)
     ]
+    # Only points within path_connection_distance can be connected, so only
+    # nearby points are checked. They're checked in the same order as a scan
+    # over all points would.
+    connection_point_index = ConnectionPointIndex(
+        connection_points, map_config.path_connection_distance
+    )
     for i, connection_i in enumerate(connection_points):
-        for j, connection_j in enumerate(connection_points):
+        for j in connection_point_index.nearby(connection_i):
+            connection_j = connection_points[j]
             if (
                 connection_point_entity[connection_i]
                 == connection_point_entity[connection_j]
@@ -740,7 +803,9 @@ def RandomMap(map_config: MapConfig):
                     for coord in path_to_j:
                         offset = coord.to_offset_coordinates()
                         if offset_coord_in_map(map, offset):
-                            map[offset[0]][offset[1]] = PathTile(map_config=map_config)
+                            map[offset[0]][offset[1]] = PathTile(
+                                map_config=map_config, rng=rng
+                            )
                     connected[entity_i][entity_j] = 1
                     connected[entity_j][entity_i] = 1
 
@@ -766,12 +831,11 @@ def RandomMap(map_config: MapConfig):
                     ):
                         is_near_snow = True
                         break
-                tile_generator = np.random.choice(
+                tile_generator = rng.choices(
                     [GroundTile, RandomNatureTile, GroundTileStreetLight],
-                    size=1,
-                    p=[0.88, 0.10, 0.02],
+                    weights=[0.88, 0.10, 0.02],
                 )[0]
-                tile = tile_generator(map_config=map_config)
+                tile = tile_generator(map_config=map_config, rng=rng)
                 snowify_tile = is_near_snow and tile.asset_id in TreeAssetIds(
                     map_config=map_config
                 )
@@ -789,9 +853,9 @@ def RandomMap(map_config: MapConfig):
 
     if walkable_tiles < 23:
         for i in range(23 - walkable_tiles):
-            blocked_nature_tile = random.choice(blocked_nature_tiles)
+            blocked_nature_tile = rng.choice(blocked_nature_tiles)
             r, c = blocked_nature_tile.cell.coord.to_offset_coordinates()
-            map[r][c] = GroundTile(map_config=map_config)
+            map[r][c] = GroundTile(map_config=map_config, rng=rng)
             blocked_nature_tiles.remove(blocked_nature_tile)
             walkable_tiles += 1
 
@@ -813,8 +877,9 @@ def RandomMap(map_config: MapConfig):
 
 
 class CardGenerator(object):
-    def __init__(self, id_assigner):
+    def __init__(self, id_assigner, rng=random):
         self._id_assigner = id_assigner
+        self._rng = rng
 
     def generate_card_at(self, r, c, shape, color, count):
         return card.Card(
@@ -848,7 +913,7 @@ class CardGenerator(object):
             card.Shape.STAR,
             card.Shape.TRIANGLE,
         ]
-        return random.choice(shapes)
+        return self._rng.choice(shapes)
 
     def random_color(self):
         colors = [
@@ -860,10 +925,138 @@ class CardGenerator(object):
             card.Color.RED,
             card.Color.YELLOW,
         ]
-        return random.choice(colors)
+        return self._rng.choice(colors)
 
     def random_count(self):
-        return random.randint(1, 3)
+        return self._rng.randint(1, 3)
+
+
+class CardSpawnSampler(object):
+    """Weighted sampling of card spawn locations.
+
+    Each location has a fixed integer weight. Occupied locations (which have a
+    card on them) have weight 0 until they're released. The weights are kept in
+    a Fenwick tree, so occupying, releasing and sampling are all O(log n).
+    """
+
+    def __init__(self, locations, weights, indices=None):
+        """If provided, indices maps from location to index in locations. It
+        isn't modified, so it can be shared (see TileStore.layout())."""
+        self._locations = locations
+        if indices is None:
+            indices = {location: i for i, location in enumerate(locations)}
+        self._indices = indices
+        self._weights = array("l", weights)
+        self._occupied = bytearray(len(self._locations))
+        self._total = sum(self._weights)
+        # Fenwick tree (1-indexed), built in O(n).
+        self._tree = array("l", [0]) + self._weights
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def _add(self, index, delta):
+        self._total += delta
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        """Sum of the weights of unoccupied locations."""
+        return self._total
+
+    def set_occupied(self, location, occupied):
+        """Marks a location as (un)occupied. Unknown locations are ignored."""
+        index = self._indices.get(location)
+        if index is None or self._occupied[index] == occupied:
+            return
+        self._occupied[index] = 1 if occupied else 0
+        self._add(index, -self._weights[index] if occupied else self._weights[index])
+
+    def sample(self, rng=random):
+        """Returns a random unoccupied location, chosen with probability
+        proportional to its weight. Returns None if there are none left."""
+        if self._total <= 0:
+            return None
+        # Finds the first index whose prefix sum exceeds target.
+        target = rng.randrange(self._total)
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step > 0:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= target:
+                position = next_position
+                target -= self._tree[position]
+            step >>= 1
+        return self._locations[position]
+
+
+class TileStore(object):
+    """Shares identical tiles between maps.
+
+    Random maps of the same size have tiles at the same coordinates, and there
+    are only a few kinds of boundaries, assets and rotations, so many of their
+    tiles are equal. intern_tiles() replaces each tile with an equal tile from
+    the store, so pooled maps share tiles instead of each keeping its own copy.
+
+    Interned tiles are shared, so they must not be modified. The store keeps
+    every distinct tile it has seen, but that levels off quickly (about 16k
+    tiles after 1000 default-sized maps).
+    """
+
+    def __init__(self):
+        self._coords = {}
+        self._boundaries = {}
+        self._cells = {}
+        self._tiles = {}
+        # Maps from a tuple of tile locations -> (locations, indices).
+        self._layouts = {}
+
+    def intern_tile(self, tile):
+        shared_tile = self._tiles.get(tile)
+        if shared_tile is not None:
+            return shared_tile
+        shared_cell = self._cells.get(tile.cell)
+        if shared_cell is None:
+            coord = tile.cell.coord
+            if coord not in self._coords:
+                self._coords[coord] = HecsCoord(coord.a, coord.r, coord.c)
+            boundary = tile.cell.boundary
+            if boundary not in self._boundaries:
+                self._boundaries[boundary] = HexBoundary(boundary.edges)
+            shared_cell = HexCell(
+                self._coords[coord],
+                self._boundaries[boundary],
+                tile.cell.height,
+                tile.cell.layer,
+            )
+            self._cells[shared_cell] = shared_cell
+        shared_tile = Tile(tile.asset_id, shared_cell, tile.rotation_degrees)
+        self._tiles[shared_tile] = shared_tile
+        return shared_tile
+
+    def intern_tiles(self, tiles):
+        return [self.intern_tile(tile) for tile in tiles]
+
+    def layout(self, tiles):
+        """Returns (locations, indices) for a list of interned tiles.
+
+        locations is a tuple of each tile's coordinate, and indices is a dict
+        from coordinate to tile index. Maps with tiles at the same locations
+        (E.g. all random maps of one size) share them.
+        """
+        locations = tuple(tile.cell.coord for tile in tiles)
+        if locations not in self._layouts:
+            self._layouts[locations] = TileLayout(tiles)
+        return self._layouts[locations]
+
+
+def TileLayout(tiles):
+    """Like TileStore.layout(), for tiles that aren't shared."""
+    locations = tuple(tile.cell.coord for tile in tiles)
+    return locations, {location: i for i, location in enumerate(locations)}
 
 
 class MapType(Enum):
@@ -880,14 +1073,12 @@ class MapProvider(object):
         self._tiles = map_update.tiles
         # TODO(sharf): Need to advance id assigner to latest ID (max of tiles, cards, players)
         self._id_assigner = IdAssigner()
-        self._tiles_by_location = {}
-        for i, tile in enumerate(self._tiles):
-            self._tiles_by_location[tile.cell.coord] = i
+        self._tile_locations, self._tiles_by_location = TileLayout(self._tiles)
         self._rows = map_update.rows
         self._cols = map_update.cols
         self._cards = cards
         self._selected_cards = {}
-        self._card_generator = CardGenerator(self._id_assigner)
+        self._card_generator = CardGenerator(self._id_assigner, self._rng)
 
         # Get fog from server config.
         self._fog_start = map_update.fog_start
@@ -920,6 +1111,7 @@ class MapProvider(object):
                 AssetId.SNOWY_MOUNTAIN_TILE,
             ]
         ]
+        self._init_card_spawn_sampler()
         # Index cards generated.
         self._cards_by_location = {}
         for generated_card in self._cards:
@@ -938,6 +1130,7 @@ class MapProvider(object):
         cards: List[card.Card] = None,
         map_config: MapConfig = MapConfig(),
         custom_targets: List[int] = None,  # List of target card IDs.
+        seed: int = None,
     ):
         """Creates a MapProvider. This handles generating the map, updating the
         map, doing collision detection, generating cards, and detecting when a
@@ -952,13 +1145,30 @@ class MapProvider(object):
         of card IDs which are the targets for the scenario. Selecting these
         cards is the only way to score, and once all of them are selected, the
         scenario ends.
+
+        All randomness (the map, cards and spawn points) comes from a
+        random.Random owned by this provider and seeded with seed (or a random
+        seed, see seed()). Two providers created with the same arguments and
+        seed generate the same map, and the same cards for the same sequence of
+        calls. The global RNGs aren't used, so providers can be created and
+        used from different threads.
         """
+        if seed is None:
+            seed = random.randint(0, sys.maxsize)
+        self._seed = seed
+        self._rng = random.Random(seed)
         self._custom_targets = None
         if (custom_targets is not None) and (len(custom_targets) > 0):
             self._custom_targets = set(custom_targets)
         if map_config is None:
             map_config = GlobalConfig().map_config
         if map_type == MapType.RANDOM:
+            # A fixed seed in the config takes precedence, so that all games
+            # share the same map.
+            if map_config.rng_seed is None:
+                map_config = dataclasses.replace(
+                    map_config, rng_seed=self._rng.randint(0, sys.maxsize)
+                )
             map_update = RandomMap(map_config)
             self._map_metadata = map_update.metadata
         elif map_type == MapType.HARDCODED:
@@ -972,14 +1182,12 @@ class MapProvider(object):
 
         self._id_assigner = IdAssigner()
         self._tiles = map_update.tiles
-        self._tiles_by_location = {}
-        for i, tile in enumerate(self._tiles):
-            self._tiles_by_location[tile.cell.coord] = i
+        self._tile_locations, self._tiles_by_location = TileLayout(self._tiles)
         self._rows = map_update.rows
         self._cols = map_update.cols
         self._cards = []
         self._selected_cards = {}
-        self._card_generator = CardGenerator(self._id_assigner)
+        self._card_generator = CardGenerator(self._id_assigner, self._rng)
 
         # Initialize fog from server config.
         if GlobalConfig():
@@ -993,6 +1201,12 @@ class MapProvider(object):
 
         self.add_map_boundaries()
         self.add_layer_boundaries()
+        if map_type == MapType.RANDOM:
+            # The tiles are final, so they can be shared with other maps.
+            self._tiles = _tile_store.intern_tiles(self._tiles)
+            self._tile_locations, self._tiles_by_location = _tile_store.layout(
+                self._tiles
+            )
         if map_type == MapType.HARDCODED:
             self._cards = []
             list(tutorial_map_data.CARDS)
@@ -1003,6 +1217,9 @@ class MapProvider(object):
                 card_copy = dataclasses.replace(tutorial_card)
                 card_copy.id = self._id_assigner.alloc()
                 self._cards.append(card_copy)
+            # Tutorial cards are scripted, none are spawned randomly.
+            self._potential_spawn_tiles = []
+            self._init_card_spawn_sampler()
         else:
             # Sort through the potential spawn tiles via floodfill and find
             # partitions (regions which are blocked off by walls or edges).
@@ -1029,13 +1246,14 @@ class MapProvider(object):
                     AssetId.SNOWY_MOUNTAIN_TILE,
                 ]
             ]
+            self._init_card_spawn_sampler()
 
             number_of_cards = 21
             number_of_sets = math.ceil(number_of_cards / 3)
             card_spawn_locations = self.choose_card_spawn_locations(number_of_sets * 3)
 
             for _ in range(number_of_sets):
-                card_configs = card.RandomUniqueSet()
+                card_configs = card.RandomUniqueSet(self._rng)
                 for config in card_configs:
                     if len(card_spawn_locations) == 0:
                         break
@@ -1059,36 +1277,44 @@ class MapProvider(object):
     def id_assigner(self):
         return self._id_assigner
 
-    def choose_card_spawn_locations(self, n):
-        """Returns a list of size n of spawn locations for cards. Does not return a location that is actively occupied by an existing card."""
-        card_spawn_weights = [
-            self.calculate_card_spawn_weight(tile)
-            for tile in self._potential_spawn_tiles
-        ]
-
-        # Prevents double-placing of a card (spawning a card on top of an existing card)
-        # Yes this is computationally slower than it could be (O(n) instead of ammortized O(c)), but this doesn't happen often.
-        card_locations = set(
-            [card.location.to_offset_coordinates() for card in self._cards]
+    def seed(self):
+        """Returns the seed of this provider's RNG. Passing it to a new
+        MapProvider (with the same map type and config) replays this one."""
+        return self._seed
+
+    def _init_card_spawn_sampler(self):
+        """Builds the card spawn sampler from the potential spawn tiles. Tiles
+        with existing cards are marked occupied."""
+        # The sampler covers all tiles, so that it can share the map's layout.
+        potential_spawn_tiles = set(id(tile) for tile in self._potential_spawn_tiles)
+        self._card_spawn_sampler = CardSpawnSampler(
+            self._tile_locations,
+            [
+                self.calculate_card_spawn_weight(tile)
+                if id(tile) in potential_spawn_tiles
+                else 0
+                for tile in self._tiles
+            ],
+            self._tiles_by_location,
         )
-        for i, tile_weight in enumerate(
-            zip(self._potential_spawn_tiles, card_spawn_weights)
-        ):
-            if tile_weight[0].cell.coord.to_offset_coordinates() in card_locations:
-                card_spawn_weights[i] = 0
-
-        # Normalize card spawn weights so that they sum to 1.
-        card_spawn_weights = [
-            float(weight) / sum(card_spawn_weights) for weight in card_spawn_weights
-        ]
+        for existing_card in self._cards:
+            self._card_spawn_sampler.set_occupied(existing_card.location, True)
 
-        if n > len(self._potential_spawn_tiles):
-            logger.error("WARNING: Not enough spawn tiles to spawn all cards.")
-            n = len(self._potential_spawn_tiles)
-        spawn_tiles = np.random.choice(
-            self._potential_spawn_tiles, size=n, replace=False, p=card_spawn_weights
-        )
-        return [tile.cell.coord.to_offset_coordinates() for tile in spawn_tiles]
+    def choose_card_spawn_locations(self, n):
+        """Returns a list of up to n spawn locations for cards. Does not return a location that is occupied by an existing card.
+
+        The returned locations are marked occupied, so the caller is expected to
+        place cards on them. They're released when the card is removed.
+        """
+        locations = []
+        for _ in range(n):
+            location = self._card_spawn_sampler.sample(self._rng)
+            if location is None:
+                logger.error("WARNING: Not enough spawn tiles to spawn all cards.")
+                break
+            self._card_spawn_sampler.set_occupied(location, True)
+            locations.append(location.to_offset_coordinates())
+        return locations
 
     def calculate_card_spawn_weight(self, tile):
         if tile.asset_id == AssetId.GROUND_TILE:
@@ -1160,6 +1386,7 @@ class MapProvider(object):
         for card in self._cards:
             if card.id == card_id:
                 del self._cards_by_location[card.location]
+                self._card_spawn_sampler.set_occupied(card.location, False)
         self._cards = [card for card in self._cards if card.id != card_id]
 
     def add_random_cards(self, number_of_cards):
@@ -1180,7 +1407,7 @@ class MapProvider(object):
         """Generates 3 unique cards and adds them to the map. Returns a list of the card objects."""
         card_spawn_locations = self.choose_card_spawn_locations(3)
 
-        unique_set = card.RandomUniqueSet()
+        unique_set = card.RandomUniqueSet(self._rng)
 
         new_cards = []
 
@@ -1201,7 +1428,7 @@ class MapProvider(object):
         # Return a random spawn point.
         if len(self._spawn_points) == 0:
             return None
-        return self._spawn_points.pop(np.random.randint(len(self._spawn_points)))
+        return self._spawn_points.pop(self._rng.randrange(len(self._spawn_points)))
 
     def release_spawn_point(self, coord: HecsCoord):
         self._spawn_points.append(coord)
@@ -1288,17 +1515,21 @@ class MapProvider(object):
 
 MAP_POOL_MAXIMUM = 500
 map_pool = []
+# Tiles of random maps. See TileStore.
+_tile_store = TileStore()
 
 
-def CachedMapRetrieval():
+def CachedMapRetrieval(seed: int = None):
+    """Returns a MapProvider from the map pool, generating one if the pool is
+    empty. If seed is provided, the provider is always generated from it."""
     global map_pool
-    if len(map_pool) == 0:
+    if seed is not None or len(map_pool) == 0:
         logger.debug(f"Map pool ran out of cached maps. Generating...")
         config = GlobalConfig()
         if config:
-            return MapProvider(MapType.RANDOM, map_config=config.map_config)
+            return MapProvider(MapType.RANDOM, map_config=config.map_config, seed=seed)
         else:
-            return MapProvider(MapType.RANDOM)
+            return MapProvider(MapType.RANDOM, seed=seed)
 
     else:
         return map_pool.pop()
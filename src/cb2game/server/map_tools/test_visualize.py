@@ -0,0 +1,73 @@
+"""Unit tests for GameDisplay's cached map rendering."""
+import os
+import unittest
+from unittest import mock
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import pygame
+
+import cb2game.server.map_tools.visualize as visualize
+from cb2game.server.map_provider import MapProvider, MapType
+
+SCREEN_SIZE = 400
+
+
+class GameDisplayTest(unittest.TestCase):
+    def setUp(self):
+        visualize.make_pygame_headless()
+        provider = MapProvider(MapType.RANDOM)
+        self.map_update = provider.map()
+        self.props = [card.prop() for card in provider.cards()]
+        # The icons are git-lfs files, which might not be checked out.
+        patcher = mock.patch.object(
+            pygame.image, "load", side_effect=lambda path: pygame.Surface((8, 8))
+        )
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+        visualize._icon_atlas.clear()
+
+    def draw(self, display):
+        with mock.patch.object(
+            visualize, "draw_tile", wraps=visualize.draw_tile
+        ) as draw_tile:
+            display.draw()
+        return draw_tile.call_count
+
+    def test_map_drawn_once(self):
+        display = visualize.GameDisplay(SCREEN_SIZE)
+        display.set_map(self.map_update)
+        display.set_props(self.props)
+        self.assertEqual(self.draw(display), len(self.map_update.tiles))
+        loads = self.load.call_count
+        self.assertGreater(loads, 0)
+        self.assertEqual(self.draw(display), 0)
+        # Icons are cached across displays of the same cell size.
+        other_display = visualize.GameDisplay(SCREEN_SIZE)
+        other_display.set_map(self.map_update)
+        self.draw(other_display)
+        self.assertEqual(self.load.call_count, loads)
+        self.assertEqual(
+            len(display.tile_coordinates_map()), len(self.map_update.tiles)
+        )
+        # set_map() invalidates the cached layer.
+        display.set_map(self.map_update)
+        self.assertEqual(self.draw(display), len(self.map_update.tiles))
+
+    def test_dynamic_layers_not_cached(self):
+        display = visualize.GameDisplay(SCREEN_SIZE)
+        display.set_map(self.map_update)
+        display.set_props(self.props)
+        display.draw()
+        display.set_props([])
+        display.draw()
+        screen = pygame.image.tostring(display.screen(), "RGB")
+
+        # Re-rendering the map from scratch gives the same frame.
+        display.set_map(self.map_update)
+        display.draw()
+        self.assertEqual(screen, pygame.image.tostring(display.screen(), "RGB"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -277,6 +277,29 @@ def asset_id_to_icon(asset_id):
         return ""
 
 
+# Scaled asset icons, keyed by (asset_id, (width, height)). None if the asset
+# has no icon. Loading and scaling the PNGs used to be most of the cost of
+# drawing a map.
+_icon_atlas = {}
+
+
+def asset_icon_surface(asset_id, width, height):
+    """Returns the icon for asset_id scaled to (width, height), or None."""
+    key = (asset_id, (width, height))
+    if key not in _icon_atlas:
+        icon = None
+        asset_icon = asset_id_to_icon(asset_id)
+        if pathlib.Path(asset_icon).is_file():
+            icon = pygame.transform.scale(
+                pygame.image.load(asset_icon), (width, height)
+            )
+            # Blits are faster in the display's pixel format.
+            if pygame.display.get_surface() is not None:
+                icon = icon.convert_alpha()
+        _icon_atlas[key] = icon
+    return _icon_atlas[key]
+
+
 def draw_wrapped(display, instruction_text, max_width=50):
     words = instruction_text.split(" ")
     lines = []
@@ -464,15 +487,12 @@ def draw_tile(
         boundary,
     )
 
-    asset_icon = asset_id_to_icon(asset_id)
-    if not pathlib.Path(asset_icon).is_file():
-        return
     # Draw the asset label.
-    icon = pygame.image.load(asset_icon)
-    icon.convert()
     icon_width = int(width * 0.8)
     icon_height = int(height * 0.8)
-    icon = pygame.transform.scale(icon, (icon_width, icon_height))
+    icon = asset_icon_surface(asset_id, icon_width, icon_height)
+    if icon is None:
+        return
     screen.blit(icon, (center_x - icon_width / 2, center_y - icon_height / 2))
 
 
@@ -526,6 +546,9 @@ class GameDisplay(object):
         self._instructions = None
         self._selected_tile = None
         self._selected_color = pygame.Color("purple")
+        # The background and map tiles, pre-rendered. Everything else is drawn
+        # on top of this each frame. Cleared by set_map().
+        self._static_layer = None
 
         # Used for interactive applications to select mouse tiles.
         self._map_global_coordinates = {}
@@ -548,7 +571,14 @@ class GameDisplay(object):
         return self._screen
 
     def set_map(self, map):
+        """Sets the map to draw.
+
+        The map is only rendered again after this is called. If you modify the
+        map in place, call this again.
+        """
         self._map = map
+        self._static_layer = None
+        self._map_global_coordinates = {}
         screen_size = self._screen_size - 2 * BORDER
         self._cell_height = screen_size / self._map.rows
         self._cell_width = screen_size / self._map.cols
@@ -561,6 +591,9 @@ class GameDisplay(object):
         if hasattr(map, "props") and map.props:
             self._props = map.props
 
+    def map(self):
+        return self._map
+
     def set_props(self, props: List[Prop]):
         self._props = props
 
@@ -597,47 +630,27 @@ class GameDisplay(object):
     def visualize_map(self):
         if self._map is None:
             return
+        if self._static_layer is None:
+            self._static_layer = self._render_static_layer()
+        self._screen.blit(self._static_layer, (0, 0))
 
-        # Draw the map
+    def _render_static_layer(self):
+        layer = pygame.Surface(self._screen.get_size())
+        layer.fill((255, 255, 255))
         for tile in self._map.tiles:
-            # Get the tile color.
-            asset_id = tile.asset_id
-            color = asset_id_to_color(asset_id)
-
             # Get the center of the hexagonal cell.
-            cell = tile.cell
             (center_x, center_y) = self.transform_to_screen_coords(
-                cell.coord.cartesian()
+                tile.cell.coord.cartesian()
             )
             self._map_global_coordinates[(center_x, center_y)] = tile
-
-            # Get the boundary of the cell.
-            boundary = cell.boundary
-
-            # Draw the cell.
-            draw_hexagon(
-                self._screen,
-                center_x,
-                center_y,
+            draw_tile(
+                layer,
+                tile,
+                (center_x, center_y),
                 self._cell_width,
                 self._cell_height,
-                color,
-                tile.rotation_degrees,
-                boundary,
-            )
-
-            asset_icon = asset_id_to_icon(asset_id)
-            if not pathlib.Path(asset_icon).is_file():
-                continue
-            # Draw the asset label.
-            icon = pygame.image.load(asset_icon)
-            icon.convert()
-            icon_width = int(self._cell_width * 0.8)
-            icon_height = int(self._cell_height * 0.8)
-            icon = pygame.transform.scale(icon, (icon_width, icon_height))
-            self._screen.blit(
-                icon, (center_x - icon_width / 2, center_y - icon_height / 2)
             )
+        return layer
 
     def visualize_props(self):
         if self._props is None:
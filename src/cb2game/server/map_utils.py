@@ -5,8 +5,6 @@ import random
 from enum import Enum
 from queue import Queue
 
-import numpy as np
-
 from cb2game.server.assets import (
     AssetFrequenciesFromTileClass,
     AssetId,
@@ -58,7 +56,13 @@ def ChooseAssetFromTileClass(
     tile_class: TileClass,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
+    """Chooses an asset from the tile class's assets allowed by map_config.
+
+    Tile generators take rng, a random.Random or the random module, so that
+    maps can be generated from a seed (see RandomMap in map_provider.py).
+    """
     frequencies = {
         asset: frequency
         for asset, frequency in zip(
@@ -93,11 +97,7 @@ def ChooseAssetFromTileClass(
     if preference != AssetId.NONE and preference in tiles:
         return preference
     tile_frequencies = [frequencies[tile] for tile in tiles]
-    # Normalize frequencies.
-    frequency_sum = sum(tile_frequencies)
-    for i in range(len(tile_frequencies)):
-        tile_frequencies[i] /= frequency_sum
-    asset_id = int(np.random.choice(tiles, p=tile_frequencies))
+    asset_id = int(rng.choices(tiles, weights=tile_frequencies)[0])
     assert type(asset_id) == int, f"Invalid asset_id type: {asset_id}"
     return asset_id
 
@@ -106,9 +106,12 @@ def GroundTile(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of ground."""
-    asset_id = ChooseAssetFromTileClass(TileClass.GROUND_TILES, map_config, preference)
+    asset_id = ChooseAssetFromTileClass(
+        TileClass.GROUND_TILES, map_config, preference, rng
+    )
     return Tile(
         asset_id,
         HexCell(
@@ -139,9 +142,12 @@ def WaterTile(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of Water."""
-    asset_id = ChooseAssetFromTileClass(TileClass.WATER_TILES, map_config, preference)
+    asset_id = ChooseAssetFromTileClass(
+        TileClass.WATER_TILES, map_config, preference, rng
+    )
     return Tile(
         asset_id,
         HexCell(
@@ -158,9 +164,12 @@ def PathTile(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of Path."""
-    asset_id = ChooseAssetFromTileClass(TileClass.PATH_TILES, map_config, preference)
+    asset_id = ChooseAssetFromTileClass(
+        TileClass.PATH_TILES, map_config, preference, rng
+    )
     return Tile(
         asset_id,
         HexCell(
@@ -177,9 +186,12 @@ def GroundTileStone(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of rocky ground."""
-    asset_id = ChooseAssetFromTileClass(TileClass.STONE_TILES, map_config, preference)
+    asset_id = ChooseAssetFromTileClass(
+        TileClass.STONE_TILES, map_config, preference, rng
+    )
     return Tile(
         asset_id,
         HexCell(
@@ -241,9 +253,12 @@ def GroundTileTree(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of ground with a tree on it."""
-    asset_id = ChooseAssetFromTileClass(TileClass.TREE_TILES, map_config, preference)
+    asset_id = ChooseAssetFromTileClass(
+        TileClass.TREE_TILES, map_config, preference, rng
+    )
     return Tile(
         asset_id,
         HexCell(
@@ -277,10 +292,12 @@ def NatureAssetIds(map_config: MapConfig = MapConfig()):
     return [AssetId[name] for name in asset_names]
 
 
-def RandomNatureTile(rotation_degrees=0, map_config: MapConfig = MapConfig()):
+def RandomNatureTile(
+    rotation_degrees=0, map_config: MapConfig = MapConfig(), rng=random
+):
     """Creates a single tile of nature. Nature tiles are trees, rocks, foliage, etc."""
     return Tile(
-        random.choice(NatureAssetIds(map_config=map_config)),
+        rng.choice(NatureAssetIds(map_config=map_config)),
         HexCell(
             HecsCoord.from_offset(0, 0),
             HexBoundary(0x3F),
@@ -423,10 +440,11 @@ def UrbanHouseTile(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a random house tile (like GroundTileHouse type=HouseType.RANDOM, but with a distribution meant for cities."""
     asset_id = ChooseAssetFromTileClass(
-        TileClass.URBAN_HOUSE_TILES, map_config, preference
+        TileClass.URBAN_HOUSE_TILES, map_config, preference, rng
     )
     return Tile(
         asset_id,
@@ -444,10 +462,11 @@ def GroundTileStreetLight(
     rotation_degrees=0,
     map_config: MapConfig = MapConfig(),
     preference: AssetId = AssetId.NONE,
+    rng=random,
 ):
     """Creates a single tile of ground with a street light."""
     asset_id = ChooseAssetFromTileClass(
-        TileClass.STREETLIGHT_TILES, map_config, preference
+        TileClass.STREETLIGHT_TILES, map_config, preference, rng
     )
     return Tile(
         asset_id,
@@ -0,0 +1,142 @@
+""" Measures server memory use per pooled map and per game room.
+
+Pooled maps are MapProviders as kept in map_provider.map_pool. Rooms are
+local self-play games (see pyclient/local_game_coordinator.py), played with a
+scripted policy until the game ends or max_steps is reached. Reports bytes per
+map and per room, found by walking all objects reachable from them. Objects
+shared between pooled maps (like tiles in the TileStore) are counted once and
+split between them. Room sizes don't include shared tiles, since those are
+paid for by the map pool.
+
+Example usage:
+python3 -m cb2game.server.memory_profile --number_of_maps=100 --number_of_rooms=5
+"""
+import gc
+import logging
+import random
+import sys
+import types
+
+import fire
+
+import cb2game.server.map_provider as map_provider
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.map_provider import MapProvider, MapType
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+
+logger = logging.getLogger(__name__)
+
+# Not counted. These are shared by the whole process.
+SKIPPED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+def DeepSizeOf(objects, exclude=()):
+    """Returns the total size in bytes of all objects reachable from objects.
+
+    Each object is counted once, even if it's reachable from several of them.
+    Objects in exclude (and anything only reachable through them) are skipped.
+    """
+    seen = set(id(obj) for obj in exclude)
+    stack = list(objects)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def Reachable(objects):
+    """Returns all objects reachable from objects."""
+    seen = {}
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIPPED_TYPES):
+            continue
+        seen[id(obj)] = obj
+        stack.extend(gc.get_referents(obj))
+    return list(seen.values())
+
+
+def PooledMapBytes(number_of_maps):
+    maps = [MapProvider(MapType.RANDOM, seed=seed) for seed in range(number_of_maps)]
+    return DeepSizeOf(maps + [map_provider._tile_store]) / number_of_maps
+
+
+def PlayGame(endpoint_pair, max_steps, rng):
+    """Plays a game with random moves. The leader sends an instruction each
+    turn, and the follower completes it after using up its moves."""
+    endpoint_pair.initialize()
+    _, _, turn_state, instructions, _, _ = endpoint_pair.initial_state()
+    for _ in range(max_steps):
+        if endpoint_pair.over():
+            break
+        active = [i for i in instructions if not i.completed and not i.cancelled]
+        if turn_state.moves_remaining > 0:
+            action = rng.choice([Action.Forwards(), Action.Left(), Action.Right()])
+        elif turn_state.turn == Role.LEADER:
+            action = (
+                Action.EndTurn()
+                if len(active) > 0
+                else Action.SendInstruction("Pick up the cards.")
+            )
+        elif len(active) > 0:
+            action = Action.InstructionDone(active[0].uuid)
+        else:
+            action = Action.NoopAction()
+        _, _, turn_state, instructions, _, _ = endpoint_pair.step(action)
+
+
+def RoomBytes(number_of_rooms, max_steps):
+    """Returns (bytes per room, bytes per room excluding its map)."""
+    config = Config(comment="Memory Profile Config")
+    SetGlobalConfig(config)
+    SetDatabaseForTesting()
+    ConnectDatabase()
+    CreateTablesIfNotExists(ListDefaultTables())
+    lobby = OpenLobby(
+        LobbyInfo("Memory Profile", LobbyType.OPEN, "Memory profile", 40, 1, False)
+    )
+    coordinator = LocalGameCoordinator(config)
+    states = []
+    for i in range(number_of_rooms):
+        game_name = coordinator.CreateGame(log_to_db=False, lobby=lobby, seed=i)
+        PlayGame(EndpointPair(coordinator, game_name), max_steps, random.Random(i))
+        states.append(coordinator._game_drivers[game_name].state_machine())
+    shared = Reachable([map_provider._tile_store])
+    room_bytes = DeepSizeOf(states, exclude=[lobby] + shared)
+    map_bytes = DeepSizeOf([state._map_provider for state in states], exclude=shared)
+    return room_bytes / number_of_rooms, (room_bytes - map_bytes) / number_of_rooms
+
+
+def main(number_of_maps=100, number_of_rooms=5, max_steps=200):
+    logging.basicConfig(level=logging.WARNING)
+    print(f"{'bytes/pooled map':<28}{PooledMapBytes(number_of_maps):>12.0f}")
+    room_bytes, state_bytes = RoomBytes(number_of_rooms, max_steps)
+    print(f"{'bytes/room':<28}{room_bytes:>12.0f}")
+    print(f"{'bytes/room, excluding map':<28}{state_bytes:>12.0f}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
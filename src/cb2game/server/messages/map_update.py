@@ -5,7 +5,7 @@ from typing import List, Optional
 
 from mashumaro.mixins.json import DataClassJSONMixin
 
-from cb2game.server.hex import HecsCoord, HexBoundary, HexCell
+from cb2game.server.hex import HecsCoord, HexCell
 from cb2game.server.messages.action import Color
 from cb2game.server.messages.prop import Prop, PropUpdate
 
@@ -103,25 +103,28 @@ class MapUpdate(DataClassJSONMixin):
     @staticmethod
     def from_gym_state(observation):
         """Converts a gym space to a MapUpdate."""
-        map_space = observation["map"]
-        rows, cols = len(map_space["asset_ids"]), len(map_space["asset_ids"][0])
-        tiles = []
-        for r in range(rows):
-            for c in range(cols):
-                coord = HecsCoord.from_offset(r, c)
-                boundary = HexBoundary(map_space["boundaries"][r][c])
-                height = map_space["heights"][r][c]
-                layer = map_space["layers"][r][c]
-                cell = HexCell(coord, boundary, height, layer)
-                tiles.append(
-                    Tile(
-                        map_space["asset_ids"][r][c],
-                        cell,
-                        map_space["orientations"][r][c],
-                    )
-                )
+        from cb2game.server.map_arrays import MapArrays
+
+        map_arrays = MapArrays.from_gym_map(observation["map"])
         prop_update = PropUpdate.from_gym_state(observation)
-        return MapUpdate(rows, cols, tiles, None, prop_update.props)
+        return MapUpdate(
+            map_arrays.rows,
+            map_arrays.cols,
+            map_arrays.tiles,
+            None,
+            prop_update.props,
+        )
+
+    def arrays(self):
+        """Returns this map as a MapArrays (see server/map_arrays.py).
+
+        The conversion is cached, so don't modify the tiles after calling this.
+        """
+        if not hasattr(self, "_arrays"):
+            from cb2game.server.map_arrays import MapArrays
+
+            self._arrays = MapArrays.from_map_update(self)
+        return self._arrays
 
     def get_edge_between(self, hecs_a: HecsCoord, hecs_b: HecsCoord):
         """Returns the edge between the two given HECS coordinates.
@@ -16,7 +16,7 @@ from cb2game.server.messages.google_auth import GoogleAuthConfirmation
 from cb2game.server.messages.live_feedback import LiveFeedback
 from cb2game.server.messages.map_update import MapUpdate
 from cb2game.server.messages.menu_options import MenuOptions
-from cb2game.server.messages.objective import ObjectiveMessage
+from cb2game.server.messages.objective import ObjectiveMessage, ObjectiveUpdate
 from cb2game.server.messages.prop import Prop, PropUpdate
 from cb2game.server.messages.replay_messages import ReplayResponse
 from cb2game.server.messages.rooms import RoomManagementResponse
@@ -56,6 +56,9 @@ class MessageType(Enum):
     # Prompt the follower with feedback questions.
     SOUND_TRIGGER = 18
     FEEDBACK_QUESTION = 19
+    # Incremental objective list update. Only sent to clients that asked for
+    # them, other clients get the full list in OBJECTIVE messages.
+    OBJECTIVE_UPDATE = 20
 
 
 def ActionsFromServer(actions):
@@ -128,6 +131,14 @@ def ObjectivesFromServer(texts: List[ObjectiveMessage]):
     )
 
 
+def ObjectiveUpdateFromServer(objective_update: ObjectiveUpdate):
+    return MessageFromServer(
+        datetime.utcnow(),
+        MessageType.OBJECTIVE_UPDATE,
+        objective_update=objective_update,
+    )
+
+
 def GameStateFromServer(game_state):
     return MessageFromServer(
         datetime.utcnow(),
@@ -479,3 +490,6 @@ class MessageFromServer(DataClassJSONMixin):
     feedback_question: Optional[FeedbackQuestion] = field(
         default=None, metadata=config(exclude=ExcludeIfNone)
     )
+    objective_update: Optional[ObjectiveUpdate] = field(
+        default=None, metadata=config(exclude=ExcludeIfNone)
+    )
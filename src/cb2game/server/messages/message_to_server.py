@@ -43,6 +43,10 @@ class MessageType(Enum):
     FEEDBACK_RESPONSE = 15
     CLIENT_EXCEPTION = 16
     BUTTON_PRESS = 17
+    # Asks for the full objective list, followed by incremental
+    # OBJECTIVE_UPDATE messages instead of full OBJECTIVE lists. Also sent to
+    # recover when the client's objective list is out of sync.
+    OBJECTIVE_SYNC_REQUEST = 18
 
 
 @dataclass(frozen=True)
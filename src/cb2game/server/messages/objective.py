@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List
 
 from mashumaro.mixins.json import DataClassJSONMixin
 
@@ -43,3 +44,22 @@ class ObjectiveMessage(DataClassJSONMixin):
 @dataclass(frozen=True)
 class ObjectiveCompleteMessage(DataClassJSONMixin):
     uuid: str = ""
+
+
+@dataclass
+class ObjectiveUpdate(DataClassJSONMixin):
+    """Incremental update to a client's objective list.
+
+    Objectives are identified by uuid. Objectives the client already has are
+    replaced, and new ones are appended. The update applies to a client whose
+    list is at base_version, and brings it to version. If full is set,
+    objectives is the entire list and replaces the client's list.
+
+    Only sent to clients which asked for them with an OBJECTIVE_SYNC_REQUEST.
+    See server/objective_updates.py.
+    """
+
+    version: int = 0
+    base_version: int = 0
+    full: bool = False
+    objectives: List[ObjectiveMessage] = field(default_factory=list)
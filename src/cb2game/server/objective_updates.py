@@ -0,0 +1,93 @@
+""" Incremental objective list updates.
+
+By default, every change to the objective list (new instructions, completed
+or cancelled instructions, live feedback counts) resends the entire list to
+every player. Clients which send an OBJECTIVE_SYNC_REQUEST instead get the
+full list once, and afterwards only the objectives which changed, as
+versioned ObjectiveUpdate messages. If a client notices that it missed an
+update, it sends another OBJECTIVE_SYNC_REQUEST to get the full list again.
+
+ObjectiveUpdateStream is the server side (one per client), and
+ApplyObjectiveUpdate is the client side.
+"""
+import dataclasses
+from typing import List, Optional, Tuple
+
+from cb2game.server.messages.objective import ObjectiveMessage, ObjectiveUpdate
+
+
+class ObjectiveUpdateStream(object):
+    """Tracks the objective list that one client has.
+
+    next_update() is given the objective list that the client should see, and
+    returns an update with the objectives that differ from what was last sent.
+    """
+
+    def __init__(self):
+        self._version = 0
+        # Maps from uuid -> copy of the objective as last sent. In client order.
+        self._sent = {}
+        self._full_resend = True
+
+    def request_full_resend(self):
+        self._full_resend = True
+
+    def next_update(
+        self, objectives: List[ObjectiveMessage]
+    ) -> Optional[ObjectiveUpdate]:
+        """Returns the update to send to the client, or None if it's up to date."""
+        uuids = [objective.uuid for objective in objectives]
+        # Objectives are only ever appended or modified. If any were removed or
+        # reordered (E.g. when a scenario is loaded), resend the whole list.
+        if len(set(uuids)) != len(uuids):
+            self._full_resend = True
+        elif list(self._sent) != uuids[: len(self._sent)]:
+            self._full_resend = True
+        if self._full_resend:
+            self._sent = {}
+            changed = objectives
+        else:
+            changed = [
+                objective
+                for objective in objectives
+                if self._sent.get(objective.uuid) != objective
+            ]
+            if len(changed) == 0:
+                return None
+        # Objectives are modified in place by the state machine, so copy them.
+        changed = [dataclasses.replace(objective) for objective in changed]
+        for objective in changed:
+            self._sent[objective.uuid] = objective
+        update = ObjectiveUpdate(
+            version=self._version + 1,
+            base_version=self._version,
+            full=self._full_resend,
+            objectives=changed,
+        )
+        self._version += 1
+        self._full_resend = False
+        return update
+
+
+def ApplyObjectiveUpdate(
+    objectives: List[ObjectiveMessage], version: int, update: ObjectiveUpdate
+) -> Optional[Tuple[List[ObjectiveMessage], int]]:
+    """Applies an update to a client's objective list at the given version.
+
+    Returns the new (objectives, version), or None if the update doesn't apply
+    to this version. In that case the client is out of sync and should send an
+    OBJECTIVE_SYNC_REQUEST.
+    """
+    if update.full:
+        return list(update.objectives), update.version
+    if update.base_version != version:
+        return None
+    objectives = list(objectives)
+    indices = {objective.uuid: i for i, objective in enumerate(objectives)}
+    for objective in update.objectives:
+        if objective.uuid in indices:
+            objectives[indices[objective.uuid]] = objective
+        else:
+            indices[objective.uuid] = len(objectives)
+            objectives.append(objective)
+    return objectives, update.version
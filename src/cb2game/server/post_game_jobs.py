@@ -0,0 +1,46 @@
+""" Bookkeeping done when a game ends, run by the job queue (job_queue.py). """
+import logging
+
+import cb2game.server.db_tools.db_utils as db_utils
+import cb2game.server.google_experience as google_experience
+import cb2game.server.leaderboard as leaderboard
+import cb2game.server.mturk_experience as mturk_experience
+from cb2game.server.job_queue import EnqueueJob, JobHandler
+from cb2game.server.schemas.game import Game
+
+logger = logging.getLogger(__name__)
+
+GAME_SUMMARY = "game_summary"
+LEADERBOARD = "leaderboard"
+MTURK_EXPERIENCE = "mturk_experience"
+GOOGLE_EXPERIENCE = "google_experience"
+
+
+def EnqueuePostGameJobs(game_record):
+    for kind in [GAME_SUMMARY, LEADERBOARD, MTURK_EXPERIENCE, GOOGLE_EXPERIENCE]:
+        EnqueueJob(kind, game_id=game_record.id)
+
+
+def _GameOrDie(game_id):
+    # Raising retries the job later.
+    return Game.get(Game.id == game_id)
+
+
+@JobHandler(GAME_SUMMARY)
+def SaveGameSummary(game_id):
+    db_utils.SaveGameSummary(_GameOrDie(game_id))
+
+
+@JobHandler(LEADERBOARD)
+def UpdateLeaderboard(game_id):
+    leaderboard.UpdateLeaderboard(_GameOrDie(game_id))
+
+
+@JobHandler(MTURK_EXPERIENCE)
+def UpdateWorkerExperienceTable(game_id):
+    mturk_experience.UpdateWorkerExperienceTable(_GameOrDie(game_id))
+
+
+@JobHandler(GOOGLE_EXPERIENCE)
+def UpdateGoogleUserExperienceTable(game_id):
+    google_experience.UpdateGoogleUserExperienceTable(_GameOrDie(game_id))
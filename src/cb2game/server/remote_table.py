@@ -3,12 +3,15 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 import aiohttp
+import aiohttp.web
 import dateutil
 from dataclasses_json import config, dataclass_json
 from marshmallow import fields
 
 import cb2game.server.schemas.clients as clients_db
 from cb2game.server.messages.user_info import UserType
+from cb2game.server.websocket_compression import CompressionStats
+from cb2game.server.wire_format import WireFormat
 
 # A table of active websocket connections. Maps from aiohttp.WebSocketResponse
 # to Remote (defined below).
@@ -85,6 +88,10 @@ class Remote:
     time_offset: float = 0.0
     latency: float = 0.0
     uuid: str = ""
+    # Message encoding negotiated when the websocket connected.
+    wire_format: WireFormat = WireFormat.JSON_TEXT
+    # Websocket compression settings and stats. See websocket_compression.py.
+    compression: CompressionStats = field(default_factory=CompressionStats)
 
     def __str__(self):
         return f"m5sum hashed ip: {self.hashed_ip}, bytes (up/down): {self.bytes_up}/{self.bytes_down}, last message (up/down): {self.last_message_up}/{self.last_message_down}, time_offset: {self.time_offset}, latency: {self.latency}"
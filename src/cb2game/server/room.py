@@ -176,13 +176,18 @@ class Room(object):
     def game_record(self):
         return self._game_record
 
-    def add_player(self, ws, role):
-        """Adds a player to the room."""
+    def add_player(self, ws, role, remote=None):
+        """Adds a player to the room.
+
+        remote defaults to the remote_table entry of ws. Room shards pass it
+        explicitly, as the websocket lives in another process.
+        """
         if self.is_full():
             raise ValueError("Room is full.")
         state_machine = self._state_machine_driver.state_machine()
         id = state_machine.create_actor(role)
-        remote = GetRemote(ws)
+        if remote is None:
+            remote = GetRemote(ws)
 
         # Fetch the leader and follower user information.
         if remote != None and self._room_type not in [
@@ -281,6 +286,10 @@ class Room(object):
         self._update_loop = asyncio.create_task(self._state_machine_driver.run())
         logging.info(f"Room {self.id()} started game.")
 
+    def set_message_listener(self, listener):
+        """See StateMachineDriver.set_message_listener()."""
+        self._state_machine_driver.set_message_listener(listener)
+
     def scenario_id(self) -> str:
         return self._state_machine_driver.state_machine().scenario_id()
 
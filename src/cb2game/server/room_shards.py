@@ -0,0 +1,804 @@
+""" Runs game rooms in worker processes, to use more than one CPU core.
+
+By default, every room's state machine runs in the server's asyncio process.
+If the config sets room_shards > 0, the server starts that many worker
+processes (room shards) at startup. The main process keeps serving HTTP,
+authentication, websockets and matchmaking, and each room is created on the
+shard with the fewest rooms. The lobby holds a ShardedRoom in place of the
+Room, which forwards calls to the shard over two pipes:
+
+- Control pipe: Requests which need an answer (status queries). Requests are
+  tagged with an ID, and the main process awaits the reply without blocking
+  its event loop. Late replies to requests which timed out are dropped.
+- Data pipe: Room creation, players joining and leaving, and player messages
+  to the room. In the other direction, messages to players and room status
+  updates. Shards encode messages in each player's wire format before sending
+  them, so the main process only copies bytes to websockets.
+
+Nothing on the data pipe waits for an answer. The main process assigns player
+IDs itself, and the shard maps them to the IDs of its room's actors. Room
+state and debug info are snapshots, refreshed by RoomShards.status().
+
+Game records are written by the shards. Post-game jobs (leaderboard,
+experience tables) are queued in the database by the shards, and run by the
+main process's job queue. The main process serves the leaderboard from memory.
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime
+
+import cb2game.server.schemas.game as game_db
+from cb2game.server.job_queue import InitJobQueue
+from cb2game.server.messages.user_info import UserType
+from cb2game.server.remote_table import GetRemote
+from cb2game.server.room import Room, RoomType
+from cb2game.server.wire_format import EncodeMessage, WireFormat
+
+logger = logging.getLogger(__name__)
+
+# How long the main process waits for a shard to answer a control request.
+CONTROL_TIMEOUT_S = 10
+
+# Seconds between checks that shards are alive, and between shard cleanups.
+MONITOR_PERIOD_S = 1
+
+
+@dataclass(frozen=True)
+class RemoteInfo:
+    """The parts of remote_table.Remote which Room.add_player() reads."""
+
+    hashed_ip: str = ""
+    client_port: int = 0
+    user_type: UserType = UserType.NONE
+    google_id: str = None
+    # Not read by Room. Shards encode messages to the player in this format.
+    wire_format: WireFormat = WireFormat.JSON_TEXT
+
+    @staticmethod
+    def FromRemote(remote):
+        if remote is None:
+            return None
+        return RemoteInfo(
+            remote.hashed_ip,
+            remote.client_port,
+            remote.user_type,
+            remote.google_id,
+            remote.wire_format,
+        )
+
+
+class RoomShardExited(Exception):
+    """Reported as the exception of rooms whose shard process died."""
+
+
+class RoomNotInitialized(Exception):
+    """Reported as the exception of rooms which the shard failed to create."""
+
+
+def RoomName(id, type):
+    return "Room #" + str(id) + ("(TUTORIAL)" if type == RoomType.TUTORIAL else "")
+
+
+class ShardedRoom(object):
+    """Stands in for a Room hosted by a room shard.
+
+    Implements the Room methods used by lobbies and the server. Player
+    endpoints and roles are tracked locally. Messages to players arrive already
+    serialized, so fill_messages() returns bytes. None of the methods wait for
+    the shard. If the shard fails to create the room, it's reported as the
+    room's exception.
+    """
+
+    def __init__(self, shard, handle, name, room_id, game_record):
+        self._shard = shard
+        self._handle = handle
+        self._name = name
+        self._id = room_id
+        self._game_record = game_record
+        self._start_time = datetime.utcnow()
+        self._next_player_id = 0
+        self._players = []
+        self._player_endpoints = []
+        self._player_roles = {}  # player ID -> Role.
+        self._outboxes = {}  # player ID -> list of serialized messages.
+        # Last status reported by the shard.
+        self._done = False
+        self._shard_has_pending_messages = False
+        self._exception = None
+        self._traceback = None
+        self._scenario_id = ""
+        # Last snapshot from RoomShards.status().
+        self._state = None
+        self._debug_status = None
+
+    def initialized(self):
+        return True
+
+    def game_record(self):
+        return self._game_record
+
+    def add_player(self, ws, role):
+        if self.is_full():
+            raise ValueError("Room is full.")
+        remote = RemoteInfo.FromRemote(GetRemote(ws))
+        id = self._next_player_id
+        self._next_player_id += 1
+        self._shard.send("add_player", self._handle, id, role, remote)
+        self._players.append(id)
+        self._player_endpoints.append(ws)
+        self._player_roles[id] = role
+        self._outboxes[id] = []
+        return id
+
+    def remove_player(self, id, ws, disconnected=False):
+        if id not in self._players:
+            logger.error(
+                f"Attempted to remove player {id} from room {self._id} but player was not in room."
+            )
+            return
+        self._players.remove(id)
+        if ws in self._player_endpoints:
+            self._player_endpoints.remove(ws)
+        self._shard.send("remove_player", self._handle, id, disconnected)
+
+    def player_endpoints(self):
+        return self._player_endpoints
+
+    def player_role(self, player_id):
+        return self._player_roles[player_id]
+
+    def number_of_players(self):
+        return len(self._players)
+
+    def drain_messages(self, id, messages):
+        self._shard.send("drain_messages", self._handle, id, messages)
+
+    def start(self):
+        # The shard starts rooms when it creates them.
+        pass
+
+    def stop(self):
+        self._shard.send("stop", self._handle)
+
+    def scenario_id(self) -> str:
+        """The scenario ID last reported by the shard (scenario rooms only)."""
+        return self._scenario_id
+
+    def has_exception(self):
+        return self._exception is not None
+
+    def exception(self):
+        return self._exception
+
+    def traceback(self):
+        return self._traceback
+
+    def set_scenario(self, scenario):
+        self._call("set_scenario", scenario)
+
+    def done(self):
+        return self._done
+
+    def game_time(self):
+        return datetime.utcnow() - self._start_time
+
+    def has_pending_messages(self):
+        return self._shard_has_pending_messages or any(self._outboxes.values())
+
+    def desync(self, id):
+        self._shard.send("desync", self._handle, id)
+
+    def desync_all(self):
+        self._call("desync_all")
+
+    def is_full(self):
+        return len(self._players) == 2
+
+    def is_empty(self):
+        return len(self._players) == 0
+
+    def state(self):
+        """The room's state as of the last RoomShards.status(), or None."""
+        return self._state
+
+    def debug_status(self):
+        """Room.debug_status() as of the last RoomShards.status(), or None."""
+        return self._debug_status
+
+    def fill_messages(self, player_id, out_messages):
+        outbox = self._outboxes.get(player_id, None)
+        if not outbox:
+            return False
+        out_messages.extend(outbox)
+        outbox.clear()
+        return True
+
+    def id(self):
+        return self._id
+
+    def name(self):
+        return self._name
+
+    def _call(self, method, *args):
+        self._shard.send("call", self._handle, method, args)
+
+    # Called by RoomShard with updates from the shard process.
+    def _receive_messages(self, player_id, messages):
+        if player_id in self._outboxes:
+            self._outboxes[player_id].extend(messages)
+
+    def _receive_status(
+        self, done, has_pending_messages, scenario_id, exception, traceback
+    ):
+        self._done = done
+        self._shard_has_pending_messages = has_pending_messages
+        self._scenario_id = scenario_id
+        if exception is not None:
+            self._exception = exception
+            self._traceback = traceback
+
+    def _receive_snapshot(self, state, debug_status):
+        self._state = state
+        self._debug_status = debug_status
+
+
+class RoomShard(object):
+    """Handle to one room shard process, used by the main process."""
+
+    def __init__(self, index, config, context):
+        self._index = index
+        self._control, shard_control = context.Pipe()
+        self._data, shard_data = context.Pipe()
+        self._process = context.Process(
+            target=RunShard,
+            args=(index, config, shard_control, shard_data),
+            name=f"room-shard-{index}",
+            daemon=True,
+        )
+        self._shard_ends = [shard_control, shard_data]
+        self._rooms = {}  # handle -> ShardedRoom
+        self._next_request_id = 0
+        self._pending_requests = {}  # request ID -> future of (error, result)
+        self._exited = False
+
+    def index(self):
+        return self._index
+
+    def number_of_rooms(self):
+        return len(self._rooms)
+
+    def alive(self):
+        return self._process.is_alive()
+
+    def start(self):
+        self._process.start()
+        for end in self._shard_ends:
+            end.close()
+
+    def listen(self, loop):
+        loop.add_reader(self._data.fileno(), self._receive)
+        loop.add_reader(self._control.fileno(), self._receive_control)
+
+    def create_room(
+        self, handle, lobby, id, game_record, type, tutorial_name, from_event
+    ):
+        game_id = game_record.id if game_record is not None else None
+        self.send(
+            "create_room",
+            handle,
+            lobby.lobby_name(),
+            id,
+            game_id,
+            type,
+            tutorial_name,
+            from_event,
+        )
+        room = ShardedRoom(self, handle, RoomName(id, type), id, game_record)
+        self._rooms[handle] = room
+        return room
+
+    async def request(self, op, *args):
+        """Sends a control request and waits for the answer."""
+        if self._exited:
+            raise RoomShardExited(f"Room shard {self._index} exited.")
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        future = asyncio.get_event_loop().create_future()
+        self._pending_requests[request_id] = future
+        try:
+            self._control.send((request_id, op) + args)
+            error, result = await asyncio.wait_for(future, CONTROL_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Room shard {self._index} did not answer {op}.")
+        finally:
+            self._pending_requests.pop(request_id, None)
+        if error is not None:
+            raise RuntimeError(f"Room shard {self._index} {op} failed: {error}")
+        return result
+
+    async def status(self):
+        """Returns the shard's status, and refreshes its rooms' snapshots."""
+        status = await self.request("status")
+        for handle, (state, debug_status) in status.pop("rooms").items():
+            if handle in self._rooms:
+                self._rooms[handle]._receive_snapshot(state, debug_status)
+        return status
+
+    def send(self, op, *args):
+        """Sends a data message. Doesn't wait for the shard to process it."""
+        if self._exited:
+            return
+        self._data.send((op,) + args)
+
+    def stop(self):
+        if self.alive():
+            try:
+                self.send("shutdown")
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(timeout=5)
+        if self.alive():
+            self._process.terminate()
+
+    def check_exited(self):
+        """Ends this shard's rooms if the shard process died."""
+        if self._exited or self.alive():
+            return
+        logger.error(
+            f"Room shard {self._index} exited with code {self._process.exitcode}."
+        )
+        self._exited = True
+        for future in self._pending_requests.values():
+            if not future.done():
+                future.set_exception(
+                    RoomShardExited(f"Room shard {self._index} exited.")
+                )
+        for room in self._rooms.values():
+            room._receive_status(
+                True,
+                False,
+                room.scenario_id(),
+                RoomShardExited(f"Room shard {self._index} exited."),
+                "",
+            )
+
+    def _receive(self):
+        try:
+            while self._data.poll():
+                message = self._data.recv()
+                self._handle_message(*message)
+        except (EOFError, OSError):
+            asyncio.get_event_loop().remove_reader(self._data.fileno())
+            self.check_exited()
+
+    def _receive_control(self):
+        try:
+            while self._control.poll():
+                request_id, error, result = self._control.recv()
+                future = self._pending_requests.get(request_id, None)
+                if future is None or future.done():
+                    logger.warning(
+                        f"Dropped late reply to request {request_id} from room shard {self._index}."
+                    )
+                    continue
+                future.set_result((error, result))
+        except (EOFError, OSError):
+            asyncio.get_event_loop().remove_reader(self._control.fileno())
+            self.check_exited()
+
+    def _handle_message(self, op, *args):
+        if op == "messages":
+            handle, player_id, messages = args
+            if handle in self._rooms:
+                self._rooms[handle]._receive_messages(player_id, messages)
+        elif op == "status":
+            handle = args[0]
+            if handle in self._rooms:
+                self._rooms[handle]._receive_status(*args[1:])
+        elif op == "closed":
+            self._rooms.pop(args[0], None)
+        else:
+            logger.warning(f"Unknown message from room shard {self._index}: {op}")
+
+
+class RoomShards(object):
+    """The set of room shard processes. Create with InitRoomShards()."""
+
+    def __init__(self, config, number_of_shards):
+        context = mp.get_context("spawn")
+        self._shards = [RoomShard(i, config, context) for i in range(number_of_shards)]
+        self._next_handle = 0
+
+    def start(self):
+        for shard in self._shards:
+            shard.start()
+
+    def stop(self):
+        for shard in self._shards:
+            shard.stop()
+
+    def create_room(
+        self,
+        lobby,
+        id,
+        game_record,
+        type: RoomType = RoomType.GAME,
+        tutorial_name: str = "",
+        from_event: str = "",
+    ):
+        """Creates a room on the least loaded shard. Returns a ShardedRoom."""
+        shards = [shard for shard in self._shards if shard.alive()]
+        if len(shards) == 0:
+            logger.error("No room shards are running. Cannot create room.")
+            return None
+        shard = min(shards, key=lambda shard: shard.number_of_rooms())
+        # Room IDs aren't unique (e.g. demo rooms), so shards use handles.
+        self._next_handle += 1
+        return shard.create_room(
+            self._next_handle, lobby, id, game_record, type, tutorial_name, from_event
+        )
+
+    async def status(self):
+        """Returns a list with the status of each shard, for /status.
+
+        Also refreshes the state() and debug_status() of sharded rooms.
+        """
+
+        async def ShardStatus(shard):
+            status = {"index": shard.index(), "alive": shard.alive()}
+            if shard.alive():
+                try:
+                    status.update(await shard.status())
+                except (
+                    RuntimeError,
+                    TimeoutError,
+                    RoomShardExited,
+                    EOFError,
+                    OSError,
+                ) as e:
+                    status["error"] = str(e)
+            return status
+
+        return list(
+            await asyncio.gather(*[ShardStatus(shard) for shard in self._shards])
+        )
+
+    async def run(self):
+        """Receives messages from shards and watches for shards exiting."""
+        loop = asyncio.get_event_loop()
+        for shard in self._shards:
+            shard.listen(loop)
+        while True:
+            await asyncio.sleep(MONITOR_PERIOD_S)
+            for shard in self._shards:
+                shard.check_exited()
+
+
+room_shards = None
+
+
+def InitRoomShards(config):
+    """Starts config.room_shards room shard processes, if any."""
+    global room_shards
+    if config.room_shards <= 0:
+        return None
+    room_shards = RoomShards(config, config.room_shards)
+    room_shards.start()
+    return room_shards
+
+
+def GetRoomShards():
+    """Returns the room shards, or None if rooms run in this process."""
+    return room_shards
+
+
+class RoomShardWorker(object):
+    """Hosts rooms in a room shard process."""
+
+    def __init__(self, index, control, data):
+        self._index = index
+        self._control = control
+        self._data = data
+        self._rooms = {}  # handle -> Room
+        # handle -> {player ID: actor ID}. Player IDs are assigned by the main
+        # process, actor IDs by the room.
+        self._players = {}
+        self._scenario_rooms = set()  # Handles of RoomType.SCENARIO rooms.
+        self._wire_formats = {}  # (handle, player ID) -> WireFormat
+        self._statuses = {}  # handle -> last reported status tuple.
+        self._stop_times = {}  # handle -> time.time() when stopped.
+        # Sends happen on a thread, so that this process always keeps reading
+        # from the main process, even while the main process isn't reading.
+        self._outgoing = queue.Queue()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        # Set when rooms have new messages, or data arrives. Wakes _pump().
+        self._wake = None
+        self._pump_times = []
+        self._shutdown = None
+
+    def room_ids(self):
+        """Used by MapGenerationTask to only generate maps while idle."""
+        return self._rooms.keys()
+
+    async def run(self):
+        from cb2game.server.map_provider import MapGenerationTask
+
+        loop = asyncio.get_event_loop()
+        self._shutdown = loop.create_future()
+        self._wake = asyncio.Event()
+        self._sender.start()
+        loop.add_reader(self._control.fileno(), self._receive_control)
+        loop.add_reader(self._data.fileno(), self._receive_data)
+        tasks = [
+            asyncio.ensure_future(self._pump()),
+            asyncio.ensure_future(self._cleanup()),
+            asyncio.ensure_future(MapGenerationTask([self], GlobalConfigOrDie())),
+        ]
+        await self._shutdown
+        for task in tasks:
+            task.cancel()
+        for room in self._rooms.values():
+            room.stop()
+        self._outgoing.put(None)
+
+    def _send(self, *message):
+        self._outgoing.put(message)
+
+    def _send_loop(self):
+        while True:
+            message = self._outgoing.get()
+            if message is None:
+                return
+            try:
+                self._data.send(message)
+            except (BrokenPipeError, OSError):
+                return
+
+    def _receive_control(self):
+        try:
+            while self._control.poll():
+                request_id, op, *args = self._control.recv()
+                try:
+                    reply = (request_id, None, getattr(self, "_control_" + op)(*args))
+                except Exception as e:
+                    logger.exception(f"Room shard control request {op} failed.")
+                    reply = (request_id, repr(e), None)
+                self._control.send(reply)
+        except (EOFError, OSError):
+            self._stop()
+
+    def _receive_data(self):
+        try:
+            while self._data.poll():
+                op, *args = self._data.recv()
+                try:
+                    getattr(self, "_data_" + op)(*args)
+                except Exception:
+                    logger.exception(f"Room shard data message {op} failed.")
+                self._wake.set()
+        except (EOFError, OSError):
+            self._stop()
+
+    def _stop(self):
+        if not self._shutdown.done():
+            self._shutdown.set_result(True)
+
+    def _control_status(self):
+        from cb2game.server.lobby_utils import GetLobbies
+        from cb2game.server.map_provider import MapPoolSize
+
+        pump_times = self._pump_times
+        self._pump_times = []
+        return {
+            "pid": os.getpid(),
+            "number_rooms": len(self._rooms),
+            "number_players": sum(len(p) for p in self._players.values()),
+            "map_cache_size": MapPoolSize(),
+            # Time spent forwarding messages per pump pass.
+            "mean_pump_s": sum(pump_times) / len(pump_times) if pump_times else 0,
+            "max_pump_s": max(pump_times) if pump_times else 0,
+            "tick_latency": {
+                lobby.lobby_name(): lobby.tick_latency().summary()
+                for lobby in GetLobbies()
+            },
+            # Popped by RoomShard.status().
+            "rooms": {
+                handle: (room.state(), room.debug_status())
+                for handle, room in self._rooms.items()
+            },
+        }
+
+    def _data_create_room(
+        self, handle, lobby_name, id, game_id, type, tutorial_name, from_event
+    ):
+        from cb2game.server.lobby_utils import GetLobby
+
+        try:
+            game_record = None
+            if game_id is not None:
+                game_record = game_db.Game.get_by_id(game_id)
+            room = Room(
+                RoomName(id, type),
+                2,
+                id,
+                game_record,
+                GetLobby(lobby_name),
+                type,
+                tutorial_name,
+                from_event,
+            )
+            if not room.initialized():
+                raise RoomNotInitialized(f"Room {id} failed to initialize.")
+        except Exception as e:
+            logger.exception(f"Failed to create room {id}.")
+            self._send_failure(handle, e)
+            self._send("closed", handle)
+            return
+        room.set_message_listener(self._wake.set)
+        room.start()
+        self._rooms[handle] = room
+        self._players[handle] = {}
+        if type == RoomType.SCENARIO:
+            self._scenario_rooms.add(handle)
+
+    def _data_add_player(self, handle, player_id, role, remote):
+        if handle not in self._rooms:
+            return
+        try:
+            actor_id = self._rooms[handle].add_player(None, role, remote)
+        except Exception as e:
+            logger.exception(f"Failed to add player to room {handle}.")
+            self._send_failure(handle, e)
+            return
+        self._players[handle][player_id] = actor_id
+        if remote is not None:
+            self._wire_formats[(handle, player_id)] = remote.wire_format
+
+    def _data_call(self, handle, method, args):
+        if handle in self._rooms:
+            getattr(self._rooms[handle], method)(*args)
+
+    def _data_desync(self, handle, player_id):
+        if player_id in self._players.get(handle, {}):
+            self._rooms[handle].desync(self._players[handle][player_id])
+
+    def _data_drain_messages(self, handle, player_id, messages):
+        if player_id in self._players.get(handle, {}):
+            self._rooms[handle].drain_messages(
+                self._players[handle][player_id], messages
+            )
+
+    def _data_remove_player(self, handle, player_id, disconnected):
+        if player_id not in self._players.get(handle, {}):
+            return
+        actor_id = self._players[handle].pop(player_id)
+        self._rooms[handle].remove_player(actor_id, None, disconnected)
+        self._wire_formats.pop((handle, player_id), None)
+
+    def _data_stop(self, handle):
+        if handle not in self._rooms or handle in self._stop_times:
+            return
+        self._rooms[handle].stop()
+        self._stop_times[handle] = time.time()
+
+    def _data_shutdown(self):
+        self._stop()
+
+    def _send_failure(self, handle, exception):
+        self._send(
+            "status",
+            handle,
+            True,
+            False,
+            "",
+            PicklableException(exception),
+            traceback.format_exc(),
+        )
+
+    async def _pump(self):
+        """Sends messages and status changes of rooms to the main process.
+
+        Sleeps until a room has new messages or data arrives, but at least
+        checks room status every MONITOR_PERIOD_S.
+        """
+        while True:
+            self._wake.clear()
+            start = time.time()
+            for handle, room in list(self._rooms.items()):
+                for player_id, actor_id in self._players[handle].items():
+                    messages = []
+                    if room.fill_messages(actor_id, messages):
+                        wire_format = self._wire_formats.get(
+                            (handle, player_id), WireFormat.JSON_TEXT
+                        )
+                        self._send(
+                            "messages",
+                            handle,
+                            player_id,
+                            [EncodeMessage(m, wire_format) for m in messages],
+                        )
+                status = (
+                    room.done(),
+                    room.has_pending_messages(),
+                    room.scenario_id() if handle in self._scenario_rooms else "",
+                    room.has_exception(),
+                )
+                if status != self._statuses.get(handle, None):
+                    self._statuses[handle] = status
+                    self._send(
+                        "status",
+                        handle,
+                        *status[:3],
+                        PicklableException(room.exception()),
+                        str(room.traceback()) if room.has_exception() else None,
+                    )
+            if len(self._pump_times) < 10000:
+                self._pump_times.append(time.time() - start)
+            try:
+                await asyncio.wait_for(self._wake.wait(), MONITOR_PERIOD_S)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _cleanup(self):
+        """Deletes stopped rooms once their state machine has finished."""
+        while True:
+            await asyncio.sleep(MONITOR_PERIOD_S)
+            for handle, stop_time in list(self._stop_times.items()):
+                # Give the room's update loop time to notice it was stopped.
+                if time.time() - stop_time < MONITOR_PERIOD_S:
+                    continue
+                del self._stop_times[handle]
+                del self._rooms[handle]
+                for player_id in self._players.pop(handle):
+                    self._wire_formats.pop((handle, player_id), None)
+                self._statuses.pop(handle, None)
+                self._scenario_rooms.discard(handle)
+                self._send("closed", handle)
+
+
+def PicklableException(exception):
+    if exception is None:
+        return None
+    try:
+        pickle.loads(pickle.dumps(exception))
+        return exception
+    except Exception:
+        return RuntimeError(repr(exception))
+
+
+def GlobalConfigOrDie():
+    from cb2game.server.config.config import GlobalConfig
+
+    config = GlobalConfig()
+    if config is None:
+        raise ValueError("Room shard started without a config.")
+    return config
+
+
+def RunShard(index, config, control, data):
+    """Entry point of room shard processes."""
+    from cb2game.server.config.config import SetGlobalConfig
+    from cb2game.server.lobby_utils import InitializeLobbies
+    from cb2game.server.schemas import base
+
+    log_format = f"[%(asctime)s] shard-{index} %(name)s %(levelname)s [%(module)s:%(funcName)s:%(lineno)d] %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_format)
+    SetGlobalConfig(config)
+    # Rooms are created in this process, but lobbies (and their queues) live
+    # in the main process. These lobbies only provide the lobby settings.
+    InitializeLobbies(config.lobbies)
+    base.SetDatabase(config)
+    base.ConnectDatabase()
+    # Jobs are run by the main process.
+    InitJobQueue(start_worker=False)
+    logger.info(f"Room shard {index} started. pid: {os.getpid()}")
+    asyncio.run(RoomShardWorker(index, control, data).run())
+    logger.info(f"Room shard {index} exiting.")
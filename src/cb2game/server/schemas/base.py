@@ -1,11 +1,34 @@
 import logging
+import time
 
 from peewee import Model
 from playhouse.sqlite_ext import SqliteExtDatabase
 
+from cb2game.server.util import LatencyHistogram
+
 logger = logging.getLogger(__name__)
 
-database = SqliteExtDatabase(None)
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class TimedSqliteExtDatabase(SqliteExtDatabase):
+    """Records the latency of every write statement, for /status."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_latency = LatencyHistogram()
+
+    def execute_sql(self, sql, *args, **kwargs):
+        if not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            return super().execute_sql(sql, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, *args, **kwargs)
+        finally:
+            self.write_latency.record(time.perf_counter() - start)
+
+
+database = TimedSqliteExtDatabase(None)
 
 
 class BaseModel(Model):
@@ -51,6 +74,10 @@ def GetDatabase():
     return database
 
 
+def DatabaseWriteLatency():
+    return database.write_latency
+
+
 def CloseDatabase():
     database.close()
 
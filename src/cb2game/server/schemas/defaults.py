@@ -4,7 +4,9 @@ from cb2game.server.schemas.client_exception import *
 from cb2game.server.schemas.clients import *
 from cb2game.server.schemas.event import *
 from cb2game.server.schemas.game import *
+from cb2game.server.schemas.game_summary import *
 from cb2game.server.schemas.google_user import *
+from cb2game.server.schemas.job import *
 from cb2game.server.schemas.leaderboard import *
 from cb2game.server.schemas.map import *
 from cb2game.server.schemas.mturk import *
@@ -32,6 +34,8 @@ TABLES = [
     GoogleUser,
     Event,
     ClientException,
+    GameSummary,
+    Job,
 ]
 
 
@@ -0,0 +1,54 @@
+import datetime
+
+import orjson
+from peewee import *
+
+from cb2game.server.schemas.base import *
+from cb2game.server.schemas.game import Game
+
+
+class GameSummary(BaseModel):
+    """Per-game facts derived from the game's events.
+
+    Computing these from the event table is slow, so they're stored once per
+    game, when the game ends (see post_game_jobs.py) or by
+    server/db_tools/backfill_game_summaries.py for older games. See
+    db_utils.SummarizeGame for how each field is computed.
+    """
+
+    game = ForeignKeyField(Game, backref="summary", unique=True)
+    time = DateTimeField(default=datetime.datetime.utcnow)  # Time of summary.
+    duration_s = FloatField(default=0)
+    instructions_sent = IntegerField(default=0)
+    instructions_activated = IntegerField(default=0)
+    instructions_completed = IntegerField(default=0)
+    instructions_cancelled = IntegerField(default=0)
+    # Activated instructions which the follower took an action for, and how
+    # many of those were cancelled. These define the cancel rate used to
+    # diagnose games (see db_utils.high_percent_cancelled_instructions).
+    instructions_acted_on = IntegerField(default=0)
+    instructions_acted_on_cancelled = IntegerField(default=0)
+    cancel_rate = FloatField(default=0)
+    leader_moves = IntegerField(default=0)
+    follower_moves = IntegerField(default=0)
+    # JSON lists with one entry per instruction, in the order they were sent.
+    instruction_move_counts = TextField(default="[]")
+    instruction_word_counts = TextField(default="[]")
+    # JSON list of the unique words used in the game's instructions.
+    vocabulary = TextField(default="[]")
+    follower_got_lost = BooleanField(default=False)
+    high_percent_cancelled = BooleanField(default=False)
+    # GameDiagnosis name and research validity at the time of the summary.
+    # db_utils.DiagnoseGame re-checks the parts that can change afterwards
+    # (e.g. a game being marked invalid).
+    diagnosis = TextField(default="")
+    research_valid = BooleanField(default=False)
+
+    def move_counts(self):
+        return orjson.loads(self.instruction_move_counts)
+
+    def word_counts(self):
+        return orjson.loads(self.instruction_word_counts)
+
+    def words(self):
+        return orjson.loads(self.vocabulary)
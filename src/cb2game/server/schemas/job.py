@@ -0,0 +1,29 @@
+import datetime
+from enum import IntEnum
+
+from peewee import *
+
+from cb2game.server.schemas.base import *
+
+
+class JobStatus(IntEnum):
+    PENDING = 0
+    FAILED = 1  # Ran out of attempts. Kept for inspection.
+
+
+class Job(BaseModel):
+    """Work to run outside of the game loop. See server/job_queue.py.
+
+    Rows are deleted once their job succeeds.
+    """
+
+    kind = TextField()  # Selects the handler registered in job_queue.py.
+    payload = TextField(default="{}")  # JSON arguments to the handler.
+    status = IntegerField(default=JobStatus.PENDING)
+    attempts = IntegerField(default=0)
+    created = DateTimeField(default=datetime.datetime.utcnow)
+    run_after = DateTimeField(default=datetime.datetime.utcnow)
+    last_error = TextField(default="")
+
+    class Meta:
+        indexes = ((("status", "run_after"), False),)
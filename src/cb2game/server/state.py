@@ -1,20 +1,15 @@
 import dataclasses
 import logging
 import math
-import queue
 import uuid
 from collections import deque
 from datetime import datetime, timedelta
-from queue import Queue
 from typing import List
 
 import humanhash
 
 import cb2game.server.config.config as config
-import cb2game.server.google_experience as google_experience
-import cb2game.server.leaderboard as leaderboard
 import cb2game.server.map_utils as map_utils
-import cb2game.server.mturk_experience as mturk_experience
 import cb2game.server.scenario_util as scenario_util
 from cb2game.server.actor import Actor
 from cb2game.server.assets import AssetId
@@ -41,6 +36,8 @@ from cb2game.server.messages.scenario import (
 from cb2game.server.messages.sound_trigger import SoundClipType, SoundTrigger
 from cb2game.server.messages.state_sync import StateMachineTick
 from cb2game.server.messages.turn_state import GameOverMessage, TurnUpdate
+from cb2game.server.objective_updates import ObjectiveUpdateStream
+from cb2game.server.post_game_jobs import EnqueuePostGameJobs
 from cb2game.server.state_utils import (
     FOLLOWER_FEEDBACK_QUESTIONS,
     FOLLOWER_MOVES_PER_TURN,
@@ -55,6 +52,12 @@ from cb2game.server.util import CountDownTimer, JsonSerialize
 
 logger = logging.getLogger(__name__)
 
+# Actions queued for a player who hasn't received them yet (E.g. a stalled
+# connection). Past this, the actions are dropped and the player is resynced
+# instead, so that a slow client can't grow the room's memory without bound.
+MAX_PENDING_ACTIONS = 1000
+# Each turn state is complete, so a player only needs the latest few.
+MAX_PENDING_TURN_STATES = 10
 
 # The Cerealbar2 State Machine. This is the state machine that is used to drive the game.
 # This class contains methods to consume and produce messages from/for the state machine. It also contains a state machine update loop.
@@ -107,6 +110,7 @@ class State(object):
         realtime_actions: bool = False,
         lobby: "server.Lobby" = None,
         spawn_cards_on_set: bool = True,
+        seed: int = None,
     ):
         """Initialize the game state.
 
@@ -120,6 +124,10 @@ class State(object):
             scenario (Scenario): Preset data. See server/messages/scenario.py.
             log_to_db (bool): If true, log game events to the database.
             realtime_actions (bool): Enables realtime actions. See server/actor.py.
+            seed (int): Seeds the map provider, which generates the map, cards
+                and spawn points. If None, a map is taken from the map pool.
+                Either way, the seed is recorded in the game's kvals as
+                "rng_seed", so the game can be replayed.
         """
         self._start_time = datetime.utcnow()
         self._room_id = room_id
@@ -159,6 +167,9 @@ class State(object):
         self._instruction_added = (
             False  # True if an instruction was added since the last iteration.
         )
+        # Maps from player_id -> ObjectiveUpdateStream, for players that asked
+        # for incremental objective updates. See objective_updates.py.
+        self._objective_streams = {}
         self._instruction_complete_queue = deque()
         self._live_feedback_queue = deque()
 
@@ -213,7 +224,11 @@ class State(object):
             )
             # Map props and actors share IDs from the same pool, so the ID assigner
             # is shared to prevent overlap.
-            self._map_provider = CachedMapRetrieval()
+            self._map_provider = CachedMapRetrieval(seed)
+            kvals = self._game_recorder.kvals()
+            if kvals is not None:
+                kvals["rng_seed"] = self._map_provider.seed()
+                self._game_recorder.set_kvals(kvals)
             initial_turn = TurnUpdate(
                 Role.LEADER,
                 LEADER_MOVES_PER_TURN,
@@ -272,7 +287,17 @@ class State(object):
         # Queues this action to be sent to each user.
         for id in self._actors:
             actor = self._actors[id]
-            self._action_history[actor.actor_id()].append(action)
+            action_history = self._action_history[actor.actor_id()]
+            if len(action_history) >= MAX_PENDING_ACTIONS:
+                # A state sync includes every actor's location, so the player
+                # doesn't need the dropped actions.
+                logger.warning(
+                    f"Room {self._room_id} dropping {len(action_history)} actions for player_id {actor.actor_id()}"
+                )
+                action_history.clear()
+                self.desync(actor.actor_id())
+                continue
+            action_history.append(action)
 
     def mark_player_disconnected(self, id):
         if id not in self._role_history:
@@ -290,6 +315,9 @@ class State(object):
     def map(self):
         return self._map_provider.map()
 
+    def seed(self):
+        return self._map_provider.seed()
+
     def cards(self):
         return self._map_provider.cards()
 
@@ -715,11 +743,9 @@ class State(object):
         logger.debug(f"Game {self._room_id} is over.")
         self._game_recorder.record_game_over()
         if self._game_recorder.record() is not None:
-            leaderboard.UpdateLeaderboard(self._game_recorder.record())
-            mturk_experience.UpdateWorkerExperienceTable(self._game_recorder.record())
-            google_experience.UpdateGoogleUserExperienceTable(
-                self._game_recorder.record()
-            )
+            # Leaderboard, experience tables and game summary. Run by the job
+            # queue, so the game loop doesn't wait for them.
+            EnqueuePostGameJobs(self._game_recorder.record())
 
     def _has_instructions_todo(self):
         for instruction in self._instructions:
@@ -901,6 +927,11 @@ class State(object):
         elif message.type == message_to_server.MessageType.STATE_SYNC_REQUEST:
             logger.debug(f"Sync request recvd. Room: {self._room_id}, Player: {id}")
             self.desync(id)
+        elif message.type == message_to_server.MessageType.OBJECTIVE_SYNC_REQUEST:
+            logger.debug(
+                f"Objective sync request recvd. Room: {self._room_id}, Player: {id}"
+            )
+            self._drain_objective_sync_request(id)
         elif message.type == message_to_server.MessageType.LIVE_FEEDBACK:
             logger.debug(f"Live feedback recvd. Room: {self._room_id}, Player: {id}")
             self._drain_live_feedback(id, message.live_feedback)
@@ -974,6 +1005,12 @@ class State(object):
             self._instructions_stale[actor_id] = True
         self.queue_leader_sound(SoundClipType.INSTRUCTION_SENT)
 
+    def _drain_objective_sync_request(self, id):
+        if id not in self._objective_streams:
+            self._objective_streams[id] = ObjectiveUpdateStream()
+        self._objective_streams[id].request_full_resend()
+        self._instructions_stale[id] = True
+
     def queue_leader_sound(self, clip_id: SoundClipType):
         if not self._leader:
             return
@@ -1149,6 +1186,8 @@ class State(object):
             del self._action_history[actor_id]
         if actor_id in self._instructions_stale:
             del self._instructions_stale[actor_id]
+        if actor_id in self._objective_streams:
+            del self._objective_streams[actor_id]
         if actor_id in self._turn_history:
             del self._turn_history[actor_id]
         # We don't free actor IDs. We'll never run out, and
@@ -1187,7 +1226,7 @@ class State(object):
                 return True
             if self._instructions_stale.get(actor_id, False):
                 return True
-            if not self._turn_history.get(actor_id, Queue()).empty():
+            if len(self._turn_history.get(actor_id, [])) > 0:
                 return True
         return False
 
@@ -1254,13 +1293,22 @@ class State(object):
             msg = message_from_server.StateSyncFromServer(state_sync)
             return msg
 
-        objectives = self._next_instructions(player_id)
-        if len(objectives) > 0:
-            logger.debug(
-                f"Room {self._room_id} {len(objectives)} texts for player_id {player_id}"
-            )
-            msg = message_from_server.ObjectivesFromServer(objectives)
-            return msg
+        if player_id in self._objective_streams:
+            objective_update = self._next_objective_update(player_id)
+            if objective_update is not None:
+                logger.debug(
+                    f"Room {self._room_id} {len(objective_update.objectives)} objective updates for player_id {player_id}"
+                )
+                msg = message_from_server.ObjectiveUpdateFromServer(objective_update)
+                return msg
+        else:
+            objectives = self._next_instructions(player_id)
+            if len(objectives) > 0:
+                logger.debug(
+                    f"Room {self._room_id} {len(objectives)} texts for player_id {player_id}"
+                )
+                msg = message_from_server.ObjectivesFromServer(objectives)
+                return msg
 
         turn_state = self._next_turn_state(player_id)
         if not turn_state is None:
@@ -1330,6 +1378,12 @@ class State(object):
         self._action_history[actor_id] = []
         return action_history
 
+    def _next_objective_update(self, actor_id):
+        if not self._instructions_stale.get(actor_id, True):
+            return None
+        objectives = self._next_instructions(actor_id)
+        return self._objective_streams[actor_id].next_update(objectives)
+
     def _next_instructions(self, actor_id):
         if not actor_id in self._instructions_stale:
             self._instructions_stale[actor_id] = True
@@ -1659,22 +1713,18 @@ class State(object):
         self._turn_state = turn_state
         for actor_id in self._actors:
             if not actor_id in self._turn_history:
-                self._turn_history[actor_id] = Queue()
-            self._turn_history[actor_id].put(dataclasses.replace(turn_state))
+                self._turn_history[actor_id] = deque(maxlen=MAX_PENDING_TURN_STATES)
+            self._turn_history[actor_id].append(dataclasses.replace(turn_state))
 
     def _resend_turn_state(self):
         if self._turn_state is None:
             return
         for actor_id in self._actors:
             if not actor_id in self._turn_history:
-                self._turn_history[actor_id] = Queue()
-            self._turn_history[actor_id].put(dataclasses.replace(self._turn_state))
+                self._turn_history[actor_id] = deque(maxlen=MAX_PENDING_TURN_STATES)
+            self._turn_history[actor_id].append(dataclasses.replace(self._turn_state))
 
     def _next_turn_state(self, actor_id):
-        if not actor_id in self._turn_history:
-            self._turn_history[actor_id] = Queue()
-        try:
-            turn = self._turn_history[actor_id].get_nowait()
-            return turn
-        except queue.Empty:
+        if len(self._turn_history.get(actor_id, [])) == 0:
             return None
+        return self._turn_history[actor_id].popleft()
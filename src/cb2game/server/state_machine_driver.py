@@ -32,6 +32,16 @@ class StateMachineDriver(object):
         self._exception = None
         self._traceback = None
 
+        # Called after iterations which produced messages, and when the game
+        # ends. See set_message_listener().
+        self._message_listener = None
+
+    def set_message_listener(self, listener):
+        """Sets a function (without arguments) to call when there are new
+        messages for fill_messages(), or when the game ends. Lets room shards
+        wait for rooms instead of polling them."""
+        self._message_listener = listener
+
     def state_machine(self):
         return self._state_machine
 
@@ -64,11 +74,14 @@ class StateMachineDriver(object):
         try:
             last_loop = time.time()
             latency_monitor = self._lobby.latency_monitor() if self._lobby else None
+            tick_latency = self._lobby.tick_latency() if self._lobby else None
             self._state_machine.start()  # Initialize the state machine.
             while not self._state_machine.done():
                 # Run one iteration of the game loop.
                 self.step()
                 poll_period = time.time() - last_loop
+                if tick_latency:
+                    tick_latency.record(poll_period)
                 if (poll_period) > 0.2:
                     logging.warn(
                         f"Game {self._room_id} slow poll period of {poll_period}s"
@@ -83,6 +96,8 @@ class StateMachineDriver(object):
             self._exception = e
             self._traceback = exc_info_plus()
             self.end_game()
+        if self._message_listener is not None:
+            self._message_listener()
 
     def step(self):
         self._process_incoming_messages()
@@ -116,10 +131,14 @@ class StateMachineDriver(object):
             self._state_machine.drain_messages(player_id, messages[player_id])
 
     def _serialize_outgoing_messages(self):
+        messages_added = False
         for player_id in self._state_machine.player_ids():
             if player_id not in self._messages_out:
                 self._messages_out[player_id] = Queue()
             out_messages = []
             if self._state_machine.fill_messages(player_id, out_messages):
+                messages_added = True
                 for message in out_messages:
                     self._messages_out[player_id].put(message)
+        if messages_added and self._message_listener is not None:
+            self._message_listener()
@@ -0,0 +1,152 @@
+"""Unit tests for the batch renderer."""
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import cb2game.server.db_tools.batch_render as batch_render
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.map_tools import visualize
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas import base
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.event import Event, EventType
+
+logger = logging.getLogger(__name__)
+
+NUM_INSTRUCTIONS = 2
+
+
+def PlayGame(coordinator, lobby):
+    """Leader sends instructions. The follower moves twice for each and then
+    marks it done."""
+    game_name = coordinator.CreateGame(
+        log_to_db=True, realtime_actions=True, lobby=lobby
+    )
+    endpoint_pair = EndpointPair(coordinator, game_name)
+    endpoint_pair.initialize()
+    _, _, turn_state, instructions, _, _ = endpoint_pair.initial_state()
+    sent, moves = 0, 0
+    while not endpoint_pair.over():
+        active = [i for i in instructions if not (i.completed or i.cancelled)]
+        if turn_state.turn == Role.LEADER:
+            if sent == NUM_INSTRUCTIONS and not active:
+                break
+            if not active:
+                sent += 1
+                action = Action.SendInstruction(f"instruction number {sent}")
+            else:
+                action = Action.EndTurn()
+        elif not active:
+            action = Action.EndTurn()
+        elif moves < 2:
+            action = Action.Right()
+            moves += 1
+        else:
+            action = Action.InstructionDone(active[0].uuid)
+            moves = 0
+        _, _, turn_state, instructions, _, _ = endpoint_pair.step(action)
+    coordinator.Cleanup()
+
+
+class BatchRenderTest(unittest.TestCase):
+    """Renders a logged game from a database file, like the command line."""
+
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.data_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.data_directory.cleanup)
+        self.db_path = os.path.join(self.data_directory.name, "game_data.db")
+        self.output_dir = os.path.join(self.data_directory.name, "renders")
+        config = Config(comment="Batch Render Unit Test Config")
+        SetGlobalConfig(config)
+        base.SetDatabaseByPath(self.db_path)
+        base.ConnectDatabase()
+        base.CreateTablesIfNotExists(ListDefaultTables())
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        PlayGame(LocalGameCoordinator(config), lobby)
+        self.instruction_ids = [
+            event.short_code
+            for event in Event.select()
+            .where(Event.type == EventType.INSTRUCTION_SENT)
+            .order_by(Event.server_time)
+        ]
+        base.CloseDatabase()
+        # Icons are PNGs in the package. Drawing tiles as plain hexagons
+        # keeps the test fast.
+        icon_patch = mock.patch.object(
+            visualize, "asset_icon_surface", return_value=None
+        )
+        icon_patch.start()
+        self.addCleanup(icon_patch.stop)
+
+    def Render(self, **kwargs):
+        batch_render.main(self.db_path, self.output_dir, workers=0, **kwargs)
+        with open(os.path.join(self.output_dir, "index.json"), "r") as f:
+            return json.load(f)
+
+    def test_instructions(self):
+        self.assertEqual(len(self.instruction_ids), NUM_INSTRUCTIONS)
+        entries = self.Render()
+        self.assertEqual(
+            sorted(entry["instruction_id"] for entry in entries),
+            sorted(self.instruction_ids),
+        )
+        self.assertEqual([entry["status"] for entry in entries], ["rendered"] * 2)
+        for entry in entries:
+            self.assertTrue(
+                os.path.isfile(os.path.join(self.output_dir, entry["path"]))
+            )
+        with open(os.path.join(self.output_dir, "index.html"), "r") as f:
+            index_html = f.read()
+        for entry in entries:
+            self.assertIn(f'<img src="{entry["path"]}"', index_html)
+            self.assertIn(entry["text"], index_html)
+
+        # Existing outputs are skipped, unless overwriting.
+        path = os.path.join(self.output_dir, entries[0]["path"])
+        modified = os.path.getmtime(path)
+        entries = self.Render()
+        self.assertEqual([entry["status"] for entry in entries], ["skipped"] * 2)
+        self.assertEqual(os.path.getmtime(path), modified)
+        entries = self.Render(overwrite=True)
+        self.assertEqual([entry["status"] for entry in entries], ["rendered"] * 2)
+
+    def test_selected_instructions(self):
+        entries = self.Render(instructions=self.instruction_ids[1])
+        self.assertEqual(
+            [(entry["instruction_id"], entry["status"]) for entry in entries],
+            [(self.instruction_ids[1], "rendered")],
+        )
+        # Only the selected instruction was drawn.
+        game_dir = os.path.dirname(os.path.join(self.output_dir, entries[0]["path"]))
+        self.assertEqual(
+            os.listdir(game_dir), [f"instruction_{self.instruction_ids[1]}.png"]
+        )
+
+    def test_animations(self):
+        entries = self.Render(mode="animations")
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["status"], "rendered")
+        # The follower turned twice for each instruction.
+        self.assertGreaterEqual(entries[0]["frames"], 2 * NUM_INSTRUCTIONS)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.output_dir, entries[0]["path"]))
+        )
+        entries = self.Render(mode="animations")
+        self.assertEqual(entries[0]["status"], "skipped")
+
+
+if __name__ == "__main__":
+    unittest.main()
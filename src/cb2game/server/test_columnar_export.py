@@ -0,0 +1,196 @@
+"""Unit tests for the columnar export and the reports which read it."""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import cb2game.server.db_tools.columnar_export as columnar_export
+import cb2game.server.db_tools.game_statistics_tool as game_statistics_tool
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.event import Event, EventType
+from cb2game.server.schemas.game import Game, Instruction
+from cb2game.server.schemas.mturk import Worker
+
+MTURK_GAME_TYPE = "follower-pilot-lobby|4|game-mturk"
+
+# Instructions are (turn issued, activated, cancelled, follower actions).
+HUMAN_GAMES = [
+    [(0, True, False, 3), (0, True, True, 2), (2, True, False, 4)],
+    [(1, True, False, 25), (3, False, False, 0)],
+    [(0, True, True, 1), (1, True, True, 1)],
+]
+AI_GAMES = [
+    [(0, True, False, 2), (2, True, True, 5), (2, True, False, 1)],
+    [(1, True, False, 6)],
+]
+
+
+def CreateGame(follower, instructions, game_type=MTURK_GAME_TYPE, leader=1):
+    """Creates a finished game with the given instructions, and the events
+    the game recorder logs for them."""
+    start_time = datetime(2023, 1, 1) + timedelta(days=Game.select().count())
+    game = Game.create(
+        type=game_type,
+        leader=leader,
+        follower=follower,
+        score=len(instructions),
+        number_turns=2 * len(instructions),
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=7 * len(instructions), seconds=30),
+    )
+    tick = 0
+    for number, (turn, activated, cancelled, actions) in enumerate(instructions):
+        Instruction.create(
+            game=game,
+            uuid=f"{game.id}-{number}",
+            text=f"instruction {number}",
+            instruction_number=number,
+            turn_issued=turn,
+            turn_activated=turn if activated else -1,
+            turn_cancelled=turn + 1 if cancelled else -1,
+        )
+        sent = Event.create(
+            game=game,
+            type=EventType.INSTRUCTION_SENT,
+            tick=tick,
+            role="Role.LEADER",
+            data=json.dumps({"text": f"instruction {number}"}),
+        )
+        children = []
+        if activated:
+            children.append((EventType.INSTRUCTION_ACTIVATED, "Role.LEADER"))
+        children += [(EventType.ACTION, "Role.FOLLOWER")] * actions
+        if cancelled:
+            children.append((EventType.INSTRUCTION_CANCELLED, "Role.LEADER"))
+        for event_type, role in children:
+            tick += 1
+            Event.create(
+                game=game, type=event_type, tick=tick, role=role, parent_event=sent
+            )
+    return game
+
+
+class ColumnarExportTest(unittest.TestCase):
+    def setUp(self):
+        # In-memory db for test validation.
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        for i in range(4):
+            Worker.create(hashed_id=f"worker {i}")
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def ExportedIds(self, model):
+        frame = columnar_export.LoadTable(self.output_dir.name, model)
+        return sorted(frame[columnar_export.GameIdColumn(model)].tolist())
+
+    def DatabaseIds(self, model):
+        column = getattr(model, columnar_export.GameIdColumn(model))
+        return sorted(row[0] for row in model.select(column).tuples())
+
+    def test_incremental_export(self):
+        for instructions in HUMAN_GAMES:
+            CreateGame(2, instructions)
+        with mock.patch.object(columnar_export, "PARTITION_SIZE", 2):
+            columnar_export.Export(self.output_dir.name)
+            self.assertEqual(
+                columnar_export.ReadState(self.output_dir.name)["last_game_id"], 3
+            )
+
+            # A running game holds back itself and every game after it.
+            running = CreateGame(None, AI_GAMES[0])
+            running.end_time = datetime.max
+            running.start_time = datetime.utcnow()
+            running.save()
+            CreateGame(None, AI_GAMES[1])
+            columnar_export.Export(self.output_dir.name)
+            self.assertEqual(self.ExportedIds(Game), [1, 2, 3])
+
+            running.end_time = datetime.utcnow()
+            running.save()
+            columnar_export.Export(self.output_dir.name)
+            games = columnar_export.LoadTable(
+                self.output_dir.name, Game, ["id", "end_time"], game_ids=[2, 4]
+            )
+
+        self.assertEqual(sorted(games["id"].tolist()), [2, 4])
+        self.assertFalse(games["end_time"].isna().any())
+        for model in columnar_export.EXPORTED_TABLES:
+            self.assertEqual(self.ExportedIds(model), self.DatabaseIds(model))
+
+    def test_reports_match_database(self):
+        for instructions in HUMAN_GAMES:
+            CreateGame(2, instructions)
+        for instructions in AI_GAMES:
+            CreateGame(None, instructions)
+        # These are filtered out of every report.
+        CreateGame(2, HUMAN_GAMES[0], game_type="game-lobby")
+        CreateGame(4, HUMAN_GAMES[0], leader=3)
+        columnar_export.Export(self.output_dir.name)
+        ids = self.DatabaseIds(Game)
+
+        database_reports = {
+            "game_counts": lambda: game_statistics_tool.ReportGameTypes(ids),
+            "basic_stats": lambda: self.ForEachGameType(
+                game_statistics_tool.ReportBasicStats, ids
+            ),
+            "termination_stats": lambda: self.ForEachGameType(
+                game_statistics_tool.ReportTerminationStats, ids
+            ),
+            "instruction_chaining_amount": lambda: self.ForEachGameType(
+                game_statistics_tool.ReportInstructionChaining, ids
+            ),
+            "num_invalid_games": lambda: self.ForEachGameType(
+                game_statistics_tool.ReportInvalidGames, ids
+            ),
+            "zero_score_games": lambda: self.ForEachGameType(
+                game_statistics_tool.ReportZeroScoringGames, ids
+            ),
+        }
+        self.assertEqual(
+            sorted(database_reports), sorted(game_statistics_tool.COLUMNAR_COMMANDS)
+        )
+        for command, database_report in database_reports.items():
+            with self.subTest(command=command):
+                expected = self.Output(database_report)
+                if command == "game_counts":
+                    # The database report also prints each game ID.
+                    expected = "\n".join(
+                        line for line in expected.split("\n") if not line.isdigit()
+                    )
+                actual = self.Output(
+                    lambda: game_statistics_tool.RunColumnarCommand(
+                        command, ids, self.output_dir.name
+                    )
+                )
+                self.assertEqual(actual, expected)
+
+    def test_missing_pyarrow(self):
+        with mock.patch.object(columnar_export, "pyarrow", None):
+            with self.assertRaisesRegex(ImportError, r"cb2game\[analytics\]"):
+                columnar_export.Export(self.output_dir.name)
+        self.assertEqual(os.listdir(self.output_dir.name), [])
+
+    def ForEachGameType(self, report, ids):
+        for game_type in ["ai", "human", "overall"]:
+            report(ids, game_type)
+
+    def Output(self, report):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            report()
+        return output.getvalue()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Unit tests for GameRecorder's event lookups."""
+import logging
+import os
+import unittest
+import uuid
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.game_recorder import GameRecorder
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages.objective import ObjectiveMessage
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    GetDatabase,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.event import Event, EventType
+from cb2game.server.schemas.game import Game
+
+logger = logging.getLogger(__name__)
+
+
+class GameRecorderTest(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.config = Config(comment="Game Recorder Unit Test Config")
+        SetGlobalConfig(self.config)
+        # In-memory db for test validation.
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        self.event_queries = []
+
+    def trace_event_queries(self, enabled):
+        def trace(statement):
+            if statement.startswith("SELECT") and '"event"' in statement:
+                self.event_queries.append(statement)
+
+        GetDatabase().connection().set_trace_callback(trace if enabled else None)
+
+    def test_moves_dont_query_events(self):
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        coordinator = LocalGameCoordinator(self.config)
+        game_name = coordinator.CreateGame(
+            log_to_db=True, realtime_actions=True, lobby=lobby
+        )
+        endpoint_pair = EndpointPair(coordinator, game_name)
+        endpoint_pair.initialize()
+        _, _, turn_state, instructions, _, _ = endpoint_pair.initial_state()
+        moves = 0
+        while not endpoint_pair.over() and moves < 6:
+            active = [i for i in instructions if not (i.completed or i.cancelled)]
+            if turn_state.turn == Role.LEADER:
+                if not active:
+                    action = Action.SendInstruction("Turn right, then you're done")
+                else:
+                    action = Action.EndTurn()
+            elif moves % 3 < 2:
+                action = Action.Right()
+                moves += 1
+            else:
+                action = Action.InstructionDone(active[0].uuid)
+                moves += 1
+            # Only follower moves and instruction completion are traced.
+            self.trace_event_queries(turn_state.turn == Role.FOLLOWER)
+            _, _, turn_state, instructions, _, _ = endpoint_pair.step(action)
+            self.trace_event_queries(False)
+        coordinator.Cleanup()
+
+        self.assertEqual(self.event_queries, [])
+        # Moves are still linked to their instruction.
+        follower_moves = list(
+            Event.select().where(
+                Event.type == EventType.ACTION, Event.role == Role.FOLLOWER
+            )
+        )
+        self.assertGreater(len(follower_moves), 0)
+        for move in follower_moves:
+            self.assertIsNotNone(move.parent_event)
+            self.assertEqual(move.parent_event.type, EventType.INSTRUCTION_SENT)
+        self.assertEqual(
+            Event.select().where(Event.type == EventType.INSTRUCTION_DONE).count(), 2
+        )
+
+    def test_instruction_from_another_game(self):
+        # Games restored from a previous game's events complete instructions
+        # that were sent in the earlier game.
+        objective = ObjectiveMessage(Role.LEADER, "Go left", uuid.uuid4().hex)
+        first = GameRecorder(Game.create())
+        first.record_instruction_sent(objective)
+
+        second = GameRecorder(Game.create())
+        self.trace_event_queries(True)
+        second.record_instruction_activated(objective)
+        second.record_instruction_activated(objective)
+        self.trace_event_queries(False)
+        # One lookup, then it's in memory.
+        self.assertEqual(len(self.event_queries), 1)
+        activations = list(
+            Event.select().where(Event.type == EventType.INSTRUCTION_ACTIVATED)
+        )
+        self.assertEqual(len(activations), 2)
+        for activation in activations:
+            self.assertEqual(activation.parent_event.short_code, objective.uuid)
+
+
+if __name__ == "__main__":
+    unittest.main()
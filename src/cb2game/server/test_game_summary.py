@@ -0,0 +1,132 @@
+"""Unit tests for the GameSummary table."""
+import logging
+import os
+import unittest
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import cb2game.server.db_tools.db_utils as db_utils
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages.rooms import Role
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.event import Event, EventType
+from cb2game.server.schemas.game import Game
+from cb2game.server.schemas.game_summary import GameSummary
+
+logger = logging.getLogger(__name__)
+
+
+class GameSummaryTest(unittest.TestCase):
+    """Plays a logged game and checks the summary stored when it ends."""
+
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.config = Config(
+            card_covers=True,
+            comment="Game Summary Unit Test Config",
+        )
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        SetGlobalConfig(self.config)
+        # In-memory db for test validation.
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        self.coordinator = LocalGameCoordinator(self.config)
+        self.game_name = self.coordinator.CreateGame(
+            log_to_db=True, realtime_actions=True, lobby=lobby
+        )
+        self.endpoint_pair = EndpointPair(self.coordinator, self.game_name)
+
+    def play_game(self):
+        """Leader sends instructions. The follower moves once for each and
+        then marks it done."""
+        self.endpoint_pair.initialize()
+        self.coordinator.StepGame(self.game_name)
+        _, _, turn_state, instructions, _, _ = self.endpoint_pair.initial_state()
+        sent = 0
+        follower_acted = False
+        while not self.endpoint_pair.over():
+            active = [i for i in instructions if not (i.completed or i.cancelled)]
+            if turn_state.turn == Role.LEADER:
+                if not active:
+                    sent += 1
+                    action = Action.SendInstruction(f"instruction number {sent}")
+                else:
+                    action = Action.EndTurn()
+                follower_acted = False
+            elif not follower_acted:
+                action = Action.Right()
+                follower_acted = True
+            else:
+                action = Action.InstructionDone(active[0].uuid)
+            _, _, turn_state, instructions, _, _ = self.endpoint_pair.step(action)
+        # Ends the game, which records it.
+        self.coordinator.Cleanup()
+
+    def test_summary_matches_events(self):
+        self.play_game()
+
+        game = Game.select().get()
+        summary = GameSummary.get(GameSummary.game == game.id)
+        game_events = Event.select().where(Event.game == game.id)
+        sent = game_events.where(Event.type == EventType.INSTRUCTION_SENT)
+        actions = game_events.where(Event.type == EventType.ACTION)
+
+        self.assertGreater(summary.instructions_sent, 0)
+        self.assertEqual(summary.instructions_sent, sent.count())
+        self.assertEqual(
+            summary.follower_moves,
+            actions.where(Event.role == "Role.FOLLOWER").count(),
+        )
+        self.assertEqual(
+            summary.leader_moves, actions.where(Event.role == "Role.LEADER").count()
+        )
+        self.assertEqual(
+            summary.move_counts(),
+            [
+                actions.where(Event.parent_event == instruction.id).count()
+                for instruction in sent.order_by(Event.server_time)
+            ],
+        )
+        self.assertEqual(summary.word_counts(), [3] * summary.instructions_sent)
+        self.assertIn("instruction", summary.words())
+        self.assertEqual(
+            summary.follower_got_lost, db_utils.follower_got_lost(game_events)
+        )
+        self.assertEqual(
+            summary.high_percent_cancelled,
+            db_utils.high_percent_cancelled_instructions(game_events),
+        )
+        self.assertEqual(summary.instructions_completed, summary.instructions_sent)
+        self.assertEqual(summary.follower_moves, summary.instructions_sent)
+        # Games played locally aren't MTurk games.
+        self.assertEqual(summary.diagnosis, db_utils.GameDiagnosis.NOT_MTURK.name)
+        self.assertFalse(summary.research_valid)
+
+    def test_summary_replaced(self):
+        self.play_game()
+        game = Game.select().get()
+        db_utils.SaveGameSummary(game)
+        self.assertEqual(
+            GameSummary.select().where(GameSummary.game == game.id).count(), 1
+        )
+        self.assertEqual(
+            db_utils.GetGameSummary(game).instructions_sent,
+            GameSummary.get(GameSummary.game == game.id).instructions_sent,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Unit tests for the background job queue."""
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import cb2game.server.job_queue as job_queue
+from cb2game.server.post_game_jobs import EnqueuePostGameJobs
+from cb2game.server.schemas import base
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.game import Game
+from cb2game.server.schemas.game_summary import GameSummary
+from cb2game.server.schemas.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIMEOUT_S = 10
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        # The worker thread has its own connection, so an in-memory database
+        # won't do.
+        self.data_directory = tempfile.TemporaryDirectory()
+        base.SetDatabaseByPath(os.path.join(self.data_directory.name, "test.db"))
+        base.ConnectDatabase()
+        base.CreateTablesIfNotExists(ListDefaultTables())
+        self.calls = []
+        self.failures_left = 0
+
+        @job_queue.JobHandler("test")
+        def Handler(value):
+            self.calls.append((value, threading.current_thread().name))
+            Game.create(type=f"test|{value}")
+            if self.failures_left > 0:
+                self.failures_left -= 1
+                raise RuntimeError("Test failure")
+
+    def tearDown(self):
+        base.CloseDatabase()
+        self.data_directory.cleanup()
+
+    def test_enqueue_runs_in_worker_thread(self):
+        queue = job_queue.JobQueue()
+        queue.start()
+        with mock.patch.object(job_queue, "_job_queue", queue):
+            job_queue.EnqueueJob("test", value=1)
+            end_time = time.time() + WAIT_TIMEOUT_S
+            while not self.calls and time.time() < end_time:
+                time.sleep(0.01)
+        queue.stop()
+        self.assertEqual(self.calls, [(1, "job-queue")])
+        self.assertEqual(queue.depth(), {"pending": 0, "failed": 0})
+
+    def test_runs_inline_without_queue(self):
+        job_queue.EnqueueJob("test", value=2)
+        self.assertEqual(self.calls, [(2, threading.current_thread().name)])
+        self.assertEqual(Job.select().count(), 0)
+
+    def test_retries_failures(self):
+        queue = job_queue.JobQueue(retry_delay_s=0, max_attempts=3)
+        self.failures_left = 1
+        queue.enqueue("test", {"value": 3})
+        self.assertEqual(queue.run_pending(), 1)
+        job = Job.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("Test failure", job.last_error)
+        # The failed attempt's writes were rolled back.
+        self.assertEqual(Game.select().count(), 0)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(queue.depth(), {"pending": 0, "failed": 0})
+        self.assertEqual(Game.select().count(), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        queue = job_queue.JobQueue(retry_delay_s=0, max_attempts=2)
+        self.failures_left = 5
+        queue.enqueue("test", {"value": 4})
+        queue.enqueue("unknown-kind", {})
+        for _ in range(3):
+            queue.run_pending()
+        self.assertEqual(queue.depth(), {"pending": 0, "failed": 2})
+        self.assertEqual(len(self.calls), 2)
+        job = Job.get(Job.kind == "test")
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("Test failure", job.last_error)
+
+    def test_retry_backoff(self):
+        queue = job_queue.JobQueue(retry_delay_s=60)
+        self.failures_left = 1
+        queue.enqueue("test", {"value": 5})
+        queue.run_pending()
+        # Not due yet.
+        self.assertEqual(queue.run_pending(), 0)
+        self.assertEqual(queue.depth(), {"pending": 1, "failed": 0})
+
+    def test_post_game_jobs_are_queued(self):
+        game = Game.create(type="test|1|GAME", score=0)
+        queue = job_queue.JobQueue()
+        with mock.patch.object(job_queue, "_job_queue", queue):
+            EnqueuePostGameJobs(game)
+        self.assertEqual(queue.depth(), {"pending": 4, "failed": 0})
+        self.assertEqual(GameSummary.select().count(), 0)
+        # Jobs are durable. A new queue (E.g. after a restart) runs them.
+        self.assertEqual(job_queue.JobQueue().run_pending(), 4)
+        self.assertEqual(queue.depth(), {"pending": 0, "failed": 0})
+        self.assertEqual(GameSummary.get().game_id, game.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
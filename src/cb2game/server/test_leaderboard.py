@@ -0,0 +1,120 @@
+"""Unit tests for the cached leaderboard."""
+import random
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import cb2game.server.job_queue as job_queue
+import cb2game.server.leaderboard as leaderboard
+from cb2game.server.lobby_consts import LobbyType
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+from cb2game.server.schemas.leaderboard import Leaderboard
+
+
+def FakeGame(game_id, score, lobby_name, lobby_type):
+    return SimpleNamespace(
+        id=game_id,
+        type=f"{lobby_name}|{int(lobby_type)}|game",
+        score=score,
+        end_time=datetime.utcnow(),
+        leader=None,
+        follower=None,
+    )
+
+
+class LeaderboardCacheTest(unittest.TestCase):
+    def setUp(self):
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        leaderboard.ReloadLeaderboards()
+
+    def play_games(self):
+        rng = random.Random(42)
+        lobbies = [
+            ("open", LobbyType.OPEN),
+            ("bot-sandbox", LobbyType.FOLLOWER_PILOT),
+            ("other", LobbyType.OPEN),
+        ]
+        for game_id in range(200):
+            lobby_name, lobby_type = rng.choice(lobbies)
+            leaderboard.UpdateLeaderboard(
+                FakeGame(game_id, rng.randint(0, 20), lobby_name, lobby_type)
+            )
+
+    def test_matches_database(self):
+        self.play_games()
+        cached = leaderboard.GetLeaderboard("open", LobbyType.OPEN)
+        self.assertEqual(len(cached), leaderboard.LEADERBOARD_SIZE)
+        # The table is pruned as entries are evicted from the cache.
+        rows = (
+            Leaderboard.select()
+            .where(Leaderboard.lobby_name == "open")
+            .order_by(Leaderboard.score.desc(), Leaderboard.id)
+        )
+        self.assertEqual([e.id for e in cached], [e.id for e in rows])
+
+        # A freshly loaded cache agrees with the one updated incrementally.
+        for lobby_name, lobby_type, only_bot in [
+            ("", LobbyType.NONE, False),
+            ("bot-sandbox", LobbyType.FOLLOWER_PILOT, True),
+            ("other", LobbyType.NONE, False),
+        ]:
+            before = leaderboard.GetLeaderboardJson(lobby_name, lobby_type, only_bot)
+            leaderboard.ReloadLeaderboards()
+            after = leaderboard.GetLeaderboardJson(lobby_name, lobby_type, only_bot)
+            self.assertEqual(before, after)
+
+    def test_etag_changes_on_update(self):
+        self.play_games()
+        body, etag = leaderboard.GetLeaderboardJson("open", LobbyType.OPEN)
+        self.assertEqual(
+            (body, etag), leaderboard.GetLeaderboardJson("open", LobbyType.OPEN)
+        )
+        leaderboard.UpdateLeaderboard(FakeGame(1000, 100, "open", LobbyType.OPEN))
+        new_body, new_etag = leaderboard.GetLeaderboardJson("open", LobbyType.OPEN)
+        self.assertNotEqual(etag, new_etag)
+        self.assertIn(b'"score":100', new_body)
+
+    def test_rolled_back_job_leaves_cache(self):
+        self.play_games()
+        fail = True
+
+        @job_queue.JobHandler("test_leaderboard")
+        def Handler(game_id):
+            leaderboard.UpdateLeaderboard(
+                FakeGame(game_id, 100, "open", LobbyType.OPEN)
+            )
+            if fail:
+                raise RuntimeError("Test failure")
+
+        queue = job_queue.JobQueue(retry_delay_s=0)
+        queue.enqueue("test_leaderboard", {"game_id": 1000})
+        before = leaderboard.GetLeaderboard("open", LobbyType.OPEN)
+        queue.run_pending()
+        # Neither the new entry nor the eviction it caused were committed.
+        self.assertEqual(leaderboard.GetLeaderboard("open", LobbyType.OPEN), before)
+        self.assertEqual(
+            Leaderboard.select().where(Leaderboard.score == 100).count(), 0
+        )
+
+        fail = False
+        queue.run_pending()
+        cached = leaderboard.GetLeaderboard("open", LobbyType.OPEN)
+        self.assertEqual(cached[0].score, 100)
+        self.assertEqual(cached[1:], before[:-1])
+        rows = (
+            Leaderboard.select()
+            .where(Leaderboard.lobby_name == "open")
+            .order_by(Leaderboard.score.desc(), Leaderboard.id)
+        )
+        self.assertEqual([e.id for e in cached], [e.id for e in rows])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Unit tests for the array-backed map representation."""
+import unittest
+
+from cb2game.server.assets import AssetId
+from cb2game.server.config.map_config import MapConfig
+from cb2game.server.hex import HecsCoord
+from cb2game.server.map_arrays import MapArrays
+from cb2game.server.map_provider import RandomMap
+from cb2game.server.messages.map_update import MapUpdate
+
+
+class MapArraysTest(unittest.TestCase):
+    def setUp(self):
+        self.map_update = RandomMap(MapConfig(rng_seed=7))
+
+    def test_round_trip(self):
+        arrays = MapArrays.from_map_update(self.map_update)
+        self.assertEqual(arrays.to_map_update(), self.map_update)
+        self.assertEqual(
+            MapArrays.from_json(arrays.to_json()).to_map_update(), self.map_update
+        )
+
+    def test_offset_access(self):
+        arrays = self.map_update.arrays()
+        self.assertIs(self.map_update.arrays(), arrays)
+        for tile in self.map_update.tiles:
+            r, c = tile.cell.coord.to_offset_coordinates()
+            self.assertEqual(arrays.asset_ids[r, c], tile.asset_id)
+            self.assertEqual(arrays.edges[r, c], tile.cell.boundary.edges)
+            self.assertEqual(arrays.tile_at(tile.cell.coord), tile)
+        self.assertIsNone(arrays.tile_at_offset(-1, 0))
+        self.assertIsNone(arrays.tile_at_offset(0, arrays.cols))
+
+    def test_missing_tiles(self):
+        tiles = self.map_update.tiles[::2]
+        partial = MapUpdate(self.map_update.rows, self.map_update.cols, tiles)
+        arrays = MapArrays.from_map_update(partial)
+        self.assertEqual(arrays.tiles, tiles)
+        missing = self.map_update.tiles[1].cell.coord
+        self.assertIsNone(arrays.tile_at(missing))
+        r, c = missing.to_offset_coordinates()
+        self.assertEqual(arrays.asset_ids[r, c], AssetId.NONE)
+        self.assertEqual(arrays.edges[r, c], -1)
+
+    def test_none_tiles(self):
+        tiles = list(self.map_update.tiles)
+        missing = tiles[1].cell.coord
+        tiles[1] = None
+        partial = MapUpdate(self.map_update.rows, self.map_update.cols, tiles)
+        arrays = MapArrays.from_map_update(partial)
+        self.assertEqual(arrays.tiles, [tile for tile in tiles if tile is not None])
+        self.assertIsNone(arrays.tile_at(missing))
+
+    def test_edges_match_map_update(self):
+        arrays = MapArrays.from_map_update(self.map_update)
+        for tile in self.map_update.tiles:
+            coord = tile.cell.coord
+            for neighbor in coord.neighbors():
+                self.assertEqual(
+                    arrays.get_edge_between(coord, neighbor),
+                    self.map_update.get_edge_between(coord, neighbor),
+                )
+
+    def test_gym_map(self):
+        arrays = self.map_update.arrays()
+        gym_map = {
+            "asset_ids": arrays.asset_ids.tolist(),
+            "boundaries": arrays.edges.tolist(),
+            "orientations": arrays.rotations.tolist(),
+            "heights": arrays.heights.tolist(),
+            "layers": arrays.layers.tolist(),
+        }
+        from_gym = MapArrays.from_gym_map(gym_map)
+        coord = HecsCoord.from_offset(3, 4)
+        self.assertEqual(from_gym.tile_at(coord), arrays.tile_at(coord))
+        self.assertEqual(len(from_gym.tiles), arrays.rows * arrays.cols)
+
+
+if __name__ == "__main__":
+    unittest.main()
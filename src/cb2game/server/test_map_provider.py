@@ -0,0 +1,183 @@
+"""Unit tests for random map generation."""
+import collections
+import hashlib
+import random
+import unittest
+
+from cb2game.server.config.map_config import MapConfig
+from cb2game.server.hex import HecsCoord
+from cb2game.server.map_provider import (
+    CardSpawnSampler,
+    MapProvider,
+    MapType,
+    RandomMap,
+    TileStore,
+    path_find,
+)
+from cb2game.server.map_utils import GroundTile, WaterTile
+
+# Fingerprints of the maps generated from these seeds. If you change map
+# generation on purpose, regenerate them with MapFingerprint(). Otherwise, a
+# mismatch means maps from stored seeds can no longer be reproduced.
+GOLDEN_MAPS = {
+    0: "f13db6348ba947802ab36c506e1f541f342ef402f83c0884dabf03caed7d061b",
+    1234: "6c5294b07435fcb8dd890f1426b0db7f85e7f7b05b2e6865a70f44be133b3260",
+}
+
+
+def MapFingerprint(map_update):
+    tiles = "".join(
+        f"{tile.asset_id},{tile.rotation_degrees},{tile.cell.layer};"
+        for tile in map_update.tiles
+    )
+    return hashlib.sha256(tiles.encode("utf-8")).hexdigest()
+
+
+class RandomMapTest(unittest.TestCase):
+    def test_golden_maps(self):
+        for seed, fingerprint in GOLDEN_MAPS.items():
+            with self.subTest(seed=seed):
+                map_update = RandomMap(MapConfig(rng_seed=seed))
+                self.assertEqual(MapFingerprint(map_update), fingerprint)
+                self.assertEqual(map_update.metadata.start_seed, seed)
+
+    def test_global_rng_untouched(self):
+        random.seed(5)
+        expected = random.random()
+        random.seed(5)
+        RandomMap(MapConfig(rng_seed=1))
+        self.assertEqual(random.random(), expected)
+
+    def test_unseeded_maps_reproducible(self):
+        map_update = RandomMap(MapConfig())
+        replay = RandomMap(MapConfig(rng_seed=map_update.metadata.start_seed))
+        self.assertEqual(MapFingerprint(map_update), MapFingerprint(replay))
+
+
+class MapProviderTest(unittest.TestCase):
+    def Replay(self, provider):
+        return MapProvider(MapType.RANDOM, seed=provider.seed())
+
+    def test_same_seed_same_game(self):
+        provider = MapProvider(MapType.RANDOM, seed=42)
+        replay = self.Replay(provider)
+        self.assertEqual(MapFingerprint(provider.map()), MapFingerprint(replay.map()))
+        self.assertEqual(provider.cards(), replay.cards())
+        for _ in range(2):
+            self.assertEqual(
+                provider.consume_spawn_point(), replay.consume_spawn_point()
+            )
+            self.assertEqual(
+                provider.add_random_unique_set(), replay.add_random_unique_set()
+            )
+            self.assertEqual(provider.add_random_cards(3), replay.add_random_cards(3))
+
+    def test_seeds_differ(self):
+        provider = MapProvider(MapType.RANDOM)
+        other = MapProvider(MapType.RANDOM)
+        self.assertNotEqual(provider.seed(), other.seed())
+        self.assertNotEqual(MapFingerprint(provider.map()), MapFingerprint(other.map()))
+
+    def test_global_rng_untouched(self):
+        random.seed(5)
+        expected = random.random()
+        random.seed(5)
+        provider = MapProvider(MapType.RANDOM, seed=1)
+        provider.add_random_unique_set()
+        provider.consume_spawn_point()
+        self.assertEqual(random.random(), expected)
+
+    def test_cards_not_stacked(self):
+        provider = MapProvider(MapType.RANDOM, seed=3)
+        for _ in range(5):
+            provider.add_random_unique_set()
+        locations = [card.location for card in provider.cards()]
+        self.assertEqual(len(locations), len(set(locations)))
+
+    def test_removed_card_frees_location(self):
+        provider = MapProvider(MapType.RANDOM, seed=3)
+        sampler = provider._card_spawn_sampler
+        total = sampler.total()
+        removed = provider.cards()[0]
+        provider.remove_card(removed.id)
+        self.assertEqual(
+            sampler.total(),
+            total
+            + provider.calculate_card_spawn_weight(
+                provider._tiles[provider._tiles_by_location[removed.location]]
+            ),
+        )
+        provider.add_random_cards(1)
+        self.assertEqual(sampler.total(), total)
+
+    def test_pooled_maps_share_tiles(self):
+        provider = MapProvider(MapType.RANDOM, seed=5)
+        other = MapProvider(MapType.RANDOM, seed=6)
+        self.assertIs(provider._tiles_by_location, other._tiles_by_location)
+        shared = set(map(id, provider._tiles)) & set(map(id, other._tiles))
+        self.assertGreater(len(shared), 0)
+
+    def test_tile_store(self):
+        store = TileStore()
+        tiles = RandomMap(MapConfig(rng_seed=5)).tiles
+        interned = store.intern_tiles(tiles)
+        self.assertEqual(interned, tiles)
+        replay = store.intern_tiles(RandomMap(MapConfig(rng_seed=5)).tiles)
+        for tile, replay_tile in zip(interned, replay):
+            self.assertIs(tile, replay_tile)
+
+
+class CardSpawnSamplerTest(unittest.TestCase):
+    def test_weighted_sampling(self):
+        sampler = CardSpawnSampler("abcde", [1, 2, 0, 4, 1])
+        rng = random.Random(0)
+        counts = collections.Counter(sampler.sample(rng) for _ in range(8000))
+        self.assertNotIn("c", counts)
+        for location, weight in zip("abde", [1, 2, 4, 1]):
+            self.assertAlmostEqual(counts[location] / 8000, weight / 8, delta=0.02)
+
+    def test_occupancy(self):
+        sampler = CardSpawnSampler("abc", [1, 2, 3])
+        rng = random.Random(0)
+        sampler.set_occupied("b", True)
+        sampler.set_occupied("b", True)
+        sampler.set_occupied("z", True)
+        self.assertEqual(sampler.total(), 4)
+        self.assertNotIn("b", {sampler.sample(rng) for _ in range(100)})
+        sampler.set_occupied("a", True)
+        sampler.set_occupied("c", True)
+        self.assertIsNone(sampler.sample(rng))
+        sampler.set_occupied("b", False)
+        self.assertEqual(sampler.sample(rng), "b")
+
+
+class PathFindTest(unittest.TestCase):
+    def setUp(self):
+        self.map = [[GroundTile() for _ in range(5)] for _ in range(5)]
+
+    def test_shortest_path(self):
+        start = HecsCoord.from_offset(0, 0)
+        end = HecsCoord.from_offset(0, 4)
+        path = path_find(self.map, start, end)
+        self.assertEqual(path[0], start)
+        self.assertEqual(path[-1], end)
+        self.assertEqual(len(path), 5)
+        for a, b in zip(path, path[1:]):
+            self.assertIn(b, a.neighbors())
+
+    def test_routes_around_water(self):
+        for c in range(4):
+            self.map[2][c] = WaterTile()
+        start = HecsCoord.from_offset(0, 0)
+        end = HecsCoord.from_offset(4, 0)
+        path = path_find(self.map, start, end)
+        self.assertEqual(path[-1], end)
+        for coord in path:
+            self.assertNotIn(coord.to_offset_coordinates(), [(2, c) for c in range(4)])
+        # Fully blocked.
+        self.map[2][4] = WaterTile()
+        self.assertIsNone(path_find(self.map, start, end))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Unit tests for incremental objective updates."""
+import logging
+import os
+import unittest
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action, GameEndpoint
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages import message_from_server, message_to_server
+from cb2game.server.messages.objective import ObjectiveMessage
+from cb2game.server.messages.rooms import Role
+from cb2game.server.objective_updates import ApplyObjectiveUpdate, ObjectiveUpdateStream
+from cb2game.server.schemas.base import (
+    ConnectDatabase,
+    CreateTablesIfNotExists,
+    SetDatabaseForTesting,
+)
+from cb2game.server.schemas.defaults import ListDefaultTables
+
+logger = logging.getLogger(__name__)
+
+
+def Objective(uuid, text="", completed=False):
+    return ObjectiveMessage(Role.LEADER, text, uuid, completed)
+
+
+class ObjectiveUpdateStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.stream = ObjectiveUpdateStream()
+        self.client = ([], None)
+
+    def send(self, objectives):
+        update = self.stream.next_update(objectives)
+        if update is not None:
+            self.client = ApplyObjectiveUpdate(*self.client, update)
+            self.assertEqual(self.client[0], objectives)
+        return update
+
+    def test_only_changes_sent(self):
+        objectives = [Objective("a"), Objective("b")]
+        update = self.send(objectives)
+        self.assertTrue(update.full)
+        self.assertIsNone(self.send(objectives))
+        # Objectives are modified in place.
+        objectives[0].completed = True
+        objectives.append(Objective("c"))
+        update = self.send(objectives)
+        self.assertFalse(update.full)
+        self.assertEqual([o.uuid for o in update.objectives], ["a", "c"])
+        self.assertEqual(update.base_version, 1)
+        self.assertEqual(update.version, 2)
+
+    def test_removed_objectives_resend_full_list(self):
+        self.send([Objective("a"), Objective("b")])
+        update = self.send([Objective("c")])
+        self.assertTrue(update.full)
+        update = self.send([])
+        self.assertTrue(update.full)
+
+    def test_missed_update_detected(self):
+        objectives = [Objective("a")]
+        self.send(objectives)
+        objectives.append(Objective("b"))
+        self.stream.next_update(objectives)  # Never reaches the client.
+        objectives.append(Objective("c"))
+        update = self.stream.next_update(objectives)
+        self.assertIsNone(ApplyObjectiveUpdate(*self.client, update))
+        self.stream.request_full_resend()
+        update = self.send(objectives)
+        self.assertTrue(update.full)
+
+
+class ObjectiveUpdateGameTest(unittest.TestCase):
+    """Objective lists stay in sync in a local game with incremental updates."""
+
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.config = Config(
+            comment="Objective Update Unit Test Config", objective_updates=True
+        )
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        SetGlobalConfig(self.config)
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        self.coordinator = LocalGameCoordinator(self.config)
+        game_name = self.coordinator.CreateGame(log_to_db=False, lobby=lobby)
+        self.endpoint_pair = EndpointPair(self.coordinator, game_name)
+        self.endpoint_pair.initialize()
+
+    def test_instructions(self):
+        leader = self.endpoint_pair.leader()
+        follower = self.endpoint_pair.follower()
+        updates = []
+        handle_message = leader._handle_message
+
+        def RecordingHandleMessage(message):
+            if message.type == message_from_server.MessageType.OBJECTIVE_UPDATE:
+                updates.append(message.objective_update)
+            handle_message(message)
+
+        leader._handle_message = RecordingHandleMessage
+        for text in ["first", "second", "third"]:
+            self.endpoint_pair.step(Action.SendInstruction(text))
+        _, _, _, instructions, _, _ = self.endpoint_pair.step(Action.EndTurn())
+        self.assertEqual(
+            [i.text for i in leader.instructions], ["first", "second", "third"]
+        )
+        self.assertEqual([i.text for i in instructions], ["first"])
+        # One full list, then one new instruction at a time.
+        self.assertTrue(updates[0].full)
+        for update in updates[1:]:
+            self.assertFalse(update.full)
+            self.assertEqual(len(update.objectives), 1)
+
+        _, _, _, instructions, _, _ = self.endpoint_pair.step(
+            Action.InstructionDone(instructions[0].uuid)
+        )
+        self.assertTrue(leader.instructions[0].completed)
+        self.assertEqual(
+            [(i.text, i.completed) for i in follower.instructions],
+            [("first", True), ("second", False)],
+        )
+
+    def test_not_requested_unless_advertised(self):
+        # Older servers can't parse OBJECTIVE_SYNC_REQUEST.
+        for objective_updates in [False, True]:
+            endpoint = GameEndpoint(None, Config(objective_updates=objective_updates))
+            requested = any(
+                message.type == message_to_server.MessageType.OBJECTIVE_SYNC_REQUEST
+                for message in endpoint.queued_messages
+            )
+            self.assertEqual(requested, objective_updates)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Unit tests for hosting rooms in room shard processes."""
+import asyncio
+import logging
+import pathlib
+import tempfile
+import unittest
+
+import orjson
+
+import cb2game.server.room_shards as room_shards
+import cb2game.server.schemas.game as game_db
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobby_utils import GetLobby, InitializeLobbies
+from cb2game.server.messages.rooms import Role
+from cb2game.server.room import RoomType
+from cb2game.server.schemas import base
+from cb2game.server.schemas.defaults import ListDefaultTables
+
+# How long to wait for the shard to start and to answer.
+WAIT_S = 60
+
+
+class FakeSocket(object):
+    """Stands in for a websocket. Rooms only use it as a key."""
+
+
+class RoomShardsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO)
+        self.data_directory = tempfile.TemporaryDirectory()
+        self.config = Config(
+            data_prefix=self.data_directory.name,
+            room_shards=1,
+            map_cache_size=0,
+            comment="Room Shards Unit Test Config",
+        )
+        SetGlobalConfig(self.config)
+        # The shard opens the same database file.
+        base.SetDatabase(self.config)
+        base.ConnectDatabase()
+        base.CreateTablesIfNotExists(ListDefaultTables())
+        InitializeLobbies(self.config.lobbies)
+        self.shards = room_shards.InitRoomShards(self.config)
+
+    def tearDown(self):
+        self.shards.stop()
+        room_shards.room_shards = None
+        base.GetDatabase().close()
+        self.data_directory.cleanup()
+
+    async def wait_for(self, condition):
+        for _ in range(WAIT_S * 10):
+            if condition():
+                return
+            await asyncio.sleep(0.1)
+        self.fail("Timed out waiting for room shard.")
+
+    async def test_game_in_shard(self):
+        monitor = asyncio.ensure_future(self.shards.run())
+        lobby = GetLobby("open")
+        game_record = game_db.Game()
+        game_record.save()
+        log_directory = pathlib.Path(self.data_directory.name, "game_logs")
+        log_directory.mkdir()
+        game_record.log_directory = str(log_directory)
+        game_record.save()
+
+        room = lobby.create_room(game_record.id, game_record)
+        self.assertIsInstance(room, room_shards.ShardedRoom)
+        self.assertIs(lobby.get_room(game_record.id), room)
+        leader = room.add_player(FakeSocket(), Role.LEADER)
+        follower = room.add_player(FakeSocket(), Role.FOLLOWER)
+        self.assertTrue(room.is_full())
+        self.assertEqual(room.player_role(follower), Role.FOLLOWER)
+
+        # Both players receive serialized state from the shard.
+        for player_id in [leader, follower]:
+            messages = []
+            await self.wait_for(lambda: room.fill_messages(player_id, messages))
+            self.assertIsInstance(messages[0], bytes)
+            self.assertIn("type", orjson.loads(messages[0]))
+        self.assertFalse(room.has_exception())
+
+        # The shard stores the game's record.
+        game_record = game_db.Game.get_by_id(game_record.id)
+        self.assertIsNotNone(game_record.type)
+
+        status = await self.shards.status()
+        self.assertEqual(status[0]["number_rooms"], 1)
+        self.assertEqual(status[0]["number_players"], 2)
+        self.assertNotIn("rooms", status[0])
+        # Status queries refresh the room's state snapshot.
+        self.assertEqual(len(room.state().actors), 2)
+        self.assertIsNotNone(room.debug_status())
+
+        room.stop()
+        await self.wait_for(lambda: room.done())
+        await self.wait_for(lambda: self.shards._shards[0].number_of_rooms() == 0)
+        status = await self.shards.status()
+        self.assertEqual(status[0]["number_rooms"], 0)
+        monitor.cancel()
+
+    async def test_failed_room_reports_exception(self):
+        monitor = asyncio.ensure_future(self.shards.run())
+        lobby = GetLobby("open")
+        # The event to start this preset game from doesn't exist.
+        room = lobby.create_room(
+            1, None, RoomType.PRESET_GAME, from_event="missing-event"
+        )
+        await self.wait_for(lambda: room.has_exception())
+        self.assertTrue(room.done())
+        self.assertIn("missing-event", repr(room.exception()))
+        await self.wait_for(lambda: self.shards._shards[0].number_of_rooms() == 0)
+        monitor.cancel()
+
+    async def test_idle_shard_answers_status(self):
+        monitor = asyncio.ensure_future(self.shards.run())
+        statuses = await asyncio.gather(self.shards.status(), self.shards.status())
+        for status in statuses:
+            self.assertEqual(status[0]["number_rooms"], 0)
+            self.assertNotIn("error", status[0])
+        monitor.cancel()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,14 +3,19 @@ import logging
 import os
 import unittest
 
+import orjson
+
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
 
 from cb2game.pyclient.endpoint_pair import EndpointPair
 from cb2game.pyclient.game_endpoint import Action
 from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator
 from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.hex import HecsCoord
 from cb2game.server.lobbies.open_lobby import OpenLobby
 from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages import message_from_server
+from cb2game.server.messages.action import Walk
 from cb2game.server.messages.rooms import Role
 from cb2game.server.schemas.base import (
     ConnectDatabase,
@@ -18,7 +23,12 @@ from cb2game.server.schemas.base import (
     SetDatabaseForTesting,
 )
 from cb2game.server.schemas.defaults import ListDefaultTables
-from cb2game.server.state import FOLLOWER_MOVES_PER_TURN, LEADER_MOVES_PER_TURN
+from cb2game.server.schemas.game import Game
+from cb2game.server.state import (
+    FOLLOWER_MOVES_PER_TURN,
+    LEADER_MOVES_PER_TURN,
+    MAX_PENDING_ACTIONS,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -231,5 +241,68 @@ class RandomRealtimeLocalSelfPlayTest(unittest.TestCase):
             follower_moved = False
 
 
+class SeededGameTest(unittest.TestCase):
+    """Games created with the same seed start from the same state."""
+
+    def setUp(self):
+        self.config = Config(comment="Seeded Game Unit Test Config")
+        self.lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        SetGlobalConfig(self.config)
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        self.coordinator = LocalGameCoordinator(self.config)
+
+    def initial_state(self, seed):
+        game_name = self.coordinator.CreateGame(
+            log_to_db=True, lobby=self.lobby, seed=seed
+        )
+        endpoint_pair = EndpointPair(self.coordinator, game_name)
+        endpoint_pair.initialize()
+        map_update, props, _, _, actors, _ = endpoint_pair.initial_state()
+        return map_update, list(props), [actor.location() for actor in actors]
+
+    def test_same_seed_same_game(self):
+        self.assertEqual(self.initial_state(1234), self.initial_state(1234))
+        self.assertEqual(Game.select().count(), 2)
+        for game in Game.select():
+            self.assertEqual(orjson.loads(game.kvals)["rng_seed"], 1234)
+
+
+class PendingMessagesTest(unittest.TestCase):
+    """Messages queued for a player who isn't receiving them stay bounded."""
+
+    def setUp(self):
+        self.config = Config(comment="Pending Messages Unit Test Config")
+        lobby = OpenLobby(
+            LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+        )
+        SetGlobalConfig(self.config)
+        SetDatabaseForTesting()
+        ConnectDatabase()
+        CreateTablesIfNotExists(ListDefaultTables())
+        self.coordinator = LocalGameCoordinator(self.config)
+        game_name = self.coordinator.CreateGame(log_to_db=False, lobby=lobby)
+        EndpointPair(self.coordinator, game_name).initialize()
+        self.state = self.coordinator._game_drivers[game_name].state_machine()
+
+    def test_stalled_player_resynced(self):
+        player_id = list(self.state._actors)[0]
+        for _ in range(MAX_PENDING_ACTIONS + 1):
+            self.state._announce_action(Walk(player_id, HecsCoord(0, 0, 0)))
+        self.assertLessEqual(
+            len(self.state._action_history[player_id]), MAX_PENDING_ACTIONS
+        )
+        self.assertFalse(self.state.is_synced(player_id))
+        messages = []
+        self.state.fill_messages(player_id, messages)
+        self.assertIn(
+            message_from_server.MessageType.STATE_SYNC,
+            [message.type for message in messages],
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
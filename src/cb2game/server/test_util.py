@@ -48,3 +48,37 @@ class TestLagMonitor(unittest.TestCase):
         expected_timestamps_2 = [0, 60, 120]
         for i in range(len(timestamps)):
             self.assertAlmostEqual(timestamps[i], expected_timestamps_2[i], places=3)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = util.LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0)
+        for _ in range(90):
+            histogram.record(0.002)
+        for _ in range(10):
+            histogram.record(0.5)
+        self.assertEqual(histogram.count(), 100)
+        self.assertAlmostEqual(histogram.mean(), 0.0518)
+        # Percentiles are the upper bound of a bucket, within 10**0.1 (26%).
+        self.assertGreaterEqual(histogram.percentile(50), 0.002)
+        self.assertLess(histogram.percentile(90), 0.002 * 1.26)
+        self.assertGreaterEqual(histogram.percentile(95), 0.5)
+        self.assertLess(histogram.percentile(100), 0.5 * 1.26)
+
+    def test_out_of_range(self):
+        histogram = util.LatencyHistogram()
+        histogram.record(0)
+        histogram.record(10**6)
+        self.assertEqual(histogram.percentile(1), util.LatencyHistogram.MIN_LATENCY_S)
+        self.assertEqual(histogram.percentile(100), util.LatencyHistogram.bounds()[-1])
+
+    def test_window_from_snapshots(self):
+        histogram = util.LatencyHistogram()
+        histogram.record(0.001)
+        before = histogram.counts()
+        histogram.record(1)
+        histogram.record(1)
+        window = [a - b for a, b in zip(histogram.counts(), before)]
+        self.assertEqual(sum(window), 2)
+        self.assertGreaterEqual(util.HistogramPercentile(window, 1), 1)
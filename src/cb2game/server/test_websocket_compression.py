@@ -0,0 +1,133 @@
+"""Unit tests for compressing large websocket messages."""
+import unittest
+
+import orjson
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from cb2game.server.map_provider import MapProvider, MapType
+from cb2game.server.messages import message_from_server
+from cb2game.server.websocket_compression import (
+    COMPRESSION_SAMPLE_PERIOD,
+    CompressionStats,
+    FrameCompression,
+    NegotiatedCompression,
+)
+from cb2game.server.wire_format import EncodeMessage, WireFormat
+
+THRESHOLD = 1024
+
+
+def LargeMessage():
+    map_update = MapProvider(MapType.RANDOM).map()
+    return EncodeMessage(
+        message_from_server.MapUpdateFromServer(map_update), WireFormat.JSON_TEXT
+    )
+
+
+def SmallMessage():
+    return EncodeMessage(
+        message_from_server.PingMessageFromServer(), WireFormat.JSON_TEXT
+    )
+
+
+class FrameCompressionTest(unittest.TestCase):
+    def test_threshold(self):
+        stats = CompressionStats(wbits=15, threshold_bytes=THRESHOLD)
+        self.assertIsNone(FrameCompression(stats, SmallMessage()))
+        self.assertEqual(FrameCompression(stats, LargeMessage()), 15)
+        self.assertEqual(stats.messages_uncompressed, 1)
+        self.assertEqual(stats.messages_compressed, 1)
+
+    def test_disabled(self):
+        self.assertIsNone(FrameCompression(None, LargeMessage()))
+        stats = CompressionStats(wbits=0, threshold_bytes=THRESHOLD)
+        self.assertIsNone(FrameCompression(stats, LargeMessage()))
+        self.assertEqual(stats.messages_compressed, 0)
+
+    def test_sampled_stats(self):
+        stats = CompressionStats(wbits=15, threshold_bytes=THRESHOLD)
+        message = LargeMessage()
+        for _ in range(COMPRESSION_SAMPLE_PERIOD + 1):
+            FrameCompression(stats, message)
+        self.assertEqual(stats.samples, 2)
+        self.assertEqual(
+            stats.bytes_compressed, len(message) * stats.messages_compressed
+        )
+        # Map updates are repetitive JSON.
+        self.assertLess(stats.compression_ratio(), 0.5)
+        self.assertGreater(stats.estimated_bytes_saved(), stats.bytes_compressed / 2)
+        self.assertGreater(stats.estimated_cpu_s(), 0)
+
+
+class CountingTransport(object):
+    """Counts the bytes written to a transport."""
+
+    def __init__(self, transport):
+        self._transport = transport
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        self._transport.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+
+class CompressedSocketTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.messages = [SmallMessage(), LargeMessage(), SmallMessage()]
+        self.wire_bytes = []
+
+        async def endpoint(request):
+            # Set up like /player_endpoint in a lobby with compression.
+            ws = web.WebSocketResponse(compress=True)
+            await ws.prepare(request)
+            stats = NegotiatedCompression(ws, THRESHOLD)
+            transport = CountingTransport(ws._writer.transport)
+            ws._writer.transport = transport
+            for message in self.messages:
+                before = transport.bytes_written
+                await ws.send_str(
+                    message.decode("utf-8"),
+                    compress=FrameCompression(stats, message),
+                )
+                self.wire_bytes.append(transport.bytes_written - before)
+            await ws.close()
+            return ws
+
+        app = web.Application()
+        app.router.add_get("/player_endpoint", endpoint)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def receive_all(self, compress):
+        ws = await self.client.ws_connect("/player_endpoint", compress=compress)
+        received = [(await ws.receive()).data for _ in self.messages]
+        await ws.close()
+        return received
+
+    async def test_only_large_messages_compressed(self):
+        received = await self.receive_all(compress=15)
+        self.assertEqual(
+            [orjson.loads(data) for data in received],
+            [orjson.loads(message) for message in self.messages],
+        )
+        small, large, _ = self.messages
+        # Uncompressed frames only add a header.
+        self.assertLess(self.wire_bytes[0] - len(small), 16)
+        self.assertLess(self.wire_bytes[1], len(large) / 2)
+        self.assertLess(self.wire_bytes[2] - len(small), 16)
+
+    async def test_client_without_compression(self):
+        received = await self.receive_all(compress=0)
+        self.assertEqual(received[1], self.messages[1].decode("utf-8"))
+        self.assertGreater(self.wire_bytes[1], len(self.messages[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
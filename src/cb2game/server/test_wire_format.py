@@ -0,0 +1,173 @@
+"""Unit tests for the websocket message encodings."""
+import logging
+import os
+import unittest
+from unittest import mock
+
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = ""  # Hide pygame welcome message
+
+import orjson
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from cb2game.pyclient.endpoint_pair import EndpointPair
+from cb2game.pyclient.game_endpoint import Action
+from cb2game.pyclient.local_game_coordinator import LocalGameCoordinator, LocalSocket
+from cb2game.server.config.config import Config, SetGlobalConfig
+from cb2game.server.lobbies.open_lobby import OpenLobby
+from cb2game.server.lobby import LobbyInfo, LobbyType
+from cb2game.server.messages.message_from_server import MessageFromServer
+from cb2game.server.messages.message_to_server import MessageToServer
+from cb2game.server.messages.rooms import Role
+from cb2game.server.wire_format import (
+    AvailableWireFormats,
+    DecodeMessage,
+    EncodeMessage,
+    NegotiatedWireFormat,
+    Subprotocols,
+    WireFormat,
+    msgpack,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def PlayGame():
+    """Plays a short local game. Returns the messages (to server, from server)."""
+    config = Config(card_covers=True, comment="Wire Format Unit Test Config")
+    SetGlobalConfig(config)
+    lobby = OpenLobby(
+        LobbyInfo("Test Lobby", LobbyType.OPEN, "Unit test...", 40, 1, False)
+    )
+    coordinator = LocalGameCoordinator(config)
+    game_name = coordinator.CreateGame(
+        log_to_db=False, realtime_actions=True, lobby=lobby
+    )
+    endpoint_pair = EndpointPair(coordinator, game_name)
+    sent, received = [], []
+    send_message = LocalSocket.send_message
+    receive_message = LocalSocket.receive_message
+
+    def record_send(socket, message):
+        sent.append(message)
+        return send_message(socket, message)
+
+    def record_receive(socket, *args, **kwargs):
+        message, reason = receive_message(socket, *args, **kwargs)
+        if message is not None:
+            received.append(message)
+        return message, reason
+
+    with mock.patch.object(LocalSocket, "send_message", record_send), mock.patch.object(
+        LocalSocket, "receive_message", record_receive
+    ):
+        endpoint_pair.initialize()
+        _, _, turn_state, instructions, _, _ = endpoint_pair.initial_state()
+        for action in [
+            Action.Forwards(),
+            Action.SendInstruction("Go to the red card"),
+            Action.EndTurn(),
+            Action.Left(),
+            Action.Forwards(),
+        ]:
+            if endpoint_pair.over():
+                break
+            _, _, turn_state, instructions, _, _ = endpoint_pair.step(action)
+            if turn_state.turn == Role.FOLLOWER and instructions:
+                endpoint_pair.step(Action.InstructionDone(instructions[0].uuid))
+                break
+    coordinator.Cleanup()
+    return sent, received
+
+
+class WireFormatTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(level=logging.INFO)
+        cls.sent, cls.received = PlayGame()
+
+    def messages(self):
+        return [(MessageToServer, m) for m in self.sent] + [
+            (MessageFromServer, m) for m in self.received
+        ]
+
+    def test_game_has_messages(self):
+        self.assertGreater(len(self.sent), 3)
+        self.assertGreater(len(self.received), 10)
+        self.assertGreater(len({m.type for m in self.received}), 3)
+
+    def test_formats_decode_to_same_message(self):
+        for message_type, message in self.messages():
+            json_text = EncodeMessage(message, WireFormat.JSON_TEXT).decode("utf-8")
+            expected = DecodeMessage(message_type, json_text, WireFormat.JSON_TEXT)
+            for wire_format in AvailableWireFormats():
+                with self.subTest(wire_format=wire_format, type=message.type):
+                    data = EncodeMessage(message, wire_format)
+                    self.assertIsInstance(data, bytes)
+                    self.assertEqual(
+                        DecodeMessage(message_type, data, wire_format), expected
+                    )
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed.")
+    def test_msgpack_fields_match_json(self):
+        for _, message in self.messages():
+            with self.subTest(type=message.type):
+                fields = msgpack.unpackb(EncodeMessage(message, WireFormat.MSGPACK))
+                json_fields = orjson.loads(EncodeMessage(message, WireFormat.JSON))
+                self.assertEqual(fields, json_fields)
+
+    def test_text_frames_are_json(self):
+        # Text frames are JSON whatever the negotiated format.
+        message = self.sent[0]
+        text = EncodeMessage(message, WireFormat.JSON).decode("utf-8")
+        for wire_format in WireFormat:
+            self.assertEqual(
+                DecodeMessage(MessageToServer, text, wire_format),
+                DecodeMessage(MessageToServer, text, WireFormat.JSON_TEXT),
+            )
+
+
+class NegotiationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def endpoint(request):
+            # Same subprotocols as /player_endpoint.
+            ws = web.WebSocketResponse(protocols=Subprotocols())
+            await ws.prepare(request)
+            await ws.send_str(NegotiatedWireFormat(ws.ws_protocol).name)
+            await ws.close()
+            return ws
+
+        app = web.Application()
+        app.router.add_get("/player_endpoint", endpoint)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def negotiate(self, protocols):
+        ws = await self.client.ws_connect("/player_endpoint", protocols=protocols)
+        server_format = (await ws.receive()).data
+        client_format = NegotiatedWireFormat(ws.protocol)
+        await ws.close()
+        self.assertEqual(server_format, client_format.name)
+        return client_format
+
+    async def test_no_subprotocol_uses_json_text(self):
+        # E.g. the Unity client.
+        self.assertEqual(await self.negotiate(()), WireFormat.JSON_TEXT)
+
+    async def test_client_preference(self):
+        self.assertEqual(
+            await self.negotiate(Subprotocols()), AvailableWireFormats()[0]
+        )
+        self.assertEqual(
+            await self.negotiate(Subprotocols([WireFormat.JSON])), WireFormat.JSON
+        )
+        self.assertEqual(
+            await self.negotiate(("unknown-protocol",)), WireFormat.JSON_TEXT
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -579,6 +579,9 @@ class TutorialGameState(object):
             self.handle_objective_complete(id, message.objective_complete)
         elif message.type == message_to_server.MessageType.STATE_SYNC_REQUEST:
             self.desync(id)
+        elif message.type == message_to_server.MessageType.OBJECTIVE_SYNC_REQUEST:
+            # Tutorials always send the full objective list.
+            pass
         elif message.type == message_to_server.MessageType.TUTORIAL_REQUEST:
             self.handle_tutorial_request(id, message.tutorial_request)
         elif message.type == message_to_server.MessageType.TURN_COMPLETE:
@@ -3,6 +3,7 @@
 import contextvars
 import functools
 import logging
+import math
 import pathlib
 import subprocess
 import sys
@@ -237,6 +238,83 @@ class LatencyMonitor(object):
         return [bucket[1] for bucket in self.buckets]
 
 
+class LatencyHistogram(object):
+    """Counts latencies in fixed, log-spaced buckets.
+
+    Cheap enough to record every game tick. Bucket i counts latencies up to
+    bounds()[i] (the last bucket counts everything larger). Since the buckets
+    never change, the counts of two snapshots can be subtracted to get the
+    histogram of a time window (see the load test in cb2game.loadtest).
+    """
+
+    # 1us to 100s, 10 buckets per decade.
+    MIN_LATENCY_S = 1e-6
+    BUCKETS_PER_DECADE = 10
+    DECADES = 8
+
+    def __init__(self):
+        self._counts = [0] * (self.BUCKETS_PER_DECADE * self.DECADES + 1)
+        self._total_s = 0.0
+
+    @classmethod
+    def bounds(cls) -> List[float]:
+        return [
+            cls.MIN_LATENCY_S * 10 ** (i / cls.BUCKETS_PER_DECADE)
+            for i in range(cls.BUCKETS_PER_DECADE * cls.DECADES + 1)
+        ]
+
+    def record(self, latency_s: float):
+        self._total_s += latency_s
+        if latency_s <= self.MIN_LATENCY_S:
+            self._counts[0] += 1
+            return
+        bucket = math.ceil(
+            math.log10(latency_s / self.MIN_LATENCY_S) * self.BUCKETS_PER_DECADE
+        )
+        self._counts[min(bucket, len(self._counts) - 1)] += 1
+
+    def counts(self) -> List[int]:
+        return list(self._counts)
+
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def mean(self) -> float:
+        count = self.count()
+        return self._total_s / count if count > 0 else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket containing the p-th percentile (0-100)."""
+        return HistogramPercentile(self._counts, p)
+
+    def summary(self):
+        """A JSON-serializable summary, for /status."""
+        return {
+            "count": self.count(),
+            "mean_s": self.mean(),
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+            "max_s": self.percentile(100),
+            "counts": self.counts(),
+        }
+
+
+def HistogramPercentile(counts: List[int], p: float) -> float:
+    """p-th percentile (0-100) of LatencyHistogram bucket counts. 0 if empty."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = max(1, math.ceil(total * p / 100))
+    seen = 0
+    bounds = LatencyHistogram.bounds()
+    for bound, count in zip(bounds, counts):
+        seen += count
+        if seen >= rank:
+            return bound
+    return bounds[-1]
+
+
 # Asyncio.to_thread is a feature of python 3.9, however, we are using python 3.8
 # This is a backport of the function from python 3.9.
 async def to_thread(func, /, *args, **kwargs):
@@ -0,0 +1,89 @@
+""" Websocket permessage-deflate for large messages only.
+
+Lobbies with compression_threshold_bytes > 0 offer the permessage-deflate
+extension (RFC 7692) to clients. Once negotiated, aiohttp would compress every
+frame. Small messages (pings, actions) don't shrink much, so they're sent
+uncompressed instead, and only messages of at least the lobby's threshold are
+compressed. Map, prop and objective updates are the main beneficiaries.
+
+Compression stats are kept per connection in remote_table.Remote, and shown in
+/status. To measure compressed size and CPU time, every
+COMPRESSION_SAMPLE_PERIOD-th compressed message is also compressed here, with
+the same settings aiohttp uses for per-message compression.
+"""
+import time
+import zlib
+from dataclasses import dataclass
+
+# Measure one in this many compressed messages (and the first).
+COMPRESSION_SAMPLE_PERIOD = 10
+
+
+@dataclass
+class CompressionStats:
+    # permessage-deflate window bits negotiated with the client. 0 if off.
+    wbits: int = 0
+    threshold_bytes: int = 0
+    messages_compressed: int = 0
+    messages_uncompressed: int = 0
+    bytes_compressed: int = 0  # Payload bytes of compressed messages.
+    # Sampled messages: payload bytes, compressed bytes and CPU seconds.
+    samples: int = 0
+    sample_bytes: int = 0
+    sample_compressed_bytes: int = 0
+    sample_cpu_s: float = 0.0
+
+    def compression_ratio(self):
+        if self.sample_bytes == 0:
+            return 1.0
+        return self.sample_compressed_bytes / self.sample_bytes
+
+    def estimated_bytes_saved(self):
+        return int(self.bytes_compressed * (1 - self.compression_ratio()))
+
+    def estimated_cpu_s(self):
+        if self.sample_bytes == 0:
+            return 0.0
+        return self.sample_cpu_s * self.bytes_compressed / self.sample_bytes
+
+
+def NegotiatedCompression(ws, threshold_bytes):
+    """Call after ws.prepare(). Returns the connection's CompressionStats.
+
+    Stops aiohttp from compressing every frame. Frames are then only
+    compressed when FrameCompression() says so.
+    """
+    wbits = int(ws.compress) if threshold_bytes > 0 else 0
+    if ws.compress:
+        # The writer compresses all frames if this is set. Per-frame
+        # compression (send_str(..., compress=wbits)) still works without it.
+        ws._writer.compress = 0  # pylint: disable=protected-access
+    return CompressionStats(wbits=wbits, threshold_bytes=threshold_bytes)
+
+
+def FrameCompression(stats, message):
+    """Returns the compress argument for ws.send_str/send_bytes(message).
+
+    Updates stats, which may be None for connections without compression.
+    """
+    if stats is None or stats.wbits == 0:
+        return None
+    if len(message) < stats.threshold_bytes:
+        stats.messages_uncompressed += 1
+        return None
+    if stats.messages_compressed % COMPRESSION_SAMPLE_PERIOD == 0:
+        SampleCompression(stats, message)
+    stats.messages_compressed += 1
+    stats.bytes_compressed += len(message)
+    return stats.wbits
+
+
+def SampleCompression(stats, message):
+    start = time.process_time()
+    compressor = zlib.compressobj(level=zlib.Z_BEST_SPEED, wbits=-stats.wbits)
+    compressed = compressor.compress(message) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    stats.sample_cpu_s += time.process_time() - start
+    stats.samples += 1
+    stats.sample_bytes += len(message)
+    # permessage-deflate drops the 4 byte sync flush trailer.
+    stats.sample_compressed_bytes += len(compressed) - 4
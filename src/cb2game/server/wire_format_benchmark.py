@@ -0,0 +1,80 @@
+""" Measures encoding throughput of each websocket wire format.
+
+Encodes and decodes a mix of map updates, prop updates and pings (as sent at
+the start of every game) in each format, and reports messages per second and
+bytes per message. JSON_TEXT includes the UTF-8 decode done before sending a
+text frame, and the re-encode done when receiving one.
+
+Example usage:
+python3 -m cb2game.server.wire_format_benchmark --number_of_maps=20
+"""
+import logging
+import time
+
+import fire
+
+from cb2game.server.map_provider import MapProvider, MapType
+from cb2game.server.messages import message_from_server
+from cb2game.server.messages.message_from_server import MessageFromServer
+from cb2game.server.wire_format import (
+    AvailableWireFormats,
+    DecodeMessage,
+    EncodeMessage,
+    WireFormat,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def BenchmarkMessages(number_of_maps):
+    messages = []
+    for _ in range(number_of_maps):
+        map_provider = MapProvider(MapType.RANDOM)
+        messages.append(message_from_server.MapUpdateFromServer(map_provider.map()))
+        messages.append(
+            message_from_server.PropUpdateFromServer(map_provider.prop_update())
+        )
+        messages.append(message_from_server.PingMessageFromServer())
+    return messages
+
+
+def Benchmark(messages, wire_format, repetitions):
+    """Returns (encode seconds, decode seconds, bytes) per message."""
+    frames = []
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        frames = []
+        for message in messages:
+            data = EncodeMessage(message, wire_format)
+            if not wire_format.binary():
+                data = data.decode("utf-8")
+            frames.append(data)
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for data in frames:
+            if not wire_format.binary():
+                # Websocket text frames are UTF-8 on the wire.
+                data = data.encode("utf-8")
+            DecodeMessage(MessageFromServer, data, wire_format)
+    decode_s = time.perf_counter() - start
+
+    count = len(messages) * repetitions
+    size = sum(len(frame) for frame in frames) / len(frames)
+    return encode_s / count, decode_s / count, size
+
+
+def main(number_of_maps=10, repetitions=5):
+    logging.basicConfig(level=logging.INFO)
+    messages = BenchmarkMessages(number_of_maps)
+    print(f"{'format':<12}{'encode msg/s':>14}{'decode msg/s':>14}{'bytes/msg':>12}")
+    for wire_format in [WireFormat.JSON_TEXT] + AvailableWireFormats():
+        encode_s, decode_s, size = Benchmark(messages, wire_format, repetitions)
+        print(
+            f"{wire_format.name:<12}{1 / encode_s:>14.0f}{1 / decode_s:>14.0f}{size:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)